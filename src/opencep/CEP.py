@@ -60,3 +60,11 @@ class CEP:
         Returns an object summarizing the structure of the underlying evaluation mechanism.
         """
         return self.__evaluation_manager.get_structure_summary()
+
+    def get_evaluation_mechanism_profile_report(self):
+        """
+        Returns a table listing, for each node of the evaluation tree, the partial matches it was expected to hold by
+        the cost model side by side with the counters collected during the evaluation. Profiling must be enabled in
+        the storage parameters of the evaluation mechanism.
+        """
+        return self.__evaluation_manager.get_profile_report()
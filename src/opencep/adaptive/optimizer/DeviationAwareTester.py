@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import List
 
+from opencep.misc import DefaultConfig
+
 
 class DeviationAwareTester(ABC):
     """
@@ -10,9 +12,10 @@ class DeviationAwareTester(ABC):
         self._deviation_threshold = deviation_threshold
 
     @abstractmethod
-    def is_deviated_by_t(self, new_statistics, prev_statistics):
+    def is_deviated_by_t(self, new_statistics, prev_statistics, confidence=None):
         """
         Checks if there was a deviation in one of the statistics by the given factor.
+        If the confidence of the new statistics is provided, it may be used to ignore unreliable estimates.
         """
         raise NotImplementedError()
 
@@ -21,7 +24,7 @@ class ArrivalRatesDeviationAwareTester(DeviationAwareTester):
     """
     Checks for deviations in the arrival rates statistics by the given factor.
     """
-    def is_deviated_by_t(self, new_statistics: List[int], prev_statistics: List[int]):
+    def is_deviated_by_t(self, new_statistics: List[int], prev_statistics: List[int], confidence=None):
         for i in range(len(new_statistics)):
             if prev_statistics[i] * (1 + self._deviation_threshold) < new_statistics[i] or \
                     prev_statistics[i] * (1 - self._deviation_threshold) > new_statistics[i]:
@@ -32,10 +35,20 @@ class ArrivalRatesDeviationAwareTester(DeviationAwareTester):
 class SelectivityDeviationAwareOptimizerTester(DeviationAwareTester):
     """
     Checks for deviations in the selectivity matrix statistics by the given factor.
+    Entries estimated from less than the given minimal number of samples are ignored.
     """
-    def is_deviated_by_t(self, new_statistics: List[List[float]], prev_statistics: List[List[float]]):
+    def __init__(self, deviation_threshold: float,
+                 min_samples: float = DefaultConfig.MIN_SELECTIVITY_SAMPLES_FOR_DEVIATION):
+        super().__init__(deviation_threshold)
+        self.__min_samples = min_samples
+
+    def is_deviated_by_t(self, new_statistics: List[List[float]], prev_statistics: List[List[float]],
+                         confidence: List[List[float]] = None):
         for i in range(len(new_statistics)):
             for j in range(i+1):
+                if confidence is not None and confidence[i][j] < self.__min_samples:
+                    # not enough samples to rely on this estimate
+                    continue
                 if prev_statistics[i][j] * (1 + self._deviation_threshold) < new_statistics[i][j] or \
                         prev_statistics[i][j] * (1 - self._deviation_threshold) > new_statistics[i][j]:
                     return True
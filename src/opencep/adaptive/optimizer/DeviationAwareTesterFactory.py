@@ -1,4 +1,5 @@
 from typing import List
+from opencep.misc import DefaultConfig
 from opencep.adaptive.statistics.StatisticsTypes import StatisticsTypes
 from opencep.adaptive.optimizer import DeviationAwareTester
 
@@ -9,8 +10,10 @@ class DeviationAwareTesterFactory:
     """
     @staticmethod
     def create_deviation_aware_tester(statistics_type: StatisticsTypes or List[StatisticsTypes],
-                                      deviation_threshold: float):
+                                      deviation_threshold: float,
+                                      min_selectivity_samples: float = DefaultConfig.MIN_SELECTIVITY_SAMPLES_FOR_DEVIATION):
         if statistics_type == StatisticsTypes.ARRIVAL_RATES:
             return DeviationAwareTester.ArrivalRatesDeviationAwareTester(deviation_threshold)
         if statistics_type == StatisticsTypes.SELECTIVITY_MATRIX:
-            return DeviationAwareTester.SelectivityDeviationAwareOptimizerTester(deviation_threshold)
+            return DeviationAwareTester.SelectivityDeviationAwareOptimizerTester(deviation_threshold,
+                                                                                 min_selectivity_samples)
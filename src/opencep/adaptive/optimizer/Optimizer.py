@@ -20,9 +20,10 @@ class Optimizer(ABC):
         self.__is_adaptivity_enabled = is_adaptivity_enabled
 
     @abstractmethod
-    def should_optimize(self, new_statistics: dict, pattern: Pattern):
+    def should_optimize(self, new_statistics: dict, pattern: Pattern, statistics_confidence: dict = None):
         """
         Returns True if it is necessary to attempt a reoptimization at this time, and False otherwise.
+        The optional confidence dictionary maps statistics types to the confidence of the respective estimates.
         """
         raise NotImplementedError()
 
@@ -76,7 +77,7 @@ class TrivialOptimizer(Optimizer):
     """
     Represents the trivial optimizer that always initiates plan reconstruction ignoring the statistics.
     """
-    def should_optimize(self, new_statistics: dict, pattern: Pattern):
+    def should_optimize(self, new_statistics: dict, pattern: Pattern, statistics_confidence: dict = None):
         return True
 
     def build_new_plan(self, new_statistics: dict, pattern: Pattern, shared_sub_trees: List[TreePlan] = None):
@@ -94,10 +95,12 @@ class StatisticsDeviationAwareOptimizer(Optimizer):
         self.__prev_statistics = None
         self.__type_to_deviation_aware_tester_map = type_to_deviation_aware_functions_map
 
-    def should_optimize(self, new_statistics: dict, pattern: Pattern):
+    def should_optimize(self, new_statistics: dict, pattern: Pattern, statistics_confidence: dict = None):
         for new_stats_type, new_stats in new_statistics.items():
             prev_stats = self.__prev_statistics[new_stats_type]
-            if self.__type_to_deviation_aware_tester_map[new_stats_type].is_deviated_by_t(new_stats, prev_stats):
+            confidence = None if statistics_confidence is None else statistics_confidence.get(new_stats_type)
+            if self.__type_to_deviation_aware_tester_map[new_stats_type].is_deviated_by_t(new_stats, prev_stats,
+                                                                                          confidence):
                 return True
         return False
 
@@ -116,7 +119,7 @@ class InvariantsAwareOptimizer(Optimizer):
         super().__init__(tree_plan_builder, is_adaptivity_enabled)
         self._invariants = None
 
-    def should_optimize(self, new_statistics: dict, pattern: Pattern):
+    def should_optimize(self, new_statistics: dict, pattern: Pattern, statistics_confidence: dict = None):
         return self._invariants is None or self._invariants.is_invariants_violated(new_statistics, pattern)
 
     def build_new_plan(self, new_statistics: dict, pattern: Pattern, shared_sub_trees: List[TreePlan] = None):
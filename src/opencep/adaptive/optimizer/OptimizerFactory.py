@@ -42,7 +42,8 @@ class StatisticsDeviationAwareOptimizerParameters(OptimizerParameters):
     def __init__(self, tree_plan_params: TreePlanBuilderParameters = TreePlanBuilderParameters(),
                  statistics_collector_params: StatisticsCollectorParameters = StatisticsCollectorParameters(),
                  statistics_updates_wait_time: timedelta = DefaultConfig.STATISTICS_UPDATES_WAIT_TIME,
-                 deviation_threshold: float = DefaultConfig.DEVIATION_OPTIMIZER_THRESHOLD):
+                 deviation_threshold: float = DefaultConfig.DEVIATION_OPTIMIZER_THRESHOLD,
+                 min_selectivity_samples: float = DefaultConfig.MIN_SELECTIVITY_SAMPLES_FOR_DEVIATION):
         super().__init__(OptimizerTypes.STATISTICS_DEVIATION_AWARE_OPTIMIZER, tree_plan_params,
                          statistics_collector_params, statistics_updates_wait_time)
         statistics_types = statistics_collector_params.statistics_types
@@ -50,6 +51,7 @@ class StatisticsDeviationAwareOptimizerParameters(OptimizerParameters):
             statistics_types = [statistics_types]
         self.statistics_types = statistics_types
         self.deviation_threshold = deviation_threshold
+        self.min_selectivity_samples = min_selectivity_samples
 
 
 class InvariantsAwareOptimizerParameters(OptimizerParameters):
@@ -84,8 +86,8 @@ class OptimizerFactory:
             deviation_threshold = optimizer_parameters.deviation_threshold
             type_to_deviation_aware_tester_map = {}
             for stat_type in optimizer_parameters.statistics_types:
-                deviation_aware_tester = DeviationAwareTesterFactory.create_deviation_aware_tester(stat_type,
-                                                                                                   deviation_threshold)
+                deviation_aware_tester = DeviationAwareTesterFactory.create_deviation_aware_tester(
+                    stat_type, deviation_threshold, optimizer_parameters.min_selectivity_samples)
                 type_to_deviation_aware_tester_map[stat_type] = deviation_aware_tester
 
             return Optimizer.StatisticsDeviationAwareOptimizer(tree_plan_builder, is_adaptivity_enabled,
@@ -1,16 +1,19 @@
 import copy
+import math
+import random
 from abc import ABC
-from datetime import timedelta, datetime
+from collections import deque
 from typing import List
 from opencep.base.Event import Event
 from opencep.base.Pattern import Pattern
+from opencep.misc import DefaultConfig
 
 
 class StatisticEventData:
     """
     A container class that contains the event type along with event timestamp
     """
-    def __init__(self, timestamp: datetime, event_type: str):
+    def __init__(self, timestamp: int, event_type: str):
         self.timestamp = timestamp
         self.event_type = event_type
 
@@ -32,6 +35,19 @@ class Statistics(ABC):
         """
         raise NotImplementedError()
 
+    def advance_time(self, timestamp: int):
+        """
+        Notifies the statistics that the stream has progressed to the given timestamp.
+        Only relevant for statistics that are not updated from the stream directly. Does nothing by default.
+        """
+        pass
+
+    def get_confidence(self):
+        """
+        Returns the confidence of the current statistics, or None if the statistics are exact.
+        """
+        return None
+
     @staticmethod
     def get_default_statistics(pattern: Pattern):
         """
@@ -44,7 +60,7 @@ class ArrivalRatesStatistics(Statistics):
     """
     Represents the arrival rates statistics.
     """
-    def __init__(self, arrival_rates_time_window: timedelta, pattern: Pattern, predefined_statistics: List = None):
+    def __init__(self, arrival_rates_time_window: int, pattern: Pattern, predefined_statistics: List = None):
         self.__arrival_rates = ArrivalRatesStatistics.get_default_statistics(pattern) \
             if not predefined_statistics else predefined_statistics
         self.__event_type_to_indices_map = {}
@@ -53,7 +69,7 @@ class ArrivalRatesStatistics(Statistics):
                 self.__event_type_to_indices_map[arg.type].append(i)
             else:
                 self.__event_type_to_indices_map[arg.type] = [i]
-        self.__events_arrival_time = []
+        self.__events_arrival_time = deque()
         self.__arrival_rates_time_window = arrival_rates_time_window
         self.__last_timestamp = None
 
@@ -73,24 +89,16 @@ class ArrivalRatesStatistics(Statistics):
 
         self.__remove_expired_events(event_timestamp)
 
-    def __remove_expired_events(self, last_timestamp: datetime):
+    def __remove_expired_events(self, last_timestamp: int):
         """
         Lowers the arrival rates of the events that left the time window.
         """
-        is_removed_elements = False
-        for i, event_time in enumerate(self.__events_arrival_time):
-            if last_timestamp - event_time.timestamp > self.__arrival_rates_time_window:
-                indices = self.__event_type_to_indices_map[event_time.event_type]
-                for index in indices:
-                    self.__arrival_rates[index] -= 1
-
-            else:
-                is_removed_elements = True
-                self.__events_arrival_time = self.__events_arrival_time[i:]
-                break
-
-        if not is_removed_elements:
-            self.__events_arrival_time = []
+        events_arrival_time = self.__events_arrival_time
+        while len(events_arrival_time) > 0 and \
+                last_timestamp - events_arrival_time[0].timestamp > self.__arrival_rates_time_window:
+            indices = self.__event_type_to_indices_map[events_arrival_time.popleft().event_type]
+            for index in indices:
+                self.__arrival_rates[index] -= 1
 
     def get_statistics(self):
         return copy.deepcopy(self.__arrival_rates)
@@ -103,18 +111,34 @@ class ArrivalRatesStatistics(Statistics):
 class SelectivityStatistics(Statistics):
     """
     Represents the selectivity statistics.
-    NOTE: Currently it ignores the time window
+    Only a random sample of the atomic condition evaluations (as specified by the sampling rate) is registered, and
+    only the samples collected within the statistics time window are taken into account. The window is divided into a
+    fixed number of buckets, such that an entire bucket is expired at once. Alternatively, if a decay factor is
+    specified, the older samples are not expired but rather exponentially decayed by this factor per bucket.
     """
-    # TODO: support time window for selectivity
-
-    def __init__(self, pattern: Pattern, predefined_statistics: List[List[float]] = None):
+    def __init__(self, pattern: Pattern, predefined_statistics: List[List[float]] = None,
+                 time_window: int = None,
+                 sampling_rate: float = DefaultConfig.SELECTIVITY_SAMPLING_RATE,
+                 decay_factor: float = DefaultConfig.SELECTIVITY_DECAY_FACTOR,
+                 buckets_number: int = DefaultConfig.SELECTIVITY_WINDOW_BUCKETS_NUMBER):
+        if sampling_rate <= 0.0 or sampling_rate > 1.0:
+            raise Exception("Invalid selectivity sampling rate: %s" % (sampling_rate,))
+        if decay_factor is not None and (decay_factor <= 0.0 or decay_factor >= 1.0):
+            raise Exception("Invalid selectivity decay factor: %s" % (decay_factor,))
         self.__args = pattern.get_primitive_events()
         self.__args_len = len(self.__args)
-        self.__atomic_condition_to_total_map = {}
-        self.__atomic_condition_to_success_map = {}
+        self.__atomic_condition_to_counter_map = {}
         self.__indices_to_atomic_condition_map = {}
         self.__relevant_indices = set()
 
+        self.__sampling_rate = sampling_rate
+        self.__samples_to_skip = 0
+        self.__decay_factor = decay_factor
+        self.__buckets_number = buckets_number
+        self.__bucket_length = None if time_window is None else time_window / buckets_number
+        self.__first_timestamp = None
+        self.__current_bucket = 0
+
         if not predefined_statistics:
             self.__selectivity_matrix = SelectivityStatistics.get_default_statistics(pattern)
         else:
@@ -124,16 +148,29 @@ class SelectivityStatistics(Statistics):
 
     def update(self, data):
         """
-        Updates the selectivity of an atomic condition.
+        Updates the selectivity of an atomic condition if this evaluation was chosen to be sampled.
         """
-        (atomic_condition, is_condition_success) = data
+        if self.__samples_to_skip > 0:
+            self.__samples_to_skip -= 1
+            return
+        self.__samples_to_skip = self.__get_number_of_samples_to_skip()
 
+        (atomic_condition, is_condition_success) = data
         if atomic_condition:
-            atomic_condition_id = str(atomic_condition)
-            if atomic_condition_id in self.__atomic_condition_to_total_map:
-                self.__atomic_condition_to_total_map[atomic_condition_id] += 1
-                if is_condition_success:
-                    self.__atomic_condition_to_success_map[atomic_condition_id] += 1
+            counter = self.__atomic_condition_to_counter_map.get(str(atomic_condition))
+            if counter is not None:
+                counter.add_sample(is_condition_success, self.__current_bucket, self.__get_oldest_valid_bucket())
+
+    def advance_time(self, timestamp: int):
+        """
+        Moves the current bucket according to the given timestamp.
+        """
+        if self.__bucket_length is None:
+            # the time window is disabled
+            return
+        if self.__first_timestamp is None:
+            self.__first_timestamp = timestamp
+        self.__current_bucket = int((timestamp - self.__first_timestamp) / self.__bucket_length)
 
     def get_statistics(self):
         """
@@ -147,23 +184,59 @@ class SelectivityStatistics(Statistics):
             # computation of the (i, j), (j, i) entries in the selectivity matrix
             selectivity = 1.0
             for atomic_condition_id in atomic_conditions_id:
-                numerator = self.__atomic_condition_to_success_map[atomic_condition_id]
-                denominator = self.__atomic_condition_to_total_map[atomic_condition_id]
-                if denominator != 0.0:
-                    selectivity *= (numerator / denominator)
+                counter = self.__get_up_to_date_counter(atomic_condition_id)
+                if counter.total != 0.0:
+                    selectivity *= (counter.success / counter.total)
 
             self.__selectivity_matrix[j][i] = self.__selectivity_matrix[i][j] = selectivity
 
         return copy.deepcopy(self.__selectivity_matrix)
 
+    def get_confidence(self):
+        """
+        Returns a matrix specifying the confidence of each entry in the selectivity matrix, measured as the (possibly
+        decayed) number of samples the estimate is based on. For an entry calculated from several atomic conditions,
+        the smallest sample count is taken. Entries not corresponding to any condition are always exact.
+        """
+        confidence_matrix = [[float("inf") for _ in range(self.__args_len)] for _ in range(self.__args_len)]
+        for i, j in self.__relevant_indices:
+            confidence = min(self.__get_up_to_date_counter(atomic_condition_id).total
+                             for atomic_condition_id in self.__indices_to_atomic_condition_map[(i, j)])
+            confidence_matrix[j][i] = confidence_matrix[i][j] = confidence
+        return confidence_matrix
+
     @staticmethod
     def get_default_statistics(pattern: Pattern):
         primitive_events = pattern.get_primitive_events()
         return [[1.0 for _ in primitive_events] for _ in primitive_events]
 
+    def __get_number_of_samples_to_skip(self):
+        """
+        Returns the number of atomic condition evaluations to be skipped until the next sample. The skip length is
+        geometrically distributed, which is equivalent to independently sampling each evaluation with the given rate
+        while only drawing a random number once per sample.
+        """
+        if self.__sampling_rate >= 1.0:
+            return 0
+        return int(math.log(1.0 - random.random()) / math.log(1.0 - self.__sampling_rate))
+
+    def __get_oldest_valid_bucket(self):
+        """
+        Returns the index of the oldest bucket whose samples are still taken into account.
+        """
+        return self.__current_bucket - self.__buckets_number + 1
+
+    def __get_up_to_date_counter(self, atomic_condition_id: str):
+        """
+        Returns the counter of the given atomic condition after removing or decaying its outdated samples.
+        """
+        counter = self.__atomic_condition_to_counter_map[atomic_condition_id]
+        counter.refresh(self.__current_bucket, self.__get_oldest_valid_bucket())
+        return counter
+
     def __init_maps(self, pattern: Pattern):
         """
-        Initiates the success counters and total evaluation counters for each pair of event types.
+        Initiates the sample counters for each pair of event types.
         """
         for i in range(self.__args_len):
             for j in range(i + 1):
@@ -173,9 +246,60 @@ class SelectivityStatistics(Statistics):
                     if atomic_condition:
                         atomic_condition_id = str(atomic_condition)
                         self.__relevant_indices.add((i, j))
-                        self.__atomic_condition_to_total_map[atomic_condition_id] = 0.0
-                        self.__atomic_condition_to_success_map[atomic_condition_id] = 0.0
+                        self.__atomic_condition_to_counter_map[atomic_condition_id] = \
+                            SelectivitySampleCounter(self.__decay_factor)
                         if (i, j) in self.__indices_to_atomic_condition_map:
                             self.__indices_to_atomic_condition_map[(i, j)].append(atomic_condition_id)
                         else:
                             self.__indices_to_atomic_condition_map[(i, j)] = [atomic_condition_id]
+
+
+class SelectivitySampleCounter:
+    """
+    Counts the successful and the total sampled evaluations of a single atomic condition.
+    The samples are grouped into time buckets. In the windowed mode, the buckets that left the time window are removed
+    from the counts. In the decayed mode, the counts are multiplied by the decay factor once per elapsed bucket.
+    """
+    __slots__ = ("total", "success", "__decay_factor", "__buckets", "__last_bucket")
+
+    def __init__(self, decay_factor: float = None):
+        self.total = 0.0
+        self.success = 0.0
+        self.__decay_factor = decay_factor
+        # a list of [bucket index, total samples, successful samples] entries, only used in the windowed mode
+        self.__buckets = deque()
+        self.__last_bucket = 0
+
+    def add_sample(self, is_success: bool, current_bucket: int, oldest_valid_bucket: int):
+        """
+        Registers a new sample in the given bucket.
+        """
+        if current_bucket != self.__last_bucket:
+            self.refresh(current_bucket, oldest_valid_bucket)
+        self.total += 1
+        if is_success:
+            self.success += 1
+        if self.__decay_factor is not None:
+            return
+        if len(self.__buckets) == 0 or self.__buckets[-1][0] != current_bucket:
+            self.__buckets.append([current_bucket, 0, 0])
+        bucket = self.__buckets[-1]
+        bucket[1] += 1
+        if is_success:
+            bucket[2] += 1
+
+    def refresh(self, current_bucket: int, oldest_valid_bucket: int):
+        """
+        Removes (or decays) the samples that are too old with respect to the given bucket indices.
+        """
+        if self.__decay_factor is not None:
+            if current_bucket > self.__last_bucket:
+                factor = self.__decay_factor ** (current_bucket - self.__last_bucket)
+                self.total *= factor
+                self.success *= factor
+        else:
+            while len(self.__buckets) > 0 and self.__buckets[0][0] < oldest_valid_bucket:
+                _, expired_total, expired_success = self.__buckets.popleft()
+                self.total -= expired_total
+                self.success -= expired_success
+        self.__last_bucket = current_bucket
@@ -12,9 +12,12 @@ class StatisticsCollector:
     def handle_event(self, event: Event):
         """
         Handles events directly from the stream.
-        Currently only arrival rates statistics handles the events
+        Currently only arrival rates statistics handles the events, while the rest of the statistics are only notified
+        of the progress of time.
         """
         self.update_statistics_by_type(StatisticsTypes.ARRIVAL_RATES, event)
+        for statistics in self.__statistics.values():
+            statistics.advance_time(event.timestamp)
 
     def get_statistics(self):
         """
@@ -23,6 +26,18 @@ class StatisticsCollector:
         return {statistics_type: statistics.get_statistics() for statistics_type, statistics in
                 self.__statistics.items()}
 
+    def get_statistics_confidence(self):
+        """
+        Returns a dictionary containing the statistics types and the confidence of the respective statistics.
+        Statistics that are known exactly are omitted.
+        """
+        result = {}
+        for statistics_type, statistics in self.__statistics.items():
+            confidence = statistics.get_confidence()
+            if confidence is not None:
+                result[statistics_type] = confidence
+        return result
+
     def update_statistics_by_type(self, statistics_type: StatisticsTypes, data):
         """
         This method exists because there are statistics(like selectivity)
@@ -12,11 +12,17 @@ class StatisticsCollectorParameters:
     Parameters for the statistics collector
     """
     def __init__(self, statistics_time_window: timedelta = DefaultConfig.STATISTICS_TIME_WINDOW,
-                 statistics_types: StatisticsTypes or List[StatisticsTypes] = DefaultConfig.DEFAULT_STATISTICS_TYPE):
+                 statistics_types: StatisticsTypes or List[StatisticsTypes] = DefaultConfig.DEFAULT_STATISTICS_TYPE,
+                 selectivity_sampling_rate: float = DefaultConfig.SELECTIVITY_SAMPLING_RATE,
+                 selectivity_decay_factor: float = DefaultConfig.SELECTIVITY_DECAY_FACTOR):
         if isinstance(statistics_types, StatisticsTypes):
             statistics_types = [statistics_types]
         self.statistics_types = statistics_types
         self.statistics_time_window = statistics_time_window
+        # the fraction of atomic condition evaluations to be sampled for selectivity estimation
+        self.selectivity_sampling_rate = selectivity_sampling_rate
+        # if specified, old selectivity samples are exponentially decayed instead of being dropped out of the window
+        self.selectivity_decay_factor = selectivity_decay_factor
 
 
 class StatisticsCollectorFactory:
@@ -41,7 +47,9 @@ class StatisticsCollectorFactory:
         statistics_time_window = statistics_collector_parameters.statistics_time_window
         statistics_dict = {}
         for stat_type in statistics_collector_parameters.statistics_types:
-            stat = StatisticsFactory.create_statistics(pattern, stat_type, statistics_time_window)
+            stat = StatisticsFactory.create_statistics(pattern, stat_type, statistics_time_window,
+                                                       statistics_collector_parameters.selectivity_sampling_rate,
+                                                       statistics_collector_parameters.selectivity_decay_factor)
             statistics_dict[stat_type] = stat
         return StatisticsCollector(statistics_dict)
 
@@ -1,6 +1,8 @@
 import copy
 from datetime import timedelta
 from opencep.base.Pattern import Pattern
+from opencep.misc import DefaultConfig
+from opencep.misc.Timestamps import to_duration_ns
 from opencep.adaptive.statistics.StatisticsTypes import StatisticsTypes
 from opencep.adaptive.statistics.Statistics import SelectivityStatistics, ArrivalRatesStatistics
 
@@ -11,15 +13,20 @@ class StatisticsFactory:
     """
 
     @staticmethod
-    def create_statistics(pattern: Pattern, stat_type: StatisticsTypes, statistics_time_window: timedelta):
+    def create_statistics(pattern: Pattern, stat_type: StatisticsTypes, statistics_time_window: timedelta,
+                          selectivity_sampling_rate: float = DefaultConfig.SELECTIVITY_SAMPLING_RATE,
+                          selectivity_decay_factor: float = DefaultConfig.SELECTIVITY_DECAY_FACTOR):
         predefined_statistics = None
         if pattern.statistics and stat_type in pattern.statistics:
             predefined_statistics = copy.deepcopy(pattern.statistics[stat_type])
+        # the statistics are updated with the internal event timestamps
+        statistics_time_window = to_duration_ns(statistics_time_window)
 
         if stat_type == StatisticsTypes.ARRIVAL_RATES:
             return ArrivalRatesStatistics(statistics_time_window, pattern, predefined_statistics)
         if stat_type == StatisticsTypes.SELECTIVITY_MATRIX:
-            return SelectivityStatistics(pattern, predefined_statistics)
+            return SelectivityStatistics(pattern, predefined_statistics, statistics_time_window,
+                                         selectivity_sampling_rate, selectivity_decay_factor)
         raise Exception("Unknown statistics type: %s" % (StatisticsTypes.stat_type,))
 
     @staticmethod
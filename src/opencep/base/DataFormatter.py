@@ -1,4 +1,5 @@
 from abc import ABC
+from typing import List
 
 
 class EventTypeClassifier(ABC):
@@ -32,10 +33,18 @@ class DataFormatter(ABC):
 
     def get_event_timestamp(self, event_payload: dict):
         """
-        Deduces and returns the timestamp of the event specified by the given payload.
+        Deduces and returns the timestamp of the event specified by the given payload, either as a datetime object or
+        as an integer number of nanoseconds since the epoch. The latter avoids the conversion performed by the engine.
         """
         raise NotImplementedError()
 
+    def get_event_timestamps(self, event_payloads: List[dict]):
+        """
+        Returns the timestamps of the events specified by the given payloads. Data formatters parsing their timestamps
+        with a timestamp parser override this method to parse the whole column at once.
+        """
+        return [self.get_event_timestamp(event_payload) for event_payload in event_payloads]
+
     def get_event_type(self, event_payload: dict):
         """
         Deduces and returns the type of the event specified by the given payload.
@@ -1,6 +1,7 @@
 from typing import List
 
 from opencep.base.DataFormatter import DataFormatter
+from opencep.misc.Timestamps import to_timestamp_ns
 
 
 class Event:
@@ -8,6 +9,7 @@ class Event:
     This class represents a single primitive event received from an input stream. It may contain arbitrary attributes
     of arbitrary types. The only requirement is that event type and timestamp of occurrence must be derivable from these
     attributes using an appropriate data formatter.
+    The timestamp is kept as an integer number of nanoseconds since the epoch (see misc/Timestamps.py).
     """
 
     # used in order to assign a serial number to each event that enters the system
@@ -16,15 +18,24 @@ class Event:
     INDEX_ATTRIBUTE_NAME = "InternalIndexAttributeName"
     HIDDEN_ATTRIBUTE_NAMES = [INDEX_ATTRIBUTE_NAME]
 
-    def __init__(self, raw_data: str, data_formatter: DataFormatter):
+    def __init__(self, raw_data: str, data_formatter: DataFormatter, event_types=None):
+        """
+        If a collection of the relevant event types is given, the timestamp and the probability of an event of any other
+        type are not parsed, and the caller is expected to discard the event right away.
+        """
         self.payload = data_formatter.parse_event(raw_data)
         self.type = data_formatter.get_event_type(self.payload)
-        self.min_timestamp = self.max_timestamp = self.timestamp = data_formatter.get_event_timestamp(self.payload)
+        # discarded events are still counted, as the strict contiguity conditions rely on the serial numbers
         self.payload[Event.INDEX_ATTRIBUTE_NAME] = Event.counter
+        Event.counter += 1
+        if event_types is not None and self.type not in event_types:
+            self.min_timestamp = self.max_timestamp = self.timestamp = self.probability = None
+            return
+        self.min_timestamp = self.max_timestamp = self.timestamp = \
+            to_timestamp_ns(data_formatter.get_event_timestamp(self.payload))
         self.probability = data_formatter.get_probability(self.payload)
         if self.probability is not None and (self.probability < 0.0 or self.probability > 1.0):
             raise Exception("Invalid value for probability:%s" % (self.probability,))
-        Event.counter += 1
 
     def __eq__(self, other):
         return self.payload == other.payload
@@ -33,15 +44,13 @@ class Event:
         return hash(self.payload[Event.INDEX_ATTRIBUTE_NAME])
 
     def __repr__(self):
-        result = ""
+        items = []
         for key, value in self.payload.items():
             if key in self.HIDDEN_ATTRIBUTE_NAMES:
                 continue
             actual_value = "'%s'" % (value,) if isinstance(value, str) else value
-            curr_str = "'%s': %s" % (key, actual_value)
-            result = curr_str if result == "" else ", ".join([result, curr_str])
-        result = "{%s}" % (result,)
-        return result
+            items.append("'%s': %s" % (key, actual_value))
+        return "{%s}" % (", ".join(items),)
 
 
 class AggregatedEvent(Event):
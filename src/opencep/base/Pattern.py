@@ -10,6 +10,7 @@ from opencep.condition.CompositeCondition import CompositeCondition, AndConditio
 from opencep.base.PatternStructure import PatternStructure, CompositeStructure, PrimitiveEventStructure, \
     SeqOperator, NegationOperator, UnaryStructure
 from opencep.misc.ConsumptionPolicy import ConsumptionPolicy
+from opencep.misc.Timestamps import to_duration_ns
 
 
 class Pattern:
@@ -44,6 +45,8 @@ class Pattern:
             self.condition = AndCondition(self.condition)
 
         self.window = time_window
+        # the time window in the internal representation of the engine
+        self.window_ns = to_duration_ns(time_window)
 
         self.statistics = statistics
 
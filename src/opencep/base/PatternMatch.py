@@ -1,3 +1,4 @@
+from itertools import count
 from opencep.base.Event import Event, AggregatedEvent
 from typing import List
 
@@ -7,44 +8,48 @@ class PatternMatch:
     Represents a set of primitive events satisfying one or more patterns.
     An instance of this class could correspond either to a full pattern match, or to any intermediate result
     created during the evaluation process.
+    The events are stored in an immutable tuple. If the pattern match is created from other pattern matches, their
+    timestamps can be provided to avoid scanning the events.
+    As the timestamps of the events, the timestamps of a pattern match are integer numbers of nanoseconds since the
+    epoch.
     """
+    __slots__ = ("events", "first_timestamp", "last_timestamp", "pattern_ids", "probability", "partial_id",
+                 "contributing_buckets")
 
-    # Count of all pattern matches created
-    counter = 0
+    # Generates a unique ID for each pattern match
+    __id_generator = count(1)
 
-    def __init__(self, events: List[Event], probability: float = None):
-        self.events = events
-        self.last_timestamp = max(events, key=lambda x: x.max_timestamp).max_timestamp
-        self.first_timestamp = min(events, key=lambda x: x.min_timestamp).min_timestamp
+    def __init__(self, events: List[Event], probability: float = None,
+                 first_timestamp: int = None, last_timestamp: int = None):
+        self.events = events if type(events) is tuple else tuple(events)
+        if first_timestamp is None:
+            first_timestamp = min(event.min_timestamp for event in self.events)
+        if last_timestamp is None:
+            last_timestamp = max(event.max_timestamp for event in self.events)
+        self.first_timestamp = first_timestamp
+        self.last_timestamp = last_timestamp
         # this field is only used for full pattern matches
-        self.pattern_ids = []
+        self.pattern_ids = ()
         self.probability = probability
-        # Increment global counter to gain a unique ID for this pattern match
-        PatternMatch.counter += 1
-        self.partial_id = PatternMatch.counter
+        self.partial_id = next(PatternMatch.__id_generator)
+        # the load shedding buckets of the partial matches this pattern match was created from
+        self.contributing_buckets = frozenset()
 
     def __eq__(self, other):
         return isinstance(other, PatternMatch) and set(self.events) == set(other.events) and \
                self.pattern_ids == other.pattern_ids
 
     def __str__(self):
-        result = ""
-        match = ""
+        lines = []
         for event in self.events:
             if isinstance(event, AggregatedEvent):
-                for primitive_event in event.primitive_events:
-                    match += f"{primitive_event}\n"
+                lines.extend("%s\n" % primitive_event for primitive_event in event.primitive_events)
             else:
-                match += "%s\n" % event
+                lines.append("%s\n" % event)
+        match = "".join(lines)
         if len(self.pattern_ids) == 0:
-            result += match
-            result += "\n"
-        else:
-            for idx in self.pattern_ids:
-                result += "%s: " % idx
-                result += match
-                result += "\n"
-        return result
+            return match + "\n"
+        return "".join("%s: %s\n" % (idx, match) for idx in self.pattern_ids)
 
     def __len__(self):
         res = 0
@@ -60,4 +65,4 @@ class PatternMatch:
         Adds a new pattern ID corresponding to this pattern,
         """
         if pattern_id not in self.pattern_ids:
-            self.pattern_ids.append(pattern_id)
+            self.pattern_ids += (pattern_id,)
@@ -0,0 +1,230 @@
+"""
+This file contains the benchmark runner, measuring the performance of the engine on the benchmark workloads and
+comparing it with a stored JSON baseline in order to detect performance regressions.
+For each benchmark, the following results are reported:
+- throughput: the number of input events processed per second;
+- p50_latency_ns / p99_latency_ns: the median / 99th percentile of the per-event processing latency, as reported by
+  the evaluation mechanism via StudentMetrics;
+- peak_partial_matches: the maximal number of partial matches (or buffered events, for the lazy NFA) kept at once;
+- peak_memory_bytes: the peak memory allocated during the evaluation, measured by a separate run using tracemalloc;
+- matches: the number of detected matches, which must not differ from the baseline.
+The timing results are taken from the fastest of several repetitions.
+
+Usage: python -m opencep.benchmark.BenchmarkRunner [--baseline PATH] [--update] [--cases NAME ...]
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from typing import Dict, List
+
+import opencep.misc.StudentMetrics as metrics
+from opencep.CEP import CEP
+from opencep.benchmark.SyntheticStream import SyntheticInputStream, generate_synthetic_events, \
+    create_synthetic_data_formatter
+from opencep.benchmark.Workloads import BenchmarkCase, get_default_benchmark_matrix
+from opencep.misc import DefaultConfig
+from opencep.stream.Stream import OutputStream
+
+# for the following results, a higher value is better
+HIGHER_IS_BETTER_RESULTS = ["throughput"]
+# for the following results, a lower value is better
+LOWER_IS_BETTER_RESULTS = ["p50_latency_ns", "p99_latency_ns", "peak_partial_matches", "peak_memory_bytes"]
+
+
+class _CountingOutputStream(OutputStream):
+    """
+    Counts the matches instead of storing them.
+    """
+    def __init__(self):
+        super().__init__()
+        self.matches_count = 0
+
+    def add_item(self, item: object):
+        self.matches_count += 1
+
+    def close(self):
+        pass
+
+
+class _MetricsCollector:
+    """
+    A metric sink collecting the per-event latencies and the peak number of partial matches.
+    """
+    def __init__(self):
+        self.latencies = []
+        self.peak_partial_matches = 0
+
+    def __call__(self, values: list):
+        _, metric_type, metric, value, _, attribute_value = values
+        if metric_type == "hist" and metric == str(metrics.Metrics.EVENT_PROCESSING_LATENCY):
+            self.latencies.append(value)
+            if attribute_value > self.peak_partial_matches:
+                self.peak_partial_matches = attribute_value
+
+
+def get_percentile(sorted_values: list, percentile: float):
+    """
+    Returns the given percentile of a sorted list using the nearest-rank method.
+    """
+    if len(sorted_values) == 0:
+        return 0
+    rank = max(1, int(-(-percentile * len(sorted_values) // 100)))
+    return sorted_values[rank - 1]
+
+
+def run_benchmark(case: BenchmarkCase, repetitions: int = DefaultConfig.BENCHMARK_REPETITIONS,
+                  measure_memory: bool = True):
+    """
+    Runs a single benchmark and returns its results.
+    """
+    lines = generate_synthetic_events(case.stream_params)
+    data_formatter = create_synthetic_data_formatter(case.stream_params)
+    best = None
+    for _ in range(repetitions):
+        collector = _MetricsCollector()
+        run_time, matches_count = _run_once(case, lines, data_formatter, collector)
+        if best is None or run_time < best[0]:
+            best = (run_time, matches_count, collector)
+    run_time, matches_count, collector = best
+    latencies = sorted(collector.latencies)
+    results = {
+        "throughput": len(lines) / run_time if run_time > 0 else float("inf"),
+        "p50_latency_ns": get_percentile(latencies, 50),
+        "p99_latency_ns": get_percentile(latencies, 99),
+        "peak_partial_matches": collector.peak_partial_matches,
+        "matches": matches_count,
+    }
+    if measure_memory:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        _run_once(case, lines, data_formatter, _MetricsCollector())
+        results["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1] - start_memory
+        if not was_tracing:
+            tracemalloc.stop()
+    return results
+
+
+def _run_once(case: BenchmarkCase, lines: List[str], data_formatter, collector: _MetricsCollector):
+    """
+    Evaluates the patterns of the given benchmark once and returns the evaluation time and the number of matches.
+    """
+    cep = CEP(case.create_patterns(), case.eval_mechanism_params)
+    events = SyntheticInputStream(case.stream_params, lines)
+    matches = _CountingOutputStream()
+    previous_sink = metrics.set_metric_sink(collector)
+    try:
+        run_time = cep.run(events, matches, data_formatter)
+    finally:
+        metrics.set_metric_sink(previous_sink)
+    return run_time, matches.matches_count
+
+
+def run_benchmarks(cases: List[BenchmarkCase] = None, repetitions: int = DefaultConfig.BENCHMARK_REPETITIONS,
+                   measure_memory: bool = True):
+    """
+    Runs the given benchmarks (by default, the default benchmark matrix) and returns their results by name.
+    """
+    if cases is None:
+        cases = get_default_benchmark_matrix()
+    return {case.name: dict(run_benchmark(case, repetitions, measure_memory), case=case.to_dict())
+            for case in cases}
+
+
+def save_baseline(results: Dict[str, dict], file_path: str):
+    """
+    Stores the given benchmark results as a JSON baseline.
+    """
+    with open(file_path, "w") as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+
+
+def load_baseline(file_path: str):
+    """
+    Loads a JSON baseline stored by save_baseline.
+    """
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+
+def compare_with_baseline(results: Dict[str, dict], baseline: Dict[str, dict],
+                          tolerance: float = DefaultConfig.BENCHMARK_REGRESSION_TOLERANCE):
+    """
+    Returns a description of each regression of the given results with respect to the baseline. A result regresses
+    if it deteriorates by more than the given relative tolerance. Benchmarks missing from the baseline are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline_result = baseline.get(name)
+        if baseline_result is None:
+            continue
+        if baseline_result.get("case", result.get("case")) != result.get("case"):
+            regressions.append("%s: the benchmark definition differs from the baseline" % (name,))
+            continue
+        if "matches" in baseline_result and result["matches"] != baseline_result["matches"]:
+            regressions.append("%s: %d matches were detected, %d expected" %
+                               (name, result["matches"], baseline_result["matches"]))
+        for key in HIGHER_IS_BETTER_RESULTS + LOWER_IS_BETTER_RESULTS:
+            if key not in result or key not in baseline_result:
+                continue
+            value, baseline_value = result[key], baseline_result[key]
+            if key in HIGHER_IS_BETTER_RESULTS:
+                is_regression = value < baseline_value * (1 - tolerance)
+            else:
+                is_regression = value > baseline_value * (1 + tolerance)
+            if is_regression:
+                regressions.append("%s: %s is %s, the baseline is %s" % (name, key, value, baseline_value))
+    return regressions
+
+
+def _format_results(results: Dict[str, dict]):
+    columns = ["throughput"] + LOWER_IS_BETTER_RESULTS + ["matches"]
+    rows = [["benchmark"] + columns]
+    for name, result in results.items():
+        rows.append([name] + [("%.1f" % (result[key],)) if isinstance(result.get(key), float) else
+                              str(result.get(key, "-")) for key in columns])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(value.rjust(width) for value, width in zip(row, widths)) for row in rows)
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Runs the OpenCEP benchmarks.")
+    parser.add_argument("--baseline", help="a JSON baseline to compare the results with")
+    parser.add_argument("--update", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--cases", nargs="+", help="the names of the benchmarks to run")
+    parser.add_argument("--repetitions", type=int, default=DefaultConfig.BENCHMARK_REPETITIONS)
+    parser.add_argument("--tolerance", type=float, default=DefaultConfig.BENCHMARK_REGRESSION_TOLERANCE)
+    parser.add_argument("--no-memory", action="store_true", help="skip the memory measurement run")
+    options = parser.parse_args(args)
+
+    cases = get_default_benchmark_matrix()
+    if options.cases is not None:
+        unknown_cases = set(options.cases) - set(case.name for case in cases)
+        if len(unknown_cases) > 0:
+            parser.error("unknown benchmarks: %s" % (", ".join(sorted(unknown_cases)),))
+        cases = [case for case in cases if case.name in options.cases]
+    results = run_benchmarks(cases, options.repetitions, not options.no_memory)
+    print(_format_results(results))
+
+    if options.baseline is None:
+        return 0
+    if options.update:
+        baseline = load_baseline(options.baseline) if os.path.exists(options.baseline) else {}
+        baseline.update(results)
+        save_baseline(baseline, options.baseline)
+        print("Baseline %s updated." % (options.baseline,))
+        return 0
+    regressions = compare_with_baseline(results, load_baseline(options.baseline), options.tolerance)
+    for regression in regressions:
+        print("Regression - %s" % (regression,))
+    if len(regressions) == 0:
+        print("No regressions with respect to baseline %s." % (options.baseline,))
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
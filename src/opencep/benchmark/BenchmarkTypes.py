@@ -0,0 +1,25 @@
+from enum import Enum
+
+
+class PatternShapes(Enum):
+    """
+    The shapes of the patterns generated for the benchmarks.
+    SEQ / AND: a sequence / conjunction of primitive events.
+    KLEENE_CLOSURE: a Kleene closure of a sequence of primitive events.
+    NEGATION: a sequence whose middle event is negated.
+    MULTI_PATTERN: several sequences sharing all but their last event, detected together.
+    """
+    SEQ = 0
+    AND = 1
+    KLEENE_CLOSURE = 2
+    NEGATION = 3
+    MULTI_PATTERN = 4
+
+
+class AttributeDistributions(Enum):
+    """
+    The distributions of the numeric attributes of the synthetic events.
+    """
+    UNIFORM = 0
+    NORMAL = 1
+    EXPONENTIAL = 2
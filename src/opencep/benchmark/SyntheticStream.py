@@ -0,0 +1,112 @@
+"""
+This file contains the generator of the synthetic event streams used by the benchmarks.
+Each event is a CSV line of the form "type,timestamp,value,attribute_1,...,attribute_k", where the timestamp is an
+integer number of nanoseconds since the epoch and value is uniformly distributed in [0, 1). The conditions of the
+benchmark patterns are defined over value, such that their selectivity is known in advance (see Workloads.py). The
+remaining attributes follow the configured distribution and only contribute to the payload size.
+"""
+import random
+from typing import Optional
+
+from opencep.benchmark.BenchmarkTypes import AttributeDistributions
+from opencep.misc import DefaultConfig
+from opencep.misc.Timestamps import NANOSECONDS_PER_SECOND
+from opencep.plugin.csv.SchemaCsvDataFormatter import SchemaCsvDataFormatter
+from opencep.stream.Stream import InputStream
+
+SYNTHETIC_TYPE_KEY = "Type"
+SYNTHETIC_TIMESTAMP_KEY = "Timestamp"
+SYNTHETIC_VALUE_KEY = "Value"
+SYNTHETIC_START_TIMESTAMP = 1577836800 * NANOSECONDS_PER_SECOND  # 2020-01-01
+
+
+class SyntheticStreamParameters:
+    """
+    Parameters of a synthetic event stream.
+    event_rate is the average number of events per second, with exponentially distributed inter-arrival times.
+    type_skew is the exponent of the Zipf distribution of the event types, 0 meaning that all types are equally
+    frequent. The most frequent type is "T0", followed by "T1", etc.
+    """
+    def __init__(self, event_count: int = DefaultConfig.BENCHMARK_EVENT_COUNT,
+                 event_rate: float = DefaultConfig.BENCHMARK_EVENT_RATE,
+                 event_types_number: int = DefaultConfig.BENCHMARK_EVENT_TYPES_NUMBER, type_skew: float = 0.0,
+                 attributes_number: int = 2,
+                 attribute_distribution: AttributeDistributions = AttributeDistributions.UNIFORM, seed: int = 0):
+        self.event_count = event_count
+        self.event_rate = event_rate
+        self.event_types_number = event_types_number
+        self.type_skew = type_skew
+        self.attributes_number = attributes_number
+        self.attribute_distribution = attribute_distribution
+        self.seed = seed
+
+    def to_dict(self):
+        return {"event_count": self.event_count, "event_rate": self.event_rate,
+                "event_types_number": self.event_types_number, "type_skew": self.type_skew,
+                "attributes_number": self.attributes_number,
+                "attribute_distribution": self.attribute_distribution.name, "seed": self.seed}
+
+
+def get_synthetic_event_type(index: int):
+    """
+    Returns the name of the event type of the given frequency rank.
+    """
+    return "T%d" % (index,)
+
+
+def get_type_probabilities(params: SyntheticStreamParameters):
+    """
+    Returns the occurrence probability of each event type.
+    """
+    weights = [1.0 / (rank ** params.type_skew) for rank in range(1, params.event_types_number + 1)]
+    total_weight = sum(weights)
+    return [weight / total_weight for weight in weights]
+
+
+def generate_synthetic_events(params: SyntheticStreamParameters):
+    """
+    Returns the lines of a synthetic event stream. The same parameters always produce the same stream.
+    """
+    generator = random.Random(params.seed)
+    event_types = [get_synthetic_event_type(i) for i in range(params.event_types_number)]
+    types = generator.choices(event_types, weights=get_type_probabilities(params), k=params.event_count)
+    attribute_generator = _get_attribute_generator(generator, params.attribute_distribution)
+    mean_interval_ns = NANOSECONDS_PER_SECOND / params.event_rate
+    timestamp = SYNTHETIC_START_TIMESTAMP
+    lines = []
+    for event_type in types:
+        timestamp += int(generator.expovariate(1.0) * mean_interval_ns)
+        attributes = [repr(attribute_generator()) for _ in range(params.attributes_number)]
+        lines.append(",".join([event_type, str(timestamp), repr(generator.random())] + attributes) + "\n")
+    return lines
+
+
+def _get_attribute_generator(generator: random.Random, distribution: AttributeDistributions):
+    if distribution == AttributeDistributions.UNIFORM:
+        return generator.random
+    if distribution == AttributeDistributions.NORMAL:
+        return lambda: generator.gauss(0.0, 1.0)
+    if distribution == AttributeDistributions.EXPONENTIAL:
+        return lambda: generator.expovariate(1.0)
+    raise Exception("Unknown attribute distribution: %s" % (distribution,))
+
+
+def create_synthetic_data_formatter(params: SyntheticStreamParameters):
+    """
+    Returns a data formatter for the synthetic streams of the given parameters.
+    """
+    attribute_names = ["A%d" % (i,) for i in range(1, params.attributes_number + 1)]
+    return SchemaCsvDataFormatter([SYNTHETIC_TYPE_KEY, SYNTHETIC_TIMESTAMP_KEY, SYNTHETIC_VALUE_KEY] + attribute_names,
+                                  [str, int, float] + [float] * params.attributes_number,
+                                  SYNTHETIC_TYPE_KEY, SYNTHETIC_TIMESTAMP_KEY, quotechar=None)
+
+
+class SyntheticInputStream(InputStream):
+    """
+    An input stream containing the given synthetic events or, if none are given, a newly generated stream.
+    """
+    def __init__(self, params: SyntheticStreamParameters, lines: Optional[list] = None):
+        super().__init__()
+        for line in generate_synthetic_events(params) if lines is None else lines:
+            self._stream.put(line)
+        self.close()
@@ -0,0 +1,114 @@
+"""
+This file contains the benchmark workloads, that is, the patterns of the various shapes detected over synthetic
+streams and the default benchmark matrix.
+Each condition of a benchmark pattern compares the uniformly distributed values of two consecutive positive events:
+|x - y| < d. For two independent values uniformly distributed in [0, 1), the probability of this condition is
+1 - (1 - d) ^ 2, hence d = 1 - sqrt(1 - selectivity) yields the requested selectivity.
+"""
+from datetime import timedelta
+from math import sqrt
+from typing import List, Optional
+
+from opencep.base.Pattern import Pattern
+from opencep.base.PatternStructure import SeqOperator, AndOperator, PrimitiveEventStructure, KleeneClosureOperator, \
+    NegationOperator
+from opencep.benchmark.BenchmarkTypes import PatternShapes
+from opencep.benchmark.SyntheticStream import SyntheticStreamParameters, get_synthetic_event_type, \
+    SYNTHETIC_VALUE_KEY
+from opencep.condition.CompositeCondition import AndCondition
+from opencep.condition.Condition import Variable, BinaryCondition, TrueCondition
+from opencep.evaluation.EvaluationMechanismFactory import EvaluationMechanismParameters
+
+KLEENE_CLOSURE_MAX_SIZE = 3
+
+
+class BenchmarkCase:
+    """
+    A single benchmark: the patterns of the given shape detected over a synthetic stream by an evaluation mechanism
+    created from the given parameters (or the default one if none are given).
+    length is the number of primitive events in each pattern, including the negated event, if any.
+    pattern_count is only used by the multi-pattern shape.
+    """
+    def __init__(self, name: str, shape: PatternShapes, length: int, selectivity: float = 0.5,
+                 window: timedelta = timedelta(seconds=1), pattern_count: int = 1,
+                 stream_params: SyntheticStreamParameters = None,
+                 eval_mechanism_params: Optional[EvaluationMechanismParameters] = None):
+        if length < 2 or (shape == PatternShapes.NEGATION and length < 3):
+            raise Exception("Pattern length %d is too short for the %s shape" % (length, shape.name))
+        if not 0.0 < selectivity <= 1.0:
+            raise Exception("Invalid selectivity: %s" % (selectivity,))
+        self.name = name
+        self.shape = shape
+        self.length = length
+        self.selectivity = selectivity
+        self.window = window
+        self.pattern_count = pattern_count if shape == PatternShapes.MULTI_PATTERN else 1
+        self.stream_params = SyntheticStreamParameters() if stream_params is None else stream_params
+        self.eval_mechanism_params = eval_mechanism_params
+
+    def create_patterns(self):
+        """
+        Creates the patterns of this benchmark.
+        """
+        distance = 1.0 - sqrt(1.0 - self.selectivity)
+        event_types_number = self.stream_params.event_types_number
+        if self.shape == PatternShapes.MULTI_PATTERN:
+            # all patterns share the first length - 1 event types and differ in the last one
+            return [self.__create_pattern([get_synthetic_event_type(j % event_types_number)
+                                           for j in list(range(self.length - 1)) + [self.length - 1 + i]], distance)
+                    for i in range(self.pattern_count)]
+        return [self.__create_pattern([get_synthetic_event_type(j % event_types_number)
+                                       for j in range(self.length)], distance)]
+
+    def __create_pattern(self, event_types: List[str], distance: float):
+        """
+        Creates a pattern over the given event types according to the shape of this benchmark.
+        """
+        names = ["e%d" % (i,) for i in range(len(event_types))]
+        args = [PrimitiveEventStructure(event_type, name) for event_type, name in zip(event_types, names)]
+        positive_names = names
+        if self.shape == PatternShapes.NEGATION:
+            middle = len(args) // 2
+            args[middle] = NegationOperator(args[middle])
+            positive_names = names[:middle] + names[middle + 1:]
+        structure = AndOperator(*args) if self.shape == PatternShapes.AND else SeqOperator(*args)
+        if self.shape == PatternShapes.KLEENE_CLOSURE:
+            structure = KleeneClosureOperator(structure, max_size=KLEENE_CLOSURE_MAX_SIZE)
+        return Pattern(structure, self.__create_condition(positive_names, distance), self.window)
+
+    @staticmethod
+    def __create_condition(names: List[str], distance: float):
+        """
+        Creates the conditions between each pair of consecutive events.
+        """
+        if distance >= 1.0:
+            return TrueCondition()
+        value = lambda x: x[SYNTHETIC_VALUE_KEY]
+        return AndCondition(*[BinaryCondition(Variable(first_name, value), Variable(second_name, value),
+                                              lambda x, y: abs(x - y) < distance)
+                              for first_name, second_name in zip(names, names[1:])])
+
+    def to_dict(self):
+        return {"shape": self.shape.name, "length": self.length, "selectivity": self.selectivity,
+                "window": self.window.total_seconds(), "pattern_count": self.pattern_count,
+                "stream": self.stream_params.to_dict()}
+
+
+def get_default_benchmark_matrix():
+    """
+    Returns the benchmarks executed by default.
+    """
+    skewed_stream_params = SyntheticStreamParameters(type_skew=1.0)
+    return [
+        BenchmarkCase("seq_2", PatternShapes.SEQ, 2),
+        BenchmarkCase("seq_3", PatternShapes.SEQ, 3),
+        BenchmarkCase("seq_4", PatternShapes.SEQ, 4),
+        BenchmarkCase("seq_3_skewed", PatternShapes.SEQ, 3, stream_params=skewed_stream_params),
+        BenchmarkCase("seq_3_selective", PatternShapes.SEQ, 3, selectivity=0.1),
+        BenchmarkCase("and_2", PatternShapes.AND, 2),
+        BenchmarkCase("and_3", PatternShapes.AND, 3),
+        BenchmarkCase("kleene_closure_2", PatternShapes.KLEENE_CLOSURE, 2, selectivity=0.2,
+                      window=timedelta(milliseconds=200)),
+        BenchmarkCase("negation_3", PatternShapes.NEGATION, 3),
+        BenchmarkCase("multi_pattern_3x4", PatternShapes.MULTI_PATTERN, 3, pattern_count=4),
+    ]
@@ -19,3 +19,10 @@ class EvaluationMechanism(ABC):
         Returns an object summarizing the structure of this evaluation mechanism.
         """
         raise NotImplementedError()
+
+    def get_profile_report(self):
+        """
+        Returns a report of the runtime behavior of the components of this evaluation mechanism, if profiling is
+        enabled.
+        """
+        raise NotImplementedError()
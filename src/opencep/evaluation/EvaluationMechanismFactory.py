@@ -6,6 +6,7 @@ from opencep.adaptive.statistics.StatisticsCollector import StatisticsCollector
 from opencep.base.Pattern import Pattern
 from opencep.evaluation.EvaluationMechanismTypes import EvaluationMechanismTypes
 from opencep.misc import DefaultConfig
+from opencep.nfa.LazyNFAEvaluationMechanism import LazyNFAEvaluationMechanism
 from opencep.plan.multi.LocalSearchTreePlanMerger import LocalSearchTreePlanMerger
 from opencep.plan.multi.local_search.LocalSearchFactory import LocalSearchParameters, TabuSearchLocalSearchParameters
 from opencep.tree.evaluation.TreeEvaluationMechanismUpdateTypes import TreeEvaluationMechanismUpdateTypes
@@ -18,6 +19,7 @@ from opencep.plan.TreePlan import TreePlan
 from opencep.plan.multi.MultiPatternTreePlanMergeApproaches import MultiPatternTreePlanMergeApproaches
 from opencep.tree.PatternMatchStorage import TreeStorageParameters
 from opencep.tree.evaluation.SimultaneousTreeBasedEvaluationMechanism import SimultaneousTreeBasedEvaluationMechanism
+from opencep.tree.evaluation.StateMigrationTreeBasedEvaluationMechanism import StateMigrationTreeBasedEvaluationMechanism
 from opencep.tree.evaluation.TrivialTreeBasedEvaluationMechnism import TrivialTreeBasedEvaluationMechanism
 
 
@@ -46,6 +48,18 @@ class TreeBasedEvaluationMechanismParameters(EvaluationMechanismParameters):
         self.local_search_params = local_search_params
 
 
+class LazyNFAEvaluationMechanismParameters(EvaluationMechanismParameters):
+    """
+    Parameters for the creation of a lazy NFA-based evaluation mechanism.
+    """
+    def __init__(self,
+                 arrival_rates_time_window: timedelta = DefaultConfig.LAZY_NFA_ARRIVAL_RATES_TIME_WINDOW,
+                 reorder_interval: int = DefaultConfig.LAZY_NFA_REORDER_INTERVAL):
+        super().__init__(EvaluationMechanismTypes.LAZY_NFA)
+        self.arrival_rates_time_window = arrival_rates_time_window
+        self.reorder_interval = reorder_interval
+
+
 class EvaluationMechanismFactory:
     """
     Creates an evaluation mechanism given its specification.
@@ -57,6 +71,11 @@ class EvaluationMechanismFactory:
             eval_mechanism_params = EvaluationMechanismFactory.__create_default_eval_parameters()
         if eval_mechanism_params.type == EvaluationMechanismTypes.TREE_BASED:
             return EvaluationMechanismFactory.__create_tree_based_eval_mechanism(eval_mechanism_params, patterns)
+        if eval_mechanism_params.type == EvaluationMechanismTypes.LAZY_NFA:
+            if isinstance(patterns, Pattern):
+                patterns = [patterns]
+            return LazyNFAEvaluationMechanism(patterns, eval_mechanism_params.arrival_rates_time_window,
+                                              eval_mechanism_params.reorder_interval)
         raise Exception("Unknown evaluation mechanism type: %s" % (eval_mechanism_params.type,))
 
     @staticmethod
@@ -113,6 +132,8 @@ class EvaluationMechanismFactory:
         """
         if DefaultConfig.DEFAULT_EVALUATION_MECHANISM_TYPE == EvaluationMechanismTypes.TREE_BASED:
             return TreeBasedEvaluationMechanismParameters()
+        if DefaultConfig.DEFAULT_EVALUATION_MECHANISM_TYPE == EvaluationMechanismTypes.LAZY_NFA:
+            return LazyNFAEvaluationMechanismParameters()
         raise Exception("Unknown evaluation mechanism type: %s" % (DefaultConfig.DEFAULT_EVALUATION_MECHANISM_TYPE,))
 
     @staticmethod
@@ -138,4 +159,11 @@ class EvaluationMechanismFactory:
                                                             statistics_collector,
                                                             optimizer,
                                                             statistics_update_time_window)
+
+        if tree_update_type == TreeEvaluationMechanismUpdateTypes.STATE_MIGRATION_TREE_EVALUATION:
+            return StateMigrationTreeBasedEvaluationMechanism(pattern_to_tree_plan_map,
+                                                              storage_params,
+                                                              statistics_collector,
+                                                              optimizer,
+                                                              statistics_update_time_window)
         raise Exception("Unknown evaluation mechanism type: %s" % (tree_update_type,))
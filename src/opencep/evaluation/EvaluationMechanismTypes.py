@@ -6,3 +6,4 @@ class EvaluationMechanismTypes(Enum):
     The currently supported CEP evaluation mechanisms.
     """
     TREE_BASED = 0,
+    LAZY_NFA = 1,
@@ -5,6 +5,7 @@ Each of the values below can be overridden by providing a different value in CEP
 from datetime import timedelta
 from opencep.evaluation.EvaluationMechanismTypes import EvaluationMechanismTypes
 from opencep.misc.SelectionStrategies import SelectionStrategies
+from opencep.misc.LoadSheddingTypes import LoadSheddingTypes
 from opencep.adaptive.statistics.StatisticsTypes import StatisticsTypes
 from opencep.adaptive.optimizer.OptimizerTypes import OptimizerTypes
 from opencep.plan.multi.local_search.LocalSearchApproaches import LocalSearchApproaches
@@ -17,10 +18,22 @@ from opencep.plan.TreePlanBuilderTypes import TreePlanBuilderTypes
 from opencep.transformation.PatternTransformationRules import PatternTransformationRules
 from opencep.plan.negation.NegationAlgorithmTypes import NegationAlgorithmTypes
 from opencep.plan.multi.MultiPatternTreePlanMergeApproaches import MultiPatternTreePlanMergeApproaches
+from opencep.plugin.csv.CsvPayloadTypes import CsvPayloadTypes
 
 # general settings
 DEFAULT_EVALUATION_MECHANISM_TYPE = EvaluationMechanismTypes.TREE_BASED
 
+# lazy NFA settings
+LAZY_NFA_ARRIVAL_RATES_TIME_WINDOW = timedelta(hours=1)  # the time window for measuring the arrival rates
+LAZY_NFA_REORDER_INTERVAL = 1000  # the number of events between two recalculations of the evaluation order
+
+# data formatter settings
+TIMESTAMP_PARSER_CACHE_SIZE = 1024  # the number of recently parsed timestamps kept by each timestamp parser
+DEFAULT_CSV_PAYLOAD_TYPE = CsvPayloadTypes.DICT  # the payloads created by the schema-based CSV data formatter
+
+# input stream settings
+COLUMNAR_FILE_BATCH_SIZE = 4096  # the number of payloads created at once when replaying a columnar event file
+
 # plan generation-related defaults
 DEFAULT_TREE_PLAN_BUILDER = TreePlanBuilderTypes.TRIVIAL_LEFT_DEEP_TREE
 DEFAULT_TREE_COST_MODEL = TreeCostModels.INTERMEDIATE_RESULTS_TREE_COST_MODEL
@@ -34,6 +47,11 @@ SECONDARY_SELECTION_STRATEGY = SelectionStrategies.MATCH_SINGLE
 SHOULD_SORT_STORAGE = False
 CLEANUP_INTERVAL = 10  # the default number of pattern match additions between subsequent storage cleanups
 PRIORITIZE_SORTING_BY_TIMESTAMP = True
+PARTIAL_MATCH_MEMORY_BUDGET = None  # the number of partial matches a tree keeps in memory or None for no limit
+PARTIAL_MATCH_SPILL_DIRECTORY = None  # the directory for spilled partial matches or None for a temporary location
+PARTITION_STORAGE_BY_KEY = False  # partition the storages by an attribute shared by all events of a match, if any
+SPILLED_SEGMENT_MIN_SIZE = 1000  # a smaller spilled segment is extended by the next spill of its storage
+PROFILE_TREE_NODES = False  # collect the per-node counters reported by Tree.get_profile_report
 
 # iterative improvement defaults
 ITERATIVE_IMPROVEMENT_TYPE = IterativeImprovementType.SWAP_BASED
@@ -47,6 +65,20 @@ DEFAULT_PARALLEL_UNITS_NUMBER = 1
 DEFAULT_PARALLEL_KEY = None
 DEFAULT_PARALLEL_ATTRIBUTES_DICT = None
 DEFAULT_PARALLEL_MULTIPLE = 12
+GROUP_BY_KEY_GROUPS_NUMBER = 256  # the keys are hashed into this number of key groups assigned to the units
+GROUP_BY_KEY_REBALANCE_INTERVAL = 10000  # the number of events between two successive load checks
+GROUP_BY_KEY_MAX_LOAD_IMBALANCE = 1.25  # the maximal allowed ratio between the load of a unit and the average load
+GROUP_BY_KEY_SPLIT_HOT_KEYS = False  # spread the events of overloading key groups if all patterns permit it
+STRUCTURE_PARALLEL_UNITS_NUMBER = 2  # the maximal number of stages an evaluation tree is split into
+STRUCTURE_PARALLEL_BATCH_SIZE = 256  # the number of events passed to the stages at once
+TASK_PARALLEL_UNITS_NUMBER = 4  # the maximal number of units the patterns are partitioned between
+
+# benchmark settings
+BENCHMARK_EVENT_COUNT = 5000  # the number of events in a synthetic benchmark stream
+BENCHMARK_EVENT_RATE = 100  # the average number of synthetic events per second
+BENCHMARK_EVENT_TYPES_NUMBER = 10
+BENCHMARK_REPETITIONS = 3  # the number of timed runs per benchmark, the fastest of which is reported
+BENCHMARK_REGRESSION_TOLERANCE = 0.2  # the relative deterioration with respect to the baseline reported as regression
 
 # settings for pattern transformation rules
 PREPROCESSING_RULES_ORDER = None  # disabled for now
@@ -72,6 +104,10 @@ DEFAULT_TREE_UPDATE_TYPE = TreeEvaluationMechanismUpdateTypes.TRIVIAL_TREE_EVALU
 DEFAULT_STATISTICS_TYPE = [StatisticsTypes.ARRIVAL_RATES, StatisticsTypes.SELECTIVITY_MATRIX]  # the default statistics type can also be a list of types
 STATISTICS_TIME_WINDOW = timedelta(hours=1)  # Time window for statistics
 STATISTICS_UPDATES_WAIT_TIME = None  # the default wait time between statistics updates or None to disable adaptivity
+SELECTIVITY_SAMPLING_RATE = 1.0  # the fraction of atomic condition evaluations sampled for selectivity estimation
+SELECTIVITY_DECAY_FACTOR = None  # per-bucket decay of the selectivity samples or None to use a sliding time window
+SELECTIVITY_WINDOW_BUCKETS_NUMBER = 10  # the number of buckets the selectivity statistics time window is divided into
+MIN_SELECTIVITY_SAMPLES_FOR_DEVIATION = 10  # selectivities based on fewer samples do not trigger reoptimization
 
 # Local Search Settings
 DEFAULT_SEARCH_TYPE = LocalSearchApproaches.TABU_SEARCH
@@ -88,4 +124,15 @@ TABU_SEARCH_NEIGHBORHOOD_SIZE = 100  # how many neighbors to search in each step
 
 # Load shedding settings
 USE_LOAD_SHEDDING = False
+DEFAULT_LOAD_SHEDDING_TYPE = LoadSheddingTypes.STATE_BASED
 LATENCY_THRESHOLD_NS = -1
+LOAD_SHEDDING_COOLDOWN = 3  # minimum number of events between shedding decisions
+LOAD_SHEDDING_MAX_RATIO = 0.5  # the maximal fraction of the partial matches (or input events) shedding may drop
+LOAD_SHEDDING_UTILITY_DECAY = 0.999  # per-event decay of the statistics the utilities are learned from
+
+# Match sink settings
+MATCH_SINK_BATCH_SIZE = 1024  # the number of matches written by a buffered match sink at once
+MATCH_SINK_MAX_PENDING_BATCHES = 16  # the number of full batches that may wait for the writer before blocking
+
+# Multi-pattern settings
+LEAF_PREDICATE_INDEX_MIN_LEAVES = 8  # the number of leaves of a single event type starting from which they are indexed
@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from opencep.base.PatternMatch import PatternMatch
+from opencep.misc import DefaultConfig
+
+
+class EventTypeStats:
+    """
+    The statistics of a single event type.
+    """
+    def __init__(self):
+        # the (decayed) number of full matches events of this type participated in
+        self.contribution = 0.0
+        # the (decayed) number of events of this type that were played on the evaluation tree
+        self.consumption = 0.0
+        # the (decayed) number of arrived events of this type, including the dropped ones
+        self.arrivals = 0.0
+        # the fraction of the arriving events of this type that is currently dropped
+        self.drop_probability = 0.0
+        # the accumulated drop probability not yet turned into a dropped event
+        self.drop_credit = 0.0
+        # the total number of events of this type dropped so far
+        self.dropped_count = 0
+
+    def get_utility(self):
+        """
+        Returns the contribution/consumption ratio of this event type. The ratio is smoothed such that an event type
+        with no history is not considered worthless. As the consumption only counts the events that were not dropped,
+        the utility of an event type that is entirely dropped gradually recovers.
+        """
+        return (self.contribution + 1.0) / (self.consumption + 1.0)
+
+
+class InputBasedLoadShedder:
+    """
+    Drops incoming events in order to keep the event processing latency below a threshold, before they create any
+    partial matches.
+    For each event type, the shedder learns how many full matches its events actually participated in relative to the
+    number of its events that were processed. Once per a given number of events, the fraction of the input to be
+    dropped is adjusted according to the mean latency of these events, and this fraction is then taken from the event
+    types with the lowest utility first.
+    Events are not dropped at random: an event type with a drop probability p has every (1/p)-th event dropped.
+    """
+    def __init__(self, latency_threshold_ns: int,
+                 cooldown: int = DefaultConfig.LOAD_SHEDDING_COOLDOWN,
+                 max_shedding_ratio: float = DefaultConfig.LOAD_SHEDDING_MAX_RATIO,
+                 utility_decay: float = DefaultConfig.LOAD_SHEDDING_UTILITY_DECAY):
+        self.__latency_threshold_ns = latency_threshold_ns
+        self.__cooldown = cooldown
+        self.__max_shedding_ratio = max_shedding_ratio
+        self.__utility_decay = utility_decay
+        self.__event_types = defaultdict(EventTypeStats)
+        self.__shedding_ratio = 0.0
+        self.__events_since_last_decision = 0
+        self.__latency_since_last_decision = 0
+
+    def should_drop(self, event_type: str):
+        """
+        Registers the arrival of an event of the given type and returns True if it is to be dropped and False
+        otherwise.
+        """
+        stats = self.__event_types[event_type]
+        stats.arrivals += 1.0
+        if stats.drop_probability > 0.0:
+            stats.drop_credit += stats.drop_probability
+            if stats.drop_credit >= 1.0:
+                stats.drop_credit -= 1.0
+                stats.dropped_count += 1
+                return True
+        stats.consumption += 1.0
+        return False
+
+    def register_full_match(self, match: PatternMatch):
+        """
+        Credits the event types participating in the given full match.
+        """
+        for event_type in {event.type for event in match.events}:
+            self.__event_types[event_type].contribution += 1.0
+
+    def handle_event(self, latency_ns: int):
+        """
+        Invoked once the processing of a non-dropped event is finished. Decays the learned statistics and, once per
+        cooldown period, adjusts the fraction of the dropped input to the mean latency of the period.
+        Returns the new shedding ratio if a decision was made and None otherwise.
+        """
+        for stats in self.__event_types.values():
+            stats.contribution *= self.__utility_decay
+            stats.consumption *= self.__utility_decay
+            stats.arrivals *= self.__utility_decay
+        self.__events_since_last_decision += 1
+        self.__latency_since_last_decision += latency_ns
+        if self.__latency_threshold_ns <= 0 or self.__events_since_last_decision < self.__cooldown:
+            return None
+        mean_latency_ns = self.__latency_since_last_decision / self.__events_since_last_decision
+        self.__events_since_last_decision = 0
+        self.__latency_since_last_decision = 0
+        # the admitted fraction of the input is scaled by the ratio between the threshold and the observed latency
+        admitted_ratio = 1.0 - self.__shedding_ratio
+        if mean_latency_ns > 0:
+            admitted_ratio = min(1.0, admitted_ratio * self.__latency_threshold_ns / mean_latency_ns)
+        else:
+            admitted_ratio = 1.0
+        self.__shedding_ratio = min(1.0 - admitted_ratio, self.__max_shedding_ratio)
+        self.__update_drop_probabilities()
+        return self.__shedding_ratio
+
+    def __update_drop_probabilities(self):
+        """
+        Distributes the current shedding ratio among the event types, dropping the entire input of the event type with
+        the lowest utility before moving on to the next one.
+        """
+        total_arrivals = sum(stats.arrivals for stats in self.__event_types.values())
+        arrivals_to_drop = self.__shedding_ratio * total_arrivals
+        for stats in sorted(self.__event_types.values(), key=lambda s: s.get_utility()):
+            if arrivals_to_drop <= 0.0 or stats.arrivals <= 0.0:
+                stats.drop_probability = 0.0
+                continue
+            stats.drop_probability = min(1.0, arrivals_to_drop / stats.arrivals)
+            arrivals_to_drop -= stats.drop_probability * stats.arrivals
+
+    def get_shedding_ratio(self):
+        """
+        Returns the fraction of the input this shedder currently aims to drop.
+        """
+        return self.__shedding_ratio
+
+    def get_dropped_events_count(self):
+        """
+        Returns the number of events dropped by this shedder for each event type.
+        """
+        return {event_type: stats.dropped_count for event_type, stats in self.__event_types.items()}
+
+    def get_event_type_utilities(self):
+        """
+        Returns the current utility of each event type.
+        """
+        return {event_type: stats.get_utility() for event_type, stats in self.__event_types.items()}
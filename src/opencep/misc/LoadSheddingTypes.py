@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class LoadSheddingTypes(Enum):
+    """
+    The currently supported load shedding modes.
+    """
+
+    # drops partial matches of the lowest-utility buckets from the storages of the evaluation tree
+    STATE_BASED = 0,
+
+    # drops incoming events of the lowest-utility event types before they are played on the evaluation tree
+    INPUT_BASED = 1,
@@ -1,18 +1,21 @@
-import datetime
-import sys
-from collections import defaultdict
+import math
+from collections import defaultdict, deque
+
+from opencep.base.PatternMatch import PatternMatch
+from opencep.misc import DefaultConfig
 
-WINDOW_SECONDS = 3600.0
 NUM_OF_TIME_SLICES = 3
 
 
-def slice_id(start_time: datetime.datetime, last_time: datetime.datetime):
-    age = last_time - start_time
-    ratio = age.total_seconds() / WINDOW_SECONDS
-    for i in range(1, NUM_OF_TIME_SLICES - 1):
-        if ratio < i / NUM_OF_TIME_SLICES:
-            return i - 1
-    return NUM_OF_TIME_SLICES - 1
+def slice_id(start_time: int, last_time: int, time_window: int):
+    """
+    Returns the index of the slice of the time window covered by a partial match spanning the given timestamps.
+    """
+    if time_window <= 0:
+        return NUM_OF_TIME_SLICES - 1
+    ratio = (last_time - start_time) / time_window
+    return min(int(ratio * NUM_OF_TIME_SLICES), NUM_OF_TIME_SLICES - 1)
+
 
 def length_id(length: int):  # inverts the length value to favor longer matches
     if length <= 2:
@@ -22,228 +25,119 @@ def length_id(length: int):  # inverts the length value to favor longer matches
     else:
         return 0
 
+
 class BucketStats:
+    """
+    The statistics of a single bucket of partial matches.
+    """
     def __init__(self):
+        # the (decayed) number of full matches the partial matches of this bucket contributed to
         self.contribution = 0.0
+        # the (decayed) number of partial matches created in this bucket
         self.consumption = 0.0
-        self.active_partials = 0  # number of partials currently in this bucket
+        # (first timestamp, partial match ID, storage) for each partial match of this bucket that might still be stored
+        self.active_partial_matches = deque()
 
-
-class BucketManager:
-    def __init__(self):
-        # bucket_id -> set(partial_id)
-        self.buckets = defaultdict(set)
-        # partial_id -> bucket_id
-        self.partials = {}
-        # bucket_id -> BucketStats
-        self.stats = defaultdict(BucketStats)
-
-    def debug_print_buckets(self, show_stats: bool = True):
-        """Print all known buckets and their contents for debugging."""
-        if not self.buckets:
-            print("BucketManager: no buckets", file=sys.stderr)
-            return
-        print(
-            "BucketManager: listing buckets", file=sys.stderr
-        )
-        for bucket_id, partial_ids in sorted(self.buckets.items()):
-            stats = self.stats.get(bucket_id)
-            if show_stats and stats is not None:
-                print(
-                    f"  Bucket {bucket_id}: count={stats.active_partials}",
-                    file=sys.stderr,
-                )
-            else:
-                print(
-                    f"  Bucket {bucket_id}: count(partial_ids)={len(partial_ids)}", file=sys.stderr
-                )
-            if partial_ids:
-                # show ids in deterministic order
-                try:
-                    pid_list = sorted(partial_ids)
-                except Exception:
-                    pid_list = list(partial_ids)
-                print(
-                    "    partial_ids:",
-                    ", ".join(str(x) for x in pid_list),
-                    file=sys.stderr,
-                )
-
-    def add_partial(self, partial_id, slice_id, length_id):
-        bucket_id = (slice_id, length_id)
-        """print(
-            f"BucketManager.add_partial called: pid={partial_id}, bucket={bucket_id}",
-            file=sys.stderr,
-        )"""
-        if partial_id in self.partials:
-            # already registered - move if needed
-            old_bucket = self.partials[partial_id]
-            if old_bucket == bucket_id:
-                return
-            # remove from old
-            self.buckets[old_bucket].discard(partial_id)
-            self.stats[old_bucket].consumption -= 1.0
-            self.stats[old_bucket].active_partials -= 1
-
-        self.buckets[bucket_id].add(partial_id)
-        self.partials[partial_id] = bucket_id
-        bucket = self.stats[bucket_id]
-        bucket.consumption += 1.0  # simple cost increment
-        bucket.active_partials += 1  # increment active partials
-        #self.debug_print_buckets(show_stats=True)
-
-    def remove_partial(self, partial_id):
-        """Remove a partial by id from whichever bucket it's in. Returns True if removed."""
-        #print(f"BucketManager.remove_partial called: pid={partial_id}", file=sys.stderr)
-        bucket_id = self.partials.pop(partial_id, None)
-        if bucket_id is None:
-            return False
-        # discard from bucket set
-        self.buckets[bucket_id].discard(partial_id)
-        # update stats safely
-        stats = self.stats[bucket_id]
-        stats.consumption -= 1.0
-        stats.active_partials -= 1
-
-        return True
-
-    def buckets_sorted_by_value(self, reverse=True):
-        """Return list of (bucket_id, BucketStats) sorted by bucket value (contribution/consumption).
-        If consumption==0 the value is considered 0. By default returns descending (highest first).
+    def get_utility(self):
         """
+        Returns the contribution/consumption ratio of this bucket. The ratio is smoothed such that a bucket with no
+        history is not considered worthless.
+        """
+        return (self.contribution + 1.0) / (self.consumption + 1.0)
+
+
+class StateBasedLoadShedder:
+    """
+    Drops partial matches of a single evaluation tree in order to keep the event processing latency below a threshold.
+    The partial matches are divided into buckets according to their length and the fraction of the time window they
+    span. For each bucket, the shedder learns how many full matches its partial matches actually contributed to
+    relative to the number of partial matches it created, and drops the partial matches of the buckets with the lowest
+    ratio first.
+    Shedding decisions are made once per event by the evaluation mechanism via handle_event.
+    """
+    def __init__(self, time_window: int, latency_threshold_ns: int,
+                 cooldown: int = DefaultConfig.LOAD_SHEDDING_COOLDOWN,
+                 max_shedding_ratio: float = DefaultConfig.LOAD_SHEDDING_MAX_RATIO,
+                 utility_decay: float = DefaultConfig.LOAD_SHEDDING_UTILITY_DECAY):
+        self.__time_window = time_window
+        self.__latency_threshold_ns = latency_threshold_ns
+        self.__cooldown = cooldown
+        self.__max_shedding_ratio = max_shedding_ratio
+        self.__utility_decay = utility_decay
+        self.__buckets = defaultdict(BucketStats)
+        self.__events_since_last_shedding = 0
+        self.__shed_partial_matches_count = 0
+
+    def register_partial_match(self, storage, pm: PatternMatch):
+        """
+        Assigns a partial match newly added to the given storage to its bucket.
+        The bucket is also added to the buckets the partial match inherited from the partial matches it was created from.
+        """
+        bucket_id = (slice_id(pm.first_timestamp, pm.last_timestamp, self.__time_window), length_id(len(pm)))
+        pm.contributing_buckets = pm.contributing_buckets | {bucket_id}
+        bucket = self.__buckets[bucket_id]
+        bucket.consumption += 1.0
+        bucket.active_partial_matches.append((pm.first_timestamp, pm.partial_id, storage))
 
-        def value(item):
-            bucket_id = item[0]
-            try:
-                slice_idx, length_idx = bucket_id
-                return float(slice_idx + length_idx)
-            except Exception:
-                return 0.0
-
-        return sorted(self.stats.items(), key=value, reverse=reverse)
-
-    #def shed_lowest_value_buckets(self, n=1, min_partials_removed=0):
-        """Shed the n buckets with the lowest value (contribution/consumption).
-        If min_partials_removed>0, continue shedding buckets (starting from lowest value)
-        until at least that many partial ids have been freed (or until no buckets left).
-        Returns the list of removed partial_ids.
+    def register_full_match(self, match: PatternMatch):
         """
-        # sort ascending (lowest value first)
-        sorted_buckets = self.buckets_sorted_by_value(reverse=False)
-        removed = []
-        count = 0
-        for bucket_id, _ in sorted_buckets:
-            if n <= 0 and min_partials_removed <= 0:
-                break
-            # skip empty buckets
-            partial_ids = list(self.buckets.get(bucket_id, ()))
-            if not partial_ids:
-                # remove empty stats to keep structures tidy
-                self.stats.pop(bucket_id, None)
-                self.buckets.pop(bucket_id, None)
-                continue
-            # remove this bucket entirely
-            for partial_id in partial_ids:
-                # remove mapping
-                self.partials.pop(partial_id, None)
-            removed.extend(partial_ids)
-            count += len(partial_ids)
-            # clear bucket and stats
-            self.buckets.pop(bucket_id, None)
-            self.stats.pop(bucket_id, None)
-            n -= 1
-            if min_partials_removed and count >= min_partials_removed:
-                break
-        return removed
-    
-    def shed_highest_value_buckets(self, n=1, min_partials_removed=0):
-        """Shed the n buckets with the highest value.
-        If min_partials_removed>0, continue shedding buckets (starting from highest value)
-        until at least that many partial ids have been freed (or until no buckets left).
-        Returns the list of removed partial_ids.
+        Credits the buckets whose partial matches were used to create the given full match.
         """
-        # sort descending (highest value first)
-        sorted_buckets = self.buckets_sorted_by_value(reverse=True)
-        removed = []
-        count = 0
-        print(f"  -- Current buckets before shedding:", file=sys.stderr)
-        for b_id, p_ids in self.buckets.items():
-            print(f"    Bucket {b_id}: {len(p_ids)} partials", file=sys.stderr)
-        for bucket_id, _ in sorted_buckets:
-            if n <= 0 and min_partials_removed <= 0:
-                break
-            # skip empty buckets
-            partial_ids = list(self.buckets.get(bucket_id, ()))
-            if not partial_ids:
-                # remove empty stats to keep structures tidy
-                self.stats.pop(bucket_id, None)
-                self.buckets.pop(bucket_id, None)
-                continue
-            # remove this bucket entirely
-            for partial_id in partial_ids:
-                # remove mapping
-                self.partials.pop(partial_id, None)
-            removed.extend(partial_ids)
-            count += len(partial_ids)
-            # clear bucket and stats
-            self.buckets.pop(bucket_id, None)
-            self.stats.pop(bucket_id, None)
-            n -= 1
-            print(f"  Shed bucket {bucket_id}, removed {len(partial_ids)} partials", file=sys.stderr)
-            print(f"  Current buckets after shedding:", file=sys.stderr)
-            for b_id, p_ids in self.buckets.items():
-                print(f"    Bucket {b_id}: {len(p_ids)} partials", file=sys.stderr)
-            if min_partials_removed and count >= min_partials_removed:
-                break
-        return removed
+        for bucket_id in match.contributing_buckets:
+            self.__buckets[bucket_id].contribution += 1.0
 
-    def shed_by_partial_count(self, target_count: int):
-        """FOR DEBUGGING! Shed individual partial ids starting from the lowest-value buckets.
-        Returns the list of removed partial ids.
+    def handle_event(self, latency_ns: int, last_timestamp: int):
+        """
+        Invoked once the processing of an event is finished. Decays the learned statistics, forgets the expired
+        partial matches and, if the latency threshold was violated, drops partial matches from the buckets with the
+        lowest utility. Returns the number of the dropped partial matches.
+        """
+        self.__events_since_last_shedding += 1
+        earliest_timestamp = last_timestamp - self.__time_window
+        for bucket in self.__buckets.values():
+            bucket.contribution *= self.__utility_decay
+            bucket.consumption *= self.__utility_decay
+            active_partial_matches = bucket.active_partial_matches
+            while len(active_partial_matches) > 0 and active_partial_matches[0][0] < earliest_timestamp:
+                active_partial_matches.popleft()
+        if self.__latency_threshold_ns <= 0 or latency_ns <= self.__latency_threshold_ns or \
+                self.__events_since_last_shedding < self.__cooldown:
+            return 0
+        self.__events_since_last_shedding = 0
+        overload_ratio = min(1.0 - self.__latency_threshold_ns / latency_ns, self.__max_shedding_ratio)
+        active_count = sum(len(bucket.active_partial_matches) for bucket in self.__buckets.values())
+        return self.__shed(math.ceil(active_count * overload_ratio))
+
+    def __shed(self, target_count: int):
+        """
+        Drops the given number of partial matches, starting from the oldest partial matches of the bucket with the
+        lowest utility.
         """
-        if target_count <= 0:
-            return []
-        removed = []
-        count = 0
-        # iterate buckets from lowest value first (snapshot the order)
-        for bucket_id, _ in self.buckets_sorted_by_value(reverse=False):
-            # get a deterministic list of pids for this bucket
-            pids = list(self.buckets.get(bucket_id, ()))
-            if not pids:
-                # tidy empty bucket
-                self.stats.pop(bucket_id, None)
-                self.buckets.pop(bucket_id, None)
-                continue
-            try:
-                pids = sorted(pids)
-            except Exception:
-                # fall back to insertion order
-                pids = list(pids)
-
-            # remove individual partials from this bucket until target reached
-            for pid in pids:
-                if count >= target_count:
-                    break
-                # remove mapping and bucket membership
-                self.partials.pop(pid, None)
-                self.buckets[bucket_id].discard(pid)
-                removed.append(pid)
-                count += 1
-                # update stats consumption safely
-                stats = self.stats.get(bucket_id)
-                if stats is not None:
-                    stats.consumption -= 1.0
-
-            # if bucket emptied, remove its structures
-            if not self.buckets.get(bucket_id):
-                self.buckets.pop(bucket_id, None)
-                self.stats.pop(bucket_id, None)
-
-            if count >= target_count:
+        partial_match_ids_by_storage = defaultdict(set)
+        storages = {}
+        shed_count = 0
+        for bucket in sorted(self.__buckets.values(), key=lambda b: b.get_utility()):
+            active_partial_matches = bucket.active_partial_matches
+            while shed_count < target_count and len(active_partial_matches) > 0:
+                _, partial_id, storage = active_partial_matches.popleft()
+                storages[id(storage)] = storage
+                partial_match_ids_by_storage[id(storage)].add(partial_id)
+                shed_count += 1
+            if shed_count >= target_count:
                 break
+        for storage_id, partial_ids in partial_match_ids_by_storage.items():
+            storages[storage_id].remove_partial_matches(partial_ids)
+        self.__shed_partial_matches_count += shed_count
+        return shed_count
 
-        return removed
-
+    def get_shed_partial_matches_count(self):
+        """
+        Returns the total number of partial matches dropped by this shedder.
+        """
+        return self.__shed_partial_matches_count
 
-# Module-level bucket manager instance (single source of truth)
-bucket_manager = BucketManager()
+    def get_bucket_utilities(self):
+        """
+        Returns the current utility of each bucket.
+        """
+        return {bucket_id: bucket.get_utility() for bucket_id, bucket in self.__buckets.items()}
@@ -29,10 +29,29 @@ test_last_values = {
 }
 
 
+def _print_metric(values: list):
+    print(" ".join([str(v) for v in values]), flush=True)
+
+
+# the function receiving the logged metric values, replaceable using set_metric_sink
+_metric_sink = _print_metric
+
+
+def set_metric_sink(sink: callable = None):
+    """
+    Replaces the function receiving the logged metric values, e.g., in order to collect them in memory instead of
+    printing them. None restores the default sink. Returns the previous sink.
+    """
+    global _metric_sink
+    previous_sink = _metric_sink
+    _metric_sink = _print_metric if sink is None else sink
+    return previous_sink
+
+
 def _log_metric(values: list[str]):
     assert len(values) == len(Fields)
     lock.acquire()
-    print(" ".join([str(v) for v in values]), flush=True)
+    _metric_sink(values)
     lock.release()
 
 
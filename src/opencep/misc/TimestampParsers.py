@@ -0,0 +1,124 @@
+"""
+This file contains the timestamp parsers used by the bundled data formatters.
+Each parser converts the timestamps of a single fixed format directly into the internal representation of the engine
+(an integer number of nanoseconds since the epoch, see misc/Timestamps.py) using integer arithmetic only, instead of
+creating a datetime object per event as datetime.strptime does.
+As the timestamps in event streams are typically of a second or a minute resolution, consecutive events often share
+the same timestamp string. Hence, the results are kept in a small LRU cache, and parse_column, which parses an entire
+column of timestamps at once, only parses each run of equal consecutive timestamps once.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable
+
+from opencep.misc import DefaultConfig
+from opencep.misc.Timestamps import NANOSECONDS_PER_SECOND, datetime_to_ns
+
+_MONTH_NAMES = {name: month for month, name in enumerate(["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                                         "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+
+
+def days_since_epoch(year: int, month: int, day: int):
+    """
+    Returns the number of days between 1970-01-01 and the given date of the proleptic Gregorian calendar.
+    """
+    # the year is shifted to start in March, such that the leap day is the last day of the shifted year
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def days_in_month(year: int, month: int):
+    """
+    Returns the number of days in the given month of the proleptic Gregorian calendar.
+    """
+    if month == 2:
+        return 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28
+    return 30 if month in (4, 6, 9, 11) else 31
+
+
+def date_to_timestamp_ns(year: int, month: int, day: int, hour: int = 0, minute: int = 0, second: int = 0):
+    """
+    Returns the internal representation of the given date and time.
+    """
+    if not (1 <= month <= 12 and 1 <= day <= days_in_month(year, month) and 0 <= hour < 24 and 0 <= minute < 60 and
+            0 <= second < 60):
+        raise ValueError("Invalid date and time: %s-%s-%s %s:%s:%s" % (year, month, day, hour, minute, second))
+    return ((days_since_epoch(year, month, day) * 86400 + hour * 3600 + minute * 60 + second) *
+            NANOSECONDS_PER_SECOND)
+
+
+class TimestampParser:
+    """
+    An abstract class for the timestamp parsers.
+    """
+    def __init__(self, cache_size: int = DefaultConfig.TIMESTAMP_PARSER_CACHE_SIZE):
+        self.parse = lru_cache(maxsize=cache_size)(self._parse) if cache_size > 0 else self._parse
+
+    def _parse(self, timestamp):
+        """
+        Converts a single timestamp into the internal representation.
+        """
+        raise NotImplementedError()
+
+    def parse_column(self, timestamps: Iterable):
+        """
+        Converts a column of timestamps into the internal representation.
+        """
+        result = []
+        previous_timestamp = previous_value = None
+        for timestamp in timestamps:
+            if timestamp != previous_timestamp or previous_value is None:
+                previous_timestamp, previous_value = timestamp, self.parse(timestamp)
+            result.append(previous_value)
+        return result
+
+
+class MetastockTimestampParser(TimestampParser):
+    """
+    Parses metastock 7 timestamps given in a YYYYMMDDhhmm format, either as strings or as the integers they are parsed
+    into by the metastock data formatter.
+    """
+    def _parse(self, timestamp):
+        value = int(timestamp)
+        return date_to_timestamp_ns(value // 100000000, value // 1000000 % 100, value // 10000 % 100,
+                                    value // 100 % 100, value % 100)
+
+
+class SensorsTimestampParser(TimestampParser):
+    """
+    Parses sensor timestamps given in a "%m/%d/%Y %H:%M:%S" format.
+    """
+    def _parse(self, timestamp: str):
+        date, time = timestamp.split()
+        month, day, year = date.split("/")
+        hour, minute, second = time.split(":")
+        return date_to_timestamp_ns(int(year), int(month), int(day), int(hour), int(minute), int(second))
+
+
+class TwitterTimestampParser(TimestampParser):
+    """
+    Parses tweet timestamps given in a "%a %b %d %H:%M:%S +0000 %Y" format.
+    """
+    def _parse(self, timestamp: str):
+        _, month_name, day, time, utc_offset, year = timestamp.split()
+        if utc_offset != "+0000":
+            raise ValueError("Unexpected UTC offset in timestamp: %s" % (timestamp,))
+        hour, minute, second = time.split(":")
+        return date_to_timestamp_ns(int(year), _MONTH_NAMES[month_name], int(day), int(hour), int(minute), int(second))
+
+
+class StrptimeTimestampParser(TimestampParser):
+    """
+    Parses timestamps of an arbitrary format supported by datetime.strptime.
+    """
+    def __init__(self, timestamp_format: str, cache_size: int = DefaultConfig.TIMESTAMP_PARSER_CACHE_SIZE):
+        super().__init__(cache_size)
+        self.__format = timestamp_format
+
+    def _parse(self, timestamp: str):
+        return datetime_to_ns(datetime.strptime(timestamp, self.__format))
@@ -0,0 +1,66 @@
+"""
+This file contains the conversions between the external and the internal representations of time.
+Internally, event timestamps are integer numbers of nanoseconds since the epoch and time windows are integer numbers of
+nanoseconds, such that the time window checks performed for every partial match only involve integer arithmetic.
+datetime and timedelta objects are only used at the API boundary: data formatters may return either a datetime or an
+integer number of nanoseconds since the epoch, and patterns and parameters specify their time windows as timedelta
+objects. Naive datetime objects are measured from a naive epoch, that is, time zones are ignored, as they were when
+the engine operated on the datetime objects directly.
+"""
+from datetime import datetime, timedelta, timezone
+from numbers import Integral
+
+NANOSECONDS_PER_MICROSECOND = 1000
+NANOSECONDS_PER_SECOND = 10 ** 9
+_SECONDS_PER_DAY = 24 * 60 * 60
+_EPOCH = datetime(1970, 1, 1)
+_UTC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def timedelta_to_ns(duration: timedelta):
+    """
+    Returns the number of nanoseconds in the given timedelta.
+    """
+    return ((duration.days * _SECONDS_PER_DAY + duration.seconds) * NANOSECONDS_PER_SECOND +
+            duration.microseconds * NANOSECONDS_PER_MICROSECOND)
+
+
+def datetime_to_ns(timestamp: datetime):
+    """
+    Returns the number of nanoseconds between the epoch and the given datetime.
+    """
+    return timedelta_to_ns(timestamp - (_EPOCH if timestamp.tzinfo is None else _UTC_EPOCH))
+
+
+def ns_to_datetime(timestamp_ns: int):
+    """
+    Returns the naive datetime corresponding to the given number of nanoseconds since the epoch.
+    """
+    return _EPOCH + timedelta(microseconds=timestamp_ns // NANOSECONDS_PER_MICROSECOND)
+
+
+def to_timestamp_ns(timestamp):
+    """
+    Converts an event timestamp returned by a data formatter into the internal representation.
+    """
+    if type(timestamp) == int:
+        return timestamp
+    if isinstance(timestamp, datetime):
+        return datetime_to_ns(timestamp)
+    if isinstance(timestamp, Integral):
+        # e.g., numpy integers
+        return int(timestamp)
+    raise Exception("Unsupported timestamp %s of type %s" % (timestamp, type(timestamp)))
+
+
+def to_duration_ns(duration):
+    """
+    Converts a time window or another time interval into the internal representation.
+    """
+    if duration is None:
+        return None
+    if isinstance(duration, timedelta):
+        return timedelta_to_ns(duration)
+    if isinstance(duration, Integral):
+        return int(duration)
+    raise Exception("Unsupported time interval %s of type %s" % (duration, type(duration)))
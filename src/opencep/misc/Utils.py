@@ -15,7 +15,7 @@ from functools import reduce
 from opencep.stream.Stream import Stream
 
 
-def find_partial_match_by_timestamp(partial_matches: List[PatternMatch], timestamp: datetime):
+def find_partial_match_by_timestamp(partial_matches: List[PatternMatch], timestamp: int):
     """
     Returns the partial match from the given list such that its timestamp is the closest to the given timestamp.
     The list is assumed to be sorted according to the earliest event timestamp.
@@ -309,6 +309,19 @@ def calculate_joint_probability(p1: Optional[float], p2: Optional[float]) -> Opt
     return p1 * p2
 
 
+def get_attribute_function_key(attribute_function: callable):
+    """
+    Returns a key identifying the attribute read by the given function (e.g., the getattr_func of a condition
+    variable), such that separately defined but identical functions, like two "lambda x: x['Price']" definitions, are
+    assigned the same key. Functions whose behavior may depend on more than their code are only equal to themselves.
+    """
+    code = getattr(attribute_function, "__code__", None)
+    if code is None or getattr(attribute_function, "__closure__", None) or \
+            getattr(attribute_function, "__defaults__", None):
+        return id(attribute_function)
+    return code.co_code, code.co_consts, code.co_names, id(attribute_function.__globals__)
+
+
 class ndarray:
     """
     Simple implementation of numpy.array
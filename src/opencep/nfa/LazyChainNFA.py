@@ -0,0 +1,461 @@
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from typing import Dict, List
+
+from opencep.adaptive.statistics.Statistics import ArrivalRatesStatistics
+from opencep.adaptive.statistics.StatisticsTypes import StatisticsTypes
+from opencep.base.Event import Event
+from opencep.base.Pattern import Pattern
+from opencep.base.PatternMatch import PatternMatch
+from opencep.base.PatternStructure import SeqOperator, AndOperator, PrimitiveEventStructure, NegationOperator
+from opencep.misc.SelectionStrategies import SelectionStrategies
+from opencep.misc.Timestamps import to_duration_ns
+
+
+class EventBuffer:
+    """
+    Keeps the events accepted for a single event name in the order of their arrival, which is assumed to be the order
+    of their timestamps. Supports retrieving the events within a range of timestamps using a binary search.
+    """
+    def __init__(self):
+        self.__events = []
+        self.__timestamps = []
+        # the position of the first non-expired event
+        self.__start = 0
+
+    def __len__(self):
+        return len(self.__events) - self.__start
+
+    def append(self, event: Event):
+        self.__events.append(event)
+        self.__timestamps.append(event.timestamp)
+
+    def get_range(self, lower_timestamp: int, upper_timestamp: int):
+        """
+        Returns the buffered events whose timestamps are between the given bounds (inclusive).
+        """
+        start = bisect_left(self.__timestamps, lower_timestamp, self.__start)
+        end = bisect_right(self.__timestamps, upper_timestamp, start)
+        return self.__events[start:end]
+
+    def remove_expired(self, earliest_timestamp: int):
+        """
+        Removes the events whose timestamps precede the given one.
+        """
+        self.__start = bisect_left(self.__timestamps, earliest_timestamp, self.__start)
+        if self.__start > len(self.__events) // 2:
+            # only compact the underlying lists once most of their content has expired
+            del self.__events[:self.__start]
+            del self.__timestamps[:self.__start]
+            self.__start = 0
+
+
+class LazyChainNFA:
+    """
+    Detects the matches of a single flat pattern using a lazy chain NFA.
+    Instead of creating partial matches upon every event arrival, as the tree-based evaluation mechanism does, the
+    events accepted by each state (i.e., each primitive event name) are only buffered. A match is created once its
+    last event arrives: the new event is joined with the buffered events of the remaining states, which are visited
+    in ascending order of their arrival rates. Thus, the rarest event types are considered first, and no work is done
+    for an event of a frequent type unless events of all other types were buffered during the time window.
+    The arrival rates are measured with ArrivalRatesStatistics (initialized from the pattern statistics if provided),
+    and the evaluation order is recalculated every reorder_interval events.
+    Supported patterns are flat SEQ and AND patterns, possibly containing negated primitive events. Negated events
+    followed by a positive event in a sequence are verified upon match creation, while the remaining ones keep the
+    match pending until the time window has passed.
+    The contiguity, freeze and MATCH_SINGLE consumption policies are supported. As MATCH_NEXT is defined in terms of the
+    nodes of an evaluation tree, it is not supported.
+    """
+    def __init__(self, pattern: Pattern, arrival_rates_time_window: timedelta, reorder_interval: int):
+        self.__pattern = pattern
+        self.__window = pattern.window_ns
+        self.__confidence = pattern.confidence
+        structure = pattern.full_structure
+        if not isinstance(structure, (SeqOperator, AndOperator)):
+            raise Exception("The lazy NFA evaluation mechanism only supports flat SEQ and AND patterns")
+        args, self.__is_sequence = structure.args, isinstance(structure, SeqOperator)
+
+        # the positive event names in the order of the pattern, and the negative ones along with their positions
+        # relative to the positive names
+        self.__positive_names = []
+        self.__negative_names = []
+        self.__negative_bounds = {}
+        self.__name_to_type = {}
+        for arg in args:
+            if isinstance(arg, PrimitiveEventStructure):
+                self.__positive_names.append(arg.name)
+                self.__name_to_type[arg.name] = arg.type
+            elif isinstance(arg, NegationOperator) and isinstance(arg.arg, PrimitiveEventStructure):
+                self.__negative_names.append(arg.arg.name)
+                self.__name_to_type[arg.arg.name] = arg.arg.type
+                self.__negative_bounds[arg.arg.name] = len(self.__positive_names)
+            else:
+                raise Exception("The lazy NFA evaluation mechanism does not support nested operators, Kleene closure "
+                                "operators and negated nested structures")
+        if len(self.__positive_names) == 0:
+            raise Exception("A pattern must contain at least one positive event")
+        self.__positions = {name: position for position, name in enumerate(self.__positive_names)}
+        # a negative event is bounded if a positive event follows it in a sequence
+        self.__unbounded_negative_names = [name for name in self.__negative_names
+                                           if not self.__is_sequence or
+                                           self.__negative_bounds[name] == len(self.__positive_names)]
+        self.__type_to_names = {}
+        for name in self.__positive_names + self.__negative_names:
+            self.__type_to_names.setdefault(self.__name_to_type[name], []).append(name)
+
+        self.__buffers = {name: EventBuffer() for name in self.__positive_names + self.__negative_names}
+        self.__init_conditions()
+
+        # the matches waiting for the time window to pass before they can no longer be invalidated by a negative event
+        self.__pending_matches = []
+
+        self.__init_consumption_policy()
+
+        self.__arrival_rates = ArrivalRatesStatistics(
+            to_duration_ns(arrival_rates_time_window), pattern,
+            None if not pattern.statistics else pattern.statistics.get(StatisticsTypes.ARRIVAL_RATES))
+        self.__name_to_statistics_index = {primitive_event.name: index
+                                           for index, primitive_event in enumerate(pattern.get_primitive_events())}
+        self.__reorder_interval = reorder_interval
+        self.__events_since_reorder = 0
+        self.__evaluation_orders = None
+        self.__update_evaluation_orders()
+
+    def __init_conditions(self):
+        """
+        Splits the atomic conditions of the pattern between the positive part and the negative events.
+        """
+        positive_names = set(self.__positive_names)
+        self.__positive_conditions = []
+        self.__negative_conditions = {name: [] for name in self.__negative_names}
+        for condition in self.__pattern.condition.get_conditions_list():
+            names = condition.get_event_names()
+            negative_names = names - positive_names
+            if len(negative_names) == 0:
+                self.__positive_conditions.append((names, condition))
+            elif len(negative_names) == 1:
+                self.__negative_conditions[negative_names.pop()].append(condition)
+            else:
+                raise Exception("The lazy NFA evaluation mechanism does not support conditions on several negative "
+                                "events")
+
+    def __init_consumption_policy(self):
+        """
+        Initializes the structures required for the selection strategy and the 'freeze' consumption policy.
+        """
+        policy = self.__pattern.consumption_policy
+        self.__single_types = set()
+        if policy is not None and policy.single_event_strategy is not None:
+            if policy.single_event_strategy == SelectionStrategies.MATCH_NEXT:
+                raise Exception("The lazy NFA evaluation mechanism does not support the MATCH_NEXT selection strategy")
+            self.__single_types = set(policy.single_types)
+        # the events that already appeared in a match and may not be used again
+        self.__consumed_events = set()
+        self.__consumed_events_count_after_cleanup = 0
+
+        # maps each freezer event name to the names it blocks while active
+        self.__freeze_map = {}
+        if policy is not None and policy.freeze_names is not None:
+            for freezer_name in policy.freeze_names:
+                blocked_names = set()
+                for sequence in self.__pattern.extract_flat_sequences():
+                    if freezer_name not in sequence:
+                        continue
+                    blocked_names.update(sequence[:sequence.index(freezer_name) + 1])
+                if len(blocked_names) > 0:
+                    self.__freeze_map[freezer_name] = blocked_names
+        # the active freezer events and the names they block, in the order of their arrival
+        self.__active_freezers = {}
+        self.__blocked_name_counts = {}
+
+    def __update_evaluation_orders(self):
+        """
+        Calculates, for each positive event name, the order in which the remaining names are visited when an event
+        accepted for this name arrives, along with the conditions verified after each step.
+        """
+        by_rate = self.__get_names_by_arrival_rate()
+        self.__evaluation_orders = {}
+        for trigger_name in self.__positive_names:
+            order = [trigger_name] + [name for name in by_rate if name != trigger_name]
+            steps = []
+            bound_names = set()
+            for name in order:
+                bound_names.add(name)
+                conditions = [condition for names, condition in self.__positive_conditions
+                              if names <= bound_names and (name in names or len(names) == 0 and name == trigger_name)]
+                steps.append((name, conditions))
+            self.__evaluation_orders[trigger_name] = steps
+
+    def __get_names_by_arrival_rate(self):
+        """
+        Returns the positive event names sorted by the current arrival rates of their types, breaking ties by the
+        pattern order.
+        """
+        rates = self.__arrival_rates.get_statistics()
+        return sorted(self.__positive_names,
+                      key=lambda name: (rates[self.__name_to_statistics_index[name]], self.__positions[name]))
+
+    def handle_event(self, event: Event):
+        """
+        Processes a new event and returns the matches it completed.
+        """
+        names = self.__type_to_names.get(event.type)
+        if names is None:
+            return []
+        self.__arrival_rates.update(event)
+        self.__events_since_reorder += 1
+        if self.__events_since_reorder >= self.__reorder_interval:
+            self.__update_evaluation_orders()
+            self.__events_since_reorder = 0
+
+        self.__remove_expired(event.timestamp)
+        matches = self.__release_pending_matches(event.timestamp)
+        accepting_names = []
+        for name in names:
+            if name in self.__negative_bounds:
+                self.__invalidate_pending_matches(name, event)
+                accepting_names.append(name)
+                continue
+            if name in self.__blocked_name_counts:
+                # the name is blocked by an active freezer
+                continue
+            if name in self.__freeze_map and event not in self.__active_freezers:
+                self.__register_freezer(event, name)
+            accepting_names.append(name)
+            if event.type in self.__single_types and event in self.__consumed_events:
+                # the event was already consumed by a match created for another name
+                continue
+            matches.extend(self.__create_matches(name, event))
+        # the event is only buffered after the matches are created, such that it is never joined with itself
+        for name in accepting_names:
+            self.__buffers[name].append(event)
+        return matches
+
+    def flush_pending_matches(self):
+        """
+        Releases all pending matches, typically once the input stream is exhausted.
+        """
+        matches = [match for match, _ in self.__pending_matches if self.__try_consume(match)]
+        self.__pending_matches = []
+        return matches
+
+    def get_buffered_events_count(self):
+        """
+        Returns the number of events currently buffered by the states of this NFA.
+        """
+        return sum(len(buffer) for buffer in self.__buffers.values())
+
+    def get_structure_summary(self):
+        """
+        Returns the operator of the pattern followed by its positive event names in the current evaluation order and
+        its negative event names.
+        """
+        return ("Seq" if self.__is_sequence else "And",) + tuple(self.__get_names_by_arrival_rate()) + \
+            tuple("Neg(%s)" % (name,) for name in self.__negative_names)
+
+    def __create_matches(self, trigger_name: str, trigger_event: Event):
+        """
+        Creates all matches in which the given event is accepted for the given name and all other events were
+        previously buffered.
+        """
+        steps = self.__evaluation_orders[trigger_name]
+        for name, _ in steps[1:]:
+            if len(self.__buffers[name]) == 0:
+                # the lazy evaluation - nothing is done unless all other states hold events
+                return []
+        binding = {trigger_name: trigger_event.payload}
+        bound_events = {trigger_name: trigger_event}
+        if not all(condition.eval(binding) for condition in steps[0][1]):
+            return []
+        matches = []
+        self.__extend_match(steps, 1, binding, bound_events, trigger_event, matches)
+        return matches
+
+    def __extend_match(self, steps: list, step_index: int, binding: Dict, bound_events: Dict[str, Event],
+                       trigger_event: Event, matches: List[PatternMatch]):
+        """
+        Recursively binds the name of the given step to the buffered events satisfying the time constraints and the
+        conditions, and creates a match once all names are bound.
+        """
+        if step_index == len(steps):
+            match = self.__try_create_match(bound_events)
+            if match is not None:
+                matches.append(match)
+            return
+        name, conditions = steps[step_index]
+        lower_timestamp, upper_timestamp = self.__get_timestamp_range(name, bound_events)
+        if lower_timestamp > upper_timestamp:
+            return
+        bound_event_ids = {id(event) for event in bound_events.values()}
+        for event in self.__buffers[name].get_range(lower_timestamp, upper_timestamp):
+            if id(event) in bound_event_ids:
+                continue
+            if event.type in self.__single_types and event in self.__consumed_events:
+                continue
+            binding[name] = event.payload
+            if not all(condition.eval(binding) for condition in conditions):
+                continue
+            bound_events[name] = event
+            self.__extend_match(steps, step_index + 1, binding, bound_events, trigger_event, matches)
+            del bound_events[name]
+            if trigger_event.type in self.__single_types and trigger_event in self.__consumed_events:
+                # the new event was consumed by a match - no further matches can contain it
+                break
+        binding.pop(name, None)
+
+    def __get_timestamp_range(self, name: str, bound_events: Dict[str, Event]):
+        """
+        Returns the range of timestamps an event accepted for the given name may have given the already bound events.
+        """
+        min_timestamp = min(event.min_timestamp for event in bound_events.values())
+        max_timestamp = max(event.max_timestamp for event in bound_events.values())
+        lower_timestamp, upper_timestamp = max_timestamp - self.__window, min_timestamp + self.__window
+        if self.__is_sequence:
+            position = self.__positions.get(name)
+            if position is None:
+                # a negative event is bounded by the positive events preceding and following it
+                position = self.__negative_bounds[name] - 0.5
+            for bound_name, event in bound_events.items():
+                bound_position = self.__positions[bound_name]
+                if bound_position < position:
+                    lower_timestamp = max(lower_timestamp, event.timestamp)
+                else:
+                    upper_timestamp = min(upper_timestamp, event.timestamp)
+        return lower_timestamp, upper_timestamp
+
+    def __try_create_match(self, bound_events: Dict[str, Event]):
+        """
+        Verifies the negative events and the confidence threshold for the given full assignment of the positive
+        names, and creates the corresponding match. Returns None if no match should be reported at this time.
+        """
+        probability = None
+        for event in bound_events.values():
+            if event.probability is not None:
+                probability = event.probability if probability is None else probability * event.probability
+        for name in self.__negative_names:
+            probability = self.__apply_negative_events(name, self.__buffers[name].get_range(
+                *self.__get_timestamp_range(name, bound_events)), bound_events, probability)
+            if probability is False:
+                return None
+        if probability is not None:
+            if self.__confidence is None:
+                raise Exception("Patterns applied on probabilistic event streams must have a confidence threshold")
+            if probability < self.__confidence:
+                return None
+        match = PatternMatch([bound_events[name] for name in self.__positive_names], probability)
+        if len(self.__unbounded_negative_names) > 0:
+            # a negative event arriving later may still invalidate this match
+            self.__pending_matches.append((match, dict(bound_events)))
+            return None
+        return match if self.__try_consume(match) else None
+
+    def __apply_negative_events(self, name: str, negative_events: List[Event], bound_events: Dict[str, Event],
+                                probability: float):
+        """
+        Checks whether any of the given events accepted for the given negative name invalidates the assignment of the
+        positive names. Returns False if it does and the probability of the assignment otherwise.
+        """
+        conditions = self.__negative_conditions[name]
+        binding = None
+        for negative_event in negative_events:
+            if any(negative_event is event for event in bound_events.values()):
+                continue
+            if binding is None:
+                binding = {bound_name: event.payload for bound_name, event in bound_events.items()}
+            binding[name] = negative_event.payload
+            if not all(condition.eval(binding) for condition in conditions):
+                continue
+            if negative_event.probability is None:
+                return False
+            # an uncertain negative event only reduces the probability of the match
+            probability = 1 - negative_event.probability if probability is None else \
+                probability * (1 - negative_event.probability)
+        return probability
+
+    def __invalidate_pending_matches(self, name: str, negative_event: Event):
+        """
+        Drops the pending matches invalidated by a newly arrived negative event.
+        """
+        if len(self.__pending_matches) == 0 or name not in self.__unbounded_negative_names:
+            return
+        remaining_matches = []
+        for match, bound_events in self.__pending_matches:
+            lower_timestamp, upper_timestamp = self.__get_timestamp_range(name, bound_events)
+            if lower_timestamp <= negative_event.timestamp <= upper_timestamp:
+                probability = self.__apply_negative_events(name, [negative_event], bound_events, match.probability)
+                if probability is False:
+                    continue
+                if probability is not None and probability < self.__confidence:
+                    continue
+                match.probability = probability
+            remaining_matches.append((match, bound_events))
+        self.__pending_matches = remaining_matches
+
+    def __release_pending_matches(self, current_timestamp: int):
+        """
+        Releases the pending matches that can no longer be invalidated as their time window has passed.
+        """
+        if len(self.__pending_matches) == 0:
+            return []
+        released_matches = []
+        remaining_matches = []
+        for match, bound_events in self.__pending_matches:
+            if current_timestamp - match.first_timestamp > self.__window:
+                if self.__try_consume(match):
+                    released_matches.append(match)
+            else:
+                remaining_matches.append((match, bound_events))
+        self.__pending_matches = remaining_matches
+        return released_matches
+
+    def __try_consume(self, match: PatternMatch):
+        """
+        Enforces the selection strategy and the 'freeze' policy upon reporting the given match. Returns False if the
+        match contains an already consumed event and may not be reported.
+        """
+        if len(self.__single_types) > 0:
+            single_events = [event for event in match.events if event.type in self.__single_types]
+            if any(event in self.__consumed_events for event in single_events):
+                return False
+            self.__consumed_events.update(single_events)
+        if len(self.__active_freezers) > 0:
+            for event in match.events:
+                if event in self.__active_freezers:
+                    self.__release_freezer(event)
+        return True
+
+    def __register_freezer(self, event: Event, name: str):
+        """
+        Registers an event accepted for a freezer name, blocking the names in its freeze map entry.
+        """
+        blocked_names = self.__freeze_map[name]
+        self.__active_freezers[event] = blocked_names
+        for blocked_name in blocked_names:
+            self.__blocked_name_counts[blocked_name] = self.__blocked_name_counts.get(blocked_name, 0) + 1
+
+    def __release_freezer(self, freezer: Event):
+        """
+        Deactivates the given freezer and unblocks the names no other active freezer is blocking.
+        """
+        for name in self.__active_freezers.pop(freezer):
+            if self.__blocked_name_counts[name] == 1:
+                del self.__blocked_name_counts[name]
+            else:
+                self.__blocked_name_counts[name] -= 1
+
+    def __remove_expired(self, current_timestamp: int):
+        """
+        Removes the events that can no longer appear in a match together with an event of the given timestamp.
+        """
+        earliest_timestamp = current_timestamp - self.__window
+        for buffer in self.__buffers.values():
+            buffer.remove_expired(earliest_timestamp)
+        if len(self.__active_freezers) > 0:
+            for freezer in [freezer for freezer in self.__active_freezers
+                            if current_timestamp - freezer.min_timestamp > self.__window]:
+                self.__release_freezer(freezer)
+        if len(self.__consumed_events) > 2 * self.__consumed_events_count_after_cleanup:
+            # expired consumed events can no longer be matched, hence they are only removed once in a while
+            self.__consumed_events = {event for event in self.__consumed_events
+                                      if event.max_timestamp >= earliest_timestamp}
+            self.__consumed_events_count_after_cleanup = len(self.__consumed_events)
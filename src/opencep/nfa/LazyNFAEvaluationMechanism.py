@@ -0,0 +1,81 @@
+import time
+from datetime import timedelta
+from typing import List
+
+import opencep.misc.StudentMetrics as metrics
+from opencep.base.DataFormatter import DataFormatter
+from opencep.base.Event import Event
+from opencep.base.Pattern import Pattern
+from opencep.base.PatternMatch import PatternMatch
+from opencep.evaluation.EvaluationMechanism import EvaluationMechanism
+from opencep.nfa.LazyChainNFA import LazyChainNFA
+from opencep.stream.Stream import InputStream, OutputStream
+
+
+class LazyNFAEvaluationMechanism(EvaluationMechanism):
+    """
+    An evaluation mechanism detecting each pattern using a dedicated lazy chain NFA.
+    As opposed to the tree-based evaluation mechanism, no state is shared between the patterns in the multi-pattern
+    mode. The pattern IDs are assigned as in a multi-pattern tree.
+    """
+    def __init__(self, patterns: List[Pattern], arrival_rates_time_window: timedelta, reorder_interval: int):
+        # as in a multi-pattern tree, equal patterns are only detected once
+        patterns = list(dict.fromkeys(patterns))
+        self.__is_multi_pattern_mode = len(patterns) > 1
+        if self.__is_multi_pattern_mode:
+            # pattern IDs start from 1
+            for i, pattern in enumerate(patterns, 1):
+                pattern.id = i
+        self.__patterns = patterns
+        self.__nfas = [LazyChainNFA(pattern, arrival_rates_time_window, reorder_interval) for pattern in patterns]
+        self.__event_type_to_nfas = {}
+        for pattern, nfa in zip(patterns, self.__nfas):
+            for event_type in pattern.get_all_event_types():
+                self.__event_type_to_nfas.setdefault(event_type, []).append((pattern, nfa))
+
+    def eval(self, events: InputStream, matches: OutputStream, data_formatter: DataFormatter):
+        """
+        Plays the input event stream on the NFAs of the patterns and reports all found pattern matches to the given
+        output stream.
+        """
+        for raw_event in events:
+            start_ns = time.perf_counter_ns()
+
+            event = Event(raw_event, data_formatter, self.__event_type_to_nfas)
+            nfas = self.__event_type_to_nfas.get(event.type)
+            if nfas is None:
+                continue
+            for pattern, nfa in nfas:
+                for match in nfa.handle_event(event):
+                    self.__report_match(match, pattern, matches)
+
+            end_ns = time.perf_counter_ns()
+            metrics.mark_hist_point(
+                metrics.Metrics.EVENT_PROCESSING_LATENCY,
+                end_ns - start_ns,
+                {"buffered_events": sum(nfa.get_buffered_events_count() for _, nfa in nfas)},
+                end_ns,
+            )
+            metrics.increment_counter(metrics.Metrics.PROCESSED_EVENTS, end_ns)
+
+        # the matches waiting for unbounded negative events can be reported once the stream is exhausted
+        for pattern, nfa in zip(self.__patterns, self.__nfas):
+            for match in nfa.flush_pending_matches():
+                self.__report_match(match, pattern, matches)
+        matches.close()
+
+    def __report_match(self, match: PatternMatch, pattern: Pattern, matches: OutputStream):
+        """
+        Adds a match found by the NFA of the given pattern to the output stream.
+        """
+        if self.__is_multi_pattern_mode:
+            match.add_pattern_id(pattern.id)
+        matches.add_item(match)
+        metrics.increment_counter(metrics.Metrics.DETECTED_MATCHES, time.perf_counter_ns())
+
+    def get_structure_summary(self):
+        summaries = tuple(nfa.get_structure_summary() for nfa in self.__nfas)
+        return summaries if self.__is_multi_pattern_mode else summaries[0]
+
+    def __repr__(self):
+        return str(self.get_structure_summary())
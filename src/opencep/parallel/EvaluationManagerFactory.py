@@ -7,6 +7,8 @@ from opencep.evaluation.EvaluationMechanismFactory import EvaluationMechanismPar
 from opencep.parallel.ParallelExecutionParameters import *
 from opencep.parallel.manager.SequentialEvaluationManager import SequentialEvaluationManager
 from opencep.parallel.data_parallel.DataParallelEvaluationManager import DataParallelEvaluationManager
+from opencep.parallel.structure_parallel.StructureParallelEvaluationManager import StructureParallelEvaluationManager
+from opencep.parallel.task_parallel.TaskParallelEvaluationManager import TaskParallelEvaluationManager
 
 
 class EvaluationManagerFactory:
@@ -23,4 +25,12 @@ class EvaluationManagerFactory:
             return SequentialEvaluationManager(patterns, eval_mechanism_params)
         if parallel_execution_params.execution_mode == ParallelExecutionModes.DATA_PARALLELISM:
             return DataParallelEvaluationManager(patterns, eval_mechanism_params, parallel_execution_params)
+        if parallel_execution_params.execution_mode == ParallelExecutionModes.STRUCTURE_PARALLELISM:
+            return StructureParallelEvaluationManager(patterns, eval_mechanism_params, parallel_execution_params)
+        if parallel_execution_params.execution_mode == ParallelExecutionModes.TASK_PARALLELISM:
+            return TaskParallelEvaluationManager(patterns, eval_mechanism_params, parallel_execution_params)
+        if parallel_execution_params.execution_mode == ParallelExecutionModes.HYBRID_PARALLELISM:
+            return DataParallelEvaluationManager(patterns, eval_mechanism_params,
+                                                 parallel_execution_params.data_parallel_params,
+                                                 parallel_execution_params.structure_parallel_params)
         raise Exception("Unknown parallel execution mode: %s" % (parallel_execution_params.execution_mode,))
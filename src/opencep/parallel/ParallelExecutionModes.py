@@ -7,11 +7,9 @@ class ParallelExecutionModes(Enum):
     """
     SEQUENTIAL = 0  # no parallelism
     DATA_PARALLELISM = 1
-
-    # TODO: not yet implemented
-    STRUCTURE_PARALLELISM = 2
-    TASK_PARALLELISM = 3
-    HYBRID_PARALLELISM = 4
+    STRUCTURE_PARALLELISM = 2  # the evaluation tree of a pattern is split into stages evaluated in parallel
+    TASK_PARALLELISM = 3  # the patterns are partitioned between the units
+    HYBRID_PARALLELISM = 4  # each data-parallel unit evaluates the patterns in the structure-parallel mode
 
 
 class DataParallelExecutionModes(Enum):
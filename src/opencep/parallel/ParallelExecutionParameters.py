@@ -37,11 +37,19 @@ class DataParallelExecutionParametersHirzelAlgorithm(DataParallelExecutionParame
     def __init__(self,
                  platform: ParallelExecutionPlatforms = DefaultConfig.DEFAULT_PARALLEL_EXECUTION_PLATFORM,
                  units_number: int = DefaultConfig.DEFAULT_PARALLEL_UNITS_NUMBER,
-                 key: str = DefaultConfig.DEFAULT_PARALLEL_KEY):
+                 key: str = DefaultConfig.DEFAULT_PARALLEL_KEY,
+                 key_groups_number: int = DefaultConfig.GROUP_BY_KEY_GROUPS_NUMBER,
+                 rebalance_interval: int = DefaultConfig.GROUP_BY_KEY_REBALANCE_INTERVAL,
+                 max_load_imbalance: float = DefaultConfig.GROUP_BY_KEY_MAX_LOAD_IMBALANCE,
+                 split_hot_keys: bool = DefaultConfig.GROUP_BY_KEY_SPLIT_HOT_KEYS):
         super().__init__(platform,
                          DataParallelExecutionModes.GROUP_BY_KEY_ALGORITHM,
                          units_number)
         self.divide_key = key
+        self.key_groups_number = key_groups_number
+        self.rebalance_interval = rebalance_interval
+        self.max_load_imbalance = max_load_imbalance
+        self.split_hot_keys = split_hot_keys
 
 
 class DataParallelExecutionParametersRIPAlgorithm(DataParallelExecutionParameters):
@@ -70,3 +78,53 @@ class DataParallelExecutionParametersHyperCubeAlgorithm(DataParallelExecutionPar
                          DataParallelExecutionModes.HYPER_CUBE_ALGORITHM,
                          units_number)
         self.divide_keys_dict = attributes_dict
+
+
+class StructureParallelExecutionParameters(ParallelExecutionParameters):
+    """
+    Parameters for the structure-parallel evaluation of a single pattern.
+    units_number is the maximal number of stages the evaluation tree is split into, each evaluated by a separate
+    execution unit. The input events are passed to the stages in batches of batch_size events.
+    """
+    def __init__(self,
+                 platform: ParallelExecutionPlatforms = DefaultConfig.DEFAULT_PARALLEL_EXECUTION_PLATFORM,
+                 units_number: int = DefaultConfig.STRUCTURE_PARALLEL_UNITS_NUMBER,
+                 batch_size: int = DefaultConfig.STRUCTURE_PARALLEL_BATCH_SIZE):
+        if units_number <= 0:
+            raise Exception(f"units_number must be positive number, got {units_number}")
+        if batch_size <= 0:
+            raise Exception(f"batch_size must be positive number, got {batch_size}")
+        super().__init__(execution_mode=ParallelExecutionModes.STRUCTURE_PARALLELISM, platform=platform)
+        self.units_number = units_number
+        self.batch_size = batch_size
+
+
+class TaskParallelExecutionParameters(ParallelExecutionParameters):
+    """
+    Parameters for the task-parallel evaluation, partitioning the patterns between at most units_number execution
+    units.
+    """
+    def __init__(self,
+                 platform: ParallelExecutionPlatforms = DefaultConfig.DEFAULT_PARALLEL_EXECUTION_PLATFORM,
+                 units_number: int = DefaultConfig.TASK_PARALLEL_UNITS_NUMBER):
+        if units_number <= 0:
+            raise Exception(f"units_number must be positive number, got {units_number}")
+        super().__init__(execution_mode=ParallelExecutionModes.TASK_PARALLELISM, platform=platform)
+        self.units_number = units_number
+
+
+class HybridParallelExecutionParameters(ParallelExecutionParameters):
+    """
+    Parameters for the hybrid parallel evaluation: the events are divided between the units according to the given
+    data-parallel parameters, and each unit evaluates the patterns according to the given structure-parallel
+    parameters.
+    """
+    def __init__(self,
+                 data_parallel_params: DataParallelExecutionParameters,
+                 structure_parallel_params: StructureParallelExecutionParameters = None):
+        if structure_parallel_params is None:
+            structure_parallel_params = StructureParallelExecutionParameters(data_parallel_params.platform)
+        super().__init__(execution_mode=ParallelExecutionModes.HYBRID_PARALLELISM,
+                         platform=data_parallel_params.platform)
+        self.data_parallel_params = data_parallel_params
+        self.structure_parallel_params = structure_parallel_params
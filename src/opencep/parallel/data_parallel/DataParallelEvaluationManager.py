@@ -12,16 +12,19 @@ from opencep.stream.Stream import *
 class DataParallelEvaluationManager(ParallelEvaluationManager, ABC):
     """
     A parallel evaluation manager employing the data-parallel paradigm.
+    In the hybrid mode, each unit evaluates the patterns according to the given structure-parallel parameters.
     """
     def __init__(self, patterns: Pattern or List[Pattern],
                  eval_mechanism_params: EvaluationMechanismParameters,
-                 parallel_execution_params: DataParallelExecutionParameters):
+                 parallel_execution_params: DataParallelExecutionParameters,
+                 structure_parallel_params: StructureParallelExecutionParameters = None):
         super().__init__(parallel_execution_params)
         self.__mode = parallel_execution_params.algorithm
         self.__num_units = parallel_execution_params.units_number
         self.__algorithm = \
             DataParallelExecutionAlgorithmFactory.create_data_parallel_algorithm(
-                parallel_execution_params, patterns, eval_mechanism_params, self._platform)
+                parallel_execution_params, patterns, eval_mechanism_params, self._platform,
+                structure_parallel_params)
         self.__pattern_matches = None
 
     def eval(self, events: InputStream, matches: OutputStream, data_formatter: DataFormatter):
@@ -34,3 +37,6 @@ class DataParallelEvaluationManager(ParallelEvaluationManager, ABC):
 
     def get_structure_summary(self):
         return self.__algorithm.get_structure_summary()
+
+    def get_profile_report(self):
+        return self.__algorithm.get_profile_report()
@@ -7,21 +7,31 @@ from opencep.parallel.platform.ParallelExecutionPlatform import ParallelExecutio
 from opencep.stream.Stream import *
 from opencep.parallel.manager.EvaluationManager import EvaluationManager
 from opencep.parallel.manager.SequentialEvaluationManager import SequentialEvaluationManager
+from opencep.parallel.ParallelExecutionParameters import StructureParallelExecutionParameters
+from opencep.parallel.structure_parallel.StructureParallelEvaluationManager import StructureParallelEvaluationManager
 from typing import Set, Callable
 
 
 class DataParallelExecutionAlgorithm(ABC):
     """
     An abstract base class for all data parallel evaluation algorithms.
+    If structure-parallel parameters are given (the hybrid mode), each unit evaluates the patterns in the
+    structure-parallel mode rather than sequentially.
     """
 
     def __init__(self, units_number, patterns: Pattern or List[Pattern],
-                 eval_mechanism_params: EvaluationMechanismParameters, platform: ParallelExecutionPlatform):
+                 eval_mechanism_params: EvaluationMechanismParameters, platform: ParallelExecutionPlatform,
+                 structure_parallel_params: StructureParallelExecutionParameters = None):
         self.units_number = units_number
         self.platform = platform
-        # create SequentialEvaluationManager for every unit
-        self.evaluation_managers = [SequentialEvaluationManager(patterns, eval_mechanism_params)
-                                    for _ in range(self.units_number)]
+        # create an evaluation manager for every unit
+        if structure_parallel_params is None:
+            self.evaluation_managers = [SequentialEvaluationManager(patterns, eval_mechanism_params)
+                                        for _ in range(self.units_number)]
+        else:
+            self.evaluation_managers = [StructureParallelEvaluationManager(patterns, eval_mechanism_params,
+                                                                           structure_parallel_params)
+                                        for _ in range(self.units_number)]
         self.match_lock = platform.create_lock()
 
     def eval(self, events: InputStream, matches: OutputStream, data_formatter: DataFormatter):
@@ -70,6 +80,10 @@ class DataParallelExecutionAlgorithm(ABC):
     def get_structure_summary(self):
         return tuple(map(lambda em: em.get_structure_summary(), self.evaluation_managers))
 
+    def get_profile_report(self):
+        return "\n\n".join("Unit %d:\n%s" % (unit_id, em.get_profile_report())
+                            for unit_id, em in enumerate(self.evaluation_managers))
+
     class ExecutionUnit:
         """
         A wrap for single unit that has input stream and an execution unit.
@@ -14,19 +14,30 @@ class DataParallelExecutionAlgorithmFactory:
     def create_data_parallel_algorithm(data_parallel_params: DataParallelExecutionParameters,
                                        patterns: Pattern or List[Pattern],
                                        eval_mechanism_params: EvaluationMechanismParameters,
-                                       platform: ParallelExecutionPlatform):
+                                       platform: ParallelExecutionPlatform,
+                                       structure_parallel_params: StructureParallelExecutionParameters = None):
+        """
+        If structure-parallel parameters are given, each unit of the algorithm evaluates the patterns in the
+        structure-parallel mode.
+        """
         if data_parallel_params.algorithm == DataParallelExecutionModes.GROUP_BY_KEY_ALGORITHM:
             return GroupByKeyParallelExecutionAlgorithm(data_parallel_params.units_number,
                                                         patterns, eval_mechanism_params,
                                                         platform,
-                                                        data_parallel_params.divide_key)
+                                                        data_parallel_params.divide_key,
+                                                        data_parallel_params.key_groups_number,
+                                                        data_parallel_params.rebalance_interval,
+                                                        data_parallel_params.max_load_imbalance,
+                                                        data_parallel_params.split_hot_keys,
+                                                        structure_parallel_params)
         if data_parallel_params.algorithm == DataParallelExecutionModes.RIP_ALGORITHM:
             return RIPParallelExecutionAlgorithm(data_parallel_params.units_number,
                                                  patterns, eval_mechanism_params, platform,
-                                                 data_parallel_params.rip_multiple)
+                                                 data_parallel_params.rip_multiple, structure_parallel_params)
         if data_parallel_params.algorithm == DataParallelExecutionModes.HYPER_CUBE_ALGORITHM:
             return HyperCubeParallelExecutionAlgorithm(data_parallel_params.units_number,
                                                        patterns, eval_mechanism_params,
                                                        platform,
-                                                       data_parallel_params.divide_keys_dict)
+                                                       data_parallel_params.divide_keys_dict,
+                                                       structure_parallel_params)
         raise Exception("Unknown parallel execution Algorithm: %s" % (data_parallel_params.algorithm,))
@@ -1,4 +1,9 @@
+import zlib
+
+from opencep.base.PatternStructure import CompositeStructure, PrimitiveEventStructure
+from opencep.misc import DefaultConfig
 from opencep.parallel.data_parallel.DataParallelExecutionAlgorithm import DataParallelExecutionAlgorithm
+from opencep.parallel.ParallelExecutionParameters import StructureParallelExecutionParameters
 from opencep.base.Pattern import Pattern
 from opencep.evaluation.EvaluationMechanismFactory import EvaluationMechanismParameters
 from opencep.base.PatternMatch import *
@@ -10,13 +15,30 @@ from typing import Set
 class GroupByKeyParallelExecutionAlgorithm(DataParallelExecutionAlgorithm):
     """
     Implements the key-based partitioning algorithm.
-    Gets a key and a unit-number - assigns each event to an execution unit based on the modulo value of the provided key
+    Gets a key and a unit-number - hashes the value of the key of each event into one of a fixed number of key groups,
+    and assigns each event to the execution unit currently in charge of its key group.
+
+    crc32(event[key]) % key_groups_number --> key group --> designated unit
 
-    event[key](%units_number) --> designated unit
+    Numeric key values are truncated to integers before hashing. Events with no value for the key are dropped. The key
+    values are hashed by CRC32 of their string representations, such that the routing does not depend on the hash seed
+    of the process.
 
     All patterns must include == comparison between all attributes with the given "key" argument,
     to enforce matches on the same unit id.
 
+    The number of events routed to each unit is monitored. Every rebalance_interval events, if the load of some unit
+    exceeds the average load by more than the allowed ratio, key groups are migrated from the most loaded unit to the
+    least loaded one. The partial matches of a migrated group are not transferred. Instead, the group is drained: for
+    one time window after the migration, its events are passed to both its old and its new unit. The old unit detects
+    the matches starting before the migration, while the new unit detects the ones starting after it, and each unit
+    only reports the matches starting while it was in charge of the group. Once the window has passed, all partial
+    matches of the group held by the old unit are expired and the group is only served by its new unit. A group is not
+    migrated again before its draining is over.
+    If split_hot_keys is set and all patterns consist of a single primitive event (such that a match never spans
+    several events), the events of a key group whose load alone exceeds the average load are spread between the least
+    loaded units instead.
+
     units_number - Indicate the number of units/threads to run, doesn't include the "main execution unit".
     """
     def __init__(self,
@@ -24,25 +46,167 @@ class GroupByKeyParallelExecutionAlgorithm(DataParallelExecutionAlgorithm):
                  patterns: Pattern or List[Pattern],
                  eval_mechanism_params: EvaluationMechanismParameters,
                  platform: ParallelExecutionPlatform,
-                 key: str):
-        super().__init__(units_number, patterns, eval_mechanism_params, platform)
+                 key: str,
+                 key_groups_number: int = DefaultConfig.GROUP_BY_KEY_GROUPS_NUMBER,
+                 rebalance_interval: int = DefaultConfig.GROUP_BY_KEY_REBALANCE_INTERVAL,
+                 max_load_imbalance: float = DefaultConfig.GROUP_BY_KEY_MAX_LOAD_IMBALANCE,
+                 split_hot_keys: bool = DefaultConfig.GROUP_BY_KEY_SPLIT_HOT_KEYS,
+                 structure_parallel_params: StructureParallelExecutionParameters = None):
+        super().__init__(units_number, patterns, eval_mechanism_params, platform, structure_parallel_params)
+        if key_groups_number < units_number:
+            raise Exception("The number of key groups must not be smaller than the number of units")
+        if max_load_imbalance < 1.0:
+            raise Exception("Invalid value for maximal load imbalance: %s" % (max_load_imbalance,))
         self._key = key
+        patterns = patterns if isinstance(patterns, list) else [patterns]
+        self.__window = max(pattern.window_ns for pattern in patterns)
+        self.__key_groups_number = key_groups_number
+        self.__rebalance_interval = rebalance_interval
+        self.__max_load_imbalance = max_load_imbalance
+        # a match of single event patterns never spans several events, hence a key group can switch units immediately
+        self.__single_event_patterns = \
+            all(GroupByKeyParallelExecutionAlgorithm.__is_single_event_pattern(pattern) for pattern in patterns)
+        self.__can_split_hot_keys = split_hot_keys and self.__single_event_patterns
+
+        self.__group_to_unit = [group % units_number for group in range(key_groups_number)]
+        # for each key group, the timestamps at which units took charge of it and the units themselves. This list is
+        # only appended to, hence the execution units may read it while the events are routed
+        self.__group_owners = [[(None, unit_id)] for unit_id in self.__group_to_unit]
+        # the key groups passed to their old units as well, mapped to the old units and the migration timestamps
+        self.__draining_groups = {}
+        # the number of events routed since the last load check, per key group and per unit
+        self.__group_loads = [0] * key_groups_number
+        self.__unit_loads = [0] * units_number
+        self.__total_unit_loads = [0] * units_number
+        self.__events_since_rebalance = 0
+        self.__split_groups = set()
 
     def _classifier(self, event: Event) -> Set[int]:
         """
-        Returns a list of a single unit that matches the modulo of the key
+        Returns a list of a single unit in charge of the key group of the event.
         This will server later as the execution units.
         """
-        value = event.payload.get(self._key)
-        if value is not None and (is_int(value) or is_float(value)):
-            return {int(value) % self.units_number}
-        return set()
+        group = self.__get_key_group(event.payload.get(self._key))
+        if group is None:
+            return set()
+        if group in self.__split_groups:
+            unit_ids = {min(range(self.units_number), key=self.__unit_loads.__getitem__)}
+        else:
+            unit_ids = {self.__group_to_unit[group]}
+        if group in self.__draining_groups:
+            old_unit_id, migration_timestamp = self.__draining_groups[group]
+            if event.timestamp - migration_timestamp <= self.__window:
+                unit_ids.add(old_unit_id)
+            else:
+                del self.__draining_groups[group]
+        self.__group_loads[group] += 1
+        for unit_id in unit_ids:
+            self.__unit_loads[unit_id] += 1
+            self.__total_unit_loads[unit_id] += 1
+        self.__events_since_rebalance += 1
+        if self.__events_since_rebalance >= self.__rebalance_interval:
+            self.__rebalance(event.timestamp)
+        return unit_ids
+
+    def get_unit_loads(self):
+        """
+        Returns the number of events routed to each unit so far.
+        """
+        return list(self.__total_unit_loads)
+
+    def __get_key_group(self, value):
+        """
+        Returns the key group of the given key value, or None if the event has no value for the key.
+        """
+        if value is None:
+            return None
+        try:
+            value = int(value) if is_int(value) else int(float(value)) if is_float(value) else value
+        except (TypeError, ValueError, OverflowError):
+            # non-numeric and non-finite values are hashed as they are
+            pass
+        return zlib.crc32(str(value).encode()) % self.__key_groups_number
+
+    def __rebalance(self, current_timestamp):
+        """
+        Migrates key groups from the most loaded units to the least loaded ones until the loads are balanced
+        or no further migration improves them, and updates the set of split key groups.
+        """
+        loads = self.__unit_loads
+        average_load = sum(loads) / self.units_number
+        if self.__can_split_hot_keys:
+            self.__split_groups = {group for group, load in enumerate(self.__group_loads) if load > average_load}
+        while max(loads) > self.__max_load_imbalance * average_load:
+            source_unit = max(range(self.units_number), key=loads.__getitem__)
+            target_unit = min(range(self.units_number), key=loads.__getitem__)
+            group = self.__find_group_to_migrate(source_unit, loads[source_unit] - loads[target_unit])
+            if group is None:
+                break
+            self.__migrate_group(group, target_unit, current_timestamp)
+            loads[source_unit] -= self.__group_loads[group]
+            loads[target_unit] += self.__group_loads[group]
+        self.__group_loads = [0] * self.__key_groups_number
+        self.__unit_loads = [0] * self.units_number
+        self.__events_since_rebalance = 0
+
+    def __migrate_group(self, group: int, target_unit: int, current_timestamp: int):
+        """
+        Assigns the given key group to the given unit, draining it from its current unit unless all patterns consist
+        of a single event.
+        """
+        if not self.__single_event_patterns:
+            self.__draining_groups[group] = (self.__group_to_unit[group], current_timestamp)
+        self.__group_to_unit[group] = target_unit
+        self.__group_owners[group].append((current_timestamp, target_unit))
+
+    def __get_group_owner(self, group: int, timestamp: int):
+        """
+        Returns the unit in charge of the given key group at the given timestamp. The events arriving at the timestamp
+        of a migration may have been routed before it, hence they are still attributed to the old unit.
+        """
+        for migration_timestamp, unit_id in reversed(self.__group_owners[group]):
+            if migration_timestamp is None or migration_timestamp < timestamp:
+                return unit_id
+
+    def __find_group_to_migrate(self, source_unit: int, load_difference: int):
+        """
+        Returns the most loaded key group of the given unit whose migration reduces the difference between the loads of
+        the source and the target units, or None if no such group exists. Groups whose previous migration is still
+        being drained are not migrated.
+        """
+        best_group = None
+        for group, unit_id in enumerate(self.__group_to_unit):
+            if unit_id != source_unit or group in self.__split_groups:
+                continue
+            load = self.__group_loads[group]
+            if load == 0 or load >= load_difference:
+                # migrating this group would not make the loads more balanced
+                continue
+            if group in self.__draining_groups:
+                continue
+            if best_group is None or load > self.__group_loads[best_group]:
+                best_group = group
+        return best_group
+
+    @staticmethod
+    def __is_single_event_pattern(pattern: Pattern):
+        """
+        Returns True if every match of the given pattern consists of a single primitive event.
+        """
+        structure = pattern.full_structure
+        while isinstance(structure, CompositeStructure) and len(structure.args) == 1:
+            structure = structure.args[0]
+        return isinstance(structure, PrimitiveEventStructure)
 
     def _create_skip_item(self, unit_id: int):
         """
-        Returns a trivial function that does not perform any filtering.
+        Returns a function filtering out the matches starting while the given unit was not in charge of their key group,
+        which are reported by the unit in charge at that time. Without migrations, no match is filtered out.
         """
         def skip_item(item: PatternMatch):
-            return False
+            if self.__single_event_patterns:
+                return False
+            group = self.__get_key_group(item.events[0].payload.get(self._key))
+            return group is not None and self.__get_group_owner(group, item.first_timestamp) != unit_id
 
         return skip_item
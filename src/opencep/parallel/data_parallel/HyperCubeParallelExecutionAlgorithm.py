@@ -3,6 +3,7 @@
 """
 from abc import ABC
 from opencep.parallel.data_parallel.DataParallelExecutionAlgorithm import DataParallelExecutionAlgorithm
+from opencep.parallel.ParallelExecutionParameters import StructureParallelExecutionParameters
 from opencep.base.Pattern import Pattern
 from opencep.evaluation.EvaluationMechanismFactory import EvaluationMechanismParameters
 from math import floor
@@ -21,7 +22,8 @@ class HyperCubeParallelExecutionAlgorithm(DataParallelExecutionAlgorithm, ABC):
     """
 
     def __init__(self, units_number, patterns: Pattern or List[Pattern],
-                 eval_mechanism_params: EvaluationMechanismParameters, platform, attributes_dict: dict):
+                 eval_mechanism_params: EvaluationMechanismParameters, platform, attributes_dict: dict,
+                 structure_parallel_params: StructureParallelExecutionParameters = None):
         if isinstance(patterns, Pattern):
             patterns = [patterns]
         for pattern in patterns:
@@ -49,7 +51,7 @@ class HyperCubeParallelExecutionAlgorithm(DataParallelExecutionAlgorithm, ABC):
 
         shares, cube_size = self._calc_cubic_shares(units_number, dims)
         self._cube = array(range(cube_size)).reshape(shares)
-        super().__init__(self._cube.size, patterns, eval_mechanism_params, platform)
+        super().__init__(self._cube.size, patterns, eval_mechanism_params, platform, structure_parallel_params)
 
     def _classifier(self, event: Event) -> Set[int]:
         """
@@ -1,5 +1,7 @@
+import itertools
 from abc import ABC
 from opencep.parallel.data_parallel.DataParallelExecutionAlgorithm import DataParallelExecutionAlgorithm
+from opencep.parallel.ParallelExecutionParameters import StructureParallelExecutionParameters
 from opencep.base.Pattern import Pattern
 from opencep.evaluation.EvaluationMechanismFactory import EvaluationMechanismParameters
 from opencep.base.PatternMatch import *
@@ -16,14 +18,14 @@ class RIPParallelExecutionAlgorithm(DataParallelExecutionAlgorithm, ABC):
     """
     def __init__(self, units_number, patterns: Pattern or List[Pattern],
                  eval_mechanism_params: EvaluationMechanismParameters,
-                 platform, multiple: float):
-        super().__init__(units_number, patterns, eval_mechanism_params, platform)
+                 platform, multiple: float, structure_parallel_params: StructureParallelExecutionParameters = None):
+        super().__init__(units_number, patterns, eval_mechanism_params, platform, structure_parallel_params)
 
         # in case of multi pattern
         if isinstance(patterns, list):
-            self._time_delta = max(pattern.window for pattern in patterns)
+            self._time_delta = max(pattern.window_ns for pattern in patterns)
         else:
-            self._time_delta = patterns.window
+            self._time_delta = patterns.window_ns
 
         self._interval = self._time_delta * multiple
 
@@ -31,3 +31,9 @@ class EvaluationManager(ABC):
         Returns a string containing a short description of the underlying evaluation mechanism structure
         """
         raise NotImplementedError()
+
+    def get_profile_report(self):
+        """
+        Returns the profile report of the underlying evaluation mechanism
+        """
+        raise NotImplementedError()
@@ -33,3 +33,6 @@ class SequentialEvaluationManager(EvaluationManager):
 
     def get_structure_summary(self):
         return self.__eval_mechanism.get_structure_summary()
+
+    def get_profile_report(self):
+        return self.__eval_mechanism.get_profile_report()
@@ -0,0 +1,200 @@
+"""
+This file contains the stages an evaluation tree is split into for structure-parallel evaluation, and the procedure
+choosing the subtrees to be evaluated by separate stages.
+"""
+from typing import List
+
+from opencep.base.Event import Event
+from opencep.stream.Stream import Stream, OutputStream
+from opencep.tree.Tree import Tree
+from opencep.tree.nodes.BinaryNode import BinaryNode
+from opencep.tree.nodes.LeafNode import LeafNode
+from opencep.tree.nodes.NegationNode import NegationNode
+from opencep.tree.nodes.Node import Node
+from opencep.tree.nodes.StageBoundaryNodes import StageInputNode, StageOutputNode
+from opencep.tree.nodes.UnaryNode import UnaryNode
+
+
+class EvaluationStage:
+    """
+    A part of an evaluation tree evaluated by a single execution unit, that is, the subtree of the stage root excluding
+    the subtrees evaluated by the child stages.
+    Each stage receives every batch of input events and plays the events on its own leaves. Before an event is played,
+    the storage operations applied upon the same event by the root of each child stage (see StageOutputStorage) are
+    replayed by the respective input node. Hence, the nodes of each stage receive their partial matches, and remove
+    the expired ones, in exactly the same order as in sequential evaluation.
+    The storage operations of the stage root are passed to the parent stage once the whole batch is processed, while
+    the root stage reports the full matches of the tree.
+    """
+    def __init__(self, stage_id: int, root: Node, tree: Tree = None):
+        self.stage_id = stage_id
+        self.error = None
+        self.__root = root
+        # only set for the root stage
+        self.__tree = tree
+        self.__output_node = StageOutputNode(root) if tree is None else None
+        self.__input = Stream()
+        self.__output = Stream()
+        # pairs of the input node of each child stage and the child stage itself
+        self.__child_stages = []
+        self.__event_types_listeners = {}
+        self.__event_types = set()
+
+    def get_root(self):
+        return self.__root
+
+    def add_child_stage(self, input_node: StageInputNode, child_stage):
+        """
+        Registers a stage evaluating a subtree replaced by the given input node.
+        """
+        self.__child_stages.append((input_node, child_stage))
+
+    def init_event_types(self):
+        """
+        Registers the leaves of this stage and its descendant stages as listeners of their event types.
+        """
+        for _, child_stage in self.__child_stages:
+            child_stage.init_event_types()
+        for leaf in self.__root.get_leaves():
+            self.__event_types_listeners.setdefault(leaf.get_event_type(), []).append(leaf)
+        self.__event_types = set(self.__event_types_listeners.keys())
+        for _, child_stage in self.__child_stages:
+            self.__event_types |= child_stage.get_event_types()
+
+    def get_event_types(self):
+        """
+        Returns the types of the events relevant to this stage or any of its descendant stages.
+        """
+        return self.__event_types
+
+    def add_events(self, events: List[Event]):
+        """
+        Passes a batch of input events to this stage.
+        """
+        self.__input.add_item(events)
+
+    def close(self):
+        """
+        Notifies this stage that no more input events will arrive.
+        """
+        self.__input.close()
+
+    def run(self, matches: OutputStream):
+        """
+        Processes the batches of input events until the input is closed. The root stage reports the full matches to the
+        given stream.
+        If an error occurs, the output of this stage is closed, such that the parent stage fails as well rather than
+        waiting for the partial matches of this stage forever.
+        """
+        try:
+            for events in self.__input:
+                self.__process_events(events, matches)
+            if self.__tree is not None:
+                for match in self.__tree.get_last_matches():
+                    matches.add_item(match)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.__output.close()
+
+    def __process_events(self, events: List[Event], matches: OutputStream):
+        """
+        Processes a single batch of input events.
+        """
+        # the storage operations of the child stages are tagged with the positions of the events they were applied upon
+        child_operations = [(input_node, child_stage.__output.get_item())
+                            for input_node, child_stage in self.__child_stages]
+        positions = [0] * len(child_operations)
+        for event_index, event in enumerate(events):
+            if event.type not in self.__event_types:
+                continue
+            if self.__output_node is not None:
+                self.__output_node.set_event_index(event_index)
+            for i, (input_node, operations) in enumerate(child_operations):
+                position = positions[i]
+                while position < len(operations) and operations[position][0] == event_index:
+                    input_node.replay_storage_operation(operations[position][1])
+                    position += 1
+                positions[i] = position
+            for leaf in self.__event_types_listeners.get(event.type, ()):
+                leaf.handle_event(event)
+            if self.__tree is not None:
+                for match in self.__tree.get_matches():
+                    matches.add_item(match)
+        if self.__output_node is not None:
+            self.__output.add_item(self.__output_node.take_storage_operations())
+
+
+def split_tree(tree: Tree, max_stages_number: int):
+    """
+    Splits the given evaluation tree into at most the given number of stages and returns them, the root stage being the
+    first.
+    The stages are created one by one: the largest stage (in terms of its nodes) containing a subtree that can be
+    evaluated separately is split by the subtree dividing it most evenly.
+    """
+    stage_roots = [tree.get_root()]
+    while len(stage_roots) < max_stages_number:
+        new_stage_root = None
+        stage_sizes = [(len(_get_stage_nodes(root, stage_roots)), root) for root in stage_roots]
+        for stage_size, stage_root in sorted(stage_sizes, key=lambda item: -item[0]):
+            candidates = [(abs(2 * len(_get_stage_nodes(node, stage_roots)) - stage_size), node)
+                          for node in _get_stage_nodes(stage_root, stage_roots)[1:]
+                          if _can_be_stage_root(node)]
+            if len(candidates) > 0:
+                new_stage_root = min(candidates, key=lambda item: item[0])[1]
+                break
+        if new_stage_root is None:
+            break
+        stage_roots.append(new_stage_root)
+
+    stages = [EvaluationStage(0, tree.get_root(), tree)]
+    input_nodes_to_stages = {}
+    for stage_root in stage_roots[1:]:
+        input_node = StageInputNode(stage_root)
+        parent = stage_root.get_parents()[0]
+        if isinstance(parent, BinaryNode):
+            parent.replace_subtree(stage_root, input_node)
+        else:
+            parent.replace_subtree(input_node)
+        stage = EvaluationStage(len(stages), stage_root)
+        input_nodes_to_stages[input_node] = stage
+        stages.append(stage)
+    for stage in stages:
+        for node in _get_stage_nodes(stage.get_root(), []):
+            if node in input_nodes_to_stages:
+                stage.add_child_stage(node, input_nodes_to_stages[node])
+    stages[0].init_event_types()
+    return stages
+
+
+def _get_children(node: Node):
+    if isinstance(node, BinaryNode):
+        return [node.get_left_subtree(), node.get_right_subtree()]
+    if isinstance(node, UnaryNode):
+        return [node.get_child()]
+    return []
+
+
+def _get_stage_nodes(root: Node, stage_roots: List[Node]):
+    """
+    Returns the nodes of the subtree of the given node, excluding the subtrees of the given stage roots.
+    """
+    nodes = []
+    nodes_to_visit = [root]
+    while len(nodes_to_visit) > 0:
+        node = nodes_to_visit.pop()
+        nodes.append(node)
+        nodes_to_visit.extend(child for child in _get_children(node) if child not in stage_roots)
+    return nodes
+
+
+def _can_be_stage_root(node: Node):
+    """
+    Returns True if the subtree of the given node can be evaluated by a separate stage and False otherwise. A single
+    leaf is not worth a separate stage, and an unbounded negation node keeps the pending matches that are only released
+    by the root stage at the end of the input. As the unbounded negation nodes form the topmost chain of the tree, the
+    subtree of any other internal node does not contain any of them.
+    """
+    if isinstance(node, LeafNode):
+        return False
+    return not isinstance(node, NegationNode) or node.get_first_unbounded_negative_node() is None
@@ -0,0 +1,113 @@
+"""
+This file contains the evaluation manager implementing the structure-parallel (operator-parallel) paradigm.
+"""
+from typing import List
+
+from opencep.adaptive.optimizer.OptimizerFactory import OptimizerFactory
+from opencep.base.DataFormatter import DataFormatter
+from opencep.base.Event import Event
+from opencep.base.Pattern import Pattern
+from opencep.evaluation.EvaluationMechanismFactory import EvaluationMechanismParameters, \
+    TreeBasedEvaluationMechanismParameters
+from opencep.parallel.ParallelExecutionParameters import StructureParallelExecutionParameters
+from opencep.parallel.manager.ParallelEvaluationManager import ParallelEvaluationManager
+from opencep.parallel.structure_parallel.EvaluationStage import split_tree
+from opencep.stream.Stream import InputStream, OutputStream
+from opencep.tree.Tree import Tree
+
+
+class StructureParallelEvaluationManager(ParallelEvaluationManager):
+    """
+    A parallel evaluation manager employing the structure-parallel paradigm. The evaluation tree of a single pattern is
+    split into stages (see EvaluationStage.py), each evaluated by a separate execution unit, such that the stages form
+    a pipeline: while a stage processes a batch of events, the stages below it already process the following batches.
+    The detected matches are identical to the ones detected by sequential evaluation.
+    As each node is only accessed by the execution unit of its stage, features sharing state between the nodes of a
+    tree are not supported: consumption policies, adaptivity, load shedding, memory budgets and profiling.
+    """
+    def __init__(self, patterns: Pattern or List[Pattern],
+                 eval_mechanism_params: EvaluationMechanismParameters,
+                 parallel_execution_params: StructureParallelExecutionParameters):
+        super().__init__(parallel_execution_params)
+        if isinstance(patterns, list):
+            if len(patterns) != 1:
+                raise Exception("Structure parallelism is only supported for a single pattern")
+            patterns = patterns[0]
+        if eval_mechanism_params is None:
+            eval_mechanism_params = TreeBasedEvaluationMechanismParameters()
+        StructureParallelEvaluationManager.__validate_parameters(patterns, eval_mechanism_params)
+        optimizer = OptimizerFactory.build_optimizer(eval_mechanism_params.optimizer_params)
+        tree_plan = optimizer.build_initial_plan(
+            patterns, eval_mechanism_params.optimizer_params.tree_plan_params.cost_model_type)
+        self.__tree = Tree(tree_plan, patterns, eval_mechanism_params.storage_params)
+        self.__stages = split_tree(self.__tree, parallel_execution_params.units_number)
+        self.__batch_size = parallel_execution_params.batch_size
+        self.__pattern_matches = None
+
+    @staticmethod
+    def __validate_parameters(pattern: Pattern, eval_mechanism_params: EvaluationMechanismParameters):
+        """
+        Verifies that the pattern can be evaluated using the given parameters in the structure-parallel mode.
+        """
+        if not isinstance(eval_mechanism_params, TreeBasedEvaluationMechanismParameters):
+            raise Exception("Structure parallelism is only supported by the tree-based evaluation mechanism")
+        if OptimizerFactory.build_optimizer(eval_mechanism_params.optimizer_params).is_adaptivity_enabled():
+            raise Exception("Adaptivity is not supported in the structure-parallel mode")
+        if pattern.consumption_policy is not None:
+            raise Exception("Consumption policies are not supported in the structure-parallel mode")
+        storage_params = eval_mechanism_params.storage_params
+        if storage_params.use_load_shedding or storage_params.memory_budget is not None or \
+                storage_params.profile_nodes:
+            raise Exception("Load shedding, memory budgets and profiling are not supported in the structure-parallel "
+                            "mode")
+
+    def eval(self, events: InputStream, matches: OutputStream, data_formatter: DataFormatter):
+        self.__pattern_matches = matches
+        execution_units = []
+        for stage in self.__stages:
+            execution_unit = self._platform.create_parallel_execution_unit(stage.stage_id, stage.run, matches)
+            execution_unit.start()
+            execution_units.append(execution_unit)
+
+        # the events are parsed once and passed to all stages in batches
+        event_types = self.__stages[0].get_event_types()
+        batch = []
+        for raw_event in events:
+            event = Event(raw_event, data_formatter, event_types)
+            if event.type not in event_types:
+                continue
+            batch.append(event)
+            if len(batch) == self.__batch_size:
+                self.__add_events(batch)
+                batch = []
+        if len(batch) > 0:
+            self.__add_events(batch)
+
+        for stage in self.__stages:
+            stage.close()
+        for execution_unit in execution_units:
+            execution_unit.wait()
+        # the error of the deepest failed stage is the original one
+        for stage in reversed(self.__stages):
+            if stage.error is not None:
+                raise stage.error
+        matches.close()
+
+    def __add_events(self, events: List[Event]):
+        for stage in self.__stages:
+            stage.add_events(events)
+
+    def get_stages_number(self):
+        """
+        Returns the number of stages the evaluation tree was split into.
+        """
+        return len(self.__stages)
+
+    def get_pattern_match_stream(self):
+        return self.__pattern_matches
+
+    def get_structure_summary(self):
+        return self.__tree.get_structure_summary()
+
+    def get_profile_report(self):
+        raise Exception("Profiling is not supported in the structure-parallel mode")
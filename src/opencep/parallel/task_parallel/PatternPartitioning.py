@@ -0,0 +1,102 @@
+"""
+This file contains the procedure partitioning a set of patterns between the execution units of the task-parallel mode,
+such that the patterns sharing subtrees are evaluated by the same unit.
+"""
+from typing import Dict, List
+
+from opencep.adaptive.optimizer.OptimizerFactory import OptimizerFactory
+from opencep.base.Pattern import Pattern
+from opencep.evaluation.EvaluationMechanismFactory import EvaluationMechanismParameters, \
+    TreeBasedEvaluationMechanismParameters
+from opencep.plan.TreePlan import TreePlan, TreePlanNode, TreePlanLeafNode, TreePlanNestedNode, TreePlanUnaryNode, \
+    TreePlanBinaryNode
+from opencep.plan.multi.SubTreeSharingTreePlanMerger import SubTreeSharingTreePlanMerger
+
+
+def partition_patterns(patterns: List[Pattern], eval_mechanism_params: EvaluationMechanismParameters,
+                       units_number: int):
+    """
+    Divides the given patterns into at most the given number of groups, each to be evaluated by a separate unit.
+    The patterns are first divided into sharing clusters (see find_sharing_clusters), and the clusters are then assigned
+    to the groups one by one, the largest cluster first, each to the currently smallest group. The size of a cluster is
+    the number of distinct nodes in the merged tree plans of its patterns.
+    The patterns of each group are returned in their original order.
+    """
+    clusters = find_sharing_clusters(patterns, eval_mechanism_params)
+    groups = [([], 0) for _ in range(min(units_number, len(clusters)))]
+    for cluster, cluster_size in sorted(clusters, key=lambda item: -item[1]):
+        smallest_group_index = min(range(len(groups)), key=lambda i: groups[i][1])
+        group_patterns, group_size = groups[smallest_group_index]
+        groups[smallest_group_index] = (group_patterns + cluster, group_size + cluster_size)
+    positions = {id(pattern): position for position, pattern in enumerate(patterns)}
+    return [sorted(group_patterns, key=lambda pattern: positions[id(pattern)]) for group_patterns, _ in groups]
+
+
+def find_sharing_clusters(patterns: List[Pattern], eval_mechanism_params: EvaluationMechanismParameters):
+    """
+    Returns the clusters of the given patterns sharing subtrees, along with the sizes of the clusters.
+    The tree plans of the patterns are merged by SubTreeSharingTreePlanMerger, and two patterns belong to the same
+    cluster if their merged plans share an internal node, either directly or through other patterns. Shared leaves do
+    not join the clusters, as a leaf is cheap to duplicate in several units.
+    If the patterns are not evaluated by a tree-based mechanism, each pattern forms a cluster of its own.
+    """
+    if not isinstance(eval_mechanism_params, TreeBasedEvaluationMechanismParameters):
+        return [([pattern], 1) for pattern in patterns]
+    optimizer = OptimizerFactory.build_optimizer(eval_mechanism_params.optimizer_params)
+    cost_model_type = eval_mechanism_params.optimizer_params.tree_plan_params.cost_model_type
+    pattern_to_tree_plan_map = {pattern: optimizer.build_initial_plan(pattern, cost_model_type)
+                                for pattern in patterns}
+    merged_pattern_to_tree_plan_map = SubTreeSharingTreePlanMerger().merge_tree_plans(pattern_to_tree_plan_map)
+    return _get_connected_patterns(merged_pattern_to_tree_plan_map)
+
+
+def _get_connected_patterns(pattern_to_tree_plan_map: Dict[Pattern, TreePlan]):
+    """
+    Groups the patterns whose tree plans share internal nodes using a union-find structure over the patterns.
+    """
+    patterns = list(pattern_to_tree_plan_map)
+    parents = list(range(len(patterns)))
+
+    def find(index: int):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    node_to_pattern_index = {}
+    pattern_nodes = []
+    for index, pattern in enumerate(patterns):
+        nodes = _get_plan_nodes(pattern_to_tree_plan_map[pattern].root)
+        pattern_nodes.append(nodes)
+        for node in nodes:
+            if isinstance(node, TreePlanLeafNode):
+                continue
+            if id(node) not in node_to_pattern_index:
+                node_to_pattern_index[id(node)] = index
+                continue
+            parents[find(index)] = find(node_to_pattern_index[id(node)])
+
+    clusters = {}
+    for index, pattern in enumerate(patterns):
+        cluster_patterns, cluster_nodes = clusters.setdefault(find(index), ([], {}))
+        cluster_patterns.append(pattern)
+        cluster_nodes.update((id(node), node) for node in pattern_nodes[index])
+    return [(cluster_patterns, len(cluster_nodes)) for cluster_patterns, cluster_nodes in clusters.values()]
+
+
+def _get_plan_nodes(root: TreePlanNode):
+    """
+    Returns all nodes of the tree plan rooted at the given node.
+    """
+    nodes = []
+    nodes_to_visit = [root]
+    while len(nodes_to_visit) > 0:
+        node = nodes_to_visit.pop()
+        nodes.append(node)
+        if isinstance(node, TreePlanNestedNode):
+            nodes_to_visit.append(node.sub_tree_plan)
+        elif isinstance(node, TreePlanUnaryNode):
+            nodes_to_visit.append(node.child)
+        elif isinstance(node, TreePlanBinaryNode):
+            nodes_to_visit.extend([node.left_child, node.right_child])
+    return nodes
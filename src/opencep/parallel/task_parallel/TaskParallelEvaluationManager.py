@@ -0,0 +1,149 @@
+"""
+This file contains the evaluation manager implementing the task-parallel paradigm, partitioning the patterns between
+the execution units.
+"""
+from typing import List
+
+from opencep.adaptive.optimizer.OptimizerFactory import OptimizerFactory
+from opencep.base.DataFormatter import DataFormatter
+from opencep.base.Pattern import Pattern
+from opencep.base.PatternMatch import PatternMatch
+from opencep.evaluation.EvaluationMechanismFactory import EvaluationMechanismParameters, \
+    TreeBasedEvaluationMechanismParameters
+from opencep.parallel.ParallelExecutionParameters import TaskParallelExecutionParameters
+from opencep.parallel.manager.EvaluationManager import EvaluationManager
+from opencep.parallel.manager.ParallelEvaluationManager import ParallelEvaluationManager
+from opencep.parallel.manager.SequentialEvaluationManager import SequentialEvaluationManager
+from opencep.parallel.platform.ParallelExecutionPlatform import Lock
+from opencep.parallel.task_parallel.PatternPartitioning import partition_patterns
+from opencep.stream.Stream import Stream, InputStream, OutputStream
+from opencep.tree.MultiPatternTree import MultiPatternTree
+
+
+class TaskParallelEvaluationManager(ParallelEvaluationManager):
+    """
+    A parallel evaluation manager employing the task-parallel paradigm. The patterns are partitioned between the units
+    (see PatternPartitioning.py) such that the patterns sharing subtrees are evaluated together, and each unit only
+    receives the events of the types its patterns refer to.
+    The pattern IDs of the matches are the same as in sequential evaluation of all patterns.
+    As each unit evaluates its patterns separately, consumption policies, adaptivity and memory budgets are not
+    supported, and load shedding is applied by each unit separately.
+    """
+    def __init__(self, patterns: Pattern or List[Pattern],
+                 eval_mechanism_params: EvaluationMechanismParameters,
+                 parallel_execution_params: TaskParallelExecutionParameters):
+        super().__init__(parallel_execution_params)
+        if isinstance(patterns, Pattern):
+            patterns = [patterns]
+        if eval_mechanism_params is None:
+            eval_mechanism_params = TreeBasedEvaluationMechanismParameters()
+        # equal patterns are evaluated once, exactly as in sequential evaluation
+        patterns = list(dict.fromkeys(patterns))
+        TaskParallelEvaluationManager.__validate_parameters(patterns, eval_mechanism_params)
+        self.__units_patterns = partition_patterns(patterns, eval_mechanism_params,
+                                                   parallel_execution_params.units_number)
+        pattern_ids = {id(pattern): pattern_id for pattern_id, pattern in enumerate(patterns, 1)}
+        # the ID of a pattern within the unit evaluating it is its position in the patterns of the unit
+        self.__units_pattern_ids = [[pattern_ids[id(pattern)] for pattern in unit_patterns] if len(patterns) > 1
+                                    else None for unit_patterns in self.__units_patterns]
+        self.__units_event_types = [set().union(*(pattern.get_all_event_types() for pattern in unit_patterns))
+                                    for unit_patterns in self.__units_patterns]
+        self.__evaluation_managers = [SequentialEvaluationManager(unit_patterns, eval_mechanism_params)
+                                      for unit_patterns in self.__units_patterns]
+        self.__match_lock = self._platform.create_lock()
+        self.__pattern_matches = None
+
+    @staticmethod
+    def __validate_parameters(patterns: List[Pattern], eval_mechanism_params: EvaluationMechanismParameters):
+        """
+        Verifies that the patterns can be evaluated using the given parameters in the task-parallel mode.
+        """
+        if any(pattern.consumption_policy is not None for pattern in patterns):
+            raise Exception("Consumption policies are not supported in the task-parallel mode")
+        if not isinstance(eval_mechanism_params, TreeBasedEvaluationMechanismParameters):
+            return
+        if OptimizerFactory.build_optimizer(eval_mechanism_params.optimizer_params).is_adaptivity_enabled():
+            raise Exception("Adaptivity is not supported in the task-parallel mode")
+        if eval_mechanism_params.storage_params.memory_budget is not None:
+            raise Exception("Memory budgets are not supported in the task-parallel mode")
+
+    def eval(self, events: InputStream, matches: OutputStream, data_formatter: DataFormatter):
+        self.__pattern_matches = matches
+        execution_units = []
+        units_events = []
+        for unit_id, evaluation_manager in enumerate(self.__evaluation_managers):
+            unit_events = Stream()
+            unit_matches = self.PatternIdsMappingStream(self.__units_patterns[unit_id],
+                                                        self.__units_pattern_ids[unit_id], matches, self.__match_lock)
+            execution_unit = self._platform.create_parallel_execution_unit(
+                unit_id, TaskParallelEvaluationManager.__run_unit, evaluation_manager, unit_events, unit_matches,
+                data_formatter)
+            execution_unit.start()
+            execution_units.append(execution_unit)
+            units_events.append(unit_events)
+
+        # the units receiving the events of each type are only computed once
+        event_type_to_units = {}
+        for raw_event in events:
+            event_type = data_formatter.get_event_type(data_formatter.parse_event(raw_event))
+            units = event_type_to_units.get(event_type)
+            if units is None:
+                units = [unit_events for unit_events, event_types in zip(units_events, self.__units_event_types)
+                         if event_type in event_types]
+                event_type_to_units[event_type] = units
+            for unit_events in units:
+                unit_events.add_item(raw_event)
+
+        for unit_events in units_events:
+            unit_events.close()
+        for execution_unit in execution_units:
+            execution_unit.wait()
+        matches.close()
+
+    @staticmethod
+    def __run_unit(evaluation_manager: EvaluationManager, events: InputStream, matches: OutputStream,
+                   data_formatter: DataFormatter):
+        evaluation_manager.eval(events, matches, data_formatter)
+
+    def get_units_patterns(self):
+        """
+        Returns the patterns evaluated by each unit.
+        """
+        return self.__units_patterns
+
+    def get_pattern_match_stream(self):
+        return self.__pattern_matches
+
+    def get_structure_summary(self):
+        return tuple(evaluation_manager.get_structure_summary() for evaluation_manager in self.__evaluation_managers)
+
+    def get_profile_report(self):
+        return "\n\n".join("Unit %d:\n%s" % (unit_id, evaluation_manager.get_profile_report())
+                            for unit_id, evaluation_manager in enumerate(self.__evaluation_managers))
+
+    class PatternIdsMappingStream(Stream):
+        """
+        Passes the matches of a single unit to the global output stream, replacing the IDs of the patterns within the
+        unit with their IDs among all patterns.
+        """
+        def __init__(self, patterns: List[Pattern], pattern_ids: List[int], matches: OutputStream, lock: Lock):
+            super().__init__()
+            self.patterns = patterns
+            self.pattern_ids = pattern_ids
+            self.matches = matches
+            self.lock = lock
+
+        def add_item(self, item: PatternMatch):
+            if self.pattern_ids is not None:
+                if len(self.pattern_ids) == 1:
+                    # a single pattern is evaluated without pattern IDs, hence they are attached as by MultiPatternTree
+                    if MultiPatternTree.should_attach_match_to_pattern(item, self.patterns[0]):
+                        item.pattern_ids = (self.pattern_ids[0],)
+                else:
+                    item.pattern_ids = tuple(self.pattern_ids[pattern_id - 1] for pattern_id in item.pattern_ids)
+            self.lock.acquire()
+            self.matches.add_item(item)
+            self.lock.release()
+
+        def close(self):
+            pass
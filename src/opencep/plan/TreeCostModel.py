@@ -1,5 +1,5 @@
 from abc import ABC
-from typing import List, Set
+from typing import Dict, List, Set
 
 from opencep.base.Pattern import Pattern
 from opencep.misc.LegacyStatistics import MissingStatisticsException
@@ -28,6 +28,26 @@ class IntermediateResultsTreeCostModel(TreeCostModel):
     def get_plan_cost(self, pattern: Pattern, plan: TreePlanNode, statistics: dict, visited: Set[TreePlanNode] = None):
         if visited is None:
             visited = set()
+        _, _, cost = IntermediateResultsTreeCostModel.__get_plan_cost_with_statistics(pattern, plan, statistics,
+                                                                                      visited)
+        return cost
+
+    def get_intermediate_results_sizes(self, pattern: Pattern, plan: TreePlanNode, statistics: dict):
+        """
+        Returns a dictionary mapping each node of the given plan to the expected number of partial matches it holds
+        within a single time window, as estimated by this cost model.
+        """
+        sizes = {}
+        IntermediateResultsTreeCostModel.__get_plan_cost_with_statistics(pattern, plan, statistics, set(), sizes)
+        return sizes
+
+    @staticmethod
+    def __get_plan_cost_with_statistics(pattern: Pattern, plan: TreePlanNode, statistics: dict,
+                                        visited: Set[TreePlanNode], sizes: Dict[TreePlanNode, float] = None):
+        """
+        Extracts the arrival rates and the selectivity matrix from the given statistics and calculates the cost of the
+        given plan.
+        """
         if StatisticsTypes.ARRIVAL_RATES not in statistics:
             raise MissingStatisticsException()
         arrival_rates = statistics[StatisticsTypes.ARRIVAL_RATES]
@@ -35,20 +55,20 @@ class IntermediateResultsTreeCostModel(TreeCostModel):
             selectivity_matrix = statistics[StatisticsTypes.SELECTIVITY_MATRIX]
         else:
             selectivity_matrix = [[1.0 for x in range(len(arrival_rates))] for y in range(len(arrival_rates))]
-        _, _, cost = IntermediateResultsTreeCostModel.__get_plan_cost_aux(plan, selectivity_matrix,
-                                                                          arrival_rates, pattern.window.total_seconds(),
-                                                                          visited)
-        return cost
+        return IntermediateResultsTreeCostModel.__get_plan_cost_aux(plan, selectivity_matrix, arrival_rates,
+                                                                    pattern.window.total_seconds(), visited, sizes)
 
     @staticmethod
     def __get_plan_cost_aux(tree: TreePlanNode, selectivity_matrix: List[List[float]],
-                            arrival_rates: List[int], time_window: float, visited: Set[TreePlanNode]):
+                            arrival_rates: List[int], time_window: float, visited: Set[TreePlanNode],
+                            sizes: Dict[TreePlanNode, float] = None):
         """
         A helper function for calculating the cost function of the given tree.
         Returns a tuple of three values as follows:
         - the list of all event indices in the subtree rooted by the given node;
         - the number of partial matches at the given node;
         - the total cost including subtrees.
+        If a dictionary of sizes is given, the number of partial matches at each node is stored in it.
         """
         if tree in visited:
             return [], 0, 0
@@ -57,6 +77,8 @@ class IntermediateResultsTreeCostModel(TreeCostModel):
         if isinstance(tree, TreePlanLeafNode):
             cost = pm = time_window * arrival_rates[tree.event_index] * \
                         selectivity_matrix[tree.event_index][tree.event_index]
+            if sizes is not None:
+                sizes[tree] = pm
             return [tree.event_index], pm, cost
 
         if isinstance(tree, TreePlanNestedNode):
@@ -66,10 +88,13 @@ class IntermediateResultsTreeCostModel(TreeCostModel):
             return [tree.nested_event_index], tree.cost, tree.cost
 
         if isinstance(tree, TreePlanUnaryNode):
-            return IntermediateResultsTreeCostModel.__get_plan_cost_aux(tree.child,
-                                                                        selectivity_matrix,
-                                                                        arrival_rates,
-                                                                        time_window, visited)
+            args, pm, cost = IntermediateResultsTreeCostModel.__get_plan_cost_aux(tree.child,
+                                                                                  selectivity_matrix,
+                                                                                  arrival_rates,
+                                                                                  time_window, visited, sizes)
+            if sizes is not None:
+                sizes[tree] = pm
+            return args, pm, cost
         if not isinstance(tree, TreePlanBinaryNode):
             raise Exception("Invalid tree node: %s" % (tree,))
 
@@ -77,12 +102,14 @@ class IntermediateResultsTreeCostModel(TreeCostModel):
         left_args, left_pm, left_cost = IntermediateResultsTreeCostModel.__get_plan_cost_aux(tree.left_child,
                                                                                              selectivity_matrix,
                                                                                              arrival_rates,
-                                                                                             time_window, visited)
+                                                                                             time_window, visited,
+                                                                                             sizes)
         # calculate for right subtree
         right_args, right_pm, right_cost = IntermediateResultsTreeCostModel.__get_plan_cost_aux(tree.right_child,
                                                                                                 selectivity_matrix,
                                                                                                 arrival_rates,
-                                                                                                time_window, visited)
+                                                                                                time_window, visited,
+                                                                                                sizes)
         # calculate from left and right subtrees for this subtree.
         cumulative_selectivity = 1.0
         for left_arg in left_args:
@@ -93,6 +120,8 @@ class IntermediateResultsTreeCostModel(TreeCostModel):
         else:
             pm = left_pm * right_pm * cumulative_selectivity
         cost = left_cost + right_cost + pm
+        if sizes is not None:
+            sizes[tree] = pm
 
         return left_args + right_args, pm, cost
 
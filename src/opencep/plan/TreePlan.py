@@ -54,6 +54,25 @@ class TreePlanNode(ABC):
         """
         return type(self) == type(other) and self.condition == other.condition
 
+    def get_structural_hash(self):
+        """
+        Returns a hash of the structure of the subtree of this node, such that any two equivalent nodes (see
+        is_equivalent) have equal hashes. This default implementation only hashes the type and the condition of the
+        node, the remaining fields being hashed by the subclasses.
+        """
+        return hash((type(self).__name__, self._get_condition_fingerprint()))
+
+    def _get_condition_fingerprint(self):
+        """
+        Returns a normalized representation of the condition of this node that is equal for equal conditions.
+        Composite conditions are compared regardless of the order of their subconditions, and atomic conditions of
+        opposite relations may be equal (e.g., a < b and b > a), hence composite conditions are represented by their
+        type and the number of their subconditions, and all atomic conditions share the same representation.
+        """
+        if isinstance(self.condition, CompositeCondition):
+            return type(self.condition).__name__, self.condition.get_num_conditions()
+        return "atomic"
+
     def get_leaves(self):
         """
         Returns all leaves in this tree - to be implemented by subclasses.
@@ -93,6 +112,9 @@ class TreePlanLeafNode(TreePlanNode):
         return super().is_equivalent(other) and \
                self.event_type == other.event_type and self.event_name == other.event_name
 
+    def get_structural_hash(self):
+        return hash((super().get_structural_hash(), self.event_type, self.event_name))
+
 
 class TreePlanNestedNode(TreePlanNode):
     """
@@ -128,6 +150,9 @@ class TreePlanNestedNode(TreePlanNode):
         """
         return super().is_equivalent(other) and self.sub_tree_plan.is_equivalent(other.sub_tree_plan)
 
+    def get_structural_hash(self):
+        return hash((super().get_structural_hash(), self.sub_tree_plan.get_structural_hash()))
+
 
 class TreePlanInternalNode(TreePlanNode, ABC):
     """
@@ -143,6 +168,9 @@ class TreePlanInternalNode(TreePlanNode, ABC):
         """
         return super().is_equivalent(other) and self.operator == other.operator
 
+    def get_structural_hash(self):
+        return hash((super().get_structural_hash(), self.operator))
+
 
 class TreePlanUnaryNode(TreePlanInternalNode):
     """
@@ -166,6 +194,9 @@ class TreePlanUnaryNode(TreePlanInternalNode):
         """
         return super().is_equivalent(other) and self.child.is_equivalent(other.child)
 
+    def get_structural_hash(self):
+        return hash((super().get_structural_hash(), self.child.get_structural_hash()))
+
 
 class TreePlanKCNode(TreePlanUnaryNode):
     """
@@ -193,6 +224,9 @@ class TreePlanKCNode(TreePlanUnaryNode):
             return False
         return self.min_size == other.min_size and self.max_size == other.max_size
 
+    def get_structural_hash(self):
+        return hash((super().get_structural_hash(), self.min_size, self.max_size))
+
 
 class TreePlanBinaryNode(TreePlanInternalNode):
     """
@@ -228,6 +262,14 @@ class TreePlanBinaryNode(TreePlanInternalNode):
         v4 = self.right_child.is_equivalent(other.left_child)
         return v3 and v4
 
+    def get_structural_hash(self):
+        """
+        The hashes of the children are combined regardless of their order, as the subtrees of equivalent nodes may be
+        swapped.
+        """
+        children_hashes = sorted([self.left_child.get_structural_hash(), self.right_child.get_structural_hash()])
+        return hash((super().get_structural_hash(), *children_hashes))
+
 
 class TreePlanNegativeBinaryNode(TreePlanBinaryNode):
     """
@@ -249,6 +291,14 @@ class TreePlanNegativeBinaryNode(TreePlanBinaryNode):
         v2 = self.right_child.is_equivalent(other.right_child)
         return v1 and v2
 
+    def get_structural_hash(self):
+        """
+        As opposed to other binary nodes, the operators of the nodes are not compared and the subtrees are never
+        swapped.
+        """
+        return hash((TreePlanNode.get_structural_hash(self), self.left_child.get_structural_hash(),
+                     self.right_child.get_structural_hash()))
+
 
 class TreePlan:
     """
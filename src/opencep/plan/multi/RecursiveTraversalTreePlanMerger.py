@@ -1,5 +1,5 @@
 from abc import ABC
-from typing import Dict, Set
+from typing import Dict, List
 
 from opencep.base.Pattern import Pattern
 from opencep.plan.TreePlan import TreePlan, TreePlanNode, TreePlanLeafNode, TreePlanNestedNode, TreePlanUnaryNode, \
@@ -10,9 +10,11 @@ from opencep.plan.multi.TreePlanMerger import TreePlanMerger
 class RecursiveTraversalTreePlanMerger(TreePlanMerger, ABC):
     """
     An abstract class for tree plan mergers functioning by recursively traversing the provided tree plans.
+    The previously traversed nodes are kept in a hash map by their structural hashes (see
+    TreePlanNode.get_structural_hash), such that a node is only compared to the nodes with the same hash.
     """
     def merge_tree_plans(self, pattern_to_tree_plan_map: Dict[Pattern, TreePlan]):
-        known_unique_tree_plan_nodes = set()
+        known_unique_tree_plan_nodes = {}
         merged_pattern_to_tree_plan_map = {}
         for pattern, tree_plan in pattern_to_tree_plan_map.items():
             merged_pattern_to_tree_plan_map[pattern] = TreePlan(self.__traverse_tree_plan(tree_plan.root,
@@ -20,14 +22,16 @@ class RecursiveTraversalTreePlanMerger(TreePlanMerger, ABC):
                                                                 tree_plan.original_pattern, tree_plan.modified_pattern)
         return merged_pattern_to_tree_plan_map
 
-    def __traverse_tree_plan(self, current: TreePlanNode, known_unique_tree_plan_nodes: Set[TreePlanNode]):
+    def __traverse_tree_plan(self, current: TreePlanNode,
+                             known_unique_tree_plan_nodes: Dict[int, List[TreePlanNode]]):
         """
         Recursively traverses a tree plan and attempts to merge it with previously traversed subtrees. 
         """
-        equivalent_node = self.__find_node_to_share(current, known_unique_tree_plan_nodes)
+        candidate_nodes = known_unique_tree_plan_nodes.setdefault(current.get_structural_hash(), [])
+        equivalent_node = self.__find_node_to_share(current, candidate_nodes)
         if equivalent_node is not None:
             return equivalent_node
-        known_unique_tree_plan_nodes.add(current)
+        candidate_nodes.append(current)
         if isinstance(current, TreePlanLeafNode):
             return current
         if isinstance(current, TreePlanNestedNode):
@@ -42,12 +46,12 @@ class RecursiveTraversalTreePlanMerger(TreePlanMerger, ABC):
             return current
         raise Exception("Unexpected node type: %s" % (type(current),))
 
-    def __find_node_to_share(self, node: TreePlanNode, known_unique_tree_plan_nodes: Set[TreePlanNode]):
+    def __find_node_to_share(self, node: TreePlanNode, candidate_nodes: List[TreePlanNode]):
         """
         Attempts to find a node in the given collection of potentially shared nodes with which the given unshared
         node can be replaced.
         """
-        for candidate_node in known_unique_tree_plan_nodes:
+        for candidate_node in candidate_nodes:
             if self._are_suitable_for_share(candidate_node, node):
                 return candidate_node
         return None
@@ -55,6 +59,7 @@ class RecursiveTraversalTreePlanMerger(TreePlanMerger, ABC):
     def _are_suitable_for_share(self, first_node: TreePlanNode, second_node: TreePlanNode):
         """
         Returns True if the two given nodes can be represented by a single, shared node in the global plan, and False
-        otherwise.
+        otherwise. Only equivalent nodes may be shared, as the nodes are only compared to the nodes with equal
+        structural hashes.
         """
         raise NotImplementedError()
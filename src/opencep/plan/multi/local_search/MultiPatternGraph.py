@@ -29,22 +29,52 @@ class MultiPatternGraph:
         Implements the Multi Pattern Graph for the local search algorithm.
         Creates a mapping between distinct maximal sub-patterns and the sets of patterns containing them.
         Also, for each pattern save its max common sub patterns in a dict.
+        Only the pairs of patterns sharing a primitive event (that is, an event of the same type and name) may have a
+        common sub pattern, hence the candidate pairs are found using an inverted index from the primitive events to
+        the patterns containing them. The pairs are examined in the same order as all pairs would be.
         """
         max_sub_pattern_to_patterns = dict()
         pattern_to_max_sub_patters = dict()
-        # Iterate over all pairs of patterns and calculate max common sub patterns
-        for pattern_a, pattern_b in combinations(self.__patterns_list, 2):
-            maximal_sub_patterns = self.__get_maximal_common_sub_patterns(pattern_a, pattern_b)
+        for pattern in self.__patterns_list:
+            pattern_to_max_sub_patters.setdefault(pattern, set())
+        # the projections of each pattern on the sets of event names, shared by all pairs it belongs to
+        projections_cache = dict()
+        for index_a, index_b in self.__get_candidate_pairs():
+            pattern_a, pattern_b = self.__patterns_list[index_a], self.__patterns_list[index_b]
+            maximal_sub_patterns = self.__get_maximal_common_sub_patterns(index_a, index_b, projections_cache)
             # Add the mapping max sub pattern -> [pattern_a, pattern_b]
             [max_sub_pattern_to_patterns.setdefault(maximal_sub_pattern, set()).update([pattern_a, pattern_b])
              for maximal_sub_pattern in maximal_sub_patterns]
             # Add the mapping pattern -> max sub patterns for pattern_a and pattern_b
-            [pattern_to_max_sub_patters.setdefault(pattern, set()).update(maximal_sub_patterns)
-             for pattern in [pattern_a, pattern_b]]
+            [pattern_to_max_sub_patters[pattern].update(maximal_sub_patterns) for pattern in [pattern_a, pattern_b]]
 
         self.__maximal_sub_pattern_to_patterns = max_sub_pattern_to_patterns
         self.__pattern_to_maximal_common_sub_patterns = pattern_to_max_sub_patters
 
+    def __get_candidate_pairs(self):
+        """
+        Returns the sorted pairs of indices of the patterns sharing at least one primitive event. Patterns containing
+        negative structures are never shared and thus excluded.
+        """
+        primitive_event_to_patterns = dict()
+        for index, pattern in enumerate(self.__patterns_list):
+            if self.__has_negative_structure(pattern):
+                continue
+            for primitive_event in pattern.get_primitive_events():
+                patterns_indices = primitive_event_to_patterns.setdefault((primitive_event.type, primitive_event.name),
+                                                                          [])
+                # a pattern may contain several events of the same type and name
+                if len(patterns_indices) == 0 or patterns_indices[-1] != index:
+                    patterns_indices.append(index)
+        candidate_pairs = set()
+        for patterns_indices in primitive_event_to_patterns.values():
+            candidate_pairs.update(combinations(patterns_indices, 2))
+        return sorted(candidate_pairs)
+
+    @staticmethod
+    def __has_negative_structure(pattern: Pattern):
+        return pattern.negative_structure is not None or isinstance(pattern.full_structure, NegationOperator)
+
     def get_random_max_pattern_and_peers(self, neighborhood: int):
         """
         Choose randomly a pattern, and then choose a random max sub pattern of it in the graph.
@@ -60,24 +90,24 @@ class MultiPatternGraph:
         chosen_patterns = random.sample(list(containing_patterns), min(neighborhood, len(containing_patterns)))
         return random_max_sub_pattern, chosen_patterns
 
-    def __get_maximal_common_sub_patterns(self, pattern_a: Pattern, pattern_b: Pattern) -> List[Pattern]:
+    def __get_maximal_common_sub_patterns(self, index_a: int, index_b: int, projections_cache: dict) -> List[Pattern]:
         """
-        Return the maximal common subpattern between pattern_a and pattern_b.
+        Return the maximal common subpattern between the patterns at the given indices.
         """
+        pattern_a, pattern_b = self.__patterns_list[index_a], self.__patterns_list[index_b]
         # Avoid sharing negative structures
         for pattern in [pattern_a, pattern_b]:
-            if pattern.negative_structure is not None or isinstance(pattern.full_structure, NegationOperator):
+            if self.__has_negative_structure(pattern):
                 return []
 
         if pattern_a == pattern_b:
             return [deepcopy(pattern_a)]
 
-        events_intersection = set(pattern_a.get_primitive_event_names()) & set(pattern_b.get_primitive_event_names())
+        events_intersection = frozenset(pattern_a.get_primitive_event_names()) & \
+            frozenset(pattern_b.get_primitive_event_names())
 
-        conditions_a = pattern_a.condition.get_condition_projection(events_intersection)
-        conditions_b = pattern_b.condition.get_condition_projection(events_intersection)
-
-        cond_intersection = conditions_a
+        conditions_a = self.__get_condition_projection(index_a, events_intersection, projections_cache)
+        conditions_b = self.__get_condition_projection(index_b, events_intersection, projections_cache)
 
         if conditions_a is None or conditions_b is None:
             return []
@@ -86,16 +116,20 @@ class MultiPatternGraph:
             cond_intersection = conditions_a.get_conditions_intersection(conditions_b)
             if cond_intersection is None:
                 return []
-            events_intersection = cond_intersection.get_event_names()
+            events_intersection = frozenset(cond_intersection.get_event_names())
+        else:
+            # the cached projection is shared by other pairs, hence the new pattern receives a copy of it
+            cond_intersection = conditions_a.get_condition_projection(events_intersection)
 
         # Reducing Structure a and Structure b according to the events intersection
-        structure_a = pattern_a.full_structure.get_structure_projection(events_intersection)
-        structure_b = pattern_b.full_structure.get_structure_projection(events_intersection)
+        structure_a = self.__get_structure_projection(index_a, events_intersection, projections_cache)
+        structure_b = self.__get_structure_projection(index_b, events_intersection, projections_cache)
 
         if structure_a != structure_b or (None in [structure_a, structure_b]):
             # TODO: Current limitation - The algorithm does not create intersection between the patterns structures
             #  (it only checks for equality, otherwise returns that there is no common subpattern)
             return []
+        structure_a = structure_a.duplicate()
 
         window = min(pattern_a.window, pattern_b.window)
         if pattern_a.confidence is None or pattern_b.confidence is None:
@@ -110,3 +144,21 @@ class MultiPatternGraph:
         max_pattern_statistics = pattern_a.create_modified_statistics(pattern_a.statistics, maximal)
         maximal.set_statistics(max_pattern_statistics)
         return [maximal]
+
+    def __get_condition_projection(self, index: int, event_names: frozenset, projections_cache: dict):
+        """
+        Returns the projection of the condition of the pattern at the given index on the given event names.
+        """
+        key = (index, event_names, True)
+        if key not in projections_cache:
+            projections_cache[key] = self.__patterns_list[index].condition.get_condition_projection(event_names)
+        return projections_cache[key]
+
+    def __get_structure_projection(self, index: int, event_names: frozenset, projections_cache: dict):
+        """
+        Returns the projection of the structure of the pattern at the given index on the given event names.
+        """
+        key = (index, event_names, False)
+        if key not in projections_cache:
+            projections_cache[key] = self.__patterns_list[index].full_structure.get_structure_projection(event_names)
+        return projections_cache[key]
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class CsvPayloadTypes(Enum):
+    """
+    The types of the payloads created by the schema-based CSV data formatter.
+    """
+    DICT = 0
+    RECORD = 1
@@ -0,0 +1,201 @@
+"""
+This file contains a generic data formatter for event streams given as CSV lines with a fixed, declared schema.
+As opposed to the bespoke formatters converting every field with str_to_number, which tries int() and float() and
+catches the resulting exceptions, each column here is converted by the converter declared for it (e.g., int, float or
+str). Chunks of lines can be parsed at once using parse_events, which converts the chunk column by column.
+"""
+import csv
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterable, List, Optional
+
+from opencep.base.DataFormatter import DataFormatter, EventTypeClassifier
+from opencep.misc import DefaultConfig
+from opencep.misc.TimestampParsers import TimestampParser
+from opencep.plugin.csv.CsvPayloadTypes import CsvPayloadTypes
+
+
+class CsvRecord(MutableMapping):
+    """
+    A lightweight tuple-backed event payload. The values of the schema columns are kept in a tuple and the mapping
+    from the column names to their positions is shared by all records created by a formatter. Attributes not included
+    in the schema (e.g., the event index assigned by the engine) are kept in a separate dictionary created on demand.
+    Trailing columns missing from the parsed line are absent from the record.
+    """
+    __slots__ = ("_column_indices", "_values", "_extra_attributes")
+
+    def __init__(self, column_indices: Dict[str, int], values: tuple):
+        self._column_indices = column_indices
+        self._values = values
+        self._extra_attributes = None
+
+    def __getitem__(self, key):
+        index = self._column_indices.get(key)
+        if index is not None and index < len(self._values):
+            return self._values[index]
+        if self._extra_attributes is None:
+            raise KeyError(key)
+        return self._extra_attributes[key]
+
+    def get(self, key, default=None):
+        index = self._column_indices.get(key)
+        if index is not None and index < len(self._values):
+            return self._values[index]
+        if self._extra_attributes is None:
+            return default
+        return self._extra_attributes.get(key, default)
+
+    def __setitem__(self, key, value):
+        index = self._column_indices.get(key)
+        if index is not None and index < len(self._values):
+            self._values = self._values[:index] + (value,) + self._values[index + 1:]
+            return
+        if index is not None:
+            raise Exception("Cannot set the value of a column missing from the parsed line: %s" % (key,))
+        if self._extra_attributes is None:
+            self._extra_attributes = {}
+        self._extra_attributes[key] = value
+
+    def __delitem__(self, key):
+        if key in self._column_indices:
+            raise Exception("Cannot remove a schema column from a CSV record: %s" % (key,))
+        if self._extra_attributes is None:
+            raise KeyError(key)
+        del self._extra_attributes[key]
+
+    def __iter__(self):
+        yield from list(self._column_indices)[:len(self._values)]
+        if self._extra_attributes is not None:
+            yield from self._extra_attributes
+
+    def __len__(self):
+        return len(self._values) + (0 if self._extra_attributes is None else len(self._extra_attributes))
+
+    def __eq__(self, other):
+        if isinstance(other, CsvRecord) and other._column_indices is self._column_indices:
+            return self._values == other._values and \
+                   (self._extra_attributes or {}) == (other._extra_attributes or {})
+        return super().__eq__(other)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class ColumnEventTypeClassifier(EventTypeClassifier):
+    """
+    Assigns to each event the value of the given column as its type.
+    """
+    def __init__(self, type_column: str):
+        self.__type_column = type_column
+
+    def get_event_type(self, event_payload: dict):
+        return event_payload[self.__type_column]
+
+
+class SchemaCsvDataFormatter(DataFormatter):
+    """
+    A data formatter for a CSV event stream with a declared schema. The schema consists of the column names, the
+    converters of the columns (callables receiving the raw string, e.g., int, float or str), the column defining the
+    event type and the column holding the event timestamp.
+    The timestamp column is converted by the given timestamp parser. If no parser is given, the converted value of the
+    timestamp column is used as is and should thus be either an integer number of nanoseconds since the epoch or a
+    datetime object.
+    Lines may omit trailing columns (e.g., an optional probability column), in which case these columns are absent
+    from the payload.
+    Besides raw lines, parse_event accepts the payloads returned by parse_events, such that a stream of payloads
+    parsed in advance in chunks can be processed directly.
+    """
+    def __init__(self, column_names: List[str], column_types: List[Callable[[str], object]], type_column: str,
+                 timestamp_column: str, timestamp_parser: Optional[TimestampParser] = None,
+                 probability_column: Optional[str] = None, delimiter: str = ",", quotechar: Optional[str] = '"',
+                 payload_type: CsvPayloadTypes = DefaultConfig.DEFAULT_CSV_PAYLOAD_TYPE,
+                 event_type_classifier: Optional[EventTypeClassifier] = None):
+        if len(column_names) != len(column_types):
+            raise Exception("The number of column names (%d) does not match the number of column types (%d)" %
+                            (len(column_names), len(column_types)))
+        if len(set(column_names)) != len(column_names):
+            raise Exception("Duplicate column names in schema: %s" % (column_names,))
+        for column in [type_column, timestamp_column, probability_column]:
+            if column is not None and column not in column_names:
+                raise Exception("Unknown column: %s" % (column,))
+        if payload_type not in [CsvPayloadTypes.DICT, CsvPayloadTypes.RECORD]:
+            raise Exception("Unknown CSV payload type: %s" % (payload_type,))
+        super().__init__(ColumnEventTypeClassifier(type_column) if event_type_classifier is None
+                         else event_type_classifier)
+        self.__column_names = list(column_names)
+        self.__column_types = list(column_types)
+        self.__column_indices = {name: index for index, name in enumerate(column_names)}
+        self.__timestamp_column = timestamp_column
+        self.__timestamp_parser = timestamp_parser
+        self.__probability_column = probability_column
+        self.__delimiter = delimiter
+        self.__quotechar = quotechar
+        self.__payload_type = payload_type
+        if quotechar is None:
+            self.__csv_options = {"delimiter": delimiter, "quoting": csv.QUOTE_NONE}
+        else:
+            self.__csv_options = {"delimiter": delimiter, "quotechar": quotechar}
+
+    def parse_event(self, raw_data):
+        """
+        Parses a single CSV line into an event payload. Payloads already parsed by parse_events are returned as is.
+        """
+        if not isinstance(raw_data, str):
+            return raw_data
+        if self.__quotechar is None or self.__quotechar not in raw_data:
+            fields = raw_data.rstrip("\r\n").split(self.__delimiter)
+        else:
+            fields = next(csv.reader([raw_data], **self.__csv_options))
+        return self.__create_payload(self.__convert_row(fields))
+
+    def parse_events(self, raw_data: Iterable[str]):
+        """
+        Parses a chunk of CSV lines into a list of event payloads. Empty lines are skipped. The csv module is only used
+        if the chunk contains quoted fields. As long as all lines in the chunk contain the same number of columns, the
+        values are converted column by column, invoking each converter via map on an entire column.
+        """
+        lines = [line for line in raw_data if not line.isspace() and len(line) > 0]
+        if self.__quotechar is None or not any(self.__quotechar in line for line in lines):
+            rows = [line.rstrip("\r\n").split(self.__delimiter) for line in lines]
+        else:
+            rows = [row for row in csv.reader(lines, **self.__csv_options) if row]
+        if len(rows) == 0:
+            return []
+        row_length = len(rows[0])
+        if row_length > len(self.__column_names) or any(len(row) != row_length for row in rows):
+            # lines of different lengths are converted one at a time
+            return [self.__create_payload(self.__convert_row(row)) for row in rows]
+        columns = [list(map(converter, column)) for converter, column in zip(self.__column_types, zip(*rows))]
+        return [self.__create_payload(values) for values in zip(*columns)]
+
+    def get_event_timestamp(self, event_payload: dict):
+        timestamp = event_payload[self.__timestamp_column]
+        return timestamp if self.__timestamp_parser is None else self.__timestamp_parser.parse(timestamp)
+
+    def get_event_timestamps(self, event_payloads: List[dict]):
+        timestamps = (payload[self.__timestamp_column] for payload in event_payloads)
+        return list(timestamps) if self.__timestamp_parser is None else self.__timestamp_parser.parse_column(timestamps)
+
+    def get_probability(self, event_payload: dict):
+        return None if self.__probability_column is None else event_payload.get(self.__probability_column, None)
+
+    def get_column_names(self):
+        """
+        Returns the names of the columns declared in the schema.
+        """
+        return self.__column_names
+
+    def __convert_row(self, fields: List[str]):
+        """
+        Converts the fields of a single line using the converters of the respective columns.
+        """
+        if len(fields) > len(self.__column_names):
+            raise Exception("Expected at most %d columns, got %d: %s" % (len(self.__column_names), len(fields), fields))
+        return tuple(converter(field) for converter, field in zip(self.__column_types, fields))
+
+    def __create_payload(self, values: tuple):
+        """
+        Creates a payload of the configured type from the converted values of a single line.
+        """
+        if self.__payload_type == CsvPayloadTypes.RECORD:
+            return CsvRecord(self.__column_indices, values)
+        return dict(zip(self.__column_names, values))
@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
+from typing import List
 import random
 
 from opencep.base.DataFormatter import DataFormatter, EventTypeClassifier
+from opencep.misc.TimestampParsers import SensorsTimestampParser
 from opencep.misc.Utils import str_to_number
 
 SENSORS_TIMESTAMP_KEY = "TimeStamp"
@@ -54,6 +56,7 @@ class SensorsDataFormatter(DataFormatter):
 
     def __init__(self, event_type_classifier: EventTypeClassifier = SensorsEventTypeClassifier()):
         super().__init__(event_type_classifier)
+        self.__timestamp_parser = SensorsTimestampParser()
 
     def parse_event(self, raw_data: str):
         """
@@ -69,8 +72,10 @@ class SensorsDataFormatter(DataFormatter):
         """
         The event timestamp is represented in sensors using a "%m/%d/%Y %H:%M:%S" format.
         """
-        timestamp_str = event_payload[SENSORS_TIMESTAMP_KEY]
-        return datetime.strptime(timestamp_str, "%m/%d/%Y %H:%M:%S")
+        return self.__timestamp_parser.parse(event_payload[SENSORS_TIMESTAMP_KEY])
+
+    def get_event_timestamps(self, event_payloads: List[dict]):
+        return self.__timestamp_parser.parse_column(payload[SENSORS_TIMESTAMP_KEY] for payload in event_payloads)
 
 
 def random_str(lowest, highest):
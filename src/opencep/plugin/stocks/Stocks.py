@@ -1,7 +1,7 @@
-from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from opencep.base.DataFormatter import DataFormatter, EventTypeClassifier
+from opencep.misc.TimestampParsers import MetastockTimestampParser
 from opencep.misc.Utils import str_to_number
 
 METASTOCK_STOCK_TICKER_KEY = "Stock Ticker"
@@ -38,6 +38,7 @@ class MetastockDataFormatter(DataFormatter):
     """
     def __init__(self, event_type_classifier: EventTypeClassifier = MetastockByTickerEventTypeClassifier()):
         super().__init__(event_type_classifier)
+        self.__timestamp_parser = MetastockTimestampParser()
 
     def parse_event(self, raw_data: str):
         """
@@ -53,9 +54,11 @@ class MetastockDataFormatter(DataFormatter):
         """
         The event timestamp is represented in metastock 7 using a YYYYMMDDhhmm format.
         """
-        timestamp_str = str(event_payload[METASTOCK_EVENT_TIMESTAMP_KEY])
-        return datetime(year=int(timestamp_str[0:4]), month=int(timestamp_str[4:6]), day=int(timestamp_str[6:8]),
-                        hour=int(timestamp_str[8:10]), minute=int(timestamp_str[10:12]))
+        return self.__timestamp_parser.parse(event_payload[METASTOCK_EVENT_TIMESTAMP_KEY])
+
+    def get_event_timestamps(self, event_payloads: List[dict]):
+        return self.__timestamp_parser.parse_column(payload[METASTOCK_EVENT_TIMESTAMP_KEY]
+                                                    for payload in event_payloads)
 
     def get_probability(self, event_payload: Dict[str, Any]) -> Optional[float]:
         return event_payload.get(PROBABILITY_KEY, None)
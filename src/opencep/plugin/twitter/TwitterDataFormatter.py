@@ -1,5 +1,6 @@
-from datetime import datetime
+from typing import List
 from opencep.base.DataFormatter import DataFormatter, EventTypeClassifier
+from opencep.misc.TimestampParsers import TwitterTimestampParser
 import json
 
 TWEET_MANDATORY_FIELDS = ["id", "created_at", "text", "truncated", "in_reply_to_status_id", "in_reply_to_user_id",
@@ -27,6 +28,7 @@ class TweetDataFormatter(DataFormatter):
     """
     def __init__(self, event_type_classifier: EventTypeClassifier = DummyTwitterEventTypeClassifier()):
         super().__init__(event_type_classifier)
+        self.__timestamp_parser = TwitterTimestampParser()
 
     def parse_event(self, raw_data: str):
         """
@@ -46,5 +48,8 @@ class TweetDataFormatter(DataFormatter):
         """
         The timestamps in Twitter are formatted as follows: Wed Oct 10 20:19:24 +0000 2018
         """
-        timestamp_str = str(event_payload[TWEET_EVENT_TIMESTAMP_KEY])
-        return datetime.strptime(timestamp_str, '%a %b %d %H:%M:%S +0000 %Y')
+        return self.__timestamp_parser.parse(str(event_payload[TWEET_EVENT_TIMESTAMP_KEY]))
+
+    def get_event_timestamps(self, event_payloads: List[dict]):
+        return self.__timestamp_parser.parse_column(str(payload[TWEET_EVENT_TIMESTAMP_KEY])
+                                                    for payload in event_payloads)
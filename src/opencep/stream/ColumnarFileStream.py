@@ -0,0 +1,365 @@
+"""
+This file contains a compact binary columnar file format for replaying event streams, e.g., in repeated backtests.
+A text stream is converted once using the data formatter able to parse it. The resulting file holds the event types
+(dictionary-encoded), the event timestamps (as int64 numbers of nanoseconds since the epoch), the occurrence
+probabilities and a typed column per payload attribute. It is then replayed by ColumnarFileInputStream, which
+memory-maps the file and creates the payloads directly from the columns, with no text parsing involved, together with
+ColumnarFileDataFormatter.
+
+The file starts with a magic string followed by the 8-byte length of a JSON header. The header describes the schema
+and the location of each column, which is stored as a contiguous native array aligned to 8 bytes. The supported
+column types are:
+- int64 / float64: the values of a column only containing integers / floats;
+- number: float64 values and a uint8 flag marking the integers, for columns mixing integers and floats, as produced
+  by str_to_number;
+- str: uint32 codes into a dictionary of the distinct strings kept in the header;
+- object: the pickled values, for any other column.
+Attributes missing from some of the payloads are accompanied by a uint8 presence column.
+"""
+import json
+import mmap
+import pickle
+import struct
+import sys
+from array import array
+from typing import Iterable, List, Optional
+
+from opencep.base.DataFormatter import DataFormatter, EventTypeClassifier
+from opencep.base.Event import Event
+from opencep.misc import DefaultConfig
+from opencep.misc.Timestamps import to_timestamp_ns
+from opencep.stream.Stream import InputStream
+
+COLUMNAR_FILE_MAGIC = b"OCEPCOL1"
+COLUMNAR_FILE_VERSION = 1
+_HEADER_LENGTH_FORMAT = "<Q"
+_ALIGNMENT = 8
+# integers exceeding this magnitude cannot be stored in a float64 number column without losing precision
+_MAX_EXACT_FLOAT_INTEGER = 2 ** 53
+_ARRAY_TYPE_CODES = {"int64": "q", "float64": "d", "number": "d", "str": "I"}
+# marks the payloads not containing an attribute
+_MISSING = object()
+
+
+class ReplayedPayload(dict):
+    """
+    The payload of a replayed event. Along with the attributes of the event, it holds the event type, timestamp and
+    probability calculated by the data formatter during the conversion.
+    """
+    __slots__ = ("event_type", "timestamp", "probability")
+
+
+class ReplayedEventTypeClassifier(EventTypeClassifier):
+    """
+    Returns the event type stored in a replayed payload.
+    """
+    def get_event_type(self, event_payload: ReplayedPayload):
+        return event_payload.event_type
+
+
+class ColumnarFileDataFormatter(DataFormatter):
+    """
+    The data formatter for the payloads created by ColumnarFileInputStream.
+    """
+    def __init__(self):
+        super().__init__(ReplayedEventTypeClassifier())
+
+    def parse_event(self, raw_data: ReplayedPayload):
+        return raw_data
+
+    def get_event_timestamp(self, event_payload: ReplayedPayload):
+        return event_payload.timestamp
+
+    def get_event_timestamps(self, event_payloads: List[ReplayedPayload]):
+        return [event_payload.timestamp for event_payload in event_payloads]
+
+    def get_probability(self, event_payload: ReplayedPayload):
+        return event_payload.probability
+
+
+def convert_to_columnar_file(raw_events: Iterable, data_formatter: DataFormatter, file_path: str):
+    """
+    Parses the given raw events (e.g., the lines of a text file or an InputStream) using the given data formatter and
+    writes them into a columnar file. Returns the number of converted events.
+    The events are accumulated in memory before being written.
+    """
+    event_types, timestamps, probabilities = [], [], []
+    columns = {}
+    for count, raw_event in enumerate(raw_events):
+        payload = data_formatter.parse_event(raw_event)
+        event_types.append(data_formatter.get_event_type(payload))
+        timestamps.append(to_timestamp_ns(data_formatter.get_event_timestamp(payload)))
+        probabilities.append(data_formatter.get_probability(payload))
+        for name, value in payload.items():
+            if name in Event.HIDDEN_ATTRIBUTE_NAMES:
+                continue
+            column = columns.get(name)
+            if column is None:
+                # the payloads preceding the first occurrence of the attribute do not contain it
+                column = columns[name] = [_MISSING] * count
+            column.append(value)
+        for column in columns.values():
+            if len(column) == count:
+                column.append(_MISSING)
+    event_count = len(timestamps)
+
+    writer = _BlockWriter()
+    event_type_dictionary, event_type_codes = _encode_dictionary(event_types)
+    if any(type(event_type) not in [str, int, float] for event_type in event_type_dictionary):
+        raise Exception("Event types of a columnar file must be strings or numbers")
+    header = {
+        "version": COLUMNAR_FILE_VERSION,
+        "byteorder": sys.byteorder,
+        "event_count": event_count,
+        "event_types": event_type_dictionary,
+        "event_type_codes": writer.add(array("I", event_type_codes)),
+        "timestamps": writer.add(array("q", timestamps)),
+        "probabilities": None,
+        "columns": [],
+    }
+    if any(probability is not None for probability in probabilities):
+        header["probabilities"] = writer.add(array("d", [-1.0 if probability is None else probability
+                                                         for probability in probabilities]))
+    for name, values in columns.items():
+        header["columns"].append(_write_column(writer, name, values))
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    with open(file_path, "wb") as f:
+        f.write(COLUMNAR_FILE_MAGIC)
+        f.write(struct.pack(_HEADER_LENGTH_FORMAT, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(bytes(_padding(len(COLUMNAR_FILE_MAGIC) + struct.calcsize(_HEADER_LENGTH_FORMAT) +
+                               len(header_bytes))))
+        writer.write_to(f)
+    return event_count
+
+
+class ColumnarFile:
+    """
+    A memory-mapped columnar file, providing zero-copy access to its columns and the creation of payload batches.
+    """
+    def __init__(self, file_path: str):
+        self.__file = open(file_path, "rb")
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self.__mmap)
+        if buffer[:len(COLUMNAR_FILE_MAGIC)] != COLUMNAR_FILE_MAGIC:
+            self.close()
+            raise Exception("Not a columnar event file: %s" % (file_path,))
+        length_offset = len(COLUMNAR_FILE_MAGIC)
+        header_offset = length_offset + struct.calcsize(_HEADER_LENGTH_FORMAT)
+        header_length, = struct.unpack_from(_HEADER_LENGTH_FORMAT, buffer, length_offset)
+        header = json.loads(bytes(buffer[header_offset:header_offset + header_length]).decode("utf-8"))
+        if header["version"] != COLUMNAR_FILE_VERSION:
+            self.close()
+            raise Exception("Unsupported columnar file version: %s" % (header["version"],))
+        if header["byteorder"] != sys.byteorder:
+            self.close()
+            raise Exception("The columnar file was created on a machine of a different byte order")
+        data_offset = header_offset + header_length + _padding(header_offset + header_length)
+        self.__data = buffer[data_offset:]
+        self.__event_count = header["event_count"]
+        self.__event_types = header["event_types"]
+        self.__event_type_codes = self.__get_block(header["event_type_codes"], "I")
+        self.__timestamps = self.__get_block(header["timestamps"], "q")
+        self.__probabilities = self.__get_block(header["probabilities"], "d")
+        self.__columns = [(column["name"], column["type"], column.get("dictionary"),
+                           self.__get_block(column["values"], "B" if column["type"] == "object" else
+                                            _ARRAY_TYPE_CODES[column["type"]]),
+                           self.__get_block(column.get("offsets"), "q"),
+                           self.__get_block(column.get("is_int"), "B"),
+                           self.__get_block(column.get("present"), "B"))
+                          for column in header["columns"]]
+
+    def __get_block(self, block: Optional[List[int]], type_code: str):
+        """
+        Returns a typed view of a block given by its offset and length relative to the data section.
+        """
+        if block is None:
+            return None
+        offset, length = block
+        return self.__data[offset:offset + length].cast(type_code)
+
+    def __len__(self):
+        return self.__event_count
+
+    def get_column_names(self):
+        return [column[0] for column in self.__columns]
+
+    def get_timestamps(self):
+        """
+        Returns a zero-copy int64 view of the event timestamps.
+        """
+        return self.__timestamps
+
+    def get_event_types(self):
+        """
+        Returns the event types of all events.
+        """
+        return [self.__event_types[code] for code in self.__event_type_codes]
+
+    def read_batch(self, start: int, end: int):
+        """
+        Creates the payloads of the events in the given range.
+        """
+        end = min(end, self.__event_count)
+        if start >= end:
+            return []
+        names, value_lists, absent_rows = [], [], []
+        for name, column_type, dictionary, values, offsets, is_int, present in self.__columns:
+            names.append(name)
+            value_lists.append(_read_column(column_type, dictionary, values, offsets, is_int, start, end))
+            if present is not None:
+                absent_rows.append((name, [i for i, flag in enumerate(present[start:end].tolist()) if not flag]))
+        event_types = [self.__event_types[code] for code in self.__event_type_codes[start:end].tolist()]
+        timestamps = self.__timestamps[start:end].tolist()
+        probabilities = [None] * (end - start) if self.__probabilities is None else \
+            [None if probability < 0.0 else probability for probability in self.__probabilities[start:end].tolist()]
+        payloads = []
+        for row, event_type, timestamp, probability in zip(zip(*value_lists), event_types, timestamps, probabilities):
+            payload = ReplayedPayload(zip(names, row))
+            payload.event_type = event_type
+            payload.timestamp = timestamp
+            payload.probability = probability
+            payloads.append(payload)
+        for name, rows in absent_rows:
+            for i in rows:
+                del payloads[i][name]
+        return payloads
+
+    def close(self):
+        # the views into the memory map must be released before it can be closed
+        self.__data = self.__event_type_codes = self.__timestamps = self.__probabilities = self.__columns = None
+        try:
+            self.__mmap.close()
+        except BufferError:
+            # a view returned by get_timestamps is still in use, the map is closed once it is garbage-collected
+            pass
+        self.__file.close()
+
+
+class ColumnarFileInputStream(InputStream):
+    """
+    Replays the events stored in a columnar file, to be used together with ColumnarFileDataFormatter.
+    The payloads are created lazily, a batch at a time, directly from the memory-mapped columns.
+    """
+    def __init__(self, file_path: str, batch_size: int = DefaultConfig.COLUMNAR_FILE_BATCH_SIZE):
+        super().__init__()
+        self.__file = ColumnarFile(file_path)
+        self.__batch_size = batch_size
+        self.__batches = self.get_batches()
+        self.__current_batch = iter(())
+
+    def get_batches(self):
+        """
+        Yields the remaining events in batches of payloads.
+        """
+        start = 0
+        while start < len(self.__file):
+            batch = self.__file.read_batch(start, start + self.__batch_size)
+            start += len(batch)
+            yield batch
+
+    def __next__(self):
+        while True:
+            payload = next(self.__current_batch, None)
+            if payload is not None:
+                return payload
+            batch = next(self.__batches, None)
+            if batch is None:
+                raise StopIteration()
+            self.__current_batch = iter(batch)
+
+    def count(self):
+        return len(self.__file)
+
+    def duplicate(self):
+        raise Exception("Unsupported operation")
+
+    def last(self):
+        raise Exception("Unsupported operation")
+
+    def close(self):
+        self.__file.close()
+
+
+class _BlockWriter:
+    """
+    Lays out the data blocks of a columnar file.
+    """
+    def __init__(self):
+        self.__blocks = []
+        self.__size = 0
+
+    def add(self, data):
+        """
+        Adds a block and returns its offset and length relative to the data section.
+        """
+        data = bytes(data)
+        location = [self.__size, len(data)]
+        self.__blocks.append(data + bytes(_padding(len(data))))
+        self.__size += len(self.__blocks[-1])
+        return location
+
+    def write_to(self, f):
+        for block in self.__blocks:
+            f.write(block)
+
+
+def _padding(size: int):
+    return -size % _ALIGNMENT
+
+
+def _encode_dictionary(values: list):
+    """
+    Returns the distinct values in the order of their first occurrence and the code of each value.
+    """
+    dictionary = {}
+    codes = [dictionary.setdefault(value, len(dictionary)) for value in values]
+    return list(dictionary), codes
+
+
+def _write_column(writer: _BlockWriter, name: str, values: list):
+    """
+    Writes a single attribute column choosing the most compact type fitting all of its values.
+    """
+    present_values = [value for value in values if value is not _MISSING]
+    value_types = set(type(value) for value in present_values)
+    column = {"name": name}
+    if len(present_values) < len(values):
+        column["present"] = writer.add(array("B", [value is not _MISSING for value in values]))
+    if value_types == {str}:
+        dictionary, codes = _encode_dictionary([value if value is not _MISSING else "" for value in values])
+        column.update(type="str", dictionary=dictionary, values=writer.add(array("I", codes)))
+    elif value_types == {int} and all(-2 ** 63 <= value < 2 ** 63 for value in present_values):
+        column.update(type="int64", values=writer.add(array("q", [0 if value is _MISSING else value
+                                                                  for value in values])))
+    elif value_types == {float}:
+        column.update(type="float64", values=writer.add(array("d", [0.0 if value is _MISSING else value
+                                                                    for value in values])))
+    elif value_types == {int, float} and all(type(value) == float or abs(value) <= _MAX_EXACT_FLOAT_INTEGER
+                                             for value in present_values):
+        column.update(type="number",
+                      values=writer.add(array("d", [0.0 if value is _MISSING else value for value in values])),
+                      is_int=writer.add(array("B", [type(value) == int for value in values])))
+    else:
+        pickled_values = [pickle.dumps(None if value is _MISSING else value) for value in values]
+        offsets = array("q", [0])
+        for pickled_value in pickled_values:
+            offsets.append(offsets[-1] + len(pickled_value))
+        column.update(type="object", values=writer.add(b"".join(pickled_values)), offsets=writer.add(offsets))
+    return column
+
+
+def _read_column(column_type: str, dictionary: Optional[list], values, offsets, is_int, start: int, end: int):
+    """
+    Returns the values of a single column in the given range.
+    """
+    if column_type == "str":
+        return [dictionary[code] for code in values[start:end].tolist()]
+    if column_type == "number":
+        return [int(value) if flag else value
+                for value, flag in zip(values[start:end].tolist(), is_int[start:end].tolist())]
+    if column_type == "object":
+        value_offsets = offsets[start:end + 1].tolist()
+        return [pickle.loads(values[value_offsets[i]:value_offsets[i + 1]]) for i in range(end - start)]
+    return values[start:end].tolist()
@@ -0,0 +1,111 @@
+import json
+import struct
+from abc import ABC, abstractmethod
+from typing import BinaryIO, List
+
+from opencep.base.Event import Event, AggregatedEvent
+from opencep.base.PatternMatch import PatternMatch
+
+
+def get_primitive_events(match: PatternMatch):
+    """
+    Returns the primitive events of the given match, expanding the events aggregated by Kleene closure operators.
+    """
+    primitive_events = []
+    for event in match.events:
+        if isinstance(event, AggregatedEvent):
+            primitive_events.extend(event.primitive_events)
+        else:
+            primitive_events.append(event)
+    return primitive_events
+
+
+class MatchSerializer(ABC):
+    """
+    Converts pattern matches into the bytes written by a match sink.
+    """
+    @abstractmethod
+    def serialize(self, match: PatternMatch):
+        """
+        Returns the binary representation of the given match.
+        """
+        raise NotImplementedError()
+
+
+class StringMatchSerializer(MatchSerializer):
+    """
+    Writes the matches in the human-readable format produced by PatternMatch.__str__, as FileOutputStream does.
+    """
+    def __init__(self, encoding: str = "utf-8"):
+        self.__encoding = encoding
+
+    def serialize(self, match: PatternMatch):
+        return str(match).encode(self.__encoding)
+
+
+class JSONLinesMatchSerializer(MatchSerializer):
+    """
+    Writes each match as a single JSON object containing its pattern IDs and the payloads of its primitive events.
+    Values which are not natively supported by JSON (e.g., timestamps) are written as strings.
+    """
+    def serialize(self, match: PatternMatch):
+        events = [{key: value for key, value in event.payload.items() if key not in Event.HIDDEN_ATTRIBUTE_NAMES}
+                  for event in get_primitive_events(match)]
+        line = json.dumps({"pattern_ids": list(match.pattern_ids), "events": events}, default=str)
+        return (line + "\n").encode("utf-8")
+
+
+class CSVIndexMatchSerializer(MatchSerializer):
+    """
+    Writes each match as a single CSV line consisting of the pattern IDs of the match followed by the serial numbers
+    of its primitive events, the two groups separated by a semicolon.
+    """
+    def serialize(self, match: PatternMatch):
+        pattern_ids = ",".join(map(str, match.pattern_ids))
+        indices = ",".join(str(event.payload[Event.INDEX_ATTRIBUTE_NAME]) for event in get_primitive_events(match))
+        return ("%s;%s\n" % (pattern_ids, indices)).encode("ascii")
+
+
+class BinaryMatchSerializer(MatchSerializer):
+    """
+    Writes each match as a length-prefixed record. A record starts with its length in bytes, followed by the number
+    of pattern IDs, the pattern IDs, the number of events, and the serial numbers of the primitive events. Lengths and
+    counts are unsigned 32-bit integers and the serial numbers are signed 64-bit integers, all little-endian.
+    """
+    __LENGTH_FORMAT = struct.Struct("<I")
+
+    def serialize(self, match: PatternMatch):
+        pattern_ids = match.pattern_ids
+        indices = [event.payload[Event.INDEX_ATTRIBUTE_NAME] for event in get_primitive_events(match)]
+        body = struct.pack("<I%dI" % len(pattern_ids), len(pattern_ids), *pattern_ids) + \
+            struct.pack("<I%dq" % len(indices), len(indices), *indices)
+        return BinaryMatchSerializer.__LENGTH_FORMAT.pack(len(body)) + body
+
+    @staticmethod
+    def read_records(file: BinaryIO):
+        """
+        Reads the records written by this serializer from the given file and yields a (pattern IDs, event serial
+        numbers) pair per record.
+        """
+        length_format = BinaryMatchSerializer.__LENGTH_FORMAT
+        while True:
+            header = file.read(length_format.size)
+            if not header:
+                return
+            if len(header) < length_format.size:
+                raise Exception("Truncated match record header")
+            body = file.read(length_format.unpack(header)[0])
+            pattern_ids, offset = BinaryMatchSerializer.__unpack_array(body, 0, "I")
+            indices, _ = BinaryMatchSerializer.__unpack_array(body, offset, "q")
+            yield pattern_ids, indices
+
+    @staticmethod
+    def __unpack_array(body: bytes, offset: int, item_format: str):
+        """
+        Unpacks a count-prefixed array starting at the given offset and returns it along with the offset following it.
+        """
+        count = struct.unpack_from("<I", body, offset)[0]
+        offset += 4
+        array_format = "<%d%s" % (count, item_format)
+        items: List[int] = list(struct.unpack_from(array_format, body, offset))
+        return items, offset + struct.calcsize(array_format)
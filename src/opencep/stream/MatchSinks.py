@@ -0,0 +1,98 @@
+import os
+from queue import Queue
+from threading import Thread
+
+from opencep.misc import DefaultConfig
+from opencep.stream.MatchSerializers import MatchSerializer, StringMatchSerializer
+from opencep.stream.Stream import OutputStream
+
+
+class BufferedFileOutputStream(OutputStream):
+    """
+    Writes the matches into a predefined output file in batches.
+    The matches are collected into batches of a fixed size which are handed over to a dedicated writer thread that
+    serializes and writes them. At most a bounded number of batches may wait for the writer at any time, blocking the
+    producer when the writer falls behind instead of buffering the entire output in memory.
+    """
+    def __init__(self, base_path: str, file_name: str, serializer: MatchSerializer = None,
+                 batch_size: int = DefaultConfig.MATCH_SINK_BATCH_SIZE,
+                 max_pending_batches: int = DefaultConfig.MATCH_SINK_MAX_PENDING_BATCHES):
+        super().__init__()
+        if batch_size <= 0 or max_pending_batches <= 0:
+            raise Exception("Batch size and number of pending batches must be positive")
+        if not os.path.exists(base_path):
+            os.makedirs(base_path, exist_ok=True)
+        self.__serializer = serializer if serializer is not None else StringMatchSerializer()
+        self.__batch_size = batch_size
+        self.__current_batch = []
+        self.__pending_batches = Queue(maxsize=max_pending_batches)
+        self.__writer_error = None
+        self.__is_closed = False
+        self.__output_file = open(os.path.join(base_path, file_name), 'wb')
+        self.__writer_thread = Thread(target=self.__write_batches, daemon=True)
+        self.__writer_thread.start()
+
+    def add_item(self, item: object):
+        """
+        Adds the match to the current batch and hands the batch over to the writer once it is full.
+        """
+        self.__current_batch.append(item)
+        if len(self.__current_batch) >= self.__batch_size:
+            self.__submit_current_batch()
+
+    def close(self):
+        """
+        Writes the remaining matches, waits for the writer thread to finish and closes the output file.
+        """
+        if self.__is_closed:
+            return
+        self.__is_closed = True
+        if self.__current_batch:
+            self.__submit_current_batch()
+        self.__pending_batches.put(None)
+        self.__writer_thread.join()
+        self.__output_file.close()
+        super().close()
+        if self.__writer_error is not None:
+            raise self.__writer_error
+
+    def __submit_current_batch(self):
+        if self.__writer_error is not None:
+            raise self.__writer_error
+        self.__pending_batches.put(self.__current_batch)
+        self.__current_batch = []
+
+    def __write_batches(self):
+        """
+        The main loop of the writer thread.
+        """
+        serialize = self.__serializer.serialize
+        while True:
+            batch = self.__pending_batches.get()
+            if batch is None:
+                return
+            if self.__writer_error is not None:
+                # keep consuming the batches so that the producer never blocks
+                continue
+            try:
+                self.__output_file.write(b"".join([serialize(match) for match in batch]))
+            except Exception as e:
+                self.__writer_error = e
+
+
+class CallbackOutputStream(OutputStream):
+    """
+    Passes each match directly to a user-provided callback without buffering it.
+    """
+    def __init__(self, callback: callable, on_close: callable = None):
+        super().__init__()
+        self.__callback = callback
+        self.__on_close = on_close
+
+    def add_item(self, item: object):
+        self.__callback(item)
+
+    def close(self):
+        super().close()
+        if self.__on_close is not None:
+            self.__on_close()
@@ -0,0 +1,52 @@
+import heapq
+from typing import List
+
+from opencep.base.Event import Event
+
+
+class ConsumedEventRegistry:
+    """
+    Keeps track of the events consumed under the "single" consumption policy (MATCH_SINGLE / MATCH_NEXT) by the nodes
+    of a single evaluation tree.
+    An event is consumed by a node once it becomes a part of a partial match passed by this node, and may not be
+    passed by the same node again until it expires, that is, until it falls out of the time window of the node.
+    The consumed events are kept in a heap ordered by their expiration time, such that expired events are removed
+    without examining the rest.
+    """
+    def __init__(self):
+        # (node, event) pairs for all consumed events that have not yet expired
+        self.__consumed_events = set()
+        # (expiration time, insertion order, node, event) entries for the pairs in __consumed_events
+        self.__expiration_heap = []
+        self.__insertion_counter = 0
+
+    def __len__(self):
+        """
+        Returns the number of currently registered consumed events.
+        """
+        return len(self.__consumed_events)
+
+    def is_consumed(self, node, event: Event):
+        """
+        Returns True if the given event was already consumed by the given node and False otherwise.
+        """
+        return (node, event) in self.__consumed_events
+
+    def consume(self, node, events: List[Event], window: int):
+        """
+        Registers the given events as consumed by the given node, whose time window is as specified.
+        """
+        for event in events:
+            self.__consumed_events.add((node, event))
+            heapq.heappush(self.__expiration_heap,
+                           (event.min_timestamp + window, self.__insertion_counter, node, event))
+            self.__insertion_counter += 1
+
+    def remove_expired(self, last_timestamp: int):
+        """
+        Removes the consumed events that can no longer appear together with an event of the given timestamp.
+        """
+        expiration_heap = self.__expiration_heap
+        while len(expiration_heap) > 0 and expiration_heap[0][0] < last_timestamp:
+            _, _, node, event = heapq.heappop(expiration_heap)
+            self.__consumed_events.discard((node, event))
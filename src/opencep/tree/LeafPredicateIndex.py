@@ -0,0 +1,141 @@
+from bisect import bisect_left, bisect_right
+from typing import List
+
+from opencep.base.Event import Event
+from opencep.condition.BaseRelationCondition import BaseRelationCondition
+from opencep.condition.CompositeCondition import AndCondition
+from opencep.condition.Condition import RelopTypes, Variable
+from opencep.misc.Utils import get_attribute_function_key
+from opencep.tree.nodes.LeafNode import LeafNode
+
+
+class EventTypeListeners(list):
+    """
+    The list of the leaves listening to a single event type.
+    Many leaves of the same type (typically belonging to different patterns of a multi-pattern tree) only accept events
+    satisfying a comparison between an attribute and a constant, such as "a.Price > 100" or "a.Type == 'X'". Such a
+    list can be indexed by these predicates, in which case get_accepting_leaves only returns the leaves whose indexed
+    predicate is satisfied by the event, using a single hash lookup per attribute for the equality predicates and a
+    binary search over the sorted constants for the range predicates. The returned leaves still validate their full
+    condition upon receiving the event.
+    """
+    def __init__(self, leaves: List[LeafNode] = ()):
+        super().__init__(leaves)
+        self.__is_indexed = False
+        # the positions of the leaves without an indexable predicate
+        self.__unindexed_positions = []
+        # attribute key -> (attribute function, constant -> positions of the leaves with an equality predicate)
+        self.__equality_indices = {}
+        # attribute key -> (attribute function, relation type -> (sorted constants, positions in the same order))
+        self.__range_indices = {}
+
+    def build_predicate_index(self):
+        """
+        Indexes the leaves in this list by their indexable predicates. Each leaf is indexed by at most one predicate,
+        preferring equality predicates over range ones.
+        """
+        range_predicates = {}
+        for position, leaf in enumerate(self):
+            predicate = EventTypeListeners.__get_indexable_predicate(leaf)
+            if predicate is None:
+                self.__unindexed_positions.append(position)
+                continue
+            attribute_key, attribute_function, relop_type, constant = predicate
+            if relop_type == RelopTypes.Equal:
+                _, constant_to_positions = self.__equality_indices.setdefault(attribute_key, (attribute_function, {}))
+                constant_to_positions.setdefault(constant, []).append(position)
+            else:
+                _, relop_to_entries = range_predicates.setdefault(attribute_key, (attribute_function, {}))
+                relop_to_entries.setdefault(relop_type, []).append((constant, position))
+        for attribute_key, (attribute_function, relop_to_entries) in range_predicates.items():
+            for relop_type, entries in relop_to_entries.items():
+                try:
+                    entries.sort(key=lambda entry: entry[0])
+                except TypeError:
+                    # the constants are not mutually comparable
+                    self.__unindexed_positions.extend(position for _, position in entries)
+                    continue
+                _, relop_to_sorted = self.__range_indices.setdefault(attribute_key, (attribute_function, {}))
+                relop_to_sorted[relop_type] = ([constant for constant, _ in entries],
+                                               [position for _, position in entries])
+        self.__is_indexed = True
+
+    def get_accepting_leaves(self, event: Event):
+        """
+        Returns the leaves in this list that may accept the given event, in their original order.
+        """
+        if not self.__is_indexed:
+            return self
+        positions = list(self.__unindexed_positions)
+        for attribute_function, constant_to_positions in self.__equality_indices.values():
+            try:
+                positions.extend(constant_to_positions.get(attribute_function(event.payload), ()))
+            except Exception:
+                # let the leaves evaluate (and report) the failing predicate themselves
+                for matching_positions in constant_to_positions.values():
+                    positions.extend(matching_positions)
+        for attribute_function, relop_to_sorted in self.__range_indices.values():
+            try:
+                value = attribute_function(event.payload)
+                for relop_type, (constants, relop_positions) in relop_to_sorted.items():
+                    positions.extend(EventTypeListeners.__get_satisfied_range(value, relop_type,
+                                                                              constants, relop_positions))
+            except Exception:
+                for _, relop_positions in relop_to_sorted.values():
+                    positions.extend(relop_positions)
+        positions.sort()
+        return [self[position] for position in positions]
+
+    @staticmethod
+    def __get_satisfied_range(value, relop_type: RelopTypes, constants: list, positions: list):
+        """
+        Returns the positions of the leaves whose predicate "value <relop_type> constant" is satisfied.
+        """
+        if relop_type == RelopTypes.Greater:
+            return positions[:bisect_left(constants, value)]
+        if relop_type == RelopTypes.GreaterEqual:
+            return positions[:bisect_right(constants, value)]
+        if relop_type == RelopTypes.Smaller:
+            return positions[bisect_right(constants, value):]
+        if relop_type == RelopTypes.SmallerEqual:
+            return positions[bisect_left(constants, value):]
+        raise Exception("Unsupported relation type %s" % (relop_type,))
+
+    @staticmethod
+    def __get_indexable_predicate(leaf: LeafNode):
+        """
+        Returns the (attribute key, attribute function, relation type, constant) description of a predicate the given
+        leaf can be indexed by, or None if no such predicate exists.
+        """
+        condition = leaf.get_condition()
+        if type(condition) != AndCondition:
+            return None
+        best_predicate = None
+        for atomic_condition in condition.get_conditions_list():
+            if not isinstance(atomic_condition, BaseRelationCondition) or len(atomic_condition.terms) != 1:
+                continue
+            variable = atomic_condition.terms[0]
+            if not isinstance(variable, Variable) or variable.name != leaf.get_event_name():
+                continue
+            relop_type = atomic_condition.relop_type
+            if isinstance(atomic_condition.left_term_repr, Variable):
+                constant = atomic_condition.right_term_repr
+            else:
+                # the constant is on the left side, e.g., "100 < a.Price"
+                constant = atomic_condition.left_term_repr
+                if relop_type != RelopTypes.Equal:
+                    relop_type = RelopTypes.get_opposite_relop_type(relop_type)
+            if relop_type is None or relop_type == RelopTypes.NotEqual:
+                continue
+            if relop_type == RelopTypes.Equal:
+                try:
+                    hash(constant)
+                except TypeError:
+                    continue
+            predicate = (get_attribute_function_key(variable.getattr_func), variable.getattr_func,
+                         relop_type, constant)
+            if relop_type == RelopTypes.Equal:
+                return predicate
+            if best_predicate is None:
+                best_predicate = predicate
+        return best_predicate
@@ -2,9 +2,12 @@ from typing import Dict
 
 from opencep.base.Pattern import Pattern
 from opencep.plan.TreePlan import TreePlan
+from opencep.misc.LoadSheddingTypes import LoadSheddingTypes
 from opencep.tree.PatternMatchStorage import TreeStorageParameters
+from opencep.tree.PartialMatchSpillManager import PartialMatchSpillManager
 from opencep.base.PatternMatch import PatternMatch
 from opencep.tree.Tree import Tree
+from opencep.tree.TreeProfiler import TreeProfiler
 from opencep.tree.nodes.NegationNode import NegationNode
 
 
@@ -17,6 +20,12 @@ class MultiPatternTree:
         self.__id_to_output_node_map = {}
         self.__id_to_pattern_map = {}
         self.__output_nodes = []
+        # the output nodes holding unreported matches and the order in which the output nodes are collected
+        self.__ready_output_nodes = set()
+        self.__output_node_positions = {}
+        self.__load_shedder = None
+        # the trees of the individual patterns, only kept for profiling
+        self.__trees = []
         self.__construct_multi_pattern_tree(pattern_to_tree_plan_map, storage_params)
 
     def __construct_multi_pattern_tree(self, pattern_to_tree_plan_map: Dict[Pattern, TreePlan],
@@ -27,12 +36,27 @@ class MultiPatternTree:
         """
         # pattern IDs starts from 1
         plan_nodes_to_nodes_map = {}  # a cache for already created subtrees
+        # the memory budget is shared by all patterns as their trees may share nodes
+        spill_manager = None if storage_params.memory_budget is None else \
+            PartialMatchSpillManager(storage_params.memory_budget, storage_params.spill_directory)
+        # similarly, a single load shedder tracks the partial matches of all patterns
+        if storage_params.use_load_shedding and storage_params.load_shedding_type == LoadSheddingTypes.STATE_BASED:
+            max_window = max(pattern.window_ns for pattern in pattern_to_tree_plan_map)
+            self.__load_shedder = Tree.create_load_shedder(max_window, storage_params)
+        # the counters of a shared node are maintained once for all patterns
+        profiler = TreeProfiler() if storage_params.profile_nodes else None
         for i, (pattern, plan) in enumerate(pattern_to_tree_plan_map.items(), 1):
             pattern.id = i
-            new_tree_root = Tree(plan, pattern, storage_params, plan_nodes_to_nodes_map).get_root()
+            new_tree = Tree(plan, pattern, storage_params, plan_nodes_to_nodes_map, spill_manager,
+                            self.__load_shedder, profiler)
+            if profiler is not None:
+                self.__trees.append(new_tree)
+            new_tree_root = new_tree.get_root()
             self.__id_to_output_node_map[pattern.id] = new_tree_root
             self.__id_to_pattern_map[pattern.id] = pattern
             self.__output_nodes.append(new_tree_root)
+            new_tree_root.set_ready_output_nodes(self.__ready_output_nodes)
+            self.__output_node_positions.setdefault(new_tree_root, len(self.__output_node_positions))
 
     def get_leaves(self):
         """
@@ -43,21 +67,33 @@ class MultiPatternTree:
             leaves |= set(output_node.get_leaves())
         return leaves
 
-    def __should_attach_match_to_pattern(self, match: PatternMatch, pattern: Pattern):
+    def get_partial_matches_count(self):
+        """
+        Returns the number of partial matches stored at the leaves without fetching them.
+        """
+        return sum(len(leaf.get_storage_unit()) for leaf in self.get_leaves())
+
+    @staticmethod
+    def should_attach_match_to_pattern(match: PatternMatch, pattern: Pattern):
         """
         Returns True if the given match satisfies the window/confidence constraints of the given pattern
         and False otherwise.
         """
-        if match.last_timestamp - match.first_timestamp > pattern.window:
+        if match.last_timestamp - match.first_timestamp > pattern.window_ns:
             return False
         return pattern.confidence is None or match.probability is None or match.probability >= pattern.confidence
 
     def get_matches(self):
         """
         Returns the matches from all of the output nodes.
+        Only the output nodes that buffered new matches since the last call are visited.
         """
         matches = []
-        for output_node in self.__output_nodes:
+        if len(self.__ready_output_nodes) == 0:
+            return matches
+        ready_output_nodes = sorted(self.__ready_output_nodes, key=self.__output_node_positions.__getitem__)
+        self.__ready_output_nodes.clear()
+        for output_node in ready_output_nodes:
             while output_node.has_unreported_matches():
                 match = output_node.get_next_unreported_match()
                 pattern_ids = output_node.get_pattern_ids()
@@ -68,11 +104,33 @@ class MultiPatternTree:
                         continue
                     # check if timestamp is correct for this pattern id.
                     # the pattern indices start from 1.
-                    if self.__should_attach_match_to_pattern(match, self.__id_to_pattern_map[pattern_id]):
+                    if MultiPatternTree.should_attach_match_to_pattern(match, self.__id_to_pattern_map[pattern_id]):
                         match.add_pattern_id(pattern_id)
+                if self.__load_shedder is not None:
+                    self.__load_shedder.register_full_match(match)
                 matches.append(match)
         return matches
 
+    def get_load_shedder(self):
+        return self.__load_shedder
+
+    def apply_load_shedding(self, latency_ns: int, last_timestamp: int):
+        """
+        Lets the shared load shedder (if any) drop partial matches given the processing latency of the last event.
+        """
+        if self.__load_shedder is not None:
+            self.__load_shedder.handle_event(latency_ns, last_timestamp)
+
+    def get_profile_report(self):
+        """
+        Returns the profile reports of the trees of all patterns. The counters of a shared node appear in the report of
+        each pattern sharing it.
+        """
+        if len(self.__trees) == 0:
+            raise Exception("Profiling is disabled for this tree")
+        return "\n\n".join("Pattern %d:\n%s" % (pattern_id, tree.get_profile_report())
+                            for pattern_id, tree in enumerate(self.__trees, 1))
+
     def get_last_matches(self):
         """
         This method is similar to the method- get_last_matches in a Tree.
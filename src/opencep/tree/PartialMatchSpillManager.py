@@ -0,0 +1,190 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import weakref
+from typing import List
+
+from opencep.base.PatternMatch import PatternMatch
+
+
+class SpilledSegment:
+    """
+    Describes a group of partial matches that were moved from a storage to the on-disk store.
+    The sorted first timestamps and the key range allow a storage to decide whether the segment has to be read without
+    reading it. A segment may be extended by later spills, each of which is stored as a separate chunk.
+    Expired partial matches may remain on the disk until enough of the segment expires to justify rewriting it, hence
+    the number of the stored partial matches may exceed the size of the segment.
+    """
+    __slots__ = ("segment_id", "first_timestamps", "stored_size", "min_key", "max_key")
+
+    def __init__(self, segment_id: int, first_timestamps: List[int], min_key=None, max_key=None):
+        self.segment_id = segment_id
+        self.first_timestamps = first_timestamps
+        self.stored_size = len(first_timestamps)
+        self.min_key = min_key
+        self.max_key = max_key
+
+    def get_size(self):
+        return len(self.first_timestamps)
+
+    def get_min_first_timestamp(self):
+        return self.first_timestamps[0]
+
+    def get_max_first_timestamp(self):
+        return self.first_timestamps[-1]
+
+
+class PartialMatchSpillManager:
+    """
+    Enforces the memory budget of a single evaluation tree.
+    Keeps track of the number of partial matches held in memory by the storages of the tree. Whenever this number
+    exceeds the budget, the oldest partial matches of the largest storages are moved to an on-disk SQLite store, from
+    which they are read back whenever a storage access requires them.
+    Handling a single event may probe the same storage many times, once for each new partial match. Hence, the segments
+    read back are kept decoded until release_cached_segments is invoked upon the arrival of the next event. The cached
+    segments never exceed the pattern matches the probes of a single event would have materialized anyway.
+    """
+    def __init__(self, memory_budget: int, spill_directory: str = None):
+        if memory_budget <= 0:
+            raise Exception("memory budget should be positive.")
+        self.__memory_budget = memory_budget
+        self.__storages = weakref.WeakSet()
+        # an upper bound on the number of partial matches in memory, recalculated whenever the budget seems exceeded
+        self.__in_memory_count = 0
+        if spill_directory is None:
+            # SQLite creates a private temporary on-disk database for an empty file name
+            path = ""
+        else:
+            file_descriptor, path = tempfile.mkstemp(prefix="opencep_spill_", suffix=".db", dir=spill_directory)
+            os.close(file_descriptor)
+        self.__connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS chunks "
+                                  "(id INTEGER PRIMARY KEY, segment_id INTEGER NOT NULL, data BLOB NOT NULL)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS chunks_by_segment ON chunks (segment_id)")
+        self.__next_segment_id = 0
+        # the segments read back from the disk since the last release, by their IDs
+        self.__cached_segments = {}
+        self.__segment_reads_count = 0
+        self.__finalizer = weakref.finalize(self, PartialMatchSpillManager.__release, self.__connection, path)
+
+    def register_storage(self, storage):
+        """
+        Places the given storage under the memory budget of this manager.
+        """
+        self.__storages.add(storage)
+        self.__in_memory_count += storage.get_in_memory_size()
+
+    def notify_partial_match_added(self):
+        """
+        Invoked by a storage upon adding a new partial match. Spills partial matches if the budget is exceeded.
+        """
+        self.__in_memory_count += 1
+        if self.__in_memory_count > self.__memory_budget:
+            self.__enforce_budget()
+
+    def __enforce_budget(self):
+        """
+        Repeatedly spills the older half of the largest storage until the memory budget is satisfied.
+        The newest partial match of each storage is never spilled.
+        """
+        storages = list(self.__storages)
+        in_memory_count = sum(storage.get_in_memory_size() for storage in storages)
+        while in_memory_count > self.__memory_budget:
+            largest_storage = max(storages, key=lambda storage: storage.get_in_memory_size())
+            spilled_count = largest_storage.spill_oldest_partial_matches(largest_storage.get_in_memory_size() // 2)
+            if spilled_count == 0:
+                # no storage contains more than a single partial match
+                break
+            in_memory_count -= spilled_count
+        self.__in_memory_count = in_memory_count
+
+    def write_segment(self, partial_matches: List[PatternMatch]):
+        """
+        Stores the given partial matches on disk and returns the ID of the new segment.
+        """
+        segment_id = self.__next_segment_id
+        self.__next_segment_id += 1
+        self.__write_chunk(segment_id, partial_matches)
+        return segment_id
+
+    def append_to_segment(self, segment_id: int, partial_matches: List[PatternMatch]):
+        """
+        Adds the given partial matches to the segment with the given ID without reading the segment.
+        """
+        self.__write_chunk(segment_id, partial_matches)
+        self.__cached_segments.pop(segment_id, None)
+
+    def read_segment(self, segment_id: int, restore_chunks: callable) -> List[PatternMatch]:
+        """
+        Returns the partial matches stored in the segment with the given ID, as restored by the given function from the
+        list of the chunks of the segment.
+        The returned list is shared with later reads of the segment and must not be modified.
+        """
+        partial_matches = self.__cached_segments.get(segment_id)
+        if partial_matches is not None:
+            return partial_matches
+        rows = self.__connection.execute("SELECT data FROM chunks WHERE segment_id = ? ORDER BY id",
+                                         (segment_id,)).fetchall()
+        if len(rows) == 0:
+            raise Exception("Spilled segment %s does not exist" % (segment_id,))
+        self.__segment_reads_count += 1
+        chunks = [pickle.loads(row[0]) for row in rows]
+        partial_matches = restore_chunks(chunks)
+        self.__cached_segments[segment_id] = partial_matches
+        return partial_matches
+
+    def update_segment(self, segment_id: int, partial_matches: List[PatternMatch]):
+        """
+        Replaces the partial matches stored in the segment with the given ID.
+        """
+        self.__connection.execute("DELETE FROM chunks WHERE segment_id = ?", (segment_id,))
+        self.__write_chunk(segment_id, partial_matches)
+        self.__cached_segments[segment_id] = partial_matches
+
+    def delete_segment(self, segment_id: int):
+        """
+        Removes the segment with the given ID from the disk.
+        """
+        self.__connection.execute("DELETE FROM chunks WHERE segment_id = ?", (segment_id,))
+        self.__cached_segments.pop(segment_id, None)
+
+    def release_cached_segments(self):
+        """
+        Drops the decoded segments kept since the last release. Subsequent accesses read the segments from the disk.
+        """
+        self.__cached_segments.clear()
+
+    def release_cached_segment(self, segment_id: int):
+        """
+        Drops the decoded segment with the given ID if it is kept since the last release.
+        """
+        self.__cached_segments.pop(segment_id, None)
+
+    def get_segment_reads_count(self):
+        """
+        Returns the number of times a segment was actually read from the disk.
+        """
+        return self.__segment_reads_count
+
+    def __write_chunk(self, segment_id: int, partial_matches: List[PatternMatch]):
+        """
+        Stores the given partial matches on disk as a new chunk of the segment with the given ID.
+        """
+        self.__connection.execute("INSERT INTO chunks (segment_id, data) VALUES (?, ?)",
+                                  (segment_id, pickle.dumps(partial_matches, pickle.HIGHEST_PROTOCOL)))
+
+    def close(self):
+        """
+        Releases the on-disk store. The storages under this manager must not be accessed afterwards.
+        """
+        self.__finalizer()
+
+    @staticmethod
+    def __release(connection: sqlite3.Connection, path: str):
+        """
+        Closes the connection to the on-disk store and removes the database file.
+        """
+        connection.close()
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -1,16 +1,16 @@
-import sys
+import heapq
+from bisect import bisect_left
+from itertools import chain
+from typing import List
 
 from opencep.base.PatternMatch import PatternMatch
 from opencep.misc import DefaultConfig
+from opencep.misc.LoadSheddingTypes import LoadSheddingTypes
 from opencep.misc.Utils import get_first_index, get_last_index
-from datetime import datetime
 from opencep.misc.Utils import find_partial_match_by_timestamp
 from opencep.condition.Condition import RelopTypes, EquationSides
-from opencep.misc.StateBasedLoadShedder import bucket_manager, slice_id, length_id
-from opencep.misc.StudentMetrics import Metrics, last_values, test_last_values
+from opencep.tree.PartialMatchSpillManager import PartialMatchSpillManager, SpilledSegment
 
-SHEDDER_COOLDOWN = 3  # minimum number of events between shedding attempts
-latest_number_of_events = 0  # counter of events at the time of last shedding attempt
 
 class PatternMatchStorage:
     """
@@ -20,8 +20,7 @@ class PatternMatchStorage:
     containing a single object, multiple objects, or even the entire stored content). This behavior contradicts the
     "regular" container behavior fetching a single value corresponding to this key.
     """
-    def __init__(self, get_match_key: callable, sorted_by_arrival_order: bool, clean_up_interval: int,
-                 use_load_shedding: bool, latency_threshold_ns: int):
+    def __init__(self, get_match_key: callable, sorted_by_arrival_order: bool, clean_up_interval: int):
         self._partial_matches = []
         if get_match_key is None:
             self._get_key = lambda x: x
@@ -29,9 +28,14 @@ class PatternMatchStorage:
             self._get_key = get_match_key
         self._sorted_by_arrival_order = sorted_by_arrival_order
         self._clean_up_interval = clean_up_interval
-        self._use_load_shedding = use_load_shedding
-        self._latency_threshold_ns = latency_threshold_ns
         self._access_count = 0
+        # the load shedder of the tree, notified upon each addition of a pattern match
+        self._load_shedder = None
+        # the manager enforcing the memory budget of the tree and the partial matches it moved to the disk
+        self._spill_manager = None
+        self._spilled_segments = []
+        # the profile of the node owning this storage, counting the removed pattern matches if profiling is enabled
+        self._profile = None
 
     def get_key_function(self):
         """
@@ -41,14 +45,15 @@ class PatternMatchStorage:
 
     def __len__(self):
         """
-        Returns the number of the currently stored pattern matches.
+        Returns the number of the currently stored pattern matches, including the spilled ones.
         """
-        return len(self._partial_matches)
+        return len(self._partial_matches) + sum(segment.get_size() for segment in self._spilled_segments)
 
     def __setitem__(self, index, item):
         """
         Implements list-style "set item" semantics.
         """
+        self._restore_spilled_partial_matches()
         self._partial_matches[index] = item
 
     def __getitem__(self, index):
@@ -56,27 +61,28 @@ class PatternMatchStorage:
         Implements list-style "get item" semantics.
         """
         # index can be a slice [:] so the return value can be a list
-        return self._partial_matches[index]
+        return self.get_internal_buffer()[index]
 
     def __delitem__(self, index):
         """
         Implements list-style "remove item" semantics.
         """
+        self._restore_spilled_partial_matches()
         del self._partial_matches[index]
 
     def __iter__(self):
         """
         Implements list-style iteration semantics.
         """
-        return iter(self._partial_matches)
+        return iter(self.get_internal_buffer())
 
     def __contains__(self, item):
         """
         Returns True if the given item is stored and False otherwise.
         """
-        return item in self._partial_matches
+        return item in self.get_internal_buffer()
 
-    def try_clean_expired_partial_matches(self, earliest_timestamp: datetime):
+    def try_clean_expired_partial_matches(self, earliest_timestamp: int):
         """
         If the number of storage accesses exceeded a predefined threshold, perform a costly operation of removing
         expired partial matches.
@@ -86,44 +92,222 @@ class PatternMatchStorage:
         self._clean_expired_partial_matches(earliest_timestamp)
         self._access_count = 0
 
-    def _clean_expired_partial_matches(self, earliest_timestamp: datetime):
+    def _clean_expired_partial_matches(self, earliest_timestamp: int):
         """
         Removes pattern matches whose earliest earliest_timestamp violates the time window constraint.
         """
+        original_size = len(self) if self._profile is not None else 0
         if self._sorted_by_arrival_order:
             count = find_partial_match_by_timestamp(self._partial_matches, earliest_timestamp)
             self._partial_matches = self._partial_matches[count:]
         else:
             self._partial_matches = list(filter(lambda pm: pm.first_timestamp >= earliest_timestamp,
                                                 self._partial_matches))
-
-        # Note: expired partials removed here are not propagated to bucket manager.
-        # We need to call remove_by_id for each removed partial id to keep bucket bookkeeping consistent.
+        if self._spilled_segments:
+            self.__clean_expired_spilled_segments(earliest_timestamp)
+        if self._profile is not None:
+            self._profile.partial_matches_expired += original_size - len(self)
+
+    def __clean_expired_spilled_segments(self, earliest_timestamp: int):
+        """
+        Drops the spilled segments all of whose pattern matches are expired. The expired pattern matches of the other
+        segments are located without reading them and only removed from the disk once they form at least half of the
+        segment. Until then, they are filtered out whenever the segment is read.
+        """
+        remaining_segments = []
+        for segment in self._spilled_segments:
+            expired_count = bisect_left(segment.first_timestamps, earliest_timestamp)
+            if expired_count == segment.get_size():
+                self._spill_manager.delete_segment(segment.segment_id)
+                continue
+            if expired_count > 0:
+                segment.first_timestamps = segment.first_timestamps[expired_count:]
+                self._spill_manager.release_cached_segment(segment.segment_id)
+                if 2 * segment.get_size() <= segment.stored_size:
+                    self._spill_manager.update_segment(segment.segment_id, self._read_spilled_segment(segment))
+                    segment.stored_size = segment.get_size()
+            remaining_segments.append(segment)
+        self._spilled_segments = remaining_segments
 
     def remove_by_id(self, partial_id):
-        """Remove a stored PatternMatch by its partial id. Returns True if removed.
-        Linear scan implementation (used for shedding). If the PatternMatch is found and
-        removed, the bucket manager is informed to keep bookkeeping consistent.
         """
-        for i, pm in enumerate(self._partial_matches):
-            pm_id = getattr(pm, 'partial_id', None)
-            if pm_id == partial_id:
-                # remove from internal buffer
-                del self._partial_matches[i]
-                # update bucket bookkeeping if present
-                try:
-                    bucket_manager.remove_partial(partial_id)
-                except Exception:
-                    # keep best-effort: don't raise on bucket manager failures
-                    pass
-                return True
-        return False
+        Removes the stored pattern match with the given partial ID. Returns True if it was found and False otherwise.
+        """
+        return self.remove_partial_matches({partial_id}) > 0
+
+    def remove_partial_matches(self, partial_ids: set):
+        """
+        Removes the stored pattern matches whose partial IDs are in the given set, using a single pass over the
+        buffer. Returns the number of the removed pattern matches.
+        This method is used by the load shedder, hence the removed pattern matches are counted as shed.
+        """
+        removed_count = self.__remove_partial_matches_by(lambda pm: pm.partial_id in partial_ids)
+        if self._profile is not None:
+            self._profile.partial_matches_shed += removed_count
+        return removed_count
+
+    def remove_partial_matches_containing(self, events: set):
+        """
+        Removes the stored pattern matches containing any of the given events, using a single pass over the buffer.
+        Returns the number of the removed pattern matches.
+        """
+        removed_count = self.__remove_partial_matches_by(lambda pm: any(event in events for event in pm.events))
+        if self._profile is not None:
+            self._profile.partial_matches_purged += removed_count
+        return removed_count
+
+    def __remove_partial_matches_by(self, should_remove: callable):
+        """
+        Removes the stored pattern matches satisfying the given predicate, including the spilled ones.
+        Returns the number of the removed pattern matches.
+        """
+        original_size = len(self)
+        self._partial_matches = [pm for pm in self._partial_matches if not should_remove(pm)]
+        remaining_segments = []
+        for segment in self._spilled_segments:
+            spilled_partial_matches = self._read_spilled_segment(segment)
+            remaining_partial_matches = [pm for pm in spilled_partial_matches if not should_remove(pm)]
+            if len(remaining_partial_matches) == 0:
+                self._spill_manager.delete_segment(segment.segment_id)
+                continue
+            if len(remaining_partial_matches) < len(spilled_partial_matches):
+                self._spill_manager.update_segment(segment.segment_id, remaining_partial_matches)
+                segment.first_timestamps = sorted(pm.first_timestamp for pm in remaining_partial_matches)
+                segment.stored_size = segment.get_size()
+            remaining_segments.append(segment)
+        self._spilled_segments = remaining_segments
+        return original_size - len(self)
 
     def get_internal_buffer(self):
         """
         Returns the internal buffer actually storing the pattern matches.
+        If some of the pattern matches were spilled to the disk, a new list containing all of them is returned instead.
+        """
+        if not self._spilled_segments:
+            return self._partial_matches
+        return self._combine_partial_matches(
+            [self._read_spilled_segment(segment) for segment in self._spilled_segments] + [self._partial_matches])
+
+    def get_in_memory_size(self):
+        """
+        Returns the number of the pattern matches currently held in memory.
+        """
+        return len(self._partial_matches)
+
+    def set_spill_manager(self, spill_manager: PartialMatchSpillManager):
+        """
+        Places this storage under the memory budget enforced by the given manager.
+        """
+        if self._spill_manager is spill_manager:
+            return
+        self._restore_spilled_partial_matches()
+        self._spill_manager = spill_manager
+        spill_manager.register_storage(self)
+
+    def set_load_shedder(self, load_shedder):
+        """
+        Lets the given load shedder track and drop the pattern matches added to this storage from now on.
+        """
+        self._load_shedder = load_shedder
+
+    def set_profile(self, profile):
+        """
+        Lets the given node profile count the pattern matches removed from this storage from now on.
+        """
+        self._profile = profile
+
+    def spill_oldest_partial_matches(self, count: int):
+        """
+        Moves (at most) the given number of the oldest pattern matches to the disk. The most recently added pattern
+        match is never spilled. Returns the number of the actually spilled pattern matches.
+        """
+        count = min(count, len(self._partial_matches) - 1)
+        if self._spill_manager is None or count <= 0:
+            return 0
+        partial_matches_to_spill, partial_matches_to_keep = self._select_partial_matches_to_spill(count)
+        self._partial_matches = partial_matches_to_keep
+        spilled_count = len(partial_matches_to_spill)
+        if self._profile is not None:
+            self._profile.partial_matches_spilled += spilled_count
+        new_segment = self._create_spilled_segment(None, partial_matches_to_spill)
+        last_segment = self._spilled_segments[-1] if self._spilled_segments else None
+        if last_segment is not None and last_segment.get_size() < DefaultConfig.SPILLED_SEGMENT_MIN_SIZE \
+                and last_segment.stored_size == last_segment.get_size():
+            # extend the last segment to avoid reading many small segments upon each access. A segment still storing
+            # expired pattern matches is not extended, as these are told apart from the others by their timestamps
+            self._spill_manager.append_to_segment(last_segment.segment_id, partial_matches_to_spill)
+            self._merge_spilled_segments(last_segment, new_segment)
+        else:
+            new_segment.segment_id = self._spill_manager.write_segment(partial_matches_to_spill)
+            self._spilled_segments.append(new_segment)
+        return spilled_count
+
+    def _select_partial_matches_to_spill(self, count: int):
+        """
+        Splits the pattern matches held in memory into the given number of pattern matches to be spilled and the ones
+        to be kept. The buffer is ordered by arrival, hence the oldest pattern matches form its prefix.
+        """
+        return self._partial_matches[:count], self._partial_matches[count:]
+
+    def _create_spilled_segment(self, segment_id: int, partial_matches: List[PatternMatch]):
+        """
+        Creates the descriptor of a newly spilled segment.
+        """
+        return SpilledSegment(segment_id, sorted(pm.first_timestamp for pm in partial_matches))
+
+    def _merge_spilled_segments(self, segment: SpilledSegment, other_segment: SpilledSegment):
+        """
+        Updates the descriptor of the given segment after the pattern matches described by the other one were appended
+        to it.
+        """
+        segment.first_timestamps = list(heapq.merge(segment.first_timestamps, other_segment.first_timestamps))
+        segment.stored_size += other_segment.stored_size
+
+    def _read_spilled_segment(self, segment: SpilledSegment):
+        """
+        Returns the pattern matches of the given spilled segment. The returned list must not be modified.
         """
-        return self._partial_matches
+        return self._spill_manager.read_segment(segment.segment_id,
+                                                lambda chunks: self.__restore_spilled_segment(segment, chunks))
+
+    def __restore_spilled_segment(self, segment: SpilledSegment, chunks: List[List[PatternMatch]]):
+        """
+        Combines the chunks read from the disk into the list of the pattern matches of the given spilled segment,
+        skipping the expired pattern matches which were not removed from the disk yet.
+        """
+        partial_matches = chunks[0] if len(chunks) == 1 else self._combine_partial_matches(chunks)
+        if segment.stored_size > segment.get_size():
+            earliest_timestamp = segment.get_min_first_timestamp()
+            partial_matches = [pm for pm in partial_matches if pm.first_timestamp >= earliest_timestamp]
+        return partial_matches
+
+    def _restore_spilled_partial_matches(self):
+        """
+        Moves all spilled pattern matches back to memory.
+        """
+        if not self._spilled_segments:
+            return
+        self._partial_matches = self.get_internal_buffer()
+        for segment in self._spilled_segments:
+            self._spill_manager.delete_segment(segment.segment_id)
+        self._spilled_segments = []
+
+    def _combine_partial_matches(self, partial_match_lists: List[List[PatternMatch]]):
+        """
+        Combines the pattern matches fetched from the spilled segments and from memory into a single list, preserving
+        the order in which they were added.
+        """
+        return list(chain.from_iterable(partial_match_lists))
+
+    def _notify_partial_match_added(self, pm: PatternMatch):
+        """
+        Lets the load shedder (if any) register a newly added pattern match and the spill manager (if any) enforce the
+        memory budget following its addition.
+        """
+        if self._load_shedder is not None:
+            self._load_shedder.register_partial_match(self, pm)
+        if self._spill_manager is not None:
+            self._spill_manager.notify_partial_match_added()
 
     def add(self, pm: PatternMatch):
         """
@@ -136,48 +320,52 @@ class PatternMatchStorage:
         Returns a list of pattern matches corresponding to the given value.
         """
         raise NotImplementedError()
-    
-    def _register_partial_in_bucket(self, pm: PatternMatch):
+
+    def create_empty_storage(self):
         """
-        Registers the given PatternMatch in the global bucket manager if it has a stable partial_id.
+        Creates a new empty storage with the same settings as this one.
         """
-        partial_id = getattr(pm, 'partial_id', None)
-        if partial_id is not None:
-            sid = slice_id(pm.first_timestamp, pm.last_timestamp)
-            lid = length_id(len(pm))
-            bucket_manager.add_partial(partial_id, sid, lid)
+        raise NotImplementedError()
+
+    def is_sorted_by_key(self):
+        """
+        Returns True if the pattern matches are sorted by the storage key rather than by their arrival order.
+        """
+        return False
 
 
 class SortedPatternMatchStorage(PatternMatchStorage):
     """
     This class stores the pattern matches sorted in increasing order according to a predefined function (key).
     """
-    def __init__(
-        self,
-        get_match_key: callable,
-        rel_op: RelopTypes,
-        equation_side: EquationSides,
-        clean_up_interval: int,
-        use_load_shedding: bool,
-        latency_threshold_ns: int,
-        sort_by_first_timestamp=False,
-        in_leaf=False,
-    ):
-        super().__init__(
-            get_match_key,
-            in_leaf and sort_by_first_timestamp,
-            clean_up_interval,
-            use_load_shedding,
-            latency_threshold_ns,
-        )
+    def __init__(self, get_match_key: callable, rel_op: RelopTypes, equation_side: EquationSides,
+                 clean_up_interval: int, sort_by_first_timestamp=False, in_leaf=False):
+        super().__init__(get_match_key, in_leaf and sort_by_first_timestamp, clean_up_interval)
         self.__get_function = self.__generate_get_function(rel_op, equation_side)
+        self.__segment_filter = self.__generate_segment_filter(rel_op, equation_side)
+        self.__init_arguments = (get_match_key, rel_op, equation_side, clean_up_interval, sort_by_first_timestamp,
+                                 in_leaf)
+
+    def create_empty_storage(self):
+        """
+        Creates a new empty storage with the same settings as this one.
+        """
+        return SortedPatternMatchStorage(*self.__init_arguments)
+
+    def is_sorted_by_key(self):
+        """
+        Returns True if the pattern matches are sorted by the storage key rather than by their arrival order.
+        """
+        return not self._sorted_by_arrival_order
 
     def __contains__(self, item):
         """
         Returns True if the given item is stored and False otherwise.
         Performs an efficient search in the sorted buffer.
         """
-        return item in self.__get_equal(self._get_key(item))
+        key = self._get_key(item)
+        return item in self.__get_including_spilled(self.__get_equal, key,
+                                                    lambda segment: segment.min_key <= key <= segment.max_key)
 
     def add(self, pm: PatternMatch):
         """
@@ -185,126 +373,153 @@ class SortedPatternMatchStorage(PatternMatchStorage):
         """
         self._access_count += 1
 
-        if self._use_load_shedding:
-            self._register_partial_in_bucket(pm)
-
-            global latest_number_of_events
-            #print(f"processed events: {test_last_values.get(Metrics.PROCESSED_EVENTS, 0)}, latest at shedding: {latest_number_of_events}, difference: {test_last_values.get(Metrics.PROCESSED_EVENTS, 0) - latest_number_of_events}", file=sys.stderr)
-            if (
-                self._latency_threshold_ns != -1
-                and last_values[Metrics.EVENT_PROCESSING_LATENCY]
-                > self._latency_threshold_ns
-                and test_last_values.get(Metrics.PROCESSED_EVENTS, 0) - latest_number_of_events >= SHEDDER_COOLDOWN  # only shed if cooldown elapsed
-            ):
-                #print("attempting to shed load", file=sys.stderr)
-                try:
-                    removed = bucket_manager.shed_highest_value_buckets(1)  # where highest value means most expensive, unituivitely.
-                    for rid in removed:
-                        self.remove_by_id(rid)
-                    latest_number_of_events = test_last_values.get(Metrics.PROCESSED_EVENTS, 0)
-                    print("Shedding successful", file=sys.stderr)
-                except Exception:
-                    pass
-
         if self._sorted_by_arrival_order:
             # no need for artificially sorting
             self._partial_matches.append(pm)
-            return
-
-        index = get_last_index(self._partial_matches, self._get_key(pm), self._get_key)
-        index = 0 if index == -1 else index
-        self._partial_matches.insert(index, pm)
-        print(f"Number of sorted partial matches: {len(self._partial_matches)}", file=sys.stderr)
+        else:
+            index = get_last_index(self._partial_matches, self._get_key(pm), self._get_key)
+            index = 0 if index == -1 else index
+            self._partial_matches.insert(index, pm)
+        self._notify_partial_match_added(pm)
 
     def get(self, value: int or float):
         """
         Applies the storage-specific get() function to extract the required pattern matches.
+        Only the spilled segments whose key range may contain relevant pattern matches are read from the disk.
         """
-        if not self._partial_matches:
-            return []
-        return self.__get_function(value)
+        return self.__get_including_spilled(self.__get_function, value,
+                                            lambda segment: self.__segment_filter(segment, value))
+
+    def __get_including_spilled(self, get_function: callable, value: int or float, should_read_segment: callable):
+        """
+        Applies the given get() function on the pattern matches in memory and on the relevant spilled segments.
+        """
+        if not self._spilled_segments:
+            return get_function(self._partial_matches, value) if self._partial_matches else []
+        partial_match_lists = [self._read_spilled_segment(segment)
+                               for segment in self._spilled_segments if should_read_segment(segment)]
+        partial_match_lists.append(self._partial_matches)
+        return self._combine_partial_matches([get_function(partial_matches, value)
+                                              for partial_matches in partial_match_lists if partial_matches])
 
-    def __get_equal(self, value: int or float):
+    def _select_partial_matches_to_spill(self, count: int):
+        """
+        Unless the buffer is ordered by arrival, the pattern matches with the earliest timestamps are selected. The
+        relative order of the pattern matches is preserved, hence the spilled segment remains sorted by the key.
+        """
+        if self._sorted_by_arrival_order:
+            return super()._select_partial_matches_to_spill(count)
+        oldest_indices = set(sorted(range(len(self._partial_matches)),
+                                    key=lambda i: self._partial_matches[i].first_timestamp)[:count])
+        partial_matches_to_spill, partial_matches_to_keep = [], []
+        for i, pm in enumerate(self._partial_matches):
+            (partial_matches_to_spill if i in oldest_indices else partial_matches_to_keep).append(pm)
+        return partial_matches_to_spill, partial_matches_to_keep
+
+    def _create_spilled_segment(self, segment_id: int, partial_matches: List[PatternMatch]):
+        """
+        In addition to the timestamps, records the range of the keys of the spilled pattern matches.
+        """
+        keys = [self._get_key(pm) for pm in partial_matches]
+        return SpilledSegment(segment_id, sorted(pm.first_timestamp for pm in partial_matches), min(keys), max(keys))
+
+    def _merge_spilled_segments(self, segment: SpilledSegment, other_segment: SpilledSegment):
+        """
+        Extends the key range as well.
+        """
+        super()._merge_spilled_segments(segment, other_segment)
+        segment.min_key = min(segment.min_key, other_segment.min_key)
+        segment.max_key = max(segment.max_key, other_segment.max_key)
+
+    def _combine_partial_matches(self, partial_match_lists: List[List[PatternMatch]]):
+        """
+        Merges the given sorted lists according to the key.
+        """
+        if self._sorted_by_arrival_order:
+            return super()._combine_partial_matches(partial_match_lists)
+        return list(heapq.merge(*partial_match_lists, key=self._get_key))
+
+    def __get_equal(self, partial_matches: List[PatternMatch], value: int or float):
         """
         Returns the pattern matches whose keys are equal to the given value.
         """
-        left_index = get_first_index(self._partial_matches, value, self._get_key)
-        if left_index == len(self._partial_matches) or left_index == -1 or \
-                self._get_key(self._partial_matches[left_index]) != value:
+        left_index = get_first_index(partial_matches, value, self._get_key)
+        if left_index == len(partial_matches) or left_index == -1 or \
+                self._get_key(partial_matches[left_index]) != value:
             return []
-        right_index = get_last_index(self._partial_matches, value, self._get_key)
-        return self._partial_matches[left_index: right_index + 1]
+        right_index = get_last_index(partial_matches, value, self._get_key)
+        return partial_matches[left_index: right_index + 1]
 
-    def __get_unequal(self, value: int or float):
+    def __get_unequal(self, partial_matches: List[PatternMatch], value: int or float):
         """
         Returns the pattern matches whose keys are not equal to the given value.
         """
-        left_index = get_first_index(self._partial_matches, value, self._get_key)
-        if left_index == len(self._partial_matches) or left_index == -1 or \
-                self._get_key(self._partial_matches[left_index]) != value:
-            return self._partial_matches
-        right_index = get_last_index(self._partial_matches, value, self._get_key)
-        return self._partial_matches[:left_index] + self._partial_matches[right_index + 1:]
+        left_index = get_first_index(partial_matches, value, self._get_key)
+        if left_index == len(partial_matches) or left_index == -1 or \
+                self._get_key(partial_matches[left_index]) != value:
+            return partial_matches
+        right_index = get_last_index(partial_matches, value, self._get_key)
+        return partial_matches[:left_index] + partial_matches[right_index + 1:]
 
-    def __get_greater_aux(self, value: int or float, return_equal: bool):
+    def __get_greater_aux(self, partial_matches: List[PatternMatch], value: int or float, return_equal: bool):
         """
         An auxiliary method for implementing "greater than" or "greater than or equal to" conditions.
         """
-        right_index = get_first_index(self._partial_matches, value, self._get_key) if return_equal \
-            else get_last_index(self._partial_matches, value, self._get_key)
-        if right_index == len(self._partial_matches):
+        right_index = get_first_index(partial_matches, value, self._get_key) if return_equal \
+            else get_last_index(partial_matches, value, self._get_key)
+        if right_index == len(partial_matches):
             return []
         if right_index == -1:
-            return self._partial_matches
+            return partial_matches
         # in case value doesn't exist right_index will point on the first one greater than it
-        if self._get_key(self._partial_matches[right_index]) != value:
-            return self._partial_matches[right_index:]
-        return self._partial_matches[right_index:] if return_equal else self._partial_matches[right_index + 1:]
+        if self._get_key(partial_matches[right_index]) != value:
+            return partial_matches[right_index:]
+        return partial_matches[right_index:] if return_equal else partial_matches[right_index + 1:]
 
-    def __get_greater(self, value: int or float):
+    def __get_greater(self, partial_matches: List[PatternMatch], value: int or float):
         """
         Returns the pattern matches whose keys are greater than the given value.
         """
-        return self.__get_greater_aux(value, False)
+        return self.__get_greater_aux(partial_matches, value, False)
 
-    def __get_greater_or_equal(self, value: int or float):
+    def __get_greater_or_equal(self, partial_matches: List[PatternMatch], value: int or float):
         """
         Returns the pattern matches whose keys are greater than or equal to the given value.
         """
-        return self.__get_greater_aux(value, True)
+        return self.__get_greater_aux(partial_matches, value, True)
 
-    def __get_smaller_aux(self, value: int or float, return_equal: bool):
+    def __get_smaller_aux(self, partial_matches: List[PatternMatch], value: int or float, return_equal: bool):
         """
         An auxiliary method for implementing "smaller than" or "smaller than or equal to" conditions.
         """
-        left_index = get_last_index(self._partial_matches, value, self._get_key) if return_equal \
-            else get_first_index(self._partial_matches, value, self._get_key)
-        if left_index == len(self._partial_matches):
-            return self._partial_matches
+        left_index = get_last_index(partial_matches, value, self._get_key) if return_equal \
+            else get_first_index(partial_matches, value, self._get_key)
+        if left_index == len(partial_matches):
+            return partial_matches
         if left_index == -1:
             return []
         # in case value doesn't exist left_index will point on the first one smaller than it
-        if self._get_key(self._partial_matches[left_index]) != value:
-            return self._partial_matches[: left_index + 1]
-        return self._partial_matches[:left_index + 1] if return_equal else self._partial_matches[:left_index]
+        if self._get_key(partial_matches[left_index]) != value:
+            return partial_matches[: left_index + 1]
+        return partial_matches[:left_index + 1] if return_equal else partial_matches[:left_index]
 
-    def __get_smaller(self, value: int or float):
+    def __get_smaller(self, partial_matches: List[PatternMatch], value: int or float):
         """
         Returns the pattern matches whose keys are smaller than the given value.
         """
-        return self.__get_smaller_aux(value, False)
+        return self.__get_smaller_aux(partial_matches, value, False)
 
-    def __get_smaller_or_equal(self, value: int or float):
+    def __get_smaller_or_equal(self, partial_matches: List[PatternMatch], value: int or float):
         """
         Returns the pattern matches whose keys are smaller than or equal to the given value.
         """
-        return self.__get_smaller_aux(value, True)
+        return self.__get_smaller_aux(partial_matches, value, True)
 
-    def __get_all(self, value: int or float):
+    def __get_all(self, partial_matches: List[PatternMatch], value: int or float):
         """
         Returns all pattern matches regardless of the specified value.
         """
-        return self.get_internal_buffer()
+        return partial_matches
 
     def __generate_get_function(self, rel_op: RelopTypes, equation_side: EquationSides):
         """
@@ -328,22 +543,47 @@ class SortedPatternMatchStorage(PatternMatchStorage):
         if rel_op == RelopTypes.SmallerEqual:
             return self.__get_smaller_or_equal if equation_side == EquationSides.left else self.__get_greater_or_equal
 
+    @staticmethod
+    def __generate_segment_filter(rel_op: RelopTypes, equation_side: EquationSides):
+        """
+        Initializes the function deciding whether a spilled segment may contain pattern matches to be returned upon a
+        get() access. The decision is based on the range of the keys in the segment.
+        """
+        if rel_op is None:
+            return lambda segment, value: True
+        if rel_op == RelopTypes.Equal:
+            return lambda segment, value: segment.min_key <= value <= segment.max_key
+        if rel_op == RelopTypes.NotEqual:
+            return lambda segment, value: not segment.min_key == segment.max_key == value
+
+        fetch_greater = lambda segment, value: segment.max_key > value
+        fetch_greater_or_equal = lambda segment, value: segment.max_key >= value
+        fetch_smaller = lambda segment, value: segment.min_key < value
+        fetch_smaller_or_equal = lambda segment, value: segment.min_key <= value
+        if rel_op == RelopTypes.Greater:
+            return fetch_greater if equation_side == EquationSides.left else fetch_smaller
+        if rel_op == RelopTypes.Smaller:
+            return fetch_smaller if equation_side == EquationSides.left else fetch_greater
+        if rel_op == RelopTypes.GreaterEqual:
+            return fetch_greater_or_equal if equation_side == EquationSides.left else fetch_smaller_or_equal
+        if rel_op == RelopTypes.SmallerEqual:
+            return fetch_smaller_or_equal if equation_side == EquationSides.left else fetch_greater_or_equal
+        return lambda segment, value: True
+
 
 class UnsortedPatternMatchStorage(PatternMatchStorage):
     """
     This class stores pattern matches unsorted.
     It is used when it's difficult to specify an order that helps when receiving partial matches.
     """
-    def __init__(
-        self, clean_up_interval: int, use_load_shedding: bool, latency_threshold_ns: int
-    ):
-        super().__init__(
-            lambda x: x,
-            False,
-            clean_up_interval,
-            use_load_shedding,
-            latency_threshold_ns,
-        )
+    def __init__(self, clean_up_interval: int):
+        super().__init__(lambda x: x, False, clean_up_interval)
+
+    def create_empty_storage(self):
+        """
+        Creates a new empty storage with the same settings as this one.
+        """
+        return UnsortedPatternMatchStorage(self._clean_up_interval)
 
     def add(self, pm: PatternMatch):
         """
@@ -351,32 +591,182 @@ class UnsortedPatternMatchStorage(PatternMatchStorage):
         """
         self._access_count += 1
 
-        if self._use_load_shedding:
-            self._register_partial_in_bucket(pm)
-
-            global latest_number_of_events
-            #print(f"processed events: {test_last_values.get(Metrics.PROCESSED_EVENTS, 0)}, latest at shedding: {latest_number_of_events}, difference: {test_last_values.get(Metrics.PROCESSED_EVENTS, 0) - latest_number_of_events}", file=sys.stderr)
-            if (
-                self._latency_threshold_ns != -1
-                and last_values[Metrics.EVENT_PROCESSING_LATENCY]
-                > self._latency_threshold_ns
-                and test_last_values.get(Metrics.PROCESSED_EVENTS, 0) - latest_number_of_events >= SHEDDER_COOLDOWN  # only shed if cooldown elapsed
-            ):
-                #print("attempting to shed load", file=sys.stderr)
-                try:
-                    removed = bucket_manager.shed_highest_value_buckets(1)  # where highest value means most expensive, unituivitely.
-                    for rid in removed:
-                        self.remove_by_id(rid)
-                    latest_number_of_events = test_last_values.get(Metrics.PROCESSED_EVENTS, 0)
-                    #print("Shedding successful", file=sys.stderr)
-                except Exception:
-                    pass
+        self._partial_matches.append(pm)
+        self._notify_partial_match_added(pm)
 
     def get(self, value: int or float):
         """
         Unconditionally returns all the stored matches regardless of the given value.
         """
-        return self._partial_matches
+        return self.get_internal_buffer()
+
+
+class KeyPartitionedPatternMatchStorage(PatternMatchStorage):
+    """
+    Splits the pattern matches into separate storages according to the value of a partition key, such as the value of
+    an attribute all events of a match must share.
+    A partial match arriving from a sibling node is only compared to the pattern matches of its own partition, and
+    partitions that become empty are dropped during the periodic cleanup. Pattern matches whose partition key cannot
+    be calculated are kept in a separate storage that is returned for every partition.
+    """
+    # the partition key of the pattern matches whose partition key could not be calculated
+    UNKNOWN_KEY = object()
+
+    def __init__(self, template_storage: PatternMatchStorage, get_partition_key: callable):
+        super().__init__(template_storage.get_key_function(), False, template_storage._clean_up_interval)
+        self.__template_storage = template_storage
+        self.__get_partition_key = get_partition_key
+        self.__partitions = {}
+        for pm in template_storage.get_internal_buffer():
+            self.add(pm)
+
+    def get_partition_key(self, pm: PatternMatch):
+        """
+        Returns the partition key of the given pattern match, or UNKNOWN_KEY if it cannot be calculated.
+        """
+        try:
+            partition_key = self.__get_partition_key(pm)
+            hash(partition_key)
+        except Exception:
+            return KeyPartitionedPatternMatchStorage.UNKNOWN_KEY
+        return partition_key
+
+    def get_partitions_count(self):
+        """
+        Returns the number of partitions currently held by this storage.
+        """
+        return len(self.__partitions)
+
+    def __len__(self):
+        return sum(len(partition) for partition in self.__partitions.values())
+
+    def __setitem__(self, index, item):
+        raise Exception("Unsupported operation")
+
+    def __delitem__(self, index):
+        raise Exception("Unsupported operation")
+
+    def add(self, pm: PatternMatch):
+        """
+        Adds the pattern match to the storage of its partition, creating the storage if necessary.
+        """
+        self._access_count += 1
+        partition_key = self.get_partition_key(pm)
+        partition = self.__partitions.get(partition_key)
+        if partition is None:
+            partition = self.__template_storage.create_empty_storage()
+            if self._spill_manager is not None:
+                partition.set_spill_manager(self._spill_manager)
+            partition.set_load_shedder(self._load_shedder)
+            partition.set_profile(self._profile)
+            self.__partitions[partition_key] = partition
+        partition.add(pm)
+
+    def get(self, value: int or float):
+        """
+        Returns the pattern matches corresponding to the given value from all partitions.
+        """
+        if len(self.__partitions) == 1:
+            return next(iter(self.__partitions.values())).get(value)
+        return self.__merge_partitions([partition.get(value) for partition in self.__partitions.values()])
+
+    def get_from_partition(self, partition_key, value: int or float):
+        """
+        Returns the pattern matches corresponding to the given value from the given partition only.
+        """
+        if partition_key is KeyPartitionedPatternMatchStorage.UNKNOWN_KEY:
+            return self.get(value)
+        partition = self.__partitions.get(partition_key)
+        unknown_partition = self.__partitions.get(KeyPartitionedPatternMatchStorage.UNKNOWN_KEY)
+        if unknown_partition is None or len(unknown_partition) == 0:
+            return partition.get(value) if partition is not None else []
+        if partition is None:
+            return unknown_partition.get(value)
+        return self.__merge_partitions([partition.get(value), unknown_partition.get(value)])
+
+    def get_internal_buffer(self):
+        """
+        Returns all pattern matches in the order a single storage would have kept them.
+        """
+        if len(self.__partitions) == 1:
+            return next(iter(self.__partitions.values())).get_internal_buffer()
+        return self.__merge_partitions([partition.get_internal_buffer() for partition in self.__partitions.values()])
+
+    def __merge_partitions(self, partial_match_lists: List[List[PatternMatch]]):
+        """
+        Merges the given lists of pattern matches taken from different partitions.
+        """
+        key = self._get_key if self.__template_storage.is_sorted_by_key() else lambda pm: pm.partial_id
+        return list(heapq.merge(*partial_match_lists, key=key))
+
+    def get_in_memory_size(self):
+        return sum(partition.get_in_memory_size() for partition in self.__partitions.values())
+
+    def try_clean_expired_partial_matches(self, earliest_timestamp: int):
+        """
+        Once the number of additions exceeds the cleanup interval, cleans all partitions and drops the empty ones.
+        """
+        if self._access_count < self._clean_up_interval:
+            return
+        self._clean_expired_partial_matches(earliest_timestamp)
+        self._access_count = 0
+
+    def _clean_expired_partial_matches(self, earliest_timestamp: int):
+        for partition in self.__partitions.values():
+            partition._clean_expired_partial_matches(earliest_timestamp)
+        self.__drop_empty_partitions()
+
+    def remove_partial_matches(self, partial_ids: set):
+        removed_count = sum(partition.remove_partial_matches(partial_ids) for partition in self.__partitions.values())
+        self.__drop_empty_partitions()
+        return removed_count
+
+    def remove_partial_matches_containing(self, events: set):
+        removed_count = sum(partition.remove_partial_matches_containing(events)
+                            for partition in self.__partitions.values())
+        self.__drop_empty_partitions()
+        return removed_count
+
+    def __drop_empty_partitions(self):
+        self.__partitions = {partition_key: partition for partition_key, partition in self.__partitions.items()
+                             if len(partition) > 0}
+
+    def set_spill_manager(self, spill_manager: PartialMatchSpillManager):
+        """
+        Places the storage of every partition, including the ones created later, under the given memory budget.
+        """
+        self._spill_manager = spill_manager
+        for partition in self.__partitions.values():
+            partition.set_spill_manager(spill_manager)
+
+    def set_load_shedder(self, load_shedder):
+        """
+        Lets the given load shedder track the pattern matches of every partition.
+        """
+        self._load_shedder = load_shedder
+        for partition in self.__partitions.values():
+            partition.set_load_shedder(load_shedder)
+
+    def set_profile(self, profile):
+        """
+        Lets the given node profile count the pattern matches removed from every partition.
+        """
+        self._profile = profile
+        for partition in self.__partitions.values():
+            partition.set_profile(profile)
+
+    def spill_oldest_partial_matches(self, count: int):
+        """
+        The partitions are registered at the spill manager directly, hence nothing is spilled at this level.
+        """
+        return 0
+
+    def create_empty_storage(self):
+        return KeyPartitionedPatternMatchStorage(self.__template_storage.create_empty_storage(),
+                                                 self.__get_partition_key)
+
+    def is_sorted_by_key(self):
+        return self.__template_storage.is_sorted_by_key()
 
 
 class TreeStorageParameters:
@@ -390,7 +780,14 @@ class TreeStorageParameters:
         clean_up_interval: int = DefaultConfig.CLEANUP_INTERVAL,
         prioritize_sorting_by_timestamp: bool = DefaultConfig.PRIORITIZE_SORTING_BY_TIMESTAMP,
         use_load_shedding: bool = DefaultConfig.USE_LOAD_SHEDDING,
+        load_shedding_type: LoadSheddingTypes = DefaultConfig.DEFAULT_LOAD_SHEDDING_TYPE,
         latency_threshold_ns: int = DefaultConfig.LATENCY_THRESHOLD_NS,
+        load_shedding_cooldown: int = DefaultConfig.LOAD_SHEDDING_COOLDOWN,
+        load_shedding_max_ratio: float = DefaultConfig.LOAD_SHEDDING_MAX_RATIO,
+        memory_budget: int = DefaultConfig.PARTIAL_MATCH_MEMORY_BUDGET,
+        spill_directory: str = DefaultConfig.PARTIAL_MATCH_SPILL_DIRECTORY,
+        partition_by_key: bool = DefaultConfig.PARTITION_STORAGE_BY_KEY,
+        profile_nodes: bool = DefaultConfig.PROFILE_TREE_NODES,
     ):
         if sort_storage is None:
             sort_storage = DefaultConfig.SHOULD_SORT_STORAGE
@@ -400,6 +797,10 @@ class TreeStorageParameters:
             raise Exception('cleanup interval should be positive.')
         if prioritize_sorting_by_timestamp is None:
             prioritize_sorting_by_timestamp = DefaultConfig.PRIORITIZE_SORTING_BY_TIMESTAMP
+        if load_shedding_max_ratio <= 0 or load_shedding_max_ratio > 1:
+            raise Exception('load shedding ratio should be in (0, 1].')
+        if memory_budget is not None and memory_budget <= 0:
+            raise Exception('memory budget should be positive.')
 
         # True if the user is willing to use non-default sorted storage and False otherwise
         self.sort_storage = sort_storage
@@ -411,6 +812,25 @@ class TreeStorageParameters:
         self.clean_up_interval = clean_up_interval
         self.prioritize_sorting_by_timestamp = prioritize_sorting_by_timestamp
 
-        # State-based load shedding
+        # Load shedding: whenever the processing latency of an event exceeds the threshold, either partial matches
+        # (state-based) or incoming events (input-based) are dropped. Shedding decisions are made at most once per the
+        # given number of events and may drop at most the given fraction of the partial matches or of the input
         self.use_load_shedding = use_load_shedding
+        self.load_shedding_type = load_shedding_type
         self.latency_threshold_ns = latency_threshold_ns
+        self.load_shedding_cooldown = load_shedding_cooldown
+        self.load_shedding_max_ratio = load_shedding_max_ratio
+
+        # The maximal number of partial matches a single tree keeps in memory before spilling the oldest ones to the
+        # disk, or None to keep all partial matches in memory
+        self.memory_budget = memory_budget
+        # The directory of the on-disk store of the spilled partial matches, or None to use a temporary location
+        self.spill_directory = spill_directory
+
+        # True if the storages of a single-pattern tree should be partitioned by an attribute all events of a match
+        # must share according to the pattern condition (if such an attribute exists) and False otherwise
+        self.partition_by_key = partition_by_key
+
+        # True if the tree should count, for each node, the partial matches it creates and drops, the candidates it
+        # examines and the time it spends handling new partial matches, and False otherwise
+        self.profile_nodes = profile_nodes
@@ -3,17 +3,29 @@ from typing import List, Dict
 
 from opencep.base.Pattern import Pattern
 from opencep.base.PatternStructure import PatternStructure, CompositeStructure, UnaryStructure, PrimitiveEventStructure, \
-    NegationOperator
+    NegationOperator, KleeneClosureOperator
+from opencep.condition.BaseRelationCondition import EqCondition
+from opencep.condition.CompositeCondition import AndCondition
+from opencep.condition.Condition import Condition, Variable
 from opencep.misc.ConsumptionPolicy import ConsumptionPolicy
+from opencep.misc.LoadSheddingTypes import LoadSheddingTypes
+from opencep.misc.StateBasedLoadShedder import StateBasedLoadShedder
+from opencep.misc.Utils import get_attribute_function_key
+from opencep.plan.TreeCostModel import IntermediateResultsTreeCostModel
 from opencep.plan.TreePlan import TreePlan, TreePlanNode, TreePlanLeafNode, TreePlanNestedNode, TreePlanUnaryNode, \
     OperatorTypes, TreePlanInternalNode, TreePlanBinaryNode
 from opencep.tree.nodes.AndNode import AndNode
+from opencep.tree.nodes.BinaryNode import BinaryNode
 from opencep.tree.nodes.KleeneClosureNode import KleeneClosureNode
 from opencep.tree.nodes.LeafNode import LeafNode
 from opencep.tree.nodes.NegationNode import NegativeSeqNode, NegativeAndNode, NegationNode
 from opencep.tree.nodes.Node import Node, PatternParameters
+from opencep.tree.ConsumedEventRegistry import ConsumedEventRegistry
 from opencep.tree.PatternMatchStorage import TreeStorageParameters
+from opencep.tree.PartialMatchSpillManager import PartialMatchSpillManager
+from opencep.tree.TreeProfiler import TreeProfiler, format_profile_report
 from opencep.tree.nodes.SeqNode import SeqNode
+from opencep.tree.nodes.UnaryNode import UnaryNode
 
 
 class Tree:
@@ -21,11 +33,24 @@ class Tree:
     Represents an evaluation tree. Implements the functionality of constructing an actual tree from tree plan
     object returned by a tree builder. Other than that, merely acts as a proxy to the tree root node.
     The plan_nodes_to_nodes_map is used in multi-pattern mode.
+    If a memory budget is specified in the storage parameters, all storages of the tree are placed under the given
+    spill manager, or a new one if no manager is given.
+    Similarly, if state-based load shedding is enabled, the partial matches of the tree are tracked and dropped by the
+    given load shedder, or a new one if no shedder is given.
+    If the pattern condition requires all events of a match to share the value of some attribute, the storages of a
+    single-pattern tree are partitioned by this value (unless disabled in the storage parameters).
+    If profiling is enabled in the storage parameters, the counters of the nodes are maintained by the given profiler,
+    or a new one if no profiler is given.
     """
     def __init__(self, tree_plan: TreePlan, pattern: Pattern, storage_params: TreeStorageParameters,
-                 plan_nodes_to_nodes_map: Dict[TreePlanNode, Node] = None):
+                 plan_nodes_to_nodes_map: Dict[TreePlanNode, Node] = None,
+                 spill_manager: PartialMatchSpillManager = None, load_shedder: StateBasedLoadShedder = None,
+                 profiler: TreeProfiler = None):
         self.__plan_nodes_to_nodes_map = plan_nodes_to_nodes_map
-        pattern_parameters = PatternParameters(pattern.window, pattern.confidence)
+        self.__tree_plan = tree_plan
+        # maps each node of this tree to the tree plan node it was created from
+        self.__nodes_to_plan_nodes = {}
+        pattern_parameters = PatternParameters(pattern.window_ns, pattern.confidence)
         # Maps between the event to its order in the original pattern
         self.__event_to_index_mapping = {event: index for index, event in enumerate(pattern.get_primitive_event_names())}
         self.__root = self.__construct_tree(tree_plan.modified_pattern.full_structure, tree_plan.root,
@@ -35,11 +60,34 @@ class Tree:
                 pattern.consumption_policy.should_register_event_type_as_single(True):
             for event_type in pattern.consumption_policy.single_types:
                 self.__root.register_single_event_type(event_type)
+        if pattern.consumption_policy is not None and pattern.consumption_policy.single_event_strategy is not None:
+            # all nodes enforcing the "single" consumption policy share a single registry of consumed events
+            self.__root.propagate_consumption_registry(ConsumedEventRegistry())
 
         self.__apply_condition(pattern)
 
         self.__root.set_is_output_node(True)
         self.__root.create_storage_unit(storage_params)
+        if storage_params.partition_by_key and plan_nodes_to_nodes_map is None:
+            # in multi-pattern mode, nodes may be shared by patterns that do not require the same attribute values
+            partition_attributes = Tree.__get_partition_attributes(pattern)
+            if partition_attributes is not None:
+                self.__root.propagate_partition_attributes(partition_attributes)
+        if spill_manager is None and storage_params.memory_budget is not None:
+            spill_manager = PartialMatchSpillManager(storage_params.memory_budget, storage_params.spill_directory)
+        if spill_manager is not None:
+            self.__root.propagate_spill_manager(spill_manager)
+        if load_shedder is None and storage_params.use_load_shedding and \
+                storage_params.load_shedding_type == LoadSheddingTypes.STATE_BASED:
+            load_shedder = Tree.create_load_shedder(pattern.window_ns, storage_params)
+        self.__load_shedder = load_shedder
+        if load_shedder is not None:
+            self.__root.propagate_load_shedder(load_shedder)
+        if profiler is None and storage_params.profile_nodes:
+            profiler = TreeProfiler()
+        self.__profiler = profiler
+        if profiler is not None:
+            self.__root.propagate_profiler(profiler)
 
         self.__root.create_parent_to_info_dict()
 
@@ -56,22 +104,192 @@ class Tree:
         condition_copy.set_statistics_collector(pattern.condition.get_statistics_collector())
         self.__root.apply_condition(condition_copy)
 
+    @staticmethod
+    def __get_partition_attributes(pattern: Pattern):
+        """
+        Searches the condition of the given pattern for a chain of equality conditions forcing all positive events of a
+        match to share the value of an attribute, e.g., "a.Ticker == b.Ticker AND b.Ticker == c.Ticker". Each negative
+        event must be directly compared to this attribute as well, as it could otherwise invalidate matches from all
+        partitions.
+        Returns a dictionary mapping each event name to the function extracting this attribute from its events, or None
+        if no such chain exists. Patterns containing Kleene closure operators are not supported.
+        """
+        positive_names = set(pattern.get_primitive_event_names(positive_only=True))
+        negative_names = set(pattern.get_primitive_event_names()) - positive_names
+        if len(positive_names) < 2 or Tree.__contains_kleene_closure(pattern.full_structure):
+            return None
+        # each equality is described as a pair of (event name, attribute key, attribute function) triplets
+        equalities = []
+        for condition in Tree.__get_conjuncts(pattern.condition):
+            # an equality to a constant only keeps a single term and does not relate two events
+            if isinstance(condition, EqCondition) and len(condition.terms) == 2 and \
+                    all(isinstance(term, Variable) for term in condition.terms):
+                equalities.append(tuple((variable.name, get_attribute_function_key(variable.getattr_func),
+                                         variable.getattr_func) for variable in condition.terms))
+
+        # union-find over the (event name, attribute key) pairs of the positive events
+        representatives = {}
+        attribute_functions = {}
+
+        def find(item):
+            while representatives[item] != item:
+                representatives[item] = representatives[representatives[item]]
+                item = representatives[item]
+            return item
+
+        for equality in equalities:
+            if any(name not in positive_names for name, _, _ in equality):
+                # an equality to a negative event does not constrain the positive events
+                continue
+            items = []
+            for name, key, attribute_function in equality:
+                representatives.setdefault((name, key), (name, key))
+                attribute_functions.setdefault((name, key), attribute_function)
+                items.append((name, key))
+            representatives[find(items[0])] = find(items[1])
+
+        components = {}
+        for item in representatives:
+            components.setdefault(find(item), []).append(item)
+        for items in components.values():
+            names = [name for name, _ in items]
+            if len(names) != len(set(names)) or set(names) != positive_names:
+                continue
+            partition_attributes = {name: attribute_functions[item] for item, name in zip(items, names)}
+            for equality in equalities:
+                for (name, _, attribute_function), (other_name, other_key, _) in (equality, equality[::-1]):
+                    if name in negative_names and name not in partition_attributes and \
+                            (other_name, other_key) in items:
+                        partition_attributes[name] = attribute_function
+            if not negative_names.issubset(partition_attributes.keys()):
+                return None
+            return partition_attributes
+        return None
+
+    @staticmethod
+    def __get_conjuncts(condition: Condition):
+        """
+        Returns the atomic conditions that must all hold for the given condition to hold.
+        """
+        if type(condition) != AndCondition:
+            return [condition]
+        return [atomic_condition for sub_condition in condition.get_conditions_list()
+                for atomic_condition in Tree.__get_conjuncts(sub_condition)]
+
+    @staticmethod
+    def __contains_kleene_closure(structure: PatternStructure):
+        """
+        Returns True if the given pattern structure contains a Kleene closure operator and False otherwise.
+        """
+        if isinstance(structure, KleeneClosureOperator):
+            return True
+        if isinstance(structure, UnaryStructure):
+            return Tree.__contains_kleene_closure(structure.arg)
+        if isinstance(structure, CompositeStructure):
+            return any(Tree.__contains_kleene_closure(arg) for arg in structure.args)
+        return False
+
     def get_leaves(self):
         return self.__root.get_leaves()
 
     def get_matches(self):
         while self.__root.has_unreported_matches():
-            yield self.__root.get_next_unreported_match()
+            match = self.__root.get_next_unreported_match()
+            if self.__load_shedder is not None:
+                self.__load_shedder.register_full_match(match)
+            yield match
+
+    def get_load_shedder(self):
+        return self.__load_shedder
+
+    def apply_load_shedding(self, latency_ns: int, last_timestamp: int):
+        """
+        Lets the load shedder of this tree (if any) drop partial matches given the processing latency of the last event.
+        """
+        if self.__load_shedder is not None:
+            self.__load_shedder.handle_event(latency_ns, last_timestamp)
+
+    @staticmethod
+    def create_load_shedder(time_window: int, storage_params: TreeStorageParameters):
+        """
+        Creates a load shedder for a tree with the given time window according to the given storage parameters.
+        """
+        return StateBasedLoadShedder(time_window, storage_params.latency_threshold_ns,
+                                     storage_params.load_shedding_cooldown, storage_params.load_shedding_max_ratio)
 
     def get_partial_matches(self):
         return [pm for leaf in self.get_leaves() for pm in leaf.get_partial_matches()]
 
+    def get_partial_matches_count(self):
+        """
+        Returns the number of partial matches stored at the leaves without fetching them.
+        """
+        return sum(len(leaf.get_storage_unit()) for leaf in self.get_leaves())
+
     def get_structure_summary(self):
         """
         Returns a tuple summarizing the structure of the tree.
         """
         return self.__root.get_structure_summary()
 
+    def get_profiler(self):
+        return self.__profiler
+
+    def get_profile(self, statistics: dict = None):
+        """
+        Returns the profile of each node of the tree in a depth-first order, side by side with the number of partial
+        matches the node was expected to hold within a single time window according to the intermediate results cost
+        model. The expected sizes are calculated from the given statistics, or from the statistics of the pattern if
+        none are given. If no statistics are available, or for nodes created from a nested tree plan node, the expected
+        size is None.
+        The actual size of a node is the number of partial matches added to it, normalized to the length of the time
+        window over the time span of the events received so far.
+        """
+        if self.__profiler is None:
+            raise Exception("Profiling is disabled for this tree")
+        pattern = self.__tree_plan.modified_pattern
+        if statistics is None:
+            statistics = pattern.statistics
+        predicted_sizes = {} if statistics is None else \
+            IntermediateResultsTreeCostModel().get_intermediate_results_sizes(pattern, self.__tree_plan.root, statistics)
+        duration = self.__profiler.get_observed_duration()
+        windows_count = duration / pattern.window_ns if duration > 0 else None
+        rows = []
+        self.__collect_profile(self.__root, 0, predicted_sizes, windows_count, rows)
+        return rows
+
+    def get_profile_report(self, statistics: dict = None):
+        """
+        Returns the profile of the tree as returned by get_profile, formatted as a table with one line per node.
+        """
+        return format_profile_report(self.get_profile(statistics))
+
+    def __collect_profile(self, node: Node, depth: int, predicted_sizes: Dict[TreePlanNode, float],
+                          windows_count: float, rows: List[dict]):
+        """
+        Appends the profile rows of the subtree of the given node to the given list.
+        """
+        plan_node = self.__nodes_to_plan_nodes.get(node)
+        if isinstance(node, LeafNode):
+            name = "%s (%s)" % (node.get_event_name(), node.get_event_type())
+        elif isinstance(plan_node, TreePlanInternalNode):
+            name = plan_node.operator.name
+        else:
+            name = type(node).__name__
+        profile = node.get_profile()
+        row = dict(node=name, depth=depth, predicted_size=predicted_sizes.get(plan_node),
+                   actual_size=None if windows_count is None else profile.partial_matches_added / windows_count,
+                   **profile.to_dict())
+        rows.append(row)
+        if isinstance(node, BinaryNode):
+            children = [node.get_left_subtree(), node.get_right_subtree()]
+        elif isinstance(node, UnaryNode):
+            children = [node.get_child()]
+        else:
+            children = []
+        for child in children:
+            self.__collect_profile(child, depth + 1, predicted_sizes, windows_count, rows)
+
     @staticmethod
     def __get_operator_arg_list(operator: PatternStructure):
         """
@@ -169,6 +387,7 @@ class Tree:
         # check whether the node corresponding to tree_plan already exists
         node = self.__get_existing_node(tree_plan, pattern_params, parent)
         if node is not None:
+            self.__nodes_to_plan_nodes.setdefault(node, tree_plan)
             return node
 
         if isinstance(tree_plan, TreePlanUnaryNode):
@@ -198,6 +417,8 @@ class Tree:
             raise Exception("Unknown tree plan node type")
 
         self.__register_new_node(tree_plan, node)
+        # a node created from a nested plan node is already mapped to the root of the nested plan
+        self.__nodes_to_plan_nodes.setdefault(node, tree_plan)
         return node
 
     def __get_existing_node(self, tree_plan: TreePlanNode, pattern_params: PatternParameters, parent: Node):
@@ -0,0 +1,169 @@
+"""
+This file contains the classes collecting the per-node profile of an evaluation tree, used to compare the actual
+behavior of each node with the estimations of the cost model the tree plan was created by.
+"""
+import time
+from typing import List
+
+
+class NodeProfile:
+    """
+    The counters of a single evaluation tree node:
+    - the partial matches added to the node, and the ones removed from its storage once expired, dropped by the load
+      shedder or purged due to the "single" consumption policy;
+    - the partial matches moved from the storage of the node to the disk in order to enforce the memory budget;
+    - the join probes, that is, the notifications of a new partial match handled by the node, and the candidates
+      examined, that is, the sets of partial matches (or events, for a leaf) validated by the node;
+    - the condition evaluations and the number of evaluations the condition was satisfied by;
+    - the total time spent in handle_new_partial_match, including (handling_time_ns) and excluding
+      (self_handling_time_ns) the time spent by the ancestors handling the resulting partial matches;
+    - the timestamps of the first and the last event received by the node, only set for leaves.
+    """
+    def __init__(self, profiler):
+        self.partial_matches_added = 0
+        self.partial_matches_expired = 0
+        self.partial_matches_shed = 0
+        self.partial_matches_purged = 0
+        self.partial_matches_spilled = 0
+        self.join_probes = 0
+        self.candidates_examined = 0
+        self.condition_evaluations = 0
+        self.condition_passes = 0
+        self.handling_time_ns = 0
+        self.self_handling_time_ns = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.__profiler = profiler
+        self.__handling_start_ns = None
+
+    def register_event(self, timestamp: int):
+        """
+        Registers the arrival of an event with the given timestamp at a leaf.
+        """
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+
+    def register_condition_evaluation(self, result: bool):
+        """
+        Registers a single evaluation of the condition of the node.
+        """
+        self.condition_evaluations += 1
+        if result:
+            self.condition_passes += 1
+
+    def start_handling(self):
+        """
+        Registers the beginning of the handling of a new partial match received from a child.
+        """
+        self.join_probes += 1
+        self.__handling_start_ns = self.__profiler.enter_handler()
+
+    def stop_handling(self):
+        """
+        Registers the end of the handling of a new partial match received from a child.
+        """
+        elapsed_ns, self_elapsed_ns = self.__profiler.exit_handler(self.__handling_start_ns)
+        self.handling_time_ns += elapsed_ns
+        self.self_handling_time_ns += self_elapsed_ns
+
+    def get_pass_rate(self):
+        """
+        Returns the fraction of the condition evaluations the condition was satisfied by, or None if the condition was
+        never evaluated.
+        """
+        if self.condition_evaluations == 0:
+            return None
+        return self.condition_passes / self.condition_evaluations
+
+    def to_dict(self):
+        return {"added": self.partial_matches_added, "expired": self.partial_matches_expired,
+                "shed": self.partial_matches_shed, "purged": self.partial_matches_purged,
+                "spilled": self.partial_matches_spilled, "probes": self.join_probes,
+                "candidates": self.candidates_examined, "evaluations": self.condition_evaluations,
+                "pass_rate": self.get_pass_rate(),
+                "handling_time_ns": self.handling_time_ns, "self_handling_time_ns": self.self_handling_time_ns}
+
+
+class TreeProfiler:
+    """
+    Creates the profiles of the nodes of an evaluation tree (or of several trees sharing nodes) and keeps track of the
+    nested invocations of handle_new_partial_match, such that the time spent by a node can be separated from the time
+    spent by its ancestors.
+    """
+    def __init__(self):
+        self.__profiles = []
+        # the time spent by nested handlers in each currently active handler, the innermost one being the last
+        self.__nested_times_ns = []
+
+    def create_node_profile(self):
+        """
+        Creates the profile of a new node.
+        """
+        profile = NodeProfile(self)
+        self.__profiles.append(profile)
+        return profile
+
+    def enter_handler(self):
+        """
+        Registers the beginning of a handler and returns its start time.
+        """
+        self.__nested_times_ns.append(0)
+        return time.perf_counter_ns()
+
+    def exit_handler(self, start_ns: int):
+        """
+        Registers the end of the innermost active handler and returns its duration, both including and excluding the
+        nested handlers.
+        """
+        elapsed_ns = time.perf_counter_ns() - start_ns
+        nested_time_ns = self.__nested_times_ns.pop()
+        if len(self.__nested_times_ns) > 0:
+            self.__nested_times_ns[-1] += elapsed_ns
+        return elapsed_ns, elapsed_ns - nested_time_ns
+
+    def get_observed_duration(self):
+        """
+        Returns the time (in nanoseconds) between the first and the last event received by the profiled leaves.
+        """
+        first_timestamps = [profile.first_timestamp for profile in self.__profiles
+                            if profile.first_timestamp is not None]
+        if len(first_timestamps) == 0:
+            return 0
+        return max(profile.last_timestamp for profile in self.__profiles if profile.last_timestamp is not None) - \
+            min(first_timestamps)
+
+
+# the columns of the profile report and the keys of the respective values in the profile rows
+PROFILE_REPORT_COLUMNS = [("node", "node"), ("predicted", "predicted_size"), ("actual", "actual_size"),
+                          ("added", "added"), ("expired", "expired"), ("shed", "shed"), ("purged", "purged"),
+                          ("spilled", "spilled"), ("probes", "probes"), ("candidates", "candidates"),
+                          ("evals", "evaluations"), ("pass rate", "pass_rate"), ("time ms", "handling_time_ns"),
+                          ("self ms", "self_handling_time_ns")]
+
+
+def format_profile_report(rows: List[dict]):
+    """
+    Formats the given profile rows, as returned by Tree.get_profile, as a table with one line per node. Each node is
+    indented according to its depth in the tree.
+    """
+    lines = [[title for title, _ in PROFILE_REPORT_COLUMNS]]
+    for row in rows:
+        line = []
+        for title, key in PROFILE_REPORT_COLUMNS:
+            value = row.get(key)
+            if key == "node":
+                line.append("  " * row["depth"] + value)
+            elif value is None:
+                line.append("-")
+            elif key.endswith("_ns"):
+                line.append("%.3f" % (value / 1000000,))
+            elif isinstance(value, float):
+                line.append("%.3f" % (value,))
+            else:
+                line.append(str(value))
+        lines.append(line)
+    widths = [max(len(line[i]) for line in lines) for i in range(len(PROFILE_REPORT_COLUMNS))]
+    return "\n".join("  ".join([line[0].ljust(widths[0])] +
+                               [value.rjust(width) for value, width in zip(line[1:], widths[1:])])
+                     for line in lines)
@@ -1,4 +1,4 @@
-from datetime import timedelta, datetime
+from datetime import timedelta
 from typing import Dict
 from opencep.base.Event import Event
 from opencep.base.Pattern import Pattern
@@ -32,7 +32,7 @@ class SimultaneousTreeBasedEvaluationMechanism(TreeBasedEvaluationMechanism):
         self.__tree_update_time = None
         self.__last_matches_from_old_tree = None
 
-    def _tree_update(self, new_tree: Tree, tree_update_time: datetime):
+    def _tree_update(self, new_tree: Tree, tree_update_time: int):
         """
         Registers a new tree and moves from single tree state to simultaneous state
         where the events are played in a parallel fashion on both trees.
@@ -42,7 +42,7 @@ class SimultaneousTreeBasedEvaluationMechanism(TreeBasedEvaluationMechanism):
         self.__new_event_types_listeners = self._register_event_listeners(self.__new_tree)
         self.__is_simultaneous_state = True
 
-    def _should_try_reoptimize(self, last_statistics_refresh_time: timedelta, last_event: Event):
+    def _should_try_reoptimize(self, last_statistics_refresh_time: int, last_event: Event):
         """
         If the simultaneous state is activated, there is no need for new statistics.
         This function avoids a situation where there are more than two trees in parallel.
@@ -59,7 +59,7 @@ class SimultaneousTreeBasedEvaluationMechanism(TreeBasedEvaluationMechanism):
         if self.__is_simultaneous_state:
             # After this round we ask if we are in a simultaneous state.
             # If the pattern window is over then we want to return to single tree state.
-            if event.max_timestamp - self.__tree_update_time > self._pattern.window:
+            if event.max_timestamp - self.__tree_update_time > self._pattern.window_ns:
                 # Passes pending matches from the old tree to the new tree if the root is a NegationNode
                 self.__last_matches_from_old_tree = self._tree.get_last_matches()
 
@@ -0,0 +1,71 @@
+from typing import List
+
+from opencep.tree.Tree import Tree
+from opencep.tree.nodes.BinaryNode import BinaryNode
+from opencep.tree.nodes.LeafNode import LeafNode
+from opencep.tree.nodes.Node import Node
+from opencep.tree.nodes.UnaryNode import UnaryNode
+from opencep.tree.evaluation.TrivialTreeBasedEvaluationMechnism import TrivialTreeBasedEvaluationMechanism
+
+
+class StateMigrationTreeBasedEvaluationMechanism(TrivialTreeBasedEvaluationMechanism):
+    """
+    Whenever a new tree is given, replaces the old tree with the new one after migrating the state of the old tree.
+    The partial matches of each node in the new tree are copied from an equivalent node of the old tree if one exists,
+    and are otherwise calculated by joining the (already migrated) partial matches of its children. Thus, only the
+    joins that do not exist in the old tree are recomputed.
+    If the new tree contains nodes whose state cannot be migrated, falls back to replaying the old events.
+    """
+
+    def _tree_update(self, new_tree: Tree, tree_update_time: int):
+        """
+        Replaces the old tree with the new tree, migrating the partial matches between them.
+        """
+        migration_plan = self.__create_migration_plan(self._tree.get_root(), new_tree.get_root())
+        if migration_plan is None:
+            super()._tree_update(new_tree, tree_update_time)
+            return
+        for new_node, old_node in migration_plan:
+            if old_node is not None:
+                new_node.import_partial_matches(old_node)
+            else:
+                new_node.recompute_partial_matches()
+        self._tree = new_tree
+        self._event_types_listeners = self._register_event_listeners(new_tree)
+
+    @staticmethod
+    def __create_migration_plan(old_root: Node, new_root: Node):
+        """
+        Returns the list of the nodes of the new tree in a bottom-up order, each coupled with its equivalent node in the
+        old tree or None if such a node does not exist. Returns None if the state of the old tree cannot be migrated.
+        """
+        old_nodes_by_event_names = {}
+        for old_node in StateMigrationTreeBasedEvaluationMechanism.__get_nodes_bottom_up(old_root):
+            event_names = frozenset(event_def.name for event_def in old_node.get_positive_event_definitions())
+            old_nodes_by_event_names.setdefault(event_names, []).append(old_node)
+
+        migration_plan = []
+        for new_node in StateMigrationTreeBasedEvaluationMechanism.__get_nodes_bottom_up(new_root):
+            if not new_node.supports_state_migration():
+                return None
+            event_names = frozenset(event_def.name for event_def in new_node.get_positive_event_definitions())
+            equivalent_node = next((old_node for old_node in old_nodes_by_event_names.get(event_names, [])
+                                    if old_node.supports_state_migration() and old_node.is_equivalent(new_node)),
+                                   None)
+            if equivalent_node is None and isinstance(new_node, LeafNode):
+                # a leaf has no children to calculate its partial matches from
+                return None
+            migration_plan.append((new_node, equivalent_node))
+        return migration_plan
+
+    @staticmethod
+    def __get_nodes_bottom_up(root: Node) -> List[Node]:
+        """
+        Returns the nodes of the tree rooted at the given node such that every node appears after its children.
+        """
+        if isinstance(root, BinaryNode):
+            return StateMigrationTreeBasedEvaluationMechanism.__get_nodes_bottom_up(root.get_left_subtree()) + \
+                   StateMigrationTreeBasedEvaluationMechanism.__get_nodes_bottom_up(root.get_right_subtree()) + [root]
+        if isinstance(root, UnaryNode):
+            return StateMigrationTreeBasedEvaluationMechanism.__get_nodes_bottom_up(root.get_child()) + [root]
+        return [root]
@@ -1,5 +1,6 @@
 import time
 from abc import ABC
+from collections import deque
 from datetime import timedelta
 from typing import Dict
 
@@ -9,10 +10,15 @@ from opencep.adaptive.optimizer import Optimizer
 from opencep.base.DataFormatter import DataFormatter
 from opencep.base.Event import Event
 from opencep.evaluation.EvaluationMechanism import EvaluationMechanism
+from opencep.misc import DefaultConfig
 from opencep.misc.ConsumptionPolicy import *
+from opencep.misc.InputBasedLoadShedder import InputBasedLoadShedder
+from opencep.misc.LoadSheddingTypes import LoadSheddingTypes
+from opencep.misc.Timestamps import to_duration_ns
 from opencep.misc.Utils import *
 from opencep.plan.TreePlan import TreePlan
 from opencep.stream.Stream import InputStream, OutputStream
+from opencep.tree.LeafPredicateIndex import EventTypeListeners
 from opencep.tree.nodes.LeafNode import LeafNode
 from opencep.tree.PatternMatchStorage import TreeStorageParameters
 from opencep.tree.MultiPatternTree import MultiPatternTree
@@ -43,13 +49,26 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
         self.__optimizer = optimizer
 
         self._event_types_listeners = {}
-        self.__statistics_update_time_window = statistics_update_time_window
+        self.__statistics_update_time_window = to_duration_ns(statistics_update_time_window)
+
+        # In the input-based load shedding mode, events are dropped before they are played on the tree
+        self.__input_load_shedder = None
+        if storage_params.use_load_shedding and storage_params.load_shedding_type == LoadSheddingTypes.INPUT_BASED:
+            self.__input_load_shedder = InputBasedLoadShedder(storage_params.latency_threshold_ns,
+                                                              storage_params.load_shedding_cooldown,
+                                                              storage_params.load_shedding_max_ratio)
 
         # The remainder of the initialization process is only relevant for the freeze map feature. This feature can
         # only be enabled in single-pattern mode.
         self._pattern = list(pattern_to_tree_plan_map)[0] if not self.__is_multi_pattern_mode else None
         self.__freeze_map = {}
-        self.__active_freezers = []
+        # the names of the leaves blocked by a freezer event of each type
+        self.__event_type_to_blocked_names = {}
+        # the active freezer events, and the same events in the order of their arrival for an efficient expiration
+        self.__active_freezers = set()
+        self.__freezers_by_arrival = deque()
+        # the number of active freezers blocking each leaf name
+        self.__blocked_name_counts = {}
 
         if not self.__is_multi_pattern_mode and self._pattern.consumption_policy is not None and \
                 self._pattern.consumption_policy.freeze_names is not None:
@@ -60,15 +79,18 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
         Activates the tree evaluation mechanism on the input event stream and reports all found pattern matches to the
         given output stream.
         """
-        self._event_types_listeners = self._register_event_listeners(self._tree)
+        # the leaf conditions are only indexed in multi-pattern mode, where many leaves share an event type
+        self._event_types_listeners = self._register_event_listeners(self._tree, self.__is_multi_pattern_mode)
         last_statistics_refresh_time = None
 
         for raw_event in events:
             start_ns = time.perf_counter_ns()
 
-            event = Event(raw_event, data_formatter)
+            event = Event(raw_event, data_formatter, self._event_types_listeners)
             if event.type not in self._event_types_listeners:
                 continue
+            if self.__input_load_shedder is not None and self.__input_load_shedder.should_drop(event.type):
+                continue
             self.__remove_expired_freezers(event)
 
             if not self.__is_multi_pattern_mode and self.__statistics_collector is not None:
@@ -79,10 +101,13 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
             self._get_matches(matches)
 
             end_ns = time.perf_counter_ns()
+            self._tree.apply_load_shedding(end_ns - start_ns, event.max_timestamp)
+            if self.__input_load_shedder is not None:
+                self.__input_load_shedder.handle_event(end_ns - start_ns)
             metrics.mark_hist_point(
                 metrics.Metrics.EVENT_PROCESSING_LATENCY,
                 end_ns - start_ns,
-                {"partial_matches": len(self._tree.get_partial_matches())},
+                {"partial_matches": self._tree.get_partial_matches_count()},
                 end_ns,
             )
             metrics.increment_counter(metrics.Metrics.PROCESSED_EVENTS, end_ns)
@@ -92,7 +117,7 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
         self._get_last_pending_matches(matches)
         matches.close()
 
-    def __perform_reoptimization(self, last_statistics_refresh_time: timedelta, last_event: Event):
+    def __perform_reoptimization(self, last_statistics_refresh_time: int, last_event: Event):
         """
         If needed, reoptimizes the evaluation mechanism to reflect the current statistical properties of the
         input event stream.
@@ -102,14 +127,17 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
             # it is not yet time to recalculate the statistics
             return last_statistics_refresh_time
         new_statistics = self.__statistics_collector.get_statistics()
-        if self.__optimizer.should_optimize(new_statistics, self._pattern):
+        statistics_confidence = self.__statistics_collector.get_statistics_confidence()
+        if self.__optimizer.should_optimize(new_statistics, self._pattern, statistics_confidence):
             new_tree_plan = self.__optimizer.build_new_plan(new_statistics, self._pattern)
-            new_tree = Tree(new_tree_plan, self._pattern, self.__storage_params)
+            # the new tree keeps the utilities learned by the load shedder of the old one
+            new_tree = Tree(new_tree_plan, self._pattern, self.__storage_params,
+                            load_shedder=self._tree.get_load_shedder())
             self._tree_update(new_tree, last_event.max_timestamp)
         # this is the new last statistic refresh time
         return last_event.max_timestamp
 
-    def _should_try_reoptimize(self, last_statistics_refresh_time: timedelta, last_event: Event):
+    def _should_try_reoptimize(self, last_statistics_refresh_time: int, last_event: Event):
         """
         Returns True if statistic recalculation and a reoptimization attempt can now be performed and False otherwise.
         The default implementation merely checks whether enough time has passed since the last reoptimization attempt.
@@ -129,7 +157,7 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
         """
         Lets the tree handle the event
         """
-        for leaf in event_types_listeners[event.type]:
+        for leaf in event_types_listeners[event.type].get_accepting_leaves(event):
             if self._should_ignore_events_on_leaf(leaf, event_types_listeners):
                 continue
             self.__try_register_freezer(event, leaf)
@@ -144,12 +172,15 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
         for match in self._tree.get_matches():
             matches.add_item(match)
             metrics.increment_counter(metrics.Metrics.DETECTED_MATCHES, time_ns)
+            if self.__input_load_shedder is not None:
+                self.__input_load_shedder.register_full_match(match)
             self._remove_matched_freezers(match.events)
 
     @staticmethod
-    def _register_event_listeners(tree: Tree):
+    def _register_event_listeners(tree: Tree, use_predicate_index: bool = False):
         """
         Given tree, register leaf listeners for event types.
+        If requested, the listeners of event types with sufficiently many leaves are indexed by the leaf conditions.
         """
         event_types_listeners = {}
         for leaf in tree.get_leaves():
@@ -157,7 +188,11 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
             if event_type in event_types_listeners:
                 event_types_listeners[event_type].append(leaf)
             else:
-                event_types_listeners[event_type] = [leaf]
+                event_types_listeners[event_type] = EventTypeListeners([leaf])
+        if use_predicate_index:
+            for listeners in event_types_listeners.values():
+                if len(listeners) >= DefaultConfig.LEAF_PREDICATE_INDEX_MIN_LEAVES:
+                    listeners.build_predicate_index()
         return event_types_listeners
 
     def __init_freeze_map(self):
@@ -178,51 +213,81 @@ class TreeBasedEvaluationMechanism(EvaluationMechanism, ABC):
                         break
             if len(current_event_name_set) > 0:
                 self.__freeze_map[freezer_event_name] = current_event_name_set
+        # a freezer event blocks the leaves in the freeze map entries of all freezer leaves of its type
+        for leaf in self._tree.get_leaves():
+            if leaf.get_event_name() not in self.__freeze_map:
+                continue
+            blocked_names = self.__event_type_to_blocked_names.setdefault(leaf.get_event_type(), set())
+            blocked_names |= self.__freeze_map[leaf.get_event_name()]
 
     def _should_ignore_events_on_leaf(self, leaf: LeafNode, event_types_listeners):
         """
         If the 'freeze' consumption policy is enabled, checks whether the given event should be dropped based on it.
         """
-        if len(self.__freeze_map) == 0:
-            # freeze option disabled
+        if len(self.__blocked_name_counts) == 0:
+            # freeze option disabled or no active freezers
             return False
-        for freezer in self.__active_freezers:
-            for freezer_leaf in event_types_listeners[freezer.type]:
-                if freezer_leaf.get_event_name() not in self.__freeze_map:
-                    continue
-                if leaf.get_event_name() in self.__freeze_map[freezer_leaf.get_event_name()]:
-                    return True
-        return False
+        return leaf.get_event_name() in self.__blocked_name_counts
 
     def __try_register_freezer(self, event: Event, leaf: LeafNode):
         """
         Check whether the current event is a freezer event, and, if positive, register it.
         """
-        if leaf.get_event_name() in self.__freeze_map.keys():
-            self.__active_freezers.append(event)
+        if leaf.get_event_name() not in self.__freeze_map or event in self.__active_freezers:
+            return
+        self.__active_freezers.add(event)
+        self.__freezers_by_arrival.append(event)
+        for name in self.__event_type_to_blocked_names[event.type]:
+            self.__blocked_name_counts[name] = self.__blocked_name_counts.get(name, 0) + 1
+
+    def __release_freezer(self, freezer: Event):
+        """
+        Deactivates the given freezer and unblocks the leaves no other active freezer is blocking.
+        The freezer is lazily removed from the arrival order upon its expiration.
+        """
+        self.__active_freezers.remove(freezer)
+        for name in self.__event_type_to_blocked_names[freezer.type]:
+            if self.__blocked_name_counts[name] == 1:
+                del self.__blocked_name_counts[name]
+            else:
+                self.__blocked_name_counts[name] -= 1
 
     def _remove_matched_freezers(self, match_events: List[Event]):
         """
         Removes the freezers that have been matched.
         """
-        if len(self.__freeze_map) == 0:
-            # freeze option disabled
-            return False
-        self.__active_freezers = [freezer for freezer in self.__active_freezers if freezer not in match_events]
+        if len(self.__active_freezers) == 0:
+            # freeze option disabled or no active freezers
+            return
+        for event in match_events:
+            if event in self.__active_freezers:
+                self.__release_freezer(event)
 
     def __remove_expired_freezers(self, event: Event):
         """
         Removes the freezers that have been expired.
         """
-        if len(self.__freeze_map) == 0:
-            # freeze option disabled
-            return False
-        self.__active_freezers = [freezer for freezer in self.__active_freezers
-                                  if event.max_timestamp - freezer.min_timestamp <= self._pattern.window]
+        if len(self.__freezers_by_arrival) == 0:
+            # freeze option disabled or no registered freezers
+            return
+        while len(self.__freezers_by_arrival) > 0 and \
+                event.max_timestamp - self.__freezers_by_arrival[0].min_timestamp > self._pattern.window_ns:
+            freezer = self.__freezers_by_arrival.popleft()
+            if freezer in self.__active_freezers:
+                self.__release_freezer(freezer)
+
+    def get_input_load_shedder(self):
+        """
+        Returns the input-based load shedder of this evaluation mechanism, or None if input-based shedding is disabled.
+        """
+        return self.__input_load_shedder
 
     def get_structure_summary(self):
         return self._tree.get_structure_summary()
 
+    def get_profile_report(self):
+        return self._tree.get_profile_report()
+
     def __repr__(self):
         return self.get_structure_summary()
 
@@ -11,3 +11,6 @@ class TreeEvaluationMechanismUpdateTypes(Enum):
 
     # maintains both the old and the new tree simultaneously until the current window expires
     SIMULTANEOUS_TREE_EVALUATION = 1,
+
+    # replaces the old tree immediately, migrating the partial matches of shared subexpressions to the new tree
+    STATE_MIGRATION_TREE_EVALUATION = 2,
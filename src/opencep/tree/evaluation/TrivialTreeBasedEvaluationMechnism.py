@@ -1,5 +1,4 @@
 import heapq
-from datetime import datetime
 from opencep.base.Event import Event
 from opencep.stream.Stream import OutputStream
 from opencep.tree.Tree import Tree
@@ -12,7 +11,7 @@ class TrivialTreeBasedEvaluationMechanism(TreeBasedEvaluationMechanism):
     Whenever a new tree is given, replaces the old tree with the new one.
     """
 
-    def _tree_update(self, new_tree: Tree, tree_update_time: datetime):
+    def _tree_update(self, new_tree: Tree, tree_update_time: int):
         """
         Directly replaces the old tree with the new tree.
         """
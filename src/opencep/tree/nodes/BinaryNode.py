@@ -1,9 +1,10 @@
 from abc import ABC
 from datetime import timedelta
-from typing import List, Set
+from operator import itemgetter
+from typing import Dict, List, Set, Tuple
 
 from opencep.base.Event import Event
-from opencep.misc.Utils import calculate_joint_probability
+from opencep.misc.Utils import calculate_joint_probability, merge_according_to
 from opencep.condition.Condition import Condition, Variable, EquationSides
 from opencep.condition.BaseRelationCondition import BaseRelationCondition
 from opencep.base.PatternMatch import PatternMatch
@@ -21,6 +22,11 @@ class BinaryNode(InternalNode, ABC):
         super().__init__(pattern_params, parents, pattern_ids, event_defs)
         self._left_subtree = left
         self._right_subtree = right
+        # maps a pair of event definition lists to the function reordering the concatenation of their events
+        self.__index_merge_functions = {}
+        # True if the storages of both subtrees are partitioned by key, such that only the partial matches of the same
+        # partition have to be compared
+        self.__use_partitioned_lookup = False
 
     def create_parent_to_info_dict(self):
         if self._left_subtree is not None:
@@ -83,6 +89,36 @@ class BinaryNode(InternalNode, ABC):
         self._left_subtree.propagate_pattern_id(pattern_id)
         self._right_subtree.propagate_pattern_id(pattern_id)
 
+    def propagate_spill_manager(self, spill_manager):
+        self._partial_matches.set_spill_manager(spill_manager)
+        self._left_subtree.propagate_spill_manager(spill_manager)
+        self._right_subtree.propagate_spill_manager(spill_manager)
+
+    def propagate_load_shedder(self, load_shedder):
+        self._partial_matches.set_load_shedder(load_shedder)
+        self._left_subtree.propagate_load_shedder(load_shedder)
+        self._right_subtree.propagate_load_shedder(load_shedder)
+
+    def propagate_profiler(self, profiler):
+        self._set_profiler(profiler)
+        self._left_subtree.propagate_profiler(profiler)
+        self._right_subtree.propagate_profiler(profiler)
+
+    def propagate_consumption_registry(self, consumption_registry):
+        self._consumption_registry = consumption_registry
+        self._left_subtree.propagate_consumption_registry(consumption_registry)
+        self._right_subtree.propagate_consumption_registry(consumption_registry)
+
+    def propagate_partition_attributes(self, partition_attributes: Dict[str, callable]):
+        self._left_subtree.propagate_partition_attributes(partition_attributes)
+        self._right_subtree.propagate_partition_attributes(partition_attributes)
+        self._partition_storage_unit(partition_attributes, self.get_positive_event_definitions())
+        self.__use_partitioned_lookup = \
+            self._left_subtree.is_storage_partitioned() and self._right_subtree.is_storage_partitioned()
+
+    def _get_purgeable_children(self):
+        return [self._left_subtree, self._right_subtree]
+
     def replace_subtree(self, old_node: Node, new_node: Node):
         """
         Replaces the child of this node provided as old_node with new_node.
@@ -112,7 +148,12 @@ class BinaryNode(InternalNode, ABC):
         new_pm_key = partial_match_source.get_storage_unit().get_key_function()
         first_event_defs = partial_match_source.get_event_definitions_by_parent(self)
         other_subtree.clean_expired_partial_matches(new_partial_match.last_timestamp)
-        partial_matches_to_compare = other_subtree.get_partial_matches(new_pm_key(new_partial_match))
+        if self.__use_partitioned_lookup:
+            partition_key = partial_match_source.get_storage_unit().get_partition_key(new_partial_match)
+            partial_matches_to_compare = other_subtree.get_partial_matches_from_partition(
+                partition_key, new_pm_key(new_partial_match))
+        else:
+            partial_matches_to_compare = other_subtree.get_partial_matches(new_pm_key(new_partial_match))
         second_event_defs = other_subtree.get_event_definitions_by_parent(self)
 
         self.clean_expired_partial_matches(new_partial_match.last_timestamp)
@@ -132,7 +173,30 @@ class BinaryNode(InternalNode, ABC):
             events_for_new_match = self._merge_events_for_new_match(first_event_defs, second_event_defs,
                                                                     new_partial_match.events, partial_match.events)
             probability = calculate_joint_probability(new_partial_match.probability, partial_match.probability)
-            self._validate_and_propagate_partial_match(events_for_new_match, probability)
+            self._validate_and_propagate_partial_match(events_for_new_match, probability,
+                                                       (new_partial_match, partial_match))
+
+    def supports_state_migration(self):
+        return True
+
+    def recompute_partial_matches(self):
+        """
+        Joins every pair of compatible partial matches stored at the subtrees of this node. Each pair is only examined
+        once, using the storage key of the left subtree to filter the candidates from the right one.
+        """
+        left_key = self._left_subtree.get_storage_unit().get_key_function()
+        left_event_defs = self._left_subtree.get_event_definitions_by_parent(self)
+        right_event_defs = self._right_subtree.get_event_definitions_by_parent(self)
+        for left_partial_match in self._left_subtree.get_partial_matches():
+            for right_partial_match in self._right_subtree.get_partial_matches(left_key(left_partial_match)):
+                events_for_new_match = self._merge_events_for_new_match(left_event_defs, right_event_defs,
+                                                                        left_partial_match.events,
+                                                                        right_partial_match.events)
+                if not self._validate_new_match(events_for_new_match):
+                    continue
+                probability = calculate_joint_probability(left_partial_match.probability,
+                                                          right_partial_match.probability)
+                self._add_migrated_partial_match(events_for_new_match, probability)
 
     def _merge_events_for_new_match(self,
                                     first_event_defs: List[PrimitiveEventDefinition],
@@ -148,6 +212,30 @@ class BinaryNode(InternalNode, ABC):
             return second_event_list + first_event_list
         raise Exception()
 
+    def _merge_events_by_index(self,
+                               first_event_defs: List[PrimitiveEventDefinition],
+                               second_event_defs: List[PrimitiveEventDefinition],
+                               first_event_list: Tuple[Event],
+                               second_event_list: Tuple[Event]):
+        """
+        Merges the two event tuples according to the indices of their event definitions, as merge_according_to does.
+        As the event definitions received from a child never change, the resulting order is only calculated once for
+        each pair of definition lists, and the merge itself amounts to a single tuple concatenation and lookup.
+        """
+        if len(first_event_defs) != len(first_event_list) or len(second_event_defs) != len(second_event_list):
+            raise Exception()
+        key = (id(first_event_defs), id(second_event_defs))
+        entry = self.__index_merge_functions.get(key)
+        if entry is None or entry[0] is not first_event_defs or entry[1] is not second_event_defs:
+            first_positions = range(len(first_event_defs))
+            second_positions = range(len(first_event_defs), len(first_event_defs) + len(second_event_defs))
+            order = merge_according_to(first_event_defs, second_event_defs, first_positions, second_positions,
+                                       key=lambda x: x.index)
+            # the definition lists are kept in the entry to guarantee that their IDs are not reused
+            entry = (first_event_defs, second_event_defs, itemgetter(*order))
+            self.__index_merge_functions[key] = entry
+        return entry[2](first_event_list + second_event_list)
+
     def is_equivalent(self, other):
         """
         In addition to the checks performed by the base class, checks if:
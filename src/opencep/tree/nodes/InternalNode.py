@@ -32,7 +32,7 @@ class InternalNode(Node, ABC):
             self._event_defs[i].name: InternalNode._get_event_content(events_for_new_match[i])
             for i in range(len(self._event_defs))
         }
-        return self._condition.eval(binding)
+        return self._evaluate_condition(binding)
 
     def create_parent_to_info_dict(self):
         """
@@ -53,21 +53,11 @@ class InternalNode(Node, ABC):
         In the internal nodes, we only sort the storage if a storage key is explicitly provided by the user.
         """
         if not storage_params.sort_storage or sorting_key is None:
-            self._partial_matches = UnsortedPatternMatchStorage(
-                storage_params.clean_up_interval,
-                use_load_shedding=storage_params.use_load_shedding,
-                latency_threshold_ns=storage_params.latency_threshold_ns,
-            )
+            self._partial_matches = UnsortedPatternMatchStorage(storage_params.clean_up_interval)
         else:
-            self._partial_matches = SortedPatternMatchStorage(
-                sorting_key,
-                rel_op,
-                equation_side,
-                storage_params.clean_up_interval,
-                storage_params.use_load_shedding,
-                storage_params.latency_threshold_ns,
-                sort_by_first_timestamp,
-            )
+            self._partial_matches = SortedPatternMatchStorage(sorting_key, rel_op, equation_side,
+                                                              storage_params.clean_up_interval,
+                                                              sort_by_first_timestamp)
 
     def handle_new_partial_match(self, partial_match_source: Node):
         """
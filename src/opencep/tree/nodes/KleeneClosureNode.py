@@ -25,8 +25,8 @@ class KleeneClosureNode(UnaryNode):
         """
         Reacts upon a notification of a new partial match available at the child by generating, validating, and
         propagating all sets of partial matches containing this new partial match.
-        Note: this method strictly assumes that the last partial match in the child storage is the one to cause the
-        method call (could not function properly in a parallelized implementation of the evaluation tree).
+        The new partial match is the one handed over by the child rather than the last one in the child storage, hence
+        the storage order is irrelevant.
         """
         if self._child is None:
             raise Exception()  # should never happen
@@ -35,7 +35,7 @@ class KleeneClosureNode(UnaryNode):
         self._child.clean_expired_partial_matches(new_partial_match.last_timestamp)
 
         # create partial match sets containing the new partial match that triggered this method
-        child_matches_powerset = self.__create_child_matches_powerset()
+        child_matches_powerset = self.__create_child_matches_powerset(new_partial_match)
 
         for partial_match_set in child_matches_powerset:
             # create and propagate the new match
@@ -43,9 +43,11 @@ class KleeneClosureNode(UnaryNode):
             probability = None if self._confidence is None else \
                 reduce(calculate_joint_probability, (pm.probability for pm in partial_match_set), None)
             aggregated_event = AggregatedEvent(all_primitive_events, probability)
+            if self._profile is not None:
+                self._profile.candidates_examined += 1
             if not self._validate_new_match([aggregated_event]):
                 continue
-            self._propagate_partial_match(aggregated_event.primitive_events, probability)
+            self._propagate_partial_match(aggregated_event.primitive_events, probability, partial_match_set)
 
 
     def _validate_new_match(self, events_for_new_match: List[Event]):
@@ -56,28 +58,24 @@ class KleeneClosureNode(UnaryNode):
             raise Exception("Unexpected candidate event list for Kleene closure operator")
         if not Node._validate_new_match(self, events_for_new_match):
             return False
-        return self._condition.eval([e.payload for e in events_for_new_match[0].primitive_events])
+        return self._evaluate_condition([e.payload for e in events_for_new_match[0].primitive_events])
 
-    def __create_child_matches_powerset(self):
+    def __create_child_matches_powerset(self, new_partial_match: PatternMatch):
         """
         This method is a generator returning all subsets of currently available partial matches of this node child.
         As this method is always invoked following a notification regarding a new partial match received from the child,
-        only the subsets containing this new partial match (which is assumed to be the last partial match in the child
-        list) are generated.
+        only the subsets containing this new partial match are generated.
         The subsets are enforced to satisfy the minimal and maximal size constraints.
         The maximal size constraint is enforced recursively to save as many computations as possible.
         The minimal size constraint on the other hand is enforced via post-processing filtering due to negligible
         overhead.
         """
-        child_partial_matches = self._child.get_partial_matches()
-        if not child_partial_matches:
-            return []
-        last_partial_match = child_partial_matches[-1]
-        # create subsets for all but the last element
-        actual_max_size = self.__max_size if self.__max_size is not None else len(child_partial_matches)
-        generated_powerset = powerset_generator(child_partial_matches[:-1], actual_max_size - 1)
-        # add the last item to all previously created subsets
-        result_powerset = (item + [last_partial_match] for item in generated_powerset)
+        other_partial_matches = [pm for pm in self._child.get_partial_matches() if pm is not new_partial_match]
+        # create subsets for all but the new element
+        actual_max_size = self.__max_size if self.__max_size is not None else len(other_partial_matches) + 1
+        generated_powerset = powerset_generator(other_partial_matches, actual_max_size - 1)
+        # add the new item to all previously created subsets
+        result_powerset = (item + [new_partial_match] for item in generated_powerset)
         # enforce minimal size limit
         result_powerset = (item for item in result_powerset if self.__min_size <= len(item))
         return result_powerset
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import List, Set
+from typing import Dict, List, Set
 
 from opencep.base.Event import Event
 from opencep.condition.Condition import Condition, RelopTypes, EquationSides
@@ -19,6 +19,7 @@ class LeafNode(Node):
         self.__leaf_index = leaf_index
         self.__event_name = leaf_event.name
         self.__event_type = leaf_event.type
+        self.__spill_manager = None
 
     def create_parent_to_info_dict(self):
         """
@@ -67,6 +68,11 @@ class LeafNode(Node):
         """
         Inserts the given event to this leaf.
         """
+        if self._profile is not None:
+            self._profile.register_event(event.timestamp)
+        if self.__spill_manager is not None:
+            # the spilled segments read back while handling the previous event are no longer needed
+            self.__spill_manager.release_cached_segments()
         self.clean_expired_partial_matches(event.timestamp)
         self._validate_and_propagate_partial_match([event], event.probability)
 
@@ -77,7 +83,7 @@ class LeafNode(Node):
         if not super()._validate_new_match(events_for_new_match):
             return False
         binding = {self.__event_name: events_for_new_match[0].payload}
-        return self._condition.eval(binding)
+        return self._evaluate_condition(binding)
 
     def _propagate_condition(self, condition: Condition):
         pass
@@ -93,16 +99,9 @@ class LeafNode(Node):
         should_use_default_storage_mode = not storage_params.sort_storage or sorting_key is None
         actual_sorting_key = (lambda pm: pm.events[0].timestamp) if should_use_default_storage_mode else sorting_key
         actual_sort_by_first_timestamp = should_use_default_storage_mode or sort_by_first_timestamp
-        self._partial_matches = SortedPatternMatchStorage(
-            actual_sorting_key,
-            rel_op,
-            equation_side,
-            storage_params.clean_up_interval,
-            storage_params.use_load_shedding,
-            storage_params.latency_threshold_ns,
-            actual_sort_by_first_timestamp,
-            True,
-        )
+        self._partial_matches = SortedPatternMatchStorage(actual_sorting_key, rel_op, equation_side,
+                                                          storage_params.clean_up_interval,
+                                                          actual_sort_by_first_timestamp, True)
 
     def get_structure_summary(self):
         return self.__event_name
@@ -116,5 +115,24 @@ class LeafNode(Node):
     def _propagate_pattern_parameters(self, pattern_params: PatternParameters):
         pass
 
+    def supports_state_migration(self):
+        return True
+
     def propagate_pattern_id(self, pattern_id: int):
         self.add_pattern_ids({pattern_id})
+
+    def propagate_spill_manager(self, spill_manager):
+        self.__spill_manager = spill_manager
+        self._partial_matches.set_spill_manager(spill_manager)
+
+    def propagate_load_shedder(self, load_shedder):
+        self._partial_matches.set_load_shedder(load_shedder)
+
+    def propagate_profiler(self, profiler):
+        self._set_profiler(profiler)
+
+    def propagate_consumption_registry(self, consumption_registry):
+        self._consumption_registry = consumption_registry
+
+    def propagate_partition_attributes(self, partition_attributes: Dict[str, callable]):
+        self._partition_storage_unit(partition_attributes, self.get_event_definitions())
@@ -1,12 +1,11 @@
 from abc import ABC
-from datetime import datetime
 from typing import List, Set, Type
 from opencep.base.Event import Event
 from opencep.condition.Condition import RelopTypes, EquationSides
 from opencep.base.PatternMatch import PatternMatch
 from opencep.base.PatternStructure import AndOperator, SeqOperator
 from opencep.misc.Utils import find_partial_match_by_timestamp, merge, \
-    is_sorted, merge_according_to, calculate_joint_probability
+    is_sorted, calculate_joint_probability
 from opencep.tree.nodes.BinaryNode import BinaryNode
 from opencep.tree.nodes.Node import Node, PrimitiveEventDefinition, PatternParameters
 from opencep.tree.PatternMatchStorage import TreeStorageParameters
@@ -57,7 +56,7 @@ class NegationNode(BinaryNode, ABC):
         super()._set_event_definitions(positive_event_defs, negative_event_defs)
         self._positive_event_defs = positive_event_defs
 
-    def clean_expired_partial_matches(self, last_timestamp: datetime):
+    def clean_expired_partial_matches(self, last_timestamp: int):
         """
         In addition to the normal functionality of this method, attempt to flush pending matches that can already
         be propagated.
@@ -66,7 +65,7 @@ class NegationNode(BinaryNode, ABC):
         if self.__is_first_unbounded_negative_node():
             self.flush_pending_matches(last_timestamp)
 
-    def flush_pending_matches(self, last_timestamp: datetime = None):
+    def flush_pending_matches(self, last_timestamp: int = None):
         """
         Releases the partial matches in the pending matches buffer. If the timestamp is provided, only releases
         expired matches.
@@ -108,6 +107,8 @@ class NegationNode(BinaryNode, ABC):
             negative_events = partial_match.events
             combined_event_list = self._merge_events_for_new_match(first_event_defs, second_event_defs,
                                                                    positive_events, negative_events)
+            if self._profile is not None:
+                self._profile.candidates_examined += 1
             if not self._validate_new_match(combined_event_list):
                 continue
             # a negative partial match affecting the potential positive partial match was found
@@ -119,7 +120,7 @@ class NegationNode(BinaryNode, ABC):
                 # TODO: the rejected positive partial match should be explicitly removed to save space
                 return
         # no negative match invalidated the positive one - we can go on
-        self._propagate_partial_match(positive_events, probability)
+        self._propagate_partial_match(positive_events, probability, (new_partial_match,))
 
     def _add_partial_match(self, pm: PatternMatch):
         """
@@ -159,6 +160,8 @@ class NegationNode(BinaryNode, ABC):
                                                                    negative_event_defs,
                                                                    positive_partial_match.events,
                                                                    unbounded_negative_partial_match.events)
+            if self._profile is not None:
+                self._profile.candidates_examined += 1
             if not self._validate_new_match(combined_event_list):
                 # this positive match should still be kept
                 matches_to_keep.append(positive_partial_match)
@@ -192,6 +195,18 @@ class NegationNode(BinaryNode, ABC):
         self._positive_subtree.create_storage_unit(storage_params)
         self._negative_subtree.create_storage_unit(storage_params)
 
+    def supports_state_migration(self):
+        """
+        The pending matches and the negative events of this node cannot be restored from another tree.
+        """
+        return False
+
+    def _get_purgeable_children(self):
+        """
+        Consuming an event must never remove a negative partial match, as it may still invalidate other matches.
+        """
+        return [self._positive_subtree]
+
     def is_equivalent(self, other):
         """
         In addition to the checks performed by the base class, separately verifies the equivalence of the positive and
@@ -252,5 +267,4 @@ class NegativeSeqNode(NegationNode):
                                     second_event_defs: List[PrimitiveEventDefinition],
                                     first_event_list: List[Event],
                                     second_event_list: List[Event]):
-        return merge_according_to(first_event_defs, second_event_defs,
-                                  first_event_list, second_event_list, key=lambda x: x.index)
+        return self._merge_events_by_index(first_event_defs, second_event_defs, first_event_list, second_event_list)
@@ -1,14 +1,14 @@
 from abc import ABC
-from datetime import timedelta, datetime
-from queue import Queue
-from typing import List, Set, Optional
+from collections import deque
+from typing import Dict, List, Set, Optional
 from dataclasses import dataclass
 
 from opencep.base.Event import Event
 from opencep.condition.Condition import RelopTypes, EquationSides
 from opencep.condition.CompositeCondition import CompositeCondition, AndCondition
 from opencep.base.PatternMatch import PatternMatch
-from opencep.tree.PatternMatchStorage import TreeStorageParameters
+from opencep.tree.ConsumedEventRegistry import ConsumedEventRegistry
+from opencep.tree.PatternMatchStorage import TreeStorageParameters, KeyPartitionedPatternMatchStorage
 
 
 class PrimitiveEventDefinition:
@@ -26,7 +26,7 @@ class PatternParameters:
     """
     The parameters of a pattern that are propagated down during evaluation tree during the construction process.
     """
-    window: timedelta
+    window: int  # in nanoseconds
     confidence: Optional[float]
 
 
@@ -65,13 +65,21 @@ class Node(ABC):
 
         # Full pattern matches that were not yet reported. Only relevant for an output node, that is, for a node
         # corresponding to a full pattern definition.
-        self._unreported_matches = Queue()
+        self._unreported_matches = deque()
         self._is_output_node = False
+        # the set of output nodes with unreported matches shared by all output nodes of the tree, if one is used
+        self._ready_output_nodes = None
 
         # set of event types that will only appear in a single full match
         self._single_event_types = set()
-        # events that were added to a partial match and cannot be added again
-        self._filtered_events = set()
+        # the registry of the events that were added to a partial match and cannot be added again
+        self._consumption_registry = None
+        # events consumed by an ancestor, whose partial matches are to be removed from the storage of this node
+        self._events_to_purge = set()
+        # the descendants whose partial matches can only reach the parents through this node, lazily calculated
+        self.__exclusive_descendants = None
+        # the counters of this node, only maintained if profiling is enabled
+        self._profile = None
 
         # set of pattern IDs with which this node is associated
         if pattern_ids is None:
@@ -94,28 +102,28 @@ class Node(ABC):
         Removes and returns an unreported match buffered at this node.
         Used in an output node to collect full pattern matches.
         """
-        ret = self._unreported_matches.get()
-        return ret
+        return self._unreported_matches.popleft()
 
     def has_unreported_matches(self):
         """
         Returns True if this node contains any matches we did not report yet and False otherwise.
         """
-        return self._unreported_matches.qsize() > 0
+        return len(self._unreported_matches) > 0
 
-    def clean_expired_partial_matches(self, last_timestamp: datetime):
+    def clean_expired_partial_matches(self, last_timestamp: int):
         """
         Removes partial matches whose earliest timestamp violates the time window constraint.
-        Also removes the expired filtered events if the "single" consumption policy is enabled.
+        If the "single" consumption policy is enabled, also removes the partial matches containing events consumed
+        by an ancestor, as well as the expired consumed events.
         """
+        if len(self._events_to_purge) > 0:
+            self._partial_matches.remove_partial_matches_containing(self._events_to_purge)
+            self._events_to_purge = set()
         if not Node._is_partial_match_expiration_enabled():
             return
         self._partial_matches.try_clean_expired_partial_matches(last_timestamp - self._sliding_window)
-        if len(self._single_event_types) == 0:
-            # "single" consumption policy is disabled or no event types under the policy reach this node
-            return
-        self._filtered_events = set([event for event in self._filtered_events
-                                    if event.min_timestamp >= last_timestamp - self._sliding_window])
+        if self._consumption_registry is not None:
+            self._consumption_registry.remove_expired(last_timestamp)
 
     def _add_partial_match(self, pm: PatternMatch):
         """
@@ -124,11 +132,20 @@ class Node(ABC):
         In case of UnsortedPatternMatchStorage the insertion is directly at the end, O(1).
         """
         self._partial_matches.add(pm)
+        if self._profile is not None:
+            self._profile.partial_matches_added += 1
         for parent in self._parents:
-            self._parent_to_unhandled_queue_dict[parent].put(pm)
+            self._parent_to_unhandled_queue_dict[parent].append(pm)
+            if parent._profile is None:
+                parent.handle_new_partial_match(self)
+                continue
+            parent._profile.start_handling()
             parent.handle_new_partial_match(self)
+            parent._profile.stop_handling()
         if self.is_output_node():
-            self._unreported_matches.put(pm)
+            self._unreported_matches.append(pm)
+            if self._ready_output_nodes is not None:
+                self._ready_output_nodes.add(self)
 
     def __can_add_partial_match(self, pm: PatternMatch) -> bool:
         """
@@ -146,36 +163,103 @@ class Node(ABC):
                 return False
         if len(self._single_event_types) == 0:
             return True
-        new_filtered_events = set()
+        if self._consumption_registry is None:
+            self._consumption_registry = ConsumedEventRegistry()
+        new_consumed_events = []
         for event in pm.events:
             if event.type not in self._single_event_types:
                 continue
-            if event in self._filtered_events:
+            if self._consumption_registry.is_consumed(self, event):
                 # this event was already passed
                 return False
-            else:
-                # this event was not yet passed but should only be passed once - remember it
-                new_filtered_events.add(event)
-        self._filtered_events |= new_filtered_events
+            # this event was not yet passed but should only be passed once - remember it
+            new_consumed_events.append(event)
+        if len(new_consumed_events) > 0:
+            self._consumption_registry.consume(self, new_consumed_events, self._sliding_window)
+            self.__purge_consumed_events(new_consumed_events)
         return True
 
-    def _validate_and_propagate_partial_match(self, events: List[Event], match_probability: float = None):
+    def __purge_consumed_events(self, consumed_events: List[Event]):
+        """
+        Schedules the removal of the partial matches containing the given events from the storages of the
+        descendants of this node. Such partial matches would only be rejected by this node, and are therefore removed
+        the next time their storage is cleaned rather than probed by the parents over and over again.
+        """
+        if self.__exclusive_descendants is None:
+            self.__exclusive_descendants = self._get_exclusive_descendants()
+        for descendant in self.__exclusive_descendants:
+            descendant._events_to_purge.update(consumed_events)
+
+    def _get_exclusive_descendants(self):
+        """
+        Returns the descendants of this node whose partial matches can only reach an ancestor through this node and
+        contain the events in the same form as the partial matches of this node.
+        """
+        descendants = []
+        for child in self._get_purgeable_children():
+            if len(child.get_parents()) > 1:
+                # the partial matches of a shared node are also used by other patterns
+                continue
+            descendants.append(child)
+            descendants.extend(child._get_exclusive_descendants())
+        return descendants
+
+    def _validate_and_propagate_partial_match(self, events: List[Event], match_probability: float = None,
+                                              source_partial_matches: List[PatternMatch] = ()):
         """
         Creates a new partial match from the list of events, validates it, and propagates it up the tree.
         For probabilistic streams, receives the pre-calculated probability of the potential pattern match.
         """
+        if self._profile is not None:
+            self._profile.candidates_examined += 1
         if not self._validate_new_match(events):
             return
-        self._propagate_partial_match(events, match_probability)
+        self._propagate_partial_match(events, match_probability, source_partial_matches)
 
-    def _propagate_partial_match(self, events: List[Event], match_probability: float = None):
+    def _propagate_partial_match(self, events: List[Event], match_probability: float = None,
+                                 source_partial_matches: List[PatternMatch] = ()):
         """
         Receives an already verified list of events for new partial match and propagates it up the tree.
         For probabilistic streams, receives the pre-calculated probability of the potential pattern match.
+        The new partial match inherits the load shedding buckets of the partial matches it was created from, and its
+        timestamps are derived from theirs, as together they contain exactly the same events.
+        """
+        if source_partial_matches:
+            new_partial_match = PatternMatch(events, match_probability,
+                                             min(pm.first_timestamp for pm in source_partial_matches),
+                                             max(pm.last_timestamp for pm in source_partial_matches))
+        else:
+            new_partial_match = PatternMatch(events, match_probability)
+        for source_partial_match in source_partial_matches:
+            if source_partial_match.contributing_buckets:
+                new_partial_match.contributing_buckets |= source_partial_match.contributing_buckets
+        if self.__can_add_partial_match(new_partial_match):
+            self._add_partial_match(new_partial_match)
+
+    def _add_migrated_partial_match(self, events: List[Event], match_probability: float = None):
+        """
+        Registers an already verified partial match restored from a previous evaluation tree.
+        Unlike _propagate_partial_match, the new partial match is neither passed to the parents nor reported, as it
+        was already processed by the previous tree.
         """
         new_partial_match = PatternMatch(events, match_probability)
         if self.__can_add_partial_match(new_partial_match):
-            self._add_partial_match(new_partial_match)
+            self._partial_matches.add(new_partial_match)
+
+    def import_partial_matches(self, other_node):
+        """
+        Copies the partial matches stored at an equivalent node of another evaluation tree into this node.
+        The events of each partial match are reordered according to the event definitions of this node.
+        """
+        other_event_names = [event_def.name for event_def in other_node.get_positive_event_definitions()]
+        event_names = [event_def.name for event_def in self.get_positive_event_definitions()]
+        if event_names == other_event_names:
+            for pm in other_node.get_partial_matches():
+                self._add_migrated_partial_match(pm.events, pm.probability)
+            return
+        event_positions = [other_event_names.index(name) for name in event_names]
+        for pm in other_node.get_partial_matches():
+            self._add_migrated_partial_match([pm.events[i] for i in event_positions], pm.probability)
 
     def get_partial_matches(self, filter_value: int or float = None):
         """
@@ -184,6 +268,32 @@ class Node(ABC):
         return self._partial_matches.get(filter_value) if filter_value is not None \
             else self._partial_matches.get_internal_buffer()
 
+    def get_partial_matches_from_partition(self, partition_key, filter_value: int or float):
+        """
+        Returns only partial matches of the given partition that can be a good fit the partial match identified by the
+        given filter value. Can only be called on a node whose storage is partitioned.
+        """
+        return self._partial_matches.get_from_partition(partition_key, filter_value)
+
+    def _partition_storage_unit(self, partition_attributes: Dict[str, callable],
+                                event_defs: List[PrimitiveEventDefinition]):
+        """
+        Partitions the storage of this node by the partition attribute of the first event of each partial match, given
+        the definitions of the events of the partial matches as passed to the parent.
+        The storage of the root is never accessed by another node, hence it is not partitioned.
+        """
+        if len(self._parents) == 0 or len(event_defs) == 0 or event_defs[0].name not in partition_attributes:
+            return
+        get_attribute = partition_attributes[event_defs[0].name]
+        self._partial_matches = KeyPartitionedPatternMatchStorage(self._partial_matches,
+                                                                  lambda pm: get_attribute(pm.events[0].payload))
+
+    def is_storage_partitioned(self):
+        """
+        Returns True if the storage of this node is partitioned by key and False otherwise.
+        """
+        return isinstance(self._partial_matches, KeyPartitionedPatternMatchStorage)
+
     def _validate_new_match(self, events_for_new_match: List[Event]):
         """
         Validates the condition stored in this node on the given set of events.
@@ -192,12 +302,24 @@ class Node(ABC):
         max_timestamp = events_for_new_match[-1].max_timestamp
         return max_timestamp - min_timestamp <= self._sliding_window
 
+    def _evaluate_condition(self, binding: dict):
+        """
+        Evaluates the condition stored in this node on the given binding, counting the evaluation if profiling is
+        enabled.
+        """
+        result = self._condition.eval(binding)
+        if self._profile is not None:
+            self._profile.register_condition_evaluation(result)
+        return result
+
     ###################################### Parent- and topology-related methods
     def get_last_unhandled_partial_match_by_parent(self, parent):
         """
-        Returns the last partial match buffered at this node and not yet transferred to parent.
+        Removes and returns the oldest partial match buffered at this node and not yet transferred to parent.
+        The partial matches are handed to each parent in the order of their creation, regardless of their order in the
+        storage of this node.
         """
-        return self._parent_to_unhandled_queue_dict[parent].get(block=False)
+        return self._parent_to_unhandled_queue_dict[parent].popleft()
 
     def set_parents(self, parents, on_init: bool = False):
         """
@@ -229,7 +351,7 @@ class Node(ABC):
         if parent in self._parents:
             return
         self._parents.append(parent)
-        self._parent_to_unhandled_queue_dict[parent] = Queue()
+        self._parent_to_unhandled_queue_dict[parent] = deque()
         if not on_init:
             self._parent_to_info_dict[parent] = self.get_positive_event_definitions()
 
@@ -278,6 +400,28 @@ class Node(ABC):
         """
         return self._is_output_node
 
+    def get_profile(self):
+        """
+        Returns the profile of this node, or None if profiling is disabled.
+        """
+        return self._profile
+
+    def _set_profiler(self, profiler):
+        """
+        Creates the profile of this node using the given profiler, unless the node was already profiled as part of
+        another tree sharing it.
+        """
+        if self._profile is None:
+            self._profile = profiler.create_node_profile()
+        # the storage of a shared node is recreated by each tree sharing it
+        self._partial_matches.set_profile(self._profile)
+
+    def set_ready_output_nodes(self, ready_output_nodes: Set):
+        """
+        Sets the set this output node adds itself to whenever a new unreported match is buffered at it.
+        """
+        self._ready_output_nodes = ready_output_nodes
+
     def get_storage_unit(self):
         """
         Returns the internal partial match storage of this node.
@@ -307,6 +451,13 @@ class Node(ABC):
         for parent in self._parents:
             parent.register_single_event_type(event_type)
 
+    def supports_state_migration(self):
+        """
+        Returns True if the partial matches of this node can be restored from another evaluation tree without
+        replaying the events, and False otherwise.
+        """
+        return False
+
     def apply_condition(self, condition: CompositeCondition):
         """
         Applies the given condition on all nodes in the subtree of this node.
@@ -362,6 +513,46 @@ class Node(ABC):
         """
         raise NotImplementedError()
 
+    def propagate_spill_manager(self, spill_manager):
+        """
+        Places the storages of all nodes in the subtree of this node under the memory budget enforced by the given
+        spill manager.
+        """
+        raise NotImplementedError()
+
+    def propagate_load_shedder(self, load_shedder):
+        """
+        Lets the given load shedder track and drop the partial matches of all nodes in the subtree of this node.
+        """
+        raise NotImplementedError()
+
+    def propagate_profiler(self, profiler):
+        """
+        Lets the given profiler maintain the counters of all nodes in the subtree of this node.
+        """
+        raise NotImplementedError()
+
+    def propagate_consumption_registry(self, consumption_registry: ConsumedEventRegistry):
+        """
+        Lets all nodes in the subtree of this node enforcing the "single" consumption policy register the consumed
+        events in the given registry.
+        """
+        raise NotImplementedError()
+
+    def propagate_partition_attributes(self, partition_attributes: Dict[str, callable]):
+        """
+        Partitions the storages of the nodes in the subtree of this node according to the given mapping from each
+        event name to a function returning the attribute value all events of a match must share.
+        """
+        raise NotImplementedError()
+
+    def _get_purgeable_children(self):
+        """
+        Returns the children whose partial matches may be removed once an event they contain is consumed by this
+        node. By default, no partial matches are removed.
+        """
+        return []
+
     def create_parent_to_info_dict(self):
         """
         Traverses the subtree of this node and initializes the internal dictionaries mapping each parent node to the
@@ -395,6 +586,13 @@ class Node(ABC):
         """
         raise NotImplementedError()
 
+    def recompute_partial_matches(self):
+        """
+        Calculates the partial matches of this node from the partial matches currently stored at its children without
+        propagating them up the tree - to be implemented by subclasses supporting state migration.
+        """
+        raise NotImplementedError()
+
     def get_structure_summary(self):
         """
         Returns the summary of the subtree rooted at this node - to be implemented by subclasses.
@@ -1,10 +1,11 @@
-from typing import List
+from typing import List, Set
 
 from opencep.base.Event import Event
 from opencep.condition.Condition import RelopTypes, EquationSides
-from opencep.misc.Utils import merge, merge_according_to, is_sorted
+from opencep.misc.Utils import merge
 from opencep.tree.nodes.BinaryNode import BinaryNode
-from opencep.tree.nodes.Node import PrimitiveEventDefinition
+from opencep.tree.nodes.LeafNode import LeafNode
+from opencep.tree.nodes.Node import Node, PrimitiveEventDefinition, PatternParameters
 from opencep.tree.PatternMatchStorage import TreeStorageParameters
 
 
@@ -14,6 +15,13 @@ class SeqNode(BinaryNode):
     In addition to checking the time window and condition like the basic node does, SeqNode also verifies the order
     of arrival of the events in the partial matches it constructs.
     """
+    def __init__(self, pattern_params: PatternParameters, parents: List[Node] = None, pattern_ids: int or Set[int] = None,
+                 event_defs: List[PrimitiveEventDefinition] = None,
+                 left: Node = None, right: Node = None):
+        super().__init__(pattern_params, parents, pattern_ids, event_defs, left, right)
+        # the positions to compare in a merged event list, along with the event definitions they were computed for
+        self.__order_check_positions = None
+
     def _set_event_definitions(self,
                                left_event_defs: List[PrimitiveEventDefinition],
                                right_event_defs: List[PrimitiveEventDefinition]):
@@ -24,14 +32,47 @@ class SeqNode(BinaryNode):
                                     second_event_defs: List[PrimitiveEventDefinition],
                                     first_event_list: List[Event],
                                     second_event_list: List[Event]):
-        return merge_according_to(first_event_defs, second_event_defs,
-                                  first_event_list, second_event_list, key=lambda x: x.index)
+        return self._merge_events_by_index(first_event_defs, second_event_defs, first_event_list, second_event_list)
 
     def _validate_new_match(self, events_for_new_match: List[Event]):
-        if not is_sorted(events_for_new_match, key=lambda x: x.timestamp, secondary_key=lambda x: x.max_timestamp):
-            return False
+        for i in self.__get_order_check_positions():
+            if events_for_new_match[i].timestamp > events_for_new_match[i + 1].timestamp or \
+                    events_for_new_match[i].max_timestamp > events_for_new_match[i + 1].max_timestamp:
+                return False
         return super()._validate_new_match(events_for_new_match)
 
+    def __get_order_check_positions(self):
+        """
+        Returns the positions i in a merged event list for which the i-th and the (i+1)-th events must be compared to
+        verify the sequence order.
+        If the events received from both subtrees are already known to be ordered, only the positions where the merged
+        list switches from the events of one subtree to the events of the other have to be checked. Otherwise, all
+        adjacent pairs are checked, as is_sorted would do.
+        """
+        left_event_defs = self._left_subtree.get_event_definitions_by_parent(self)
+        right_event_defs = self._right_subtree.get_event_definitions_by_parent(self)
+        cached = self.__order_check_positions
+        if cached is not None and cached[0] is left_event_defs and cached[1] is right_event_defs:
+            return cached[2]
+        merged_length = len(left_event_defs) + len(right_event_defs)
+        if SeqNode.__is_ordered_subtree(self._left_subtree) and SeqNode.__is_ordered_subtree(self._right_subtree):
+            left_indices = {event_def.index for event_def in left_event_defs}
+            is_from_left = [event_def.index in left_indices
+                            for event_def in merge(left_event_defs, right_event_defs, key=lambda x: x.index)]
+            positions = tuple(i for i in range(merged_length - 1) if is_from_left[i] != is_from_left[i + 1])
+        else:
+            positions = tuple(range(merged_length - 1))
+        self.__order_check_positions = (left_event_defs, right_event_defs, positions)
+        return positions
+
+    @staticmethod
+    def __is_ordered_subtree(subtree):
+        """
+        Returns True if the events of every partial match produced by the given subtree are guaranteed to be sorted
+        by both their timestamps and their max timestamps.
+        """
+        return isinstance(subtree, (SeqNode, LeafNode))
+
     def get_structure_summary(self):
         return ("Seq",
                 self._left_subtree.get_structure_summary(),
@@ -0,0 +1,144 @@
+"""
+This file contains the nodes connecting the stages of an evaluation tree split for structure-parallel evaluation.
+A subtree moved to a separate stage is replaced in the parent stage by a StageInputNode, receiving the partial matches
+created by the subtree, and its root is connected to a StageOutputNode, collecting these partial matches in the stage
+the subtree is evaluated by. Each node of a split tree is only accessed by the execution unit of its stage, and the
+partial matches are only passed between the stages through the boundary nodes.
+"""
+from typing import List, Tuple
+
+from opencep.base.PatternMatch import PatternMatch
+from opencep.condition.Condition import RelopTypes, EquationSides
+from opencep.tree.PatternMatchStorage import TreeStorageParameters, PatternMatchStorage
+from opencep.tree.nodes.Node import Node, PrimitiveEventDefinition
+
+
+class StageInputNode(Node):
+    """
+    Replaces a subtree evaluated by another stage. The partial matches of the subtree are received from the other stage
+    and stored by this node, such that its parent can access them exactly as it would access the subtree itself.
+    As the partial matches were already validated by the subtree, they are passed to the parent as they are.
+    This node takes over the storage created for the subtree root by the parent.
+    """
+    def __init__(self, subtree: Node):
+        super().__init__(subtree.get_basic_filtering_parameters(), None, set(subtree.get_pattern_ids()))
+        self.__event_defs = subtree.get_positive_event_definitions()
+        self.__structure_summary = subtree.get_structure_summary()
+        self._partial_matches = subtree.get_storage_unit()
+
+    def replay_storage_operation(self, operation: PatternMatch or int):
+        """
+        Replays an operation applied on the storage of the replaced subtree root (see StageOutputStorage). A new partial
+        match is registered and passed to the parent, while a timestamp triggers the removal of the expired ones.
+        """
+        if isinstance(operation, PatternMatch):
+            self._add_partial_match(operation)
+        else:
+            self._partial_matches.try_clean_expired_partial_matches(operation)
+
+    def get_event_definitions(self) -> List[PrimitiveEventDefinition]:
+        return self.__event_defs
+
+    def get_leaves(self):
+        """
+        The leaves of the replaced subtree belong to another stage.
+        """
+        return []
+
+    def create_parent_to_info_dict(self):
+        for parent in self._parents:
+            self._parent_to_info_dict[parent] = self.__event_defs
+
+    def get_structure_summary(self):
+        return self.__structure_summary
+
+    def create_storage_unit(self, storage_params: TreeStorageParameters, sorting_key: callable = None,
+                            rel_op: RelopTypes = None, equation_side: EquationSides = None,
+                            sort_by_first_timestamp: bool = False):
+        """
+        The storage of this node is the one created for the replaced subtree by the parent.
+        """
+        pass
+
+
+class StageOutputStorage(PatternMatchStorage):
+    """
+    The storage of the root of a subtree evaluated by a separate stage. Rather than keeping the partial matches, records
+    the operations applied on the storage, each tagged with the position of the event it was applied upon within the
+    current batch of events. The operations are replayed in the same order on the storage of the input node replacing
+    the subtree in the parent stage, such that the expired partial matches are removed at exactly the same points as in
+    sequential evaluation.
+    """
+    def __init__(self):
+        super().__init__(None, True, 0)
+        self.__event_index = None
+        self.__operations = []
+
+    def set_event_index(self, event_index: int):
+        """
+        Sets the position of the currently processed event within the current batch.
+        """
+        self.__event_index = event_index
+
+    def take_operations(self) -> List[Tuple[int, PatternMatch or int]]:
+        """
+        Returns the operations recorded since the last invocation, along with the positions of the events they were
+        applied upon. An operation is either a new partial match or the earliest timestamp of the partial matches to be
+        kept.
+        """
+        operations = self.__operations
+        self.__operations = []
+        return operations
+
+    def add(self, pm: PatternMatch):
+        self.__operations.append((self.__event_index, pm))
+
+    def try_clean_expired_partial_matches(self, earliest_timestamp: int):
+        self.__operations.append((self.__event_index, earliest_timestamp))
+
+    def get(self, value: int or float):
+        raise Exception("The partial matches of a subtree evaluated by a separate stage are only stored by the parent "
+                        "stage")
+
+    def create_empty_storage(self):
+        return StageOutputStorage()
+
+
+class StageOutputNode(Node):
+    """
+    The parent of the root of a subtree evaluated by a separate stage. Replaces the storage of the subtree root with a
+    StageOutputStorage recording the partial matches created by the subtree.
+    """
+    def __init__(self, subtree: Node):
+        super().__init__(subtree.get_basic_filtering_parameters(), None)
+        self.__subtree = subtree
+        self.__storage = StageOutputStorage()
+        subtree._partial_matches = self.__storage
+        subtree.set_parent(self)
+
+    def set_event_index(self, event_index: int):
+        """
+        Sets the position of the currently processed event within the current batch.
+        """
+        self.__storage.set_event_index(event_index)
+
+    def handle_new_partial_match(self, partial_match_source: Node):
+        """
+        The new partial match was already recorded by the storage of the subtree root.
+        """
+        partial_match_source.get_last_unhandled_partial_match_by_parent(self)
+
+    def take_storage_operations(self) -> List[Tuple[int, PatternMatch or int]]:
+        """
+        Returns the storage operations of the subtree root recorded since the last invocation.
+        """
+        return self.__storage.take_operations()
+
+    def get_event_definitions(self) -> List[PrimitiveEventDefinition]:
+        return self.__subtree.get_positive_event_definitions()
+
+    def get_leaves(self):
+        return self.__subtree.get_leaves()
+
+    def get_structure_summary(self):
+        return self.__subtree.get_structure_summary()
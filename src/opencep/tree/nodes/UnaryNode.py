@@ -40,6 +40,28 @@ class UnaryNode(InternalNode, ABC):
         self.add_pattern_ids({pattern_id})
         self._child.propagate_pattern_id(pattern_id)
 
+    def propagate_spill_manager(self, spill_manager):
+        self._partial_matches.set_spill_manager(spill_manager)
+        self._child.propagate_spill_manager(spill_manager)
+
+    def propagate_load_shedder(self, load_shedder):
+        self._partial_matches.set_load_shedder(load_shedder)
+        self._child.propagate_load_shedder(load_shedder)
+
+    def propagate_profiler(self, profiler):
+        self._set_profiler(profiler)
+        self._child.propagate_profiler(profiler)
+
+    def propagate_consumption_registry(self, consumption_registry):
+        self._consumption_registry = consumption_registry
+        self._child.propagate_consumption_registry(consumption_registry)
+
+    def propagate_partition_attributes(self, partition_attributes):
+        """
+        A unary node fetches all partial matches of its child, hence only the subtree of the child is partitioned.
+        """
+        self._child.propagate_partition_attributes(partition_attributes)
+
     def replace_subtree(self, child: Node):
         """
         Replaces the child of this node with the given node.
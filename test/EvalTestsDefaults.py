@@ -136,3 +136,23 @@ DEFAULT_TESTING_SIMULTANEOUS_EVALUATION_MECHANISM_SETTINGS_AND_ZSTREAM_INVARIANT
     TreeBasedEvaluationMechanismParameters(storage_params=DEFAULT_TREE_STORAGE_PARAMETERS,
                                            tree_update_type=TreeEvaluationMechanismUpdateTypes.SIMULTANEOUS_TREE_EVALUATION,
                                            optimizer_params=DEFAULT_TESTING_ZSTREAM_INVARIANT_OPTIMIZER_SETTINGS)
+
+
+"""
+evaluation mechanism: state migration
+optimizer: changes aware
+"""
+DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_DEVIATION_AWARE_OPTIMIZER = \
+    TreeBasedEvaluationMechanismParameters(storage_params=DEFAULT_TREE_STORAGE_PARAMETERS,
+                                           tree_update_type=TreeEvaluationMechanismUpdateTypes.STATE_MIGRATION_TREE_EVALUATION,
+                                           optimizer_params=DEFAULT_TESTING_DEVIATION_AWARE_OPTIMIZER_SETTINGS)
+
+
+"""
+evaluation mechanism: state migration
+optimizer: greedy invariant
+"""
+DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_GREEDY_INVARIANT_OPTIMIZER = \
+    TreeBasedEvaluationMechanismParameters(storage_params=DEFAULT_TREE_STORAGE_PARAMETERS,
+                                           tree_update_type=TreeEvaluationMechanismUpdateTypes.STATE_MIGRATION_TREE_EVALUATION,
+                                           optimizer_params=DEFAULT_TESTING_GREEDY_INVARIANT_OPTIMIZER_SETTINGS)
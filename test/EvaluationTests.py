@@ -315,3 +315,87 @@ def googleAmazonLowPatternSearchTest_8():
     googleAmazonLowPatternSearchTest(
         eval_mechanism_params=DEFAULT_TESTING_SIMULTANEOUS_EVALUATION_MECHANISM_SETTINGS_AND_ZSTREAM_INVARIANT_OPTIMIZER,
         test_name = 'googleAmazonLow|_adaptive_zstream_invariant_optimizer_simultaneous_tree_update')
+
+
+def simple_9():
+    simplePatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_DEVIATION_AWARE_OPTIMIZER,
+        test_name = 'simple|_adaptive_deviation_optimizer_state_migration_tree_update')
+
+
+def simple_10():
+    simplePatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_GREEDY_INVARIANT_OPTIMIZER,
+        test_name = 'simple|_adaptive_greedy_invariant_optimizer_state_migration_tree_update')
+
+
+def googleAscendPatternSearchTest_9():
+    googleAscendPatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_DEVIATION_AWARE_OPTIMIZER,
+        test_name = 'googleAscend|_adaptive_deviation_optimizer_state_migration_tree_update')
+
+
+def googleAscendPatternSearchTest_10():
+    googleAscendPatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_GREEDY_INVARIANT_OPTIMIZER,
+        test_name = 'googleAscend|_adaptive_greedy_invariant_optimizer_state_migration_tree_update')
+
+
+def amazonInstablePatternSearchTest_9():
+    amazonInstablePatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_DEVIATION_AWARE_OPTIMIZER,
+        test_name = 'amazonInstable|_adaptive_deviation_optimizer_state_migration_tree_update')
+
+
+def amazonInstablePatternSearchTest_10():
+    amazonInstablePatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_GREEDY_INVARIANT_OPTIMIZER,
+        test_name = 'amazonInstable|_adaptive_greedy_invariant_optimizer_state_migration_tree_update')
+
+
+def msftDrivRacePatternSearchTest_9():
+    msftDrivRacePatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_DEVIATION_AWARE_OPTIMIZER,
+        test_name = 'msftDrivRace|_adaptive_deviation_optimizer_state_migration_tree_update')
+
+
+def msftDrivRacePatternSearchTest_10():
+    msftDrivRacePatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_GREEDY_INVARIANT_OPTIMIZER,
+        test_name = 'msftDrivRace|_adaptive_greedy_invariant_optimizer_state_migration_tree_update')
+
+
+def googleIncreasePatternSearchTest_9():
+    googleIncreasePatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_DEVIATION_AWARE_OPTIMIZER,
+        test_name = 'googleIncrease|_adaptive_deviation_optimizer_state_migration_tree_update')
+
+
+def googleIncreasePatternSearchTest_10():
+    googleIncreasePatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_GREEDY_INVARIANT_OPTIMIZER,
+        test_name = 'googleIncrease|_adaptive_greedy_invariant_optimizer_state_migration_tree_update')
+
+
+def amazonSpecificPatternSearchTest_9():
+    amazonSpecificPatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_DEVIATION_AWARE_OPTIMIZER,
+        test_name = 'amazonSpecific|_adaptive_deviation_optimizer_state_migration_tree_update')
+
+
+def amazonSpecificPatternSearchTest_10():
+    amazonSpecificPatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_GREEDY_INVARIANT_OPTIMIZER,
+        test_name = 'amazonSpecific|_adaptive_greedy_invariant_optimizer_state_migration_tree_update')
+
+
+def googleAmazonLowPatternSearchTest_9():
+    googleAmazonLowPatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_DEVIATION_AWARE_OPTIMIZER,
+        test_name = 'googleAmazonLow|_adaptive_deviation_optimizer_state_migration_tree_update')
+
+
+def googleAmazonLowPatternSearchTest_10():
+    googleAmazonLowPatternSearchTest(
+        eval_mechanism_params=DEFAULT_TESTING_STATE_MIGRATION_EVALUATION_MECHANISM_SETTINGS_AND_GREEDY_INVARIANT_OPTIMIZER,
+        test_name = 'googleAmazonLow|_adaptive_greedy_invariant_optimizer_state_migration_tree_update')
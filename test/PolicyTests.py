@@ -3,7 +3,7 @@ from OpenCEP.misc.ConsumptionPolicy import *
 from datetime import timedelta
 from OpenCEP.condition.Condition import Variable
 from OpenCEP.condition.BaseRelationCondition import GreaterThanCondition
-from OpenCEP.base.PatternStructure import SeqOperator, PrimitiveEventStructure
+from OpenCEP.base.PatternStructure import AndOperator, SeqOperator, PrimitiveEventStructure
 from OpenCEP.base.Pattern import Pattern
 
 def singleType1PolicyPatternSearchTest(createTestFile = False):
@@ -36,6 +36,36 @@ def singleType2PolicyPatternSearchTest(createTestFile = False):
     runTest("singleType2Policy", [pattern], createTestFile, eventStream=nasdaqEventStreamTiny)
 
 
+def andSingleType1PolicyPatternSearchTest(createTestFile = False):
+    """
+    PATTERN AND(AppleStockPriceUpdate a, AmazonStockPriceUpdate b, AvidStockPriceUpdate c)
+    WHERE   a.OpeningPrice > c.OpeningPrice
+    WITHIN 5 minutes
+    """
+    pattern = Pattern(
+        AndOperator(PrimitiveEventStructure("AAPL", "a"), PrimitiveEventStructure("AMZN", "b"), PrimitiveEventStructure("AVID", "c")),
+        GreaterThanCondition(Variable("a", lambda x: x["Opening Price"]), Variable("c", lambda x: x["Opening Price"])),
+        timedelta(minutes=5),
+        ConsumptionPolicy(single="AMZN", secondary_selection_strategy=SelectionStrategies.MATCH_NEXT)
+    )
+    runTest("andSingleType1Policy", [pattern], createTestFile, eventStream=nasdaqEventStreamTiny)
+
+
+def andSingleType2PolicyPatternSearchTest(createTestFile = False):
+    """
+    PATTERN AND(AppleStockPriceUpdate a, AmazonStockPriceUpdate b, AvidStockPriceUpdate c)
+    WHERE   a.OpeningPrice > c.OpeningPrice
+    WITHIN 5 minutes
+    """
+    pattern = Pattern(
+        AndOperator(PrimitiveEventStructure("AAPL", "a"), PrimitiveEventStructure("AMZN", "b"), PrimitiveEventStructure("AVID", "c")),
+        GreaterThanCondition(Variable("a", lambda x: x["Opening Price"]), Variable("c", lambda x: x["Opening Price"])),
+        timedelta(minutes=5),
+        ConsumptionPolicy(single="AMZN", secondary_selection_strategy=SelectionStrategies.MATCH_SINGLE)
+    )
+    runTest("andSingleType2Policy", [pattern], createTestFile, eventStream=nasdaqEventStreamTiny)
+
+
 def contiguousPolicyPatternSearchTest(createTestFile = False):
     """
     PATTERN SEQ(AppleStockPriceUpdate a, AmazonStockPriceUpdate b, AvidStockPriceUpdate c)
@@ -4,7 +4,7 @@ from OpenCEP.condition.BaseRelationCondition import GreaterThanCondition, Greate
 from test.testUtils import *
 from OpenCEP.condition.Condition import Variable
 from OpenCEP.condition.CompositeCondition import AndCondition
-from OpenCEP.base.PatternStructure import AndOperator, PrimitiveEventStructure
+from OpenCEP.base.PatternStructure import AndOperator, SeqOperator, PrimitiveEventStructure
 from OpenCEP.base.Pattern import Pattern
 
 def sortedStorageTest(createTestFile=False):
@@ -27,6 +27,46 @@ def sortedStorageTest(createTestFile=False):
     runTest("sortedStorageTest", [pattern], createTestFile, eval_mechanism_params=eval_params, events=nasdaqEventStream)
 
 
+def spilledUnsortedStorageTest(createTestFile=False):
+    pattern = Pattern(
+        SeqOperator(PrimitiveEventStructure("DRIV", "a"), PrimitiveEventStructure("MSFT", "b"),
+                    PrimitiveEventStructure("CBRL", "c")),
+        AndCondition(
+            GreaterThanCondition(Variable("a", lambda x: x["Opening Price"]),
+                                 Variable("b", lambda x: x["Opening Price"])),
+            GreaterThanCondition(Variable("b", lambda x: x["Opening Price"]),
+                                 Variable("c", lambda x: x["Opening Price"]))
+        ),
+        timedelta(minutes=360)
+    )
+    storage_params = TreeStorageParameters(sort_storage=False, clean_up_interval=10, memory_budget=500)
+    eval_params = TreeBasedEvaluationMechanismParameters(
+        optimizer_params=StatisticsDeviationAwareOptimizerParameters(tree_plan_params=TreePlanBuilderParameters()),
+        storage_params=storage_params)
+    runTest("spilledUnsortedStorage", [pattern], createTestFile, eval_mechanism_params=eval_params,
+            events=nasdaqEventStream, expected_file_name="frequencyTailored1")
+
+
+def spilledSortedStorageTest(createTestFile=False):
+    pattern = Pattern(
+        SeqOperator(PrimitiveEventStructure("DRIV", "a"), PrimitiveEventStructure("MSFT", "b"),
+                    PrimitiveEventStructure("CBRL", "c")),
+        AndCondition(
+            GreaterThanCondition(Variable("a", lambda x: x["Opening Price"]),
+                                 Variable("b", lambda x: x["Opening Price"])),
+            GreaterThanCondition(Variable("b", lambda x: x["Opening Price"]),
+                                 Variable("c", lambda x: x["Opening Price"]))
+        ),
+        timedelta(minutes=360)
+    )
+    storage_params = TreeStorageParameters(sort_storage=True, clean_up_interval=10, memory_budget=500)
+    eval_params = TreeBasedEvaluationMechanismParameters(
+        optimizer_params=StatisticsDeviationAwareOptimizerParameters(tree_plan_params=TreePlanBuilderParameters()),
+        storage_params=storage_params)
+    runTest("spilledSortedStorage", [pattern], createTestFile, eval_mechanism_params=eval_params,
+            events=nasdaqEventStream, expected_file_name="frequencyTailored1")
+
+
 def sortedStorageBenchMarkTest(createTestFile=False):
     pattern = Pattern(
         AndOperator(PrimitiveEventStructure("DRIV", "a"), PrimitiveEventStructure("MSFT", "b"),
@@ -0,0 +1,26 @@
+from OpenCEP.base.DataFormatter import DataFormatter, EventTypeClassifier
+
+
+"""
+Data formatter shared by the unit tests, parsing events given as dictionaries with "type" and "time" keys and an
+optional "probability" key
+"""
+
+
+class TypeClassifier(EventTypeClassifier):
+    def get_event_type(self, event_payload: dict):
+        return event_payload["type"]
+
+
+class DictDataFormatter(DataFormatter):
+    def __init__(self):
+        super().__init__(TypeClassifier())
+
+    def parse_event(self, raw_data: dict):
+        return dict(raw_data)
+
+    def get_event_timestamp(self, event_payload: dict):
+        return event_payload["time"]
+
+    def get_probability(self, event_payload: dict):
+        return event_payload.get("probability", None)
@@ -0,0 +1,85 @@
+import random
+from collections import Counter
+
+import OpenCEP.misc.StudentMetrics as metrics
+from OpenCEP.CEP import CEP
+from OpenCEP.benchmark.BenchmarkRunner import run_benchmark, compare_with_baseline, get_percentile
+from OpenCEP.benchmark.BenchmarkTypes import PatternShapes, AttributeDistributions
+from OpenCEP.benchmark.SyntheticStream import SyntheticStreamParameters, SyntheticInputStream, \
+    generate_synthetic_events, create_synthetic_data_formatter
+from OpenCEP.benchmark.Workloads import BenchmarkCase
+from OpenCEP.stream.Stream import OutputStream
+
+
+def run_benchmark_tests():
+    benchmark_test = TestBenchmark()
+    benchmark_test.run_tests()
+    print("Benchmark unit tests executed successfully.")
+
+
+class TestBenchmark:
+    def test_synthetic_stream(self):
+        params = SyntheticStreamParameters(event_count=3000, type_skew=1.0,
+                                           attribute_distribution=AttributeDistributions.NORMAL, seed=7)
+        lines = generate_synthetic_events(params)
+        assert lines == generate_synthetic_events(params), "Benchmark: the synthetic stream is not reproducible"
+        data_formatter = create_synthetic_data_formatter(params)
+        payloads = data_formatter.parse_events(lines)
+        types = Counter(data_formatter.get_event_type(payload) for payload in payloads)
+        assert types["T0"] > 2 * types["T9"], "Benchmark: the event types are not skewed"
+        timestamps = data_formatter.get_event_timestamps(payloads)
+        assert timestamps == sorted(timestamps), "Benchmark: the synthetic timestamps are not ordered"
+        duration_s = (timestamps[-1] - timestamps[0]) / 10 ** 9
+        assert 0.8 < len(lines) / duration_s / params.event_rate < 1.2, "Benchmark: wrong event rate"
+
+    def test_selectivity(self):
+        generator = random.Random(0)
+        for selectivity in [0.1, 0.5, 0.9]:
+            pattern = BenchmarkCase("test", PatternShapes.SEQ, 2, selectivity=selectivity).create_patterns()[0]
+            condition = pattern.condition
+            satisfied = sum(condition.eval({"e0": {"Value": generator.random()}, "e1": {"Value": generator.random()}})
+                            for _ in range(20000))
+            assert abs(satisfied / 20000 - selectivity) < 0.02, "Benchmark: wrong condition selectivity"
+
+    def test_pattern_shapes(self):
+        multi_pattern_case = BenchmarkCase("test", PatternShapes.MULTI_PATTERN, 3, pattern_count=3)
+        patterns = multi_pattern_case.create_patterns()
+        assert [pattern.get_all_event_types() for pattern in patterns] == \
+               [{"T0", "T1", "T2"}, {"T0", "T1", "T3"}, {"T0", "T1", "T4"}], \
+            "Benchmark: wrong multi-pattern event types"
+        negation_pattern = BenchmarkCase("test", PatternShapes.NEGATION, 3).create_patterns()[0]
+        assert negation_pattern.negative_structure is not None, "Benchmark: the negation pattern has no negated event"
+
+    def test_run_benchmark(self):
+        stream_params = SyntheticStreamParameters(event_count=500)
+        case = BenchmarkCase("test", PatternShapes.SEQ, 3, stream_params=stream_params)
+        results = run_benchmark(case, repetitions=2)
+        matches = OutputStream()
+        previous_sink = metrics.set_metric_sink(lambda values: None)
+        CEP(case.create_patterns()).run(SyntheticInputStream(stream_params), matches,
+                                        create_synthetic_data_formatter(stream_params))
+        metrics.set_metric_sink(previous_sink)
+        assert results["matches"] == len(list(matches)), "Benchmark: wrong number of matches"
+        assert results["throughput"] > 0 and results["peak_memory_bytes"] > 0, "Benchmark: missing results"
+        assert 0 < results["p50_latency_ns"] <= results["p99_latency_ns"], "Benchmark: wrong latency percentiles"
+        assert results["peak_partial_matches"] > 0, "Benchmark: the partial matches were not counted"
+        assert metrics.set_metric_sink(previous_sink) is previous_sink, "Benchmark: the metric sink was not restored"
+
+    def test_baseline_comparison(self):
+        assert get_percentile([1, 2, 3, 4], 50) == 2 and get_percentile([1, 2, 3, 4], 99) == 4, \
+            "Benchmark: wrong percentiles"
+        baseline = {"a": {"throughput": 1000.0, "p99_latency_ns": 100, "matches": 10},
+                    "b": {"throughput": 1000.0, "p99_latency_ns": 100, "matches": 10}}
+        results = {"a": {"throughput": 900.0, "p99_latency_ns": 110, "matches": 10},
+                   "b": {"throughput": 700.0, "p99_latency_ns": 130, "matches": 11},
+                   "c": {"throughput": 1.0, "p99_latency_ns": 10 ** 9, "matches": 0}}
+        regressions = compare_with_baseline(results, baseline, tolerance=0.2)
+        assert len(regressions) == 3 and all(regression.startswith("b:") for regression in regressions), \
+            "Benchmark: wrong regressions %s" % (regressions,)
+
+    def run_tests(self):
+        self.test_synthetic_stream()
+        self.test_selectivity()
+        self.test_pattern_shapes()
+        self.test_run_benchmark()
+        self.test_baseline_comparison()
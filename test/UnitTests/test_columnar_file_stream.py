@@ -0,0 +1,91 @@
+import os
+import pickle
+import tempfile
+from datetime import datetime
+
+from OpenCEP.base.DataFormatter import DataFormatter
+from OpenCEP.base.Event import Event
+from OpenCEP.misc.Timestamps import datetime_to_ns
+from OpenCEP.plugin.stocks.Stocks import MetastockDataFormatter
+from OpenCEP.stream.ColumnarFileStream import convert_to_columnar_file, ColumnarFile, ColumnarFileInputStream, \
+    ColumnarFileDataFormatter
+from test.UnitTests.DictDataFormatter import DictDataFormatter
+
+
+def run_columnar_file_stream_tests():
+    columnar_file_stream_test = TestColumnarFileStream()
+    columnar_file_stream_test.run_tests()
+    print("Columnar file stream unit tests executed successfully.")
+
+
+class TestColumnarFileStream:
+    def __init__(self):
+        self.directory = tempfile.mkdtemp()
+        self.metastock_lines = ["AAPL,200802010900,136.2,136.2,136,136,6700\n",
+                                "GOOG,200802010901,560.5,561,560.5,561,1200,0.75\n",
+                                "AMZN,200802010901,74.3,74.8,74.3,74.8,300\n"]
+
+    def __replay(self, raw_events, data_formatter: DataFormatter, **kwargs):
+        file_path = os.path.join(self.directory, "events.col")
+        count = convert_to_columnar_file(raw_events, data_formatter, file_path)
+        assert count == len(raw_events), "ColumnarFileStream: wrong number of converted events"
+        stream = ColumnarFileInputStream(file_path, **kwargs)
+        replayed_formatter = ColumnarFileDataFormatter()
+        events = [Event(payload, replayed_formatter) for payload in stream]
+        stream.close()
+        return events
+
+    def __assert_equal_events(self, raw_events, data_formatter: DataFormatter, **kwargs):
+        expected_events = [Event(raw_event, data_formatter) for raw_event in raw_events]
+        events = self.__replay(raw_events, data_formatter, **kwargs)
+        assert len(events) == len(expected_events), "ColumnarFileStream: wrong number of replayed events"
+        for event, expected_event in zip(events, expected_events):
+            del event.payload[Event.INDEX_ATTRIBUTE_NAME]
+            del expected_event.payload[Event.INDEX_ATTRIBUTE_NAME]
+            assert event.payload == expected_event.payload, "ColumnarFileStream: wrong payload %s" % (event,)
+            assert [type(value) for value in event.payload.values()] == \
+                   [type(value) for value in expected_event.payload.values()], \
+                "ColumnarFileStream: wrong attribute types in %s" % (event,)
+            assert (event.type, event.timestamp, event.probability) == \
+                   (expected_event.type, expected_event.timestamp, expected_event.probability), \
+                "ColumnarFileStream: wrong event type, timestamp or probability of %s" % (event,)
+
+    def test_metastock_replay(self):
+        self.__assert_equal_events(self.metastock_lines, MetastockDataFormatter())
+        self.__assert_equal_events(self.metastock_lines * 5, MetastockDataFormatter(), batch_size=2)
+
+    def test_column_types(self):
+        raw_events = [
+            {"type": "A", "time": datetime(2020, 1, 1), "int": 2 ** 62, "float": 0.5, "number": 3,
+             "str": "x", "object": (1, 2), "big": 2 ** 60},
+            {"type": 7, "time": datetime(2020, 1, 2), "int": -1, "float": -0.25, "number": 3.5,
+             "object": None, "big": 0.5, "probability": 0.1},
+            {"type": "A", "time": datetime(2020, 1, 3), "int": 0, "float": 1e300, "number": -2 ** 53,
+             "str": "", "object": "text", "big": 1, "extra": True},
+        ]
+        self.__assert_equal_events(raw_events, DictDataFormatter())
+        file = ColumnarFile(os.path.join(self.directory, "events.col"))
+        assert file.get_timestamps().tolist() == [datetime_to_ns(event["time"]) for event in raw_events], \
+            "ColumnarFileStream: wrong timestamp column"
+        assert file.get_event_types() == ["A", 7, "A"], "ColumnarFileStream: wrong event type column"
+        payload = pickle.loads(pickle.dumps(file.read_batch(1, 2)[0]))
+        assert payload.event_type == 7 and payload.probability == 0.1, "ColumnarFileStream: a payload was not pickled"
+        assert file.read_batch(3, 5) == [], "ColumnarFileStream: events were read beyond the end of the file"
+        file.close()
+
+    def test_empty_and_invalid_files(self):
+        assert self.__replay([], MetastockDataFormatter()) == [], "ColumnarFileStream: events read from an empty file"
+        file_path = os.path.join(self.directory, "events.txt")
+        with open(file_path, "w") as f:
+            f.writelines(self.metastock_lines)
+        try:
+            ColumnarFile(file_path)
+        except Exception:
+            pass
+        else:
+            assert False, "ColumnarFileStream: a text file was opened as a columnar file"
+
+    def run_tests(self):
+        self.test_metastock_replay()
+        self.test_column_types()
+        self.test_empty_and_invalid_files()
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from OpenCEP.CEP import CEP
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, PrimitiveEventStructure
+from OpenCEP.misc.ConsumptionPolicy import ConsumptionPolicy
+from OpenCEP.misc.Timestamps import NANOSECONDS_PER_SECOND
+from OpenCEP.stream.Stream import Stream, OutputStream
+from test.UnitTests.DictDataFormatter import DictDataFormatter
+
+
+def run_freeze_policy_tests():
+    freeze_policy_test = TestFreezePolicy()
+    freeze_policy_test.run_tests()
+    print("Freeze policy unit tests executed successfully.")
+
+
+class TestFreezePolicy:
+    """
+    Runs PATTERN SEQ(A a, B b, C c, D d) WITHIN 10 seconds over a fixed stream. A freezer on b blocks the leaves a and b
+    and a freezer on c blocks the leaves a, b and c until the freezer is either matched or expires.
+    """
+    # (type, time in seconds)
+    EVENTS = [("B", 0), ("A", 1), ("C", 5), ("A", 12), ("B", 13), ("A", 16), ("B", 17), ("C", 18), ("D", 19),
+              ("A", 30), ("B", 31), ("C", 32), ("D", 33), ("A", 34), ("B", 35), ("C", 36), ("D", 37)]
+    LATE_MATCHES = [[("A", 30), ("B", 31), ("C", 32), ("D", 33)],
+                    [("A", 30), ("B", 31), ("C", 32), ("D", 37)],
+                    [("A", 30), ("B", 31), ("C", 36), ("D", 37)],
+                    [("A", 30), ("B", 35), ("C", 36), ("D", 37)],
+                    [("A", 34), ("B", 35), ("C", 36), ("D", 37)]]
+
+    def __run_pattern(self, freeze):
+        events = Stream()
+        for event_type, time in self.EVENTS:
+            events.add_item({"type": event_type, "time": time * NANOSECONDS_PER_SECOND})
+        events.close()
+        pattern = Pattern(SeqOperator(*[PrimitiveEventStructure(event_type, event_type.lower())
+                                        for event_type in "ABCD"]),
+                          None, timedelta(seconds=10), ConsumptionPolicy(freeze=freeze))
+        matches = OutputStream()
+        CEP([pattern]).run(events, matches, DictDataFormatter())
+        return [[(event.type, event.payload["time"] // NANOSECONDS_PER_SECOND) for event in match.events]
+                for match in matches]
+
+    def test_freezer_expiration(self):
+        # B0 blocks a and b until it expires, hence A1 is ignored and A12 starts a match
+        expected_matches = [[("A", 12), ("B", 13), ("C", 18), ("D", 19)]] + self.LATE_MATCHES
+        assert self.__run_pattern("b") == expected_matches, "FreezePolicy: incorrect matches of an expiring freezer"
+
+    def test_overlapping_freezers(self):
+        # C5 keeps a and b blocked after B0 expires, hence A12 and B13 are ignored until C5 expires
+        expected_matches = [[("A", 16), ("B", 17), ("C", 18), ("D", 19)]] + self.LATE_MATCHES
+        assert self.__run_pattern(["b", "c"]) == expected_matches, \
+            "FreezePolicy: incorrect matches of overlapping freezers"
+
+    def test_matched_freezers(self):
+        # B31 and C32 are released by the match ending at D33, hence A34 is accepted before they would expire
+        assert self.__run_pattern(["b", "c"])[-1] == [("A", 34), ("B", 35), ("C", 36), ("D", 37)], \
+            "FreezePolicy: matched freezers were not released"
+
+    def run_tests(self):
+        self.test_freezer_expiration()
+        self.test_overlapping_freezers()
+        self.test_matched_freezers()
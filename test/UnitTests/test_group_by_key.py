@@ -0,0 +1,149 @@
+import random
+from datetime import datetime, timedelta
+
+from OpenCEP.CEP import CEP
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import EqCondition
+from OpenCEP.condition.Condition import Variable, TrueCondition
+from OpenCEP.misc.Timestamps import datetime_to_ns, timedelta_to_ns
+from OpenCEP.parallel.ParallelExecutionParameters import DataParallelExecutionParametersHirzelAlgorithm
+from OpenCEP.parallel.data_parallel.GroupByKeyParallelExecutionAlgorithm import GroupByKeyParallelExecutionAlgorithm
+from OpenCEP.parallel.platform.ThreadingParallelExecutionPlatform import ThreadingParallelExecutionPlatform
+from OpenCEP.stream.Stream import Stream, OutputStream
+from test.UnitTests.DictDataFormatter import DictDataFormatter
+
+
+"""
+Event for these tests only
+"""
+
+
+class Event:
+    def __init__(self, ticker, time):
+        self.payload = {"Ticker": ticker}
+        self.timestamp = datetime_to_ns(time)
+
+
+def run_group_by_key_tests():
+    group_by_key_test = TestGroupByKey()
+    group_by_key_test.run_tests()
+    print("GroupByKey parallel algorithm unit tests executed successfully.")
+
+
+class TestGroupByKey:
+    def __init__(self):
+        self.dt = datetime(2020, 1, 1)
+        ticker = lambda x: x["Ticker"]
+        self.seq_pattern = Pattern(SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b")),
+                                   EqCondition(Variable("a", ticker), Variable("b", ticker)), timedelta(minutes=1))
+        self.single_event_pattern = Pattern(SeqOperator(PrimitiveEventStructure("A", "a")), TrueCondition(),
+                                            timedelta(minutes=1))
+
+    def __create_algorithm(self, pattern: Pattern, **kwargs):
+        return GroupByKeyParallelExecutionAlgorithm(4, pattern, None, ThreadingParallelExecutionPlatform(), "Ticker",
+                                                    **kwargs)
+
+    def __create_skewed_events(self, count: int, minutes_per_event: int = 1):
+        """
+        Half of the events share the key "HOT", the rest are spread between 30 other keys.
+        """
+        return [Event("HOT" if i % 2 == 0 else "K%d" % (i % 60,), self.dt + timedelta(minutes=i * minutes_per_event))
+                for i in range(count)]
+
+    def test_string_keys(self):
+        algorithm = self.__create_algorithm(self.seq_pattern)
+        first_units = algorithm._classifier(Event("AAPL", self.dt))
+        assert len(first_units) == 1, "GroupByKey: an event with a string key was not routed to a single unit"
+        assert algorithm._classifier(Event("AAPL", self.dt + timedelta(seconds=1))) == first_units, \
+            "GroupByKey: events with the same key were routed to different units"
+        assert algorithm._classifier(Event(None, self.dt)) == set(), "GroupByKey: an event with no key was routed"
+        numeric_units = algorithm._classifier(Event(74.3, self.dt))
+        assert algorithm._classifier(Event("74.8", self.dt)) == numeric_units, \
+            "GroupByKey: numeric keys were not truncated"
+
+    def __find_colliding_keys(self):
+        """
+        Returns two keys initially assigned to the same unit.
+        """
+        algorithm = self.__create_algorithm(self.seq_pattern)
+        units_to_keys = {}
+        for i in range(100):
+            key = "HOT%d" % (i,)
+            units = frozenset(algorithm._classifier(Event(key, self.dt)))
+            if units in units_to_keys:
+                return units_to_keys[units], key
+            units_to_keys[units] = key
+
+    def test_rebalancing(self):
+        events = self.__create_skewed_events(4000)
+        static_loads = self.__route(self.__create_algorithm(self.seq_pattern, rebalance_interval=10 ** 6), events)
+        loads = self.__route(self.__create_algorithm(self.seq_pattern, rebalance_interval=200), events)
+        assert max(loads) < max(static_loads), "GroupByKey: rebalancing did not reduce the load"
+
+    def test_hot_group_migration(self):
+        # two hot keys initially sharing a unit receive two thirds of the events, and a new event arrives every second
+        first_key, second_key = self.__find_colliding_keys()
+        events = [Event([first_key, second_key, "K%d" % (i % 30,)][i % 3], self.dt + timedelta(seconds=i))
+                  for i in range(3000)]
+        algorithm = self.__create_algorithm(self.seq_pattern, rebalance_interval=200)
+        initial_units = algorithm._classifier(events[0])
+        routing = {first_key: [], second_key: []}
+        for event in events[1:]:
+            units = algorithm._classifier(event)
+            if event.payload["Ticker"] in routing:
+                routing[event.payload["Ticker"]].append((event.timestamp, units))
+        migrated_key_routing = [key_routing for key_routing in routing.values() if key_routing[-1][1] != initial_units]
+        assert len(migrated_key_routing) > 0, "GroupByKey: no hot key group was migrated"
+        draining_timestamps = [timestamp for timestamp, units in migrated_key_routing[0] if len(units) == 2]
+        assert len(draining_timestamps) > 0, "GroupByKey: a migrated key group was not drained"
+        assert draining_timestamps[-1] - draining_timestamps[0] <= timedelta_to_ns(timedelta(minutes=1)), \
+            "GroupByKey: a migrated key group was passed to its old unit for more than a time window"
+        assert all(initial_units.issubset(units) for timestamp, units in migrated_key_routing[0]
+                   if timestamp <= draining_timestamps[-1]), \
+            "GroupByKey: a key group was removed from its old unit before it was drained"
+
+    def test_migration_matches(self):
+        generator = random.Random(0)
+        first_key, second_key = self.__find_colliding_keys()
+        keys = [first_key, second_key, first_key, second_key] + ["K%d" % (i,) for i in range(8)]
+        raw_events = [{"type": "AB"[generator.randrange(2)], "time": datetime_to_ns(self.dt + timedelta(seconds=i)),
+                       "Ticker": generator.choice(keys)} for i in range(2000)]
+        expected_matches = self.__run(raw_events)
+        assert len(expected_matches) > 0, "GroupByKey: no matches were detected by the test pattern"
+        parallel_execution_params = DataParallelExecutionParametersHirzelAlgorithm(units_number=4, key="Ticker",
+                                                                                   rebalance_interval=100)
+        assert self.__run(raw_events, parallel_execution_params) == expected_matches, \
+            "GroupByKey: migrating key groups changed the detected matches"
+
+    def __run(self, raw_events, parallel_execution_params=None):
+        events = Stream()
+        for raw_event in raw_events:
+            events.add_item(raw_event)
+        events.close()
+        matches = OutputStream()
+        CEP([self.seq_pattern], None, parallel_execution_params).run(events, matches, DictDataFormatter())
+        return sorted(str([(event.type, event.timestamp) for event in match.events]) for match in matches)
+
+    def test_hot_key_splitting(self):
+        events = self.__create_skewed_events(4000, minutes_per_event=0)
+        loads = self.__route(self.__create_algorithm(self.single_event_pattern, rebalance_interval=200,
+                                                     split_hot_keys=True), events)
+        assert max(loads) < 0.3 * len(events), "GroupByKey: the hot key was not split"
+        sequence_loads = self.__route(self.__create_algorithm(self.seq_pattern, rebalance_interval=200,
+                                                              split_hot_keys=True), events)
+        assert max(sequence_loads) >= 0.5 * len(events), \
+            "GroupByKey: a hot key was split although a match may span several events"
+
+    @staticmethod
+    def __route(algorithm: GroupByKeyParallelExecutionAlgorithm, events):
+        for event in events:
+            algorithm._classifier(event)
+        return algorithm.get_unit_loads()
+
+    def run_tests(self):
+        self.test_string_keys()
+        self.test_rebalancing()
+        self.test_hot_group_migration()
+        self.test_migration_matches()
+        self.test_hot_key_splitting()
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, AndOperator, PrimitiveEventStructure, NegationOperator, \
+    KleeneClosureOperator
+from OpenCEP.condition.BaseRelationCondition import GreaterThanCondition
+from OpenCEP.condition.Condition import Variable, TrueCondition
+from OpenCEP.misc.Timestamps import datetime_to_ns
+from OpenCEP.nfa.LazyChainNFA import LazyChainNFA
+
+
+"""
+Event for these tests only
+"""
+
+
+class Event:
+    def __init__(self, event_type, value, time):
+        self.payload = {"Value": value}
+        self.type = event_type
+        self.min_timestamp = self.max_timestamp = self.timestamp = datetime_to_ns(time)
+        self.probability = None
+
+    def __repr__(self):
+        return "%s(%s)" % (self.type, self.payload["Value"])
+
+
+def run_lazy_nfa_tests():
+    lazy_nfa_test = TestLazyChainNFA()
+    lazy_nfa_test.run_tests()
+    print("Lazy chain NFA unit tests executed successfully.")
+
+
+class TestLazyChainNFA:
+    def __init__(self):
+        self.dt = datetime(2020, 1, 1)
+        self.value = lambda x: x["Value"]
+
+    def __create_nfa(self, structure, condition=None, window=timedelta(minutes=5)):
+        pattern = Pattern(structure, TrueCondition() if condition is None else condition, window)
+        return LazyChainNFA(pattern, timedelta(hours=1), 2)
+
+    def __play(self, nfa: LazyChainNFA, events):
+        matches = []
+        for event_type, value, minutes in events:
+            matches.extend(nfa.handle_event(Event(event_type, value, self.dt + timedelta(minutes=minutes))))
+        matches.extend(nfa.flush_pending_matches())
+        return sorted(tuple(sorted(event.payload["Value"] for event in match.events)) for match in matches)
+
+    def test_sequence(self):
+        nfa = self.__create_nfa(SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b")),
+                                GreaterThanCondition(Variable("b", self.value), Variable("a", self.value)))
+        matches = self.__play(nfa, [("B", 0, 0), ("A", 1, 1), ("A", 5, 2), ("B", 3, 3), ("B", 6, 9)])
+        assert matches == [(1, 3)], "LazyChainNFA: wrong sequence matches %s" % (matches,)
+
+    def test_conjunction(self):
+        nfa = self.__create_nfa(AndOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b")))
+        matches = self.__play(nfa, [("B", 0, 0), ("A", 1, 1), ("A", 2, 6), ("B", 3, 7)])
+        assert matches == [(0, 1), (2, 3)], "LazyChainNFA: wrong conjunction matches %s" % (matches,)
+
+    def test_negation(self):
+        nfa = self.__create_nfa(SeqOperator(PrimitiveEventStructure("A", "a"),
+                                            NegationOperator(PrimitiveEventStructure("B", "b")),
+                                            PrimitiveEventStructure("C", "c")))
+        matches = self.__play(nfa, [("A", 0, 0), ("B", 1, 1), ("A", 2, 2), ("C", 3, 3)])
+        assert matches == [(2, 3)], "LazyChainNFA: a negated event did not invalidate a match %s" % (matches,)
+        trailing_nfa = self.__create_nfa(SeqOperator(PrimitiveEventStructure("A", "a"),
+                                                     NegationOperator(PrimitiveEventStructure("B", "b"))),
+                                         window=timedelta(minutes=2))
+        matches = self.__play(trailing_nfa, [("A", 0, 0), ("B", 1, 1), ("A", 2, 5), ("A", 3, 10)])
+        assert matches == [(2,), (3,)], "LazyChainNFA: wrong matches for a trailing negated event %s" % (matches,)
+
+    def test_lazy_buffering(self):
+        nfa = self.__create_nfa(SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b")))
+        # frequent A events followed by rare B events
+        events = [("A", i, i * 0.1) for i in range(20)] + [("B", 100, 2.5)]
+        events += [("A", 20 + i, 3 + i * 0.1) for i in range(20)] + [("B", 101, 5.5)]
+        matches = self.__play(nfa, events)
+        assert len(matches) == 55, "LazyChainNFA: wrong number of matches %d" % (len(matches),)
+        summary = nfa.get_structure_summary()
+        assert summary == ("Seq", "b", "a"), "LazyChainNFA: the rare event is not evaluated first %s" % (summary,)
+
+    def test_unsupported_patterns(self):
+        for structure in [SeqOperator(PrimitiveEventStructure("A", "a"),
+                                      KleeneClosureOperator(PrimitiveEventStructure("B", "b"))),
+                          SeqOperator(PrimitiveEventStructure("A", "a"),
+                                      AndOperator(PrimitiveEventStructure("B", "b"),
+                                                  PrimitiveEventStructure("C", "c")))]:
+            try:
+                self.__create_nfa(structure)
+            except Exception:
+                continue
+            raise Exception("LazyChainNFA: an unsupported pattern was accepted")
+
+    def run_tests(self):
+        self.test_sequence()
+        self.test_conjunction()
+        self.test_negation()
+        self.test_lazy_buffering()
+        self.test_unsupported_patterns()
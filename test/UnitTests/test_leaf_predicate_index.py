@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from OpenCEP.base.PatternStructure import PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import EqCondition, GreaterThanCondition, SmallerThanCondition, \
+    SmallerThanEqCondition, NotEqCondition
+from OpenCEP.condition.CompositeCondition import AndCondition
+from OpenCEP.condition.Condition import Variable
+from OpenCEP.tree.LeafPredicateIndex import EventTypeListeners
+from OpenCEP.tree.nodes.LeafNode import LeafNode
+from OpenCEP.tree.nodes.Node import PatternParameters
+
+
+"""
+Event for these tests only
+"""
+
+
+class Event:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def run_leaf_predicate_index_tests():
+    leaf_predicate_index_test = TestLeafPredicateIndex()
+    leaf_predicate_index_test.run_tests()
+    print("Leaf predicate index unit tests executed successfully.")
+
+
+class TestLeafPredicateIndex:
+    def __create_leaf(self, *conditions):
+        leaf = LeafNode(PatternParameters(timedelta(minutes=5), None), 0, PrimitiveEventStructure("AAPL", "a"), [])
+        leaf.apply_condition(AndCondition(*conditions))
+        return leaf
+
+    def __create_listeners(self):
+        price = lambda x: x["Price"]
+        leaves = [
+            self.__create_leaf(GreaterThanCondition(Variable("a", price), 100)),
+            self.__create_leaf(GreaterThanCondition(Variable("a", lambda x: x["Price"]), 200)),
+            self.__create_leaf(SmallerThanEqCondition(Variable("a", price), 150)),
+            # the constant is on the left side: a.Price > 120
+            self.__create_leaf(SmallerThanCondition(120, Variable("a", price))),
+            self.__create_leaf(EqCondition(Variable("a", lambda x: x["Name"]), "X")),
+            self.__create_leaf(EqCondition(Variable("a", lambda x: x["Name"]), "Y"),
+                               GreaterThanCondition(Variable("a", price), 1000)),
+            self.__create_leaf(NotEqCondition(Variable("a", price), 100)),
+            self.__create_leaf(),
+        ]
+        listeners = EventTypeListeners(leaves)
+        listeners.build_predicate_index()
+        return leaves, listeners
+
+    def test_range_predicates(self):
+        leaves, listeners = self.__create_listeners()
+        accepting = listeners.get_accepting_leaves(Event({"Price": 130, "Name": "Z"}))
+        assert accepting == [leaves[0], leaves[2], leaves[3], leaves[6], leaves[7]], \
+            "Leaf predicate index: incorrect leaves for a range lookup"
+        accepting = listeners.get_accepting_leaves(Event({"Price": 150, "Name": "Z"}))
+        assert accepting == [leaves[0], leaves[2], leaves[3], leaves[6], leaves[7]], \
+            "Leaf predicate index: incorrect leaves for a range lookup on a boundary"
+        accepting = listeners.get_accepting_leaves(Event({"Price": 250, "Name": "Z"}))
+        assert accepting == [leaves[0], leaves[1], leaves[3], leaves[6], leaves[7]], \
+            "Leaf predicate index: incorrect leaves for a range lookup"
+
+    def test_equality_predicates(self):
+        leaves, listeners = self.__create_listeners()
+        accepting = listeners.get_accepting_leaves(Event({"Price": 50, "Name": "Y"}))
+        # the equality predicate is preferred for indexing, the price condition is validated by the leaf itself
+        assert accepting == [leaves[2], leaves[5], leaves[6], leaves[7]], \
+            "Leaf predicate index: incorrect leaves for an equality lookup"
+
+    def test_failing_attribute(self):
+        leaves, listeners = self.__create_listeners()
+        accepting = listeners.get_accepting_leaves(Event({"Price": 50}))
+        assert accepting == [leaves[2], leaves[4], leaves[5], leaves[6], leaves[7]], \
+            "Leaf predicate index: leaves with a failing attribute were filtered"
+
+    def test_unindexed_listeners(self):
+        leaves = [self.__create_leaf(GreaterThanCondition(Variable("a", lambda x: x["Price"]), 100))]
+        listeners = EventTypeListeners(leaves)
+        assert listeners.get_accepting_leaves(Event({"Price": 50})) is listeners, \
+            "Leaf predicate index: an unindexed list should return all leaves"
+
+    def run_tests(self):
+        self.test_range_predicates()
+        self.test_equality_predicates()
+        self.test_failing_attribute()
+        self.test_unindexed_listeners()
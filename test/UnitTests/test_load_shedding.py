@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+
+from OpenCEP.base.PatternMatch import PatternMatch
+from OpenCEP.misc.InputBasedLoadShedder import InputBasedLoadShedder
+from OpenCEP.misc.StateBasedLoadShedder import StateBasedLoadShedder
+from OpenCEP.misc.Timestamps import datetime_to_ns, timedelta_to_ns
+from OpenCEP.tree.PatternMatchStorage import UnsortedPatternMatchStorage
+
+
+"""
+Event for these tests only
+"""
+
+
+class Event:
+    def __init__(self, payload, event_type, time):
+        self.payload = payload
+        self.type = event_type
+        self.min_timestamp = self.max_timestamp = self.timestamp = time
+
+
+def run_load_shedding_tests():
+    load_shedder_test = TestStateBasedLoadShedder()
+    load_shedder_test.run_tests()
+    input_load_shedder_test = TestInputBasedLoadShedder()
+    input_load_shedder_test.run_tests()
+    print("Load shedding unit tests executed successfully.")
+
+
+class TestStateBasedLoadShedder:
+    def __init__(self):
+        self.dt = datetime_to_ns(datetime(2020, 1, 1))
+        self.window = timedelta_to_ns(timedelta(hours=1))
+
+    def __create_partial_match(self, length: int, offset_minutes: int):
+        return PatternMatch([Event(i, "type", self.dt + timedelta_to_ns(timedelta(minutes=offset_minutes)))
+                             for i in range(length)])
+
+    def __fill_storages(self, shedder: StateBasedLoadShedder):
+        """
+        Fills one storage with short partial matches that never contribute to a full match and another one with long
+        partial matches that always do.
+        """
+        useless_storage, useful_storage = UnsortedPatternMatchStorage(1), UnsortedPatternMatchStorage(1)
+        useless_storage.set_load_shedder(shedder)
+        useful_storage.set_load_shedder(shedder)
+        for i in range(10):
+            useless_storage.add(self.__create_partial_match(1, i))
+            useful_pm = self.__create_partial_match(5, i)
+            useful_storage.add(useful_pm)
+            shedder.register_full_match(useful_pm)
+        return useless_storage, useful_storage
+
+    def test_shed_lowest_utility_first(self):
+        shedder = StateBasedLoadShedder(self.window, latency_threshold_ns=100, cooldown=1, max_shedding_ratio=0.25)
+        useless_storage, useful_storage = self.__fill_storages(shedder)
+        assert shedder.handle_event(50, self.dt + timedelta_to_ns(timedelta(minutes=10))) == 0, \
+            "Load shedder: shedding below the latency threshold"
+        # the threshold is violated by a factor of 2, but a single decision may only drop a quarter of the state
+        assert shedder.handle_event(200, self.dt + timedelta_to_ns(timedelta(minutes=10))) == 5, \
+            "Load shedder: incorrect number of dropped partial matches"
+        assert len(useless_storage) == 5 and len(useful_storage) == 10, \
+            "Load shedder: partial matches of a useful bucket were dropped first"
+        assert shedder.get_shed_partial_matches_count() == 5, "Load shedder: incorrect shedding counter"
+
+    def test_cooldown(self):
+        shedder = StateBasedLoadShedder(self.window, latency_threshold_ns=100, cooldown=3)
+        self.__fill_storages(shedder)
+        assert shedder.handle_event(1000, self.dt) == 0, "Load shedder: cooldown was not respected"
+        assert shedder.handle_event(1000, self.dt) == 0, "Load shedder: cooldown was not respected"
+        assert shedder.handle_event(1000, self.dt) > 0, "Load shedder: no shedding after the cooldown"
+        assert shedder.handle_event(1000, self.dt) == 0, "Load shedder: cooldown was not respected"
+
+    def test_expired_partial_matches_are_forgotten(self):
+        shedder = StateBasedLoadShedder(self.window, latency_threshold_ns=100, cooldown=1)
+        self.__fill_storages(shedder)
+        assert shedder.handle_event(1000, self.dt + timedelta_to_ns(timedelta(hours=2))) == 0, \
+            "Load shedder: expired partial matches were dropped"
+
+    def test_contribution_inheritance(self):
+        shedder = StateBasedLoadShedder(self.window, latency_threshold_ns=-1)
+        storage = UnsortedPatternMatchStorage(1)
+        storage.set_load_shedder(shedder)
+        source_pm = self.__create_partial_match(1, 0)
+        storage.add(source_pm)
+        full_match = self.__create_partial_match(5, 0)
+        full_match.contributing_buckets = source_pm.contributing_buckets
+        storage.add(full_match)
+        shedder.register_full_match(full_match)
+        utilities = shedder.get_bucket_utilities()
+        assert len(full_match.contributing_buckets) == 2, "Load shedder: the bucket of a new match was not recorded"
+        assert all(utility == 1.0 for utility in utilities.values()), \
+            "Load shedder: contributing buckets were not credited"
+
+    def run_tests(self):
+        self.test_shed_lowest_utility_first()
+        self.test_cooldown()
+        self.test_expired_partial_matches_are_forgotten()
+        self.test_contribution_inheritance()
+
+
+class TestInputBasedLoadShedder:
+    def __init__(self):
+        self.dt = datetime(2020, 1, 1)
+
+    def __feed_events(self, shedder: InputBasedLoadShedder, count: int, latency_ns: int):
+        """
+        Feeds events of a useless and a useful type, reporting a full match for each useful event.
+        """
+        for i in range(count):
+            for event_type in ["useless", "useful"]:
+                if shedder.should_drop(event_type):
+                    continue
+                if event_type == "useful":
+                    shedder.register_full_match(PatternMatch([Event(i, event_type, self.dt)]))
+                shedder.handle_event(latency_ns)
+
+    def test_no_shedding_below_threshold(self):
+        shedder = InputBasedLoadShedder(latency_threshold_ns=100, cooldown=1)
+        self.__feed_events(shedder, 20, 50)
+        assert shedder.get_shedding_ratio() == 0.0, "Input load shedder: shedding below the latency threshold"
+        assert all(count == 0 for count in shedder.get_dropped_events_count().values()), \
+            "Input load shedder: events dropped below the latency threshold"
+
+    def test_shed_lowest_utility_type_first(self):
+        shedder = InputBasedLoadShedder(latency_threshold_ns=100, cooldown=1, max_shedding_ratio=0.25)
+        self.__feed_events(shedder, 10, 50)
+        self.__feed_events(shedder, 20, 200)
+        assert shedder.get_shedding_ratio() == 0.25, "Input load shedder: the maximal shedding ratio was exceeded"
+        dropped_events = shedder.get_dropped_events_count()
+        assert dropped_events["useless"] > 0, "Input load shedder: no events were dropped"
+        assert dropped_events["useful"] == 0, "Input load shedder: events of a useful type were dropped first"
+
+    def test_recovery(self):
+        shedder = InputBasedLoadShedder(latency_threshold_ns=100, cooldown=1)
+        self.__feed_events(shedder, 10, 200)
+        assert shedder.get_shedding_ratio() > 0.0, "Input load shedder: no shedding above the latency threshold"
+        self.__feed_events(shedder, 10, 10)
+        assert shedder.get_shedding_ratio() == 0.0, "Input load shedder: shedding was not stopped"
+
+    def run_tests(self):
+        self.test_no_shedding_below_threshold()
+        self.test_shed_lowest_utility_type_first()
+        self.test_recovery()
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from OpenCEP.base.Event import Event as BaseEvent
+from OpenCEP.base.PatternMatch import PatternMatch
+from OpenCEP.stream.MatchSerializers import BinaryMatchSerializer, CSVIndexMatchSerializer, \
+    JSONLinesMatchSerializer, StringMatchSerializer
+from OpenCEP.stream.MatchSinks import BufferedFileOutputStream, CallbackOutputStream
+
+
+"""
+Event for these tests only
+"""
+
+
+class Event:
+    def __init__(self, index, time):
+        self.payload = {"Name": "AAPL", "Value": index, BaseEvent.INDEX_ATTRIBUTE_NAME: index}
+        self.min_timestamp = self.max_timestamp = self.timestamp = time
+
+    def __repr__(self):
+        return "{'Name': 'AAPL', 'Value': %s}" % (self.payload["Value"],)
+
+
+def run_match_sinks_tests():
+    match_sinks_test = TestMatchSinks()
+    match_sinks_test.run_tests()
+    print("Match sinks unit tests executed successfully.")
+
+
+class TestMatchSinks:
+    def __init__(self):
+        self.dt = datetime(2020, 1, 1)
+
+    def __create_matches(self, number: int):
+        matches = []
+        for i in range(number):
+            match = PatternMatch([Event(2 * i, self.dt + timedelta(minutes=i)),
+                                  Event(2 * i + 1, self.dt + timedelta(minutes=i + 1))])
+            match.add_pattern_id(i % 3)
+            matches.append(match)
+        return matches
+
+    def __write_matches(self, serializer, matches, batch_size: int = 4, max_pending_batches: int = 2):
+        base_path = tempfile.mkdtemp()
+        sink = BufferedFileOutputStream(base_path, "matches.out", serializer, batch_size, max_pending_batches)
+        for match in matches:
+            sink.add_item(match)
+        sink.close()
+        return os.path.join(base_path, "matches.out")
+
+    def test_string_serializer(self):
+        matches = self.__create_matches(10)
+        with open(self.__write_matches(StringMatchSerializer(), matches), "r") as f:
+            content = f.read()
+        assert content == "".join(str(match) for match in matches), \
+            "Match sinks: buffered output differs from the string representation of the matches"
+
+    def test_json_lines_serializer(self):
+        matches = self.__create_matches(10)
+        with open(self.__write_matches(JSONLinesMatchSerializer(), matches), "r") as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 10, "Match sinks: incorrect number of JSON records"
+        assert records[3] == {"pattern_ids": [0], "events": [{"Name": "AAPL", "Value": 6}, {"Name": "AAPL", "Value": 7}]}, \
+            "Match sinks: incorrect JSON record"
+
+    def test_csv_index_serializer(self):
+        matches = self.__create_matches(5)
+        with open(self.__write_matches(CSVIndexMatchSerializer(), matches), "r") as f:
+            lines = f.read().splitlines()
+        assert lines == ["0;0,1", "1;2,3", "2;4,5", "0;6,7", "1;8,9"], "Match sinks: incorrect CSV records"
+
+    def test_binary_serializer(self):
+        matches = self.__create_matches(9)
+        with open(self.__write_matches(BinaryMatchSerializer(), matches), "rb") as f:
+            records = list(BinaryMatchSerializer.read_records(f))
+        assert records == [([i % 3], [2 * i, 2 * i + 1]) for i in range(9)], "Match sinks: incorrect binary records"
+
+    def test_callback_sink(self):
+        received = []
+        closed = []
+        sink = CallbackOutputStream(received.append, lambda: closed.append(True))
+        matches = self.__create_matches(3)
+        for match in matches:
+            sink.add_item(match)
+        assert received == matches, "Match sinks: the callback did not receive all matches"
+        sink.close()
+        assert closed == [True], "Match sinks: the close callback was not called"
+
+    def run_tests(self):
+        self.test_string_serializer()
+        self.test_json_lines_serializer()
+        self.test_csv_index_serializer()
+        self.test_binary_serializer()
+        self.test_callback_sink()
@@ -0,0 +1,66 @@
+import random
+from datetime import timedelta
+
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, NegationOperator, PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import SmallerThanCondition
+from OpenCEP.condition.CompositeCondition import AndCondition
+from OpenCEP.condition.Condition import Variable
+from OpenCEP.plan.multi.local_search.MultiPatternGraph import MultiPatternGraph
+
+
+def run_multi_pattern_graph_tests():
+    multi_pattern_graph_test = TestMultiPatternGraph()
+    multi_pattern_graph_test.run_tests()
+    print("Multi-pattern graph unit tests executed successfully.")
+
+
+class TestMultiPatternGraph:
+    @staticmethod
+    def __create_pattern(types: str, negated_type: str = None):
+        """
+        Creates a sequence pattern over events of the given types, the value of each event being smaller than the next
+        one, optionally followed by a negated event.
+        """
+        names = types.lower()
+        value = lambda x: x["value"]
+        structure = SeqOperator(*[PrimitiveEventStructure(event_type, name) for event_type, name in zip(types, names)])
+        if negated_type is not None:
+            structure.args.append(NegationOperator(PrimitiveEventStructure(negated_type, negated_type.lower())))
+        condition = AndCondition(*[SmallerThanCondition(Variable(names[i], value), Variable(names[i + 1], value))
+                                   for i in range(len(names) - 1)])
+        return Pattern(structure, condition, timedelta(seconds=1))
+
+    @staticmethod
+    def __collect_max_patterns_and_peers(graph: MultiPatternGraph):
+        """
+        Returns the maximal common sub patterns of the graph with the IDs of the patterns containing them, as found by
+        repeatedly drawing random max sub patterns.
+        """
+        random.seed(0)
+        results = {}
+        for _ in range(500):
+            result = graph.get_random_max_pattern_and_peers(neighborhood=len(graph.patterns))
+            if result is not None:
+                max_pattern, peers = result
+                results[str(max_pattern.full_structure)] = sorted(graph.patterns.index(peer) for peer in peers)
+        return results
+
+    def test_common_sub_patterns(self):
+        patterns = [self.__create_pattern("ABC"), self.__create_pattern("ABD"), self.__create_pattern("EF"),
+                    self.__create_pattern("EFG"), self.__create_pattern("AB", negated_type="C"),
+                    self.__create_pattern("XY")]
+        results = self.__collect_max_patterns_and_peers(MultiPatternGraph(patterns))
+        expected_results = {str(self.__create_pattern("AB").full_structure): [0, 1],
+                            str(self.__create_pattern("EF").full_structure): [2, 3]}
+        assert results == expected_results, "Multi-pattern graph: wrong maximal common sub patterns"
+
+    def test_disjoint_patterns(self):
+        graph = MultiPatternGraph([self.__create_pattern("AB"), self.__create_pattern("CD"),
+                                   self.__create_pattern("AB", negated_type="C")])
+        assert self.__collect_max_patterns_and_peers(graph) == {}, \
+            "Multi-pattern graph: common sub patterns were found for disjoint patterns"
+
+    def run_tests(self):
+        self.test_common_sub_patterns()
+        self.test_disjoint_patterns()
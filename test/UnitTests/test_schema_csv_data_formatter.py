@@ -0,0 +1,91 @@
+import pickle
+
+from OpenCEP.base.Event import Event
+from OpenCEP.misc.TimestampParsers import MetastockTimestampParser
+from OpenCEP.plugin.csv.CsvPayloadTypes import CsvPayloadTypes
+from OpenCEP.plugin.csv.SchemaCsvDataFormatter import SchemaCsvDataFormatter
+from OpenCEP.plugin.stocks.Stocks import MetastockDataFormatter
+
+
+def run_schema_csv_data_formatter_tests():
+    schema_csv_data_formatter_test = TestSchemaCsvDataFormatter()
+    schema_csv_data_formatter_test.run_tests()
+    print("Schema CSV data formatter unit tests executed successfully.")
+
+
+class TestSchemaCsvDataFormatter:
+    def __init__(self):
+        self.column_names = ["Stock Ticker", "Date", "Opening Price", "Peak Price", "Lowest Price", "Close Price",
+                             "Volume", "Probability"]
+        self.column_types = [str, int, float, float, float, float, int, float]
+        self.lines = ["AAPL,200802010900,136.2,136.2,136,136,6700\n",
+                      "GOOG,200802010901,560.5,561,560.5,561,1200\n",
+                      "\n",
+                      "AMZN,200802010901,74.3,74.8,74.3,74.8,300\n"]
+
+    def __create_formatter(self, payload_type: CsvPayloadTypes, **kwargs):
+        return SchemaCsvDataFormatter(self.column_names, self.column_types, "Stock Ticker", "Date",
+                                      MetastockTimestampParser(), probability_column="Probability",
+                                      payload_type=payload_type, **kwargs)
+
+    def test_metastock_schema(self):
+        metastock_formatter = MetastockDataFormatter()
+        non_empty_lines = [line for line in self.lines if line != "\n"]
+        expected_timestamps = [metastock_formatter.get_event_timestamp(metastock_formatter.parse_event(line))
+                               for line in non_empty_lines]
+        for payload_type in CsvPayloadTypes:
+            formatter = self.__create_formatter(payload_type)
+            for payloads in [[formatter.parse_event(line) for line in non_empty_lines],
+                             formatter.parse_events(self.lines)]:
+                assert len(payloads) == len(non_empty_lines), "SchemaCsvDataFormatter: wrong number of payloads"
+                for payload, line in zip(payloads, non_empty_lines):
+                    # unlike str_to_number, the declared type is used even if the value looks like an integer
+                    assert dict(payload) == {key: self.column_types[i](value) for i, (key, value) in
+                                             enumerate(metastock_formatter.parse_event(line).items())}, \
+                        "SchemaCsvDataFormatter: wrong payload for %s" % (line,)
+                    assert "Probability" not in payload, "SchemaCsvDataFormatter: a missing column was added"
+                assert formatter.get_event_timestamps(payloads) == expected_timestamps, \
+                    "SchemaCsvDataFormatter: wrong timestamps"
+                assert [formatter.get_event_type(payload) for payload in payloads] == ["AAPL", "GOOG", "AMZN"], \
+                    "SchemaCsvDataFormatter: wrong event types"
+
+    def test_mixed_lengths_and_quotes(self):
+        formatter = self.__create_formatter(CsvPayloadTypes.DICT)
+        payloads = formatter.parse_events(['"AA,PL",200802010900,1,2,3,4,5,0.5\n', "GOOG,200802010901,1,2,3,4,5\n"])
+        assert payloads[0]["Stock Ticker"] == "AA,PL", "SchemaCsvDataFormatter: a quoted field was split"
+        assert formatter.get_probability(payloads[0]) == 0.5, "SchemaCsvDataFormatter: wrong probability"
+        assert formatter.get_probability(payloads[1]) is None, "SchemaCsvDataFormatter: wrong missing probability"
+        assert formatter.parse_event('"AA,PL",200802010900,1,2,3,4,5')["Stock Ticker"] == "AA,PL", \
+            "SchemaCsvDataFormatter: a quoted field was split"
+        tab_formatter = self.__create_formatter(CsvPayloadTypes.DICT, delimiter="\t", quotechar=None)
+        assert tab_formatter.parse_event("AAPL\t200802010900\t1\t2\t3\t4\t5")["Volume"] == 5, \
+            "SchemaCsvDataFormatter: wrong delimiter handling"
+        try:
+            formatter.parse_event("AAPL,200802010900,1,2,3,4,5,0.5,extra")
+        except Exception:
+            pass
+        else:
+            assert False, "SchemaCsvDataFormatter: a line with too many columns was accepted"
+
+    def test_records(self):
+        formatter = self.__create_formatter(CsvPayloadTypes.RECORD)
+        event = Event(self.lines[0], formatter)
+        assert event.payload[Event.INDEX_ATTRIBUTE_NAME] == Event.counter - 1, \
+            "SchemaCsvDataFormatter: the event index was not stored in the record"
+        assert str(event) == "{'Stock Ticker': 'AAPL', 'Date': 200802010900, 'Opening Price': 136.2, " \
+                             "'Peak Price': 136.2, 'Lowest Price': 136.0, 'Close Price': 136.0, 'Volume': 6700}", \
+            "SchemaCsvDataFormatter: wrong event representation"
+        copy = pickle.loads(pickle.dumps(event.payload))
+        assert copy == event.payload and dict(copy) == dict(event.payload), \
+            "SchemaCsvDataFormatter: a record was changed by pickling"
+        event.payload["Volume"] = 1
+        assert event.payload["Volume"] == 1 and len(event.payload) == 8, \
+            "SchemaCsvDataFormatter: wrong record update"
+        pre_parsed = formatter.parse_events(self.lines)[1]
+        assert Event(pre_parsed, formatter).payload is pre_parsed, \
+            "SchemaCsvDataFormatter: a pre-parsed payload was parsed again"
+
+    def run_tests(self):
+        self.test_metastock_schema()
+        self.test_mixed_lengths_and_quotes()
+        self.test_records()
@@ -0,0 +1,134 @@
+import random
+from datetime import timedelta
+
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import SmallerThanCondition, GreaterThanCondition
+from OpenCEP.condition.CompositeCondition import AndCondition
+from OpenCEP.condition.Condition import Variable
+from OpenCEP.misc.Timestamps import NANOSECONDS_PER_SECOND
+from OpenCEP.plan.TreePlan import TreePlan, TreePlanLeafNode, TreePlanBinaryNode, OperatorTypes
+from OpenCEP.stream.Stream import Stream, OutputStream
+from OpenCEP.tree.PatternMatchStorage import TreeStorageParameters
+from OpenCEP.tree.Tree import Tree
+from OpenCEP.tree.evaluation.StateMigrationTreeBasedEvaluationMechanism import \
+    StateMigrationTreeBasedEvaluationMechanism
+from OpenCEP.tree.nodes.BinaryNode import BinaryNode
+from test.UnitTests.DictDataFormatter import DictDataFormatter
+
+
+def run_state_migration_tests():
+    state_migration_test = TestStateMigration()
+    state_migration_test.run_tests()
+    print("State migration unit tests executed successfully.")
+
+
+class PlanSwitchingEvaluationMechanism(StateMigrationTreeBasedEvaluationMechanism):
+    """
+    Replaces the tree by a tree of the next given plan once every given number of events, counting the nodes of the new
+    trees whose partial matches were imported from the old tree and the nodes whose partial matches were recomputed.
+    """
+    def __init__(self, pattern: Pattern, tree_plans: list, storage_params: TreeStorageParameters,
+                 switch_interval: int):
+        super().__init__({pattern: tree_plans[0]}, storage_params)
+        self.__pattern = pattern
+        self.__tree_plans = tree_plans
+        self.__storage_params = storage_params
+        self.__switch_interval = switch_interval
+        self.__events_count = 0
+        self.__current_plan_index = 0
+        self.imported_nodes_count = 0
+        self.recomputed_nodes_count = 0
+
+    def _play_new_event_on_tree(self, event, matches):
+        self.__events_count += 1
+        if self.__events_count % self.__switch_interval == 0:
+            self.__current_plan_index = (self.__current_plan_index + 1) % len(self.__tree_plans)
+            new_tree = Tree(self.__tree_plans[self.__current_plan_index], self.__pattern, self.__storage_params)
+            self.__count_migrations(new_tree.get_root())
+            self._tree_update(new_tree, event.max_timestamp)
+        super()._play_new_event_on_tree(event, matches)
+
+    def __count_migrations(self, node):
+        """
+        Wraps the state migration methods of the given node and its descendants with counters.
+        """
+        import_partial_matches = node.import_partial_matches
+
+        def counted_import_partial_matches(other_node):
+            self.imported_nodes_count += 1
+            import_partial_matches(other_node)
+        node.import_partial_matches = counted_import_partial_matches
+
+        if isinstance(node, BinaryNode):
+            recompute_partial_matches = node.recompute_partial_matches
+
+            def counted_recompute_partial_matches():
+                self.recomputed_nodes_count += 1
+                recompute_partial_matches()
+            node.recompute_partial_matches = counted_recompute_partial_matches
+            self.__count_migrations(node.get_left_subtree())
+            self.__count_migrations(node.get_right_subtree())
+
+
+class TestStateMigration:
+    """
+    Compares the matches of PATTERN SEQ(A a, B b, C c, D d) WHERE a.value < b.value AND c.value > d.value detected with
+    periodic switches between two tree plans to the matches detected without switching.
+    """
+    def __init__(self):
+        self.pattern = Pattern(
+            SeqOperator(*[PrimitiveEventStructure(event_type, event_type.lower()) for event_type in "ABCD"]),
+            AndCondition(SmallerThanCondition(Variable("a", lambda x: x["value"]), Variable("b", lambda x: x["value"])),
+                         GreaterThanCondition(Variable("c", lambda x: x["value"]),
+                                              Variable("d", lambda x: x["value"]))),
+            timedelta(seconds=20))
+        random.seed(0)
+        self.events = [{"type": random.choice("ABCD"), "time": i * NANOSECONDS_PER_SECOND, "value": random.randint(0, 9)}
+                       for i in range(400)]
+
+    def __create_leaf(self, index: int):
+        event_type = "ABCD"[index]
+        return TreePlanLeafNode(index, event_type, event_type.lower())
+
+    def __create_tree_plans(self):
+        """
+        Creates the plans (((a, b), c), d) and ((a, b), (c, d)). Switching between them keeps the (a, b) subtree and
+        replaces the others.
+        """
+        left_deep_root = TreePlanBinaryNode(OperatorTypes.SEQ, TreePlanBinaryNode(
+            OperatorTypes.SEQ, TreePlanBinaryNode(OperatorTypes.SEQ, self.__create_leaf(0), self.__create_leaf(1)),
+            self.__create_leaf(2)), self.__create_leaf(3))
+        bushy_root = TreePlanBinaryNode(
+            OperatorTypes.SEQ, TreePlanBinaryNode(OperatorTypes.SEQ, self.__create_leaf(0), self.__create_leaf(1)),
+            TreePlanBinaryNode(OperatorTypes.SEQ, self.__create_leaf(2), self.__create_leaf(3)))
+        return [TreePlan(left_deep_root, self.pattern), TreePlan(bushy_root, self.pattern)]
+
+    def __run_pattern(self, storage_params: TreeStorageParameters, switch_interval: int):
+        events = Stream()
+        for event in self.events:
+            events.add_item(event)
+        events.close()
+        eval_mechanism = PlanSwitchingEvaluationMechanism(self.pattern, self.__create_tree_plans(), storage_params,
+                                                          switch_interval)
+        matches = OutputStream()
+        eval_mechanism.eval(events, matches, DictDataFormatter())
+        return sorted(str(match) for match in matches), eval_mechanism
+
+    def __test_plan_switches(self, storage_params: TreeStorageParameters):
+        expected_matches, _ = self.__run_pattern(storage_params, len(self.events) + 1)
+        assert len(expected_matches) > 0, "StateMigration: no matches were detected by the test pattern"
+        actual_matches, eval_mechanism = self.__run_pattern(storage_params, 37)
+        assert eval_mechanism.imported_nodes_count > 0, "StateMigration: no partial matches were imported"
+        assert eval_mechanism.recomputed_nodes_count > 0, "StateMigration: no partial matches were recomputed"
+        assert actual_matches == expected_matches, "StateMigration: the plan switches changed the detected matches"
+
+    def test_unsorted_storage(self):
+        self.__test_plan_switches(TreeStorageParameters(sort_storage=False))
+
+    def test_sorted_storage(self):
+        self.__test_plan_switches(TreeStorageParameters(sort_storage=True))
+
+    def run_tests(self):
+        self.test_unsorted_storage()
+        self.test_sorted_storage()
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from OpenCEP.adaptive.statistics.Statistics import SelectivityStatistics
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import SmallerThanCondition
+from OpenCEP.condition.Condition import Variable
+from OpenCEP.misc.Timestamps import datetime_to_ns, timedelta_to_ns
+
+
+def run_statistics_tests():
+    selectivity_statistics_test = TestSelectivityStatistics()
+    selectivity_statistics_test.run_tests()
+    print("Statistics unit tests executed successfully.")
+
+
+"""
+SELECTIVITY STATISTICS
+"""
+
+
+class TestSelectivityStatistics:
+    def __init__(self):
+        self.dt = datetime_to_ns(datetime(2020, 1, 1))
+        self.pattern = Pattern(
+            SeqOperator(PrimitiveEventStructure("AAPL", "a"), PrimitiveEventStructure("AMZN", "b")),
+            SmallerThanCondition(Variable("a", lambda x: x["Peak Price"]), Variable("b", lambda x: x["Peak Price"])),
+            timedelta(minutes=5)
+        )
+        self.condition = self.pattern.condition.extract_atomic_conditions()[0]
+
+    def test_sliding_window(self):
+        s = SelectivityStatistics(self.pattern, time_window=timedelta_to_ns(timedelta(minutes=10)))
+        s.advance_time(self.dt)
+        for i in range(100):
+            s.update((self.condition, i % 4 == 0))
+        assert s.get_statistics()[0][1] == 0.25, "SelectivityStatistics: incorrect selectivity"
+        assert s.get_confidence()[0][1] == 100, "SelectivityStatistics: incorrect confidence"
+
+        s.advance_time(self.dt + timedelta_to_ns(timedelta(minutes=5)))
+        for i in range(100):
+            s.update((self.condition, True))
+        assert s.get_statistics()[1][0] == 0.625, "SelectivityStatistics: incorrect selectivity"
+
+        # the first 100 samples leave the window
+        s.advance_time(self.dt + timedelta_to_ns(timedelta(minutes=10, seconds=30)))
+        assert s.get_statistics()[0][1] == 1.0, "SelectivityStatistics: expired samples were not removed"
+        assert s.get_confidence()[0][1] == 100, "SelectivityStatistics: expired samples were not removed"
+
+    def test_decay(self):
+        s = SelectivityStatistics(self.pattern, time_window=timedelta_to_ns(timedelta(minutes=10)), decay_factor=0.5)
+        s.advance_time(self.dt)
+        for i in range(100):
+            s.update((self.condition, i % 2 == 0))
+        s.advance_time(self.dt + timedelta_to_ns(timedelta(minutes=2)))
+        assert s.get_statistics()[0][1] == 0.5, "SelectivityStatistics: decay should not change the selectivity"
+        assert s.get_confidence()[0][1] == 25, "SelectivityStatistics: samples were not decayed"
+
+    def test_sampling(self):
+        s = SelectivityStatistics(self.pattern, sampling_rate=0.1)
+        for i in range(10000):
+            s.update((self.condition, i % 4 == 0))
+        assert 500 < s.get_confidence()[0][1] < 1500, "SelectivityStatistics: incorrect sampling rate"
+        assert 0.15 < s.get_statistics()[0][1] < 0.35, "SelectivityStatistics: biased sampling"
+
+    def run_tests(self):
+        self.test_sliding_window()
+        self.test_decay()
+        self.test_sampling()
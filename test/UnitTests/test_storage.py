@@ -1,7 +1,20 @@
 from OpenCEP.base.PatternMatch import PatternMatch
-from OpenCEP.tree.PatternMatchStorage import SortedPatternMatchStorage, UnsortedPatternMatchStorage, EquationSides
+from OpenCEP.tree.PatternMatchStorage import SortedPatternMatchStorage, UnsortedPatternMatchStorage, EquationSides, \
+    KeyPartitionedPatternMatchStorage, TreeStorageParameters
 from datetime import datetime, timedelta
-from OpenCEP.condition.Condition import RelopTypes
+from OpenCEP.condition.Condition import RelopTypes, Variable
+from OpenCEP.tree.PartialMatchSpillManager import PartialMatchSpillManager
+from OpenCEP.tree.ConsumedEventRegistry import ConsumedEventRegistry
+from OpenCEP.CEP import CEP
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import EqCondition, SmallerThanCondition
+from OpenCEP.condition.CompositeCondition import AndCondition
+from OpenCEP.evaluation.EvaluationMechanismFactory import TreeBasedEvaluationMechanismParameters, \
+    EvaluationMechanismFactory
+from OpenCEP.misc.Timestamps import NANOSECONDS_PER_SECOND
+from OpenCEP.stream.Stream import Stream, OutputStream
+from test.UnitTests.DictDataFormatter import DictDataFormatter
 
 
 """
@@ -30,6 +43,12 @@ def run_storage_tests():
     unsorted_storage_test.run_tests()
     sorted_storage_test = TestSortedStorage()
     sorted_storage_test.run_tests()
+    spilled_storage_test = TestSpilledStorage()
+    spilled_storage_test.run_tests()
+    partitioned_storage_test = TestKeyPartitionedStorage()
+    partitioned_storage_test.run_tests()
+    consumed_event_registry_test = TestConsumedEventRegistry()
+    consumed_event_registry_test.run_tests()
     print("PatternMatchStorage unit tests executed successfully.")
 
 
@@ -74,10 +93,22 @@ class TestUnsortedStorage:
         u_s._clean_expired_partial_matches(self.dt + timedelta(15))
         assert u_s.get("nothing") == [self.pm3, self.pm4], "UnsortedPatternMatchStorage clean_expired_partial_matches failed"
 
+    def test_remove_partial_matches_containing(self):
+        u_s = UnsortedPatternMatchStorage(0)
+        u_s.add(self.pm1)
+        u_s.add(self.pm2)
+        u_s.add(PatternMatch(self.pm2.events + self.pm3.events))
+        u_s.add(self.pm4)
+        assert u_s.remove_partial_matches_containing({self.pm2.events[0]}) == 2, \
+            "UnsortedPatternMatchStorage: incorrect number of removed pms"
+        assert u_s.get("nothing") == [self.pm1, self.pm4], \
+            "UnsortedPatternMatchStorage: remove_partial_matches_containing failed"
+
     def run_tests(self):
         self.test_add()
         self.test_get()
         self.test_clean_expired_partial_matches()
+        self.test_remove_partial_matches_containing()
 
 
 """
@@ -229,3 +260,246 @@ class TestSortedStorage:
     def run_tests(self):
         self.test_add()
         self.test_get()
+
+
+"""
+SPILLED STORAGE
+"""
+
+
+class TestSpilledStorage:
+    def __init__(self):
+        self.dt = datetime(2020, 1, 1)
+        self.pm_list = []
+        for i in range(20):
+            self.pm_list.append(PatternMatch([Event(i, "type", self.dt + timedelta(i * 10))]))
+
+    def test_unsorted_spill(self):
+        manager = PartialMatchSpillManager(4)
+        u_s = UnsortedPatternMatchStorage(1)
+        u_s.set_spill_manager(manager)
+        for pm in self.pm_list:
+            u_s.add(pm)
+        assert u_s.get_in_memory_size() <= 4, "Spilled storage: memory budget exceeded"
+        assert len(u_s) == 20, "Spilled storage: incorrect size"
+        assert [pm.partial_id for pm in u_s.get("nothing")] == [pm.partial_id for pm in self.pm_list], \
+            "Spilled storage: spilled partial matches were not fetched in order"
+        u_s._clean_expired_partial_matches(self.dt + timedelta(150))
+        assert [pm.partial_id for pm in u_s] == [pm.partial_id for pm in self.pm_list[15:]], \
+            "Spilled storage: expired spilled partial matches were returned"
+
+    def test_sorted_spill(self):
+        manager = PartialMatchSpillManager(5)
+        s = SortedPatternMatchStorage(lambda x: x.first_timestamp, RelopTypes.Smaller, EquationSides.left, 1)
+        s.set_spill_manager(manager)
+        for pm in reversed(self.pm_list):
+            s.add(pm)
+        assert s.get_in_memory_size() <= 5, "Spilled storage: memory budget exceeded"
+        result_pms = s.get(self.dt + timedelta(70))
+        assert [pm.partial_id for pm in result_pms] == [pm.partial_id for pm in self.pm_list[:7]], \
+            "Spilled storage: get_smaller returned incorrect pms"
+        assert self.pm_list[12].partial_id in [pm.partial_id for pm in s.get(self.dt + timedelta(130))], \
+            "Spilled storage: a spilled partial match was not found"
+        assert [pm.partial_id for pm in s[:]] == [pm.partial_id for pm in self.pm_list], \
+            "Spilled storage: incorrect order"
+
+    def test_shared_budget(self):
+        manager = PartialMatchSpillManager(6)
+        storages = [UnsortedPatternMatchStorage(1), UnsortedPatternMatchStorage(1)]
+        for storage in storages:
+            storage.set_spill_manager(manager)
+        for i, pm in enumerate(self.pm_list):
+            storages[i % 2].add(pm)
+        assert sum(storage.get_in_memory_size() for storage in storages) <= 6, \
+            "Spilled storage: shared memory budget exceeded"
+        assert storages[0].remove_by_id(self.pm_list[0].partial_id), \
+            "Spilled storage: a spilled partial match was not removed"
+        assert len(storages[0]) == 9, "Spilled storage: incorrect size after removal"
+
+    def test_cached_segments(self):
+        manager = PartialMatchSpillManager(4)
+        u_s = UnsortedPatternMatchStorage(1)
+        u_s.set_spill_manager(manager)
+        for pm in self.pm_list:
+            u_s.add(pm)
+        assert manager.get_segment_reads_count() == 0, "Spilled storage: a segment was read in order to extend it"
+        for _ in range(3):
+            u_s.get("nothing")
+        assert manager.get_segment_reads_count() == 1, "Spilled storage: a cached segment was read again"
+        manager.release_cached_segments()
+        assert [pm.partial_id for pm in u_s.get("nothing")] == [pm.partial_id for pm in self.pm_list], \
+            "Spilled storage: spilled partial matches were not fetched in order after the cache was released"
+        assert manager.get_segment_reads_count() == 2, "Spilled storage: a released segment was not read again"
+
+    def test_lazy_expiration(self):
+        manager = PartialMatchSpillManager(4)
+        u_s = UnsortedPatternMatchStorage(1)
+        u_s.set_spill_manager(manager)
+        for pm in self.pm_list:
+            u_s.add(pm)
+        u_s._clean_expired_partial_matches(self.dt + timedelta(30))
+        assert manager.get_segment_reads_count() == 0, \
+            "Spilled storage: a segment was read although only a few of its partial matches expired"
+        assert len(u_s) == 17 and [pm.partial_id for pm in u_s] == [pm.partial_id for pm in self.pm_list[3:]], \
+            "Spilled storage: expired spilled partial matches were returned"
+        new_pm_list = [PatternMatch([Event(i, "type", self.dt + timedelta(i * 10))]) for i in range(20, 25)]
+        for pm in new_pm_list:
+            u_s.add(pm)
+        assert [pm.partial_id for pm in u_s] == [pm.partial_id for pm in self.pm_list[3:] + new_pm_list], \
+            "Spilled storage: expired spilled partial matches were returned after another spill"
+        u_s._clean_expired_partial_matches(self.dt + timedelta(150))
+        assert len(u_s) == 10 and [pm.partial_id for pm in u_s] == [pm.partial_id for pm in
+                                                                    self.pm_list[15:] + new_pm_list], \
+            "Spilled storage: incorrect partial matches after the expired ones were removed from the disk"
+
+    @staticmethod
+    def __run_pattern(memory_budget: int or None):
+        pattern = Pattern(SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b"),
+                                      PrimitiveEventStructure("C", "c")),
+                          SmallerThanCondition(Variable("a", lambda x: x["value"]),
+                                               Variable("b", lambda x: x["value"])),
+                          timedelta(seconds=30))
+        eval_mechanism = EvaluationMechanismFactory.build_eval_mechanism(TreeBasedEvaluationMechanismParameters(
+            storage_params=TreeStorageParameters(memory_budget=memory_budget, profile_nodes=True)), [pattern])
+        events = Stream()
+        for i in range(150):
+            events.add_item({"type": "ABC"[i % 3], "time": i * NANOSECONDS_PER_SECOND, "value": i % 7})
+        events.close()
+        matches = OutputStream()
+        eval_mechanism.eval(events, matches, DictDataFormatter())
+        spilled_count = sum(row["spilled"] for row in eval_mechanism._tree.get_profile())
+        return sorted(str(match) for match in matches), spilled_count
+
+    def test_spilling_tree(self):
+        expected_matches, spilled_count = self.__run_pattern(None)
+        assert spilled_count == 0, "Spilled storage: partial matches were spilled without a memory budget"
+        actual_matches, spilled_count = self.__run_pattern(20)
+        assert spilled_count > 0, "Spilled storage: no partial matches were spilled"
+        assert len(expected_matches) > 0 and actual_matches == expected_matches, \
+            "Spilled storage: spilling changed the detected matches"
+
+    def run_tests(self):
+        self.test_unsorted_spill()
+        self.test_sorted_spill()
+        self.test_shared_budget()
+        self.test_cached_segments()
+        self.test_lazy_expiration()
+        self.test_spilling_tree()
+
+
+"""
+KEY PARTITIONED STORAGE
+"""
+
+
+class TestKeyPartitionedStorage:
+    def __init__(self):
+        self.dt = datetime(2020, 1, 1)
+        self.pm_list = []
+        for i in range(12):
+            self.pm_list.append(PatternMatch([Event(i, "type", self.dt + timedelta(i * 10))]))
+        self.get_partition_key = lambda pm: pm.events[0].payload % 3
+
+    def test_unsorted_partitions(self):
+        p_s = KeyPartitionedPatternMatchStorage(UnsortedPatternMatchStorage(1), self.get_partition_key)
+        for pm in self.pm_list:
+            p_s.add(pm)
+        assert len(p_s) == 12 and p_s.get_partitions_count() == 3, "KeyPartitionedStorage: incorrect size"
+        assert p_s.get_from_partition(1, "nothing") == self.pm_list[1::3], \
+            "KeyPartitionedStorage: incorrect partition returned"
+        assert p_s.get_from_partition(5, "nothing") == [], "KeyPartitionedStorage: a missing partition is not empty"
+        assert p_s.get("nothing") == self.pm_list, "KeyPartitionedStorage: partitions were not merged in order"
+        p_s._clean_expired_partial_matches(self.dt + timedelta(90))
+        assert p_s.get_internal_buffer() == self.pm_list[9:], "KeyPartitionedStorage: incorrect cleanup"
+        p_s.remove_partial_matches({self.pm_list[10].partial_id})
+        assert p_s.get_partitions_count() == 2, "KeyPartitionedStorage: an empty partition was not dropped"
+
+    def test_sorted_partitions(self):
+        template = SortedPatternMatchStorage(lambda x: x.first_timestamp, RelopTypes.Smaller, EquationSides.left, 1)
+        p_s = KeyPartitionedPatternMatchStorage(template, self.get_partition_key)
+        for pm in reversed(self.pm_list):
+            p_s.add(pm)
+        result_pms = p_s.get_from_partition(0, self.dt + timedelta(70))
+        assert result_pms == [self.pm_list[0], self.pm_list[3], self.pm_list[6]], \
+            "KeyPartitionedStorage: get_smaller returned incorrect pms"
+        assert p_s.get(self.dt + timedelta(40)) == self.pm_list[:4], \
+            "KeyPartitionedStorage: sorted partitions were not merged in order"
+
+    def test_unknown_partition(self):
+        p_s = KeyPartitionedPatternMatchStorage(UnsortedPatternMatchStorage(1), lambda pm: 12 // pm.events[0].payload)
+        for pm in self.pm_list[:4]:
+            p_s.add(pm)
+        # the partition key of the first pattern match cannot be calculated
+        assert p_s.get_partition_key(self.pm_list[0]) is KeyPartitionedPatternMatchStorage.UNKNOWN_KEY, \
+            "KeyPartitionedStorage: incorrect partition key"
+        assert p_s.get_from_partition(6, "nothing") == self.pm_list[:3:2], \
+            "KeyPartitionedStorage: the unknown partition was not returned"
+        assert p_s.get_from_partition(KeyPartitionedPatternMatchStorage.UNKNOWN_KEY, "nothing") == self.pm_list[:4], \
+            "KeyPartitionedStorage: not all partitions were returned for an unknown key"
+
+    @staticmethod
+    def __run_pattern(pattern: Pattern, partition_by_key: bool):
+        events = Stream()
+        for i in range(60):
+            events.add_item({"type": "AB"[i % 2], "time": i * NANOSECONDS_PER_SECOND, "value": i % 4, "key": i % 3})
+        events.close()
+        matches = OutputStream()
+        eval_mechanism_params = TreeBasedEvaluationMechanismParameters(
+            storage_params=TreeStorageParameters(partition_by_key=partition_by_key))
+        CEP([pattern], eval_mechanism_params).run(events, matches, DictDataFormatter())
+        return sorted(str(match) for match in matches)
+
+    def test_constant_equality_patterns(self):
+        value = lambda x: x["value"]
+        key = lambda x: x["key"]
+        structure = SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b"))
+        # an equality to a constant does not relate two events, hence it neither defines nor breaks a partitioning key
+        for condition in (EqCondition(Variable("a", value), 2),
+                          AndCondition(EqCondition(Variable("a", value), 2),
+                                       EqCondition(Variable("a", key), Variable("b", key)))):
+            pattern = Pattern(structure, condition, timedelta(seconds=5))
+            expected_matches = self.__run_pattern(pattern, False)
+            assert len(expected_matches) > 0, "KeyPartitionedStorage: no matches were detected by the test pattern"
+            assert self.__run_pattern(pattern, True) == expected_matches, \
+                "KeyPartitionedStorage: partitioning changed the matches of a pattern with an equality to a constant"
+
+    def run_tests(self):
+        self.test_unsorted_partitions()
+        self.test_sorted_partitions()
+        self.test_unknown_partition()
+        self.test_constant_equality_patterns()
+
+
+"""
+CONSUMED EVENT REGISTRY
+"""
+
+
+class TestConsumedEventRegistry:
+    def __init__(self):
+        self.dt = datetime(2020, 1, 1)
+        self.window = timedelta(minutes=10)
+        self.events = [Event(i, "type", self.dt + timedelta(minutes=i)) for i in range(10)]
+
+    def test_consumption_per_node(self):
+        registry = ConsumedEventRegistry()
+        first_node, second_node = object(), object()
+        registry.consume(first_node, self.events[:3], self.window)
+        assert registry.is_consumed(first_node, self.events[1]), "ConsumedEventRegistry: consumed event not found"
+        assert not registry.is_consumed(first_node, self.events[3]), "ConsumedEventRegistry: unconsumed event found"
+        assert not registry.is_consumed(second_node, self.events[1]), \
+            "ConsumedEventRegistry: event consumed by another node found"
+
+    def test_expiration(self):
+        registry = ConsumedEventRegistry()
+        node = object()
+        # consumption does not necessarily happen in the order of the event timestamps
+        registry.consume(node, list(reversed(self.events)), self.window)
+        registry.remove_expired(self.dt + timedelta(minutes=15))
+        assert len(registry) == 5, "ConsumedEventRegistry: incorrect number of expired events"
+        assert not registry.is_consumed(node, self.events[4]) and registry.is_consumed(node, self.events[5]), \
+            "ConsumedEventRegistry: incorrect events expired"
+
+    def run_tests(self):
+        self.test_consumption_per_node()
+        self.test_expiration()
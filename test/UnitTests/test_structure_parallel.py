@@ -0,0 +1,122 @@
+import random
+from datetime import timedelta
+
+from OpenCEP.CEP import CEP
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, AndOperator, KleeneClosureOperator, NegationOperator, \
+    PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import SmallerThanCondition, EqCondition
+from OpenCEP.condition.CompositeCondition import AndCondition
+from OpenCEP.condition.Condition import Variable
+from OpenCEP.misc.Timestamps import NANOSECONDS_PER_SECOND
+from OpenCEP.parallel.ParallelExecutionParameters import StructureParallelExecutionParameters, \
+    HybridParallelExecutionParameters, DataParallelExecutionParametersHirzelAlgorithm
+from OpenCEP.parallel.structure_parallel.StructureParallelEvaluationManager import StructureParallelEvaluationManager
+from OpenCEP.stream.Stream import Stream, OutputStream
+from OpenCEP.tree.PatternMatchStorage import TreeStorageParameters
+from OpenCEP.evaluation.EvaluationMechanismFactory import TreeBasedEvaluationMechanismParameters
+from test.UnitTests.DictDataFormatter import DictDataFormatter
+
+
+def run_structure_parallel_tests():
+    structure_parallel_test = TestStructureParallel()
+    structure_parallel_test.run_tests()
+    print("Structure-parallel evaluation unit tests executed successfully.")
+
+
+class TestStructureParallel:
+    def __init__(self):
+        # events of four types arriving every 10 milliseconds, with random values and keys
+        generator = random.Random(0)
+        self.events = [{"type": "ABCD"[generator.randrange(4)], "time": i * NANOSECONDS_PER_SECOND // 100,
+                        "value": generator.randrange(100), "key": generator.randrange(3)} for i in range(1500)]
+
+    @staticmethod
+    def __create_patterns():
+        value = lambda x: x["value"]
+        key = lambda x: x["key"]
+        seq_pattern = Pattern(
+            SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b"),
+                        PrimitiveEventStructure("C", "c"), PrimitiveEventStructure("D", "d")),
+            AndCondition(SmallerThanCondition(Variable("a", value), Variable("b", value)),
+                         SmallerThanCondition(Variable("c", value), Variable("d", value)),
+                         EqCondition(Variable("a", key), Variable("d", key))),
+            timedelta(milliseconds=300))
+        and_pattern = Pattern(
+            AndOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b"),
+                        PrimitiveEventStructure("C", "c"), PrimitiveEventStructure("D", "d")),
+            AndCondition(SmallerThanCondition(Variable("a", value), Variable("b", value)),
+                         SmallerThanCondition(Variable("b", value), Variable("c", value)),
+                         EqCondition(Variable("a", key), Variable("b", key))),
+            timedelta(milliseconds=100))
+        kleene_pattern = Pattern(
+            KleeneClosureOperator(SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b"),
+                                              PrimitiveEventStructure("C", "c")), max_size=2),
+            AndCondition(SmallerThanCondition(Variable("a", value), Variable("b", value)),
+                         SmallerThanCondition(Variable("b", value), Variable("c", value))),
+            timedelta(milliseconds=150))
+        negation_pattern = Pattern(
+            SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b"),
+                        NegationOperator(PrimitiveEventStructure("C", "c")), PrimitiveEventStructure("D", "d")),
+            EqCondition(Variable("a", key), Variable("d", key)),
+            timedelta(milliseconds=200))
+        return [seq_pattern, and_pattern, kleene_pattern, negation_pattern]
+
+    def __run(self, pattern: Pattern, parallel_execution_params=None):
+        events = Stream()
+        for event in self.events:
+            events.add_item(event)
+        events.close()
+        matches = OutputStream()
+        CEP([pattern], None, parallel_execution_params).run(events, matches, DictDataFormatter())
+        return sorted(str([(event.type, event.timestamp) for event in match.events]) for match in matches)
+
+    def test_stages_number(self):
+        for pattern in self.__create_patterns():
+            for units_number in range(1, 5):
+                manager = StructureParallelEvaluationManager(
+                    pattern, None, StructureParallelExecutionParameters(units_number=units_number))
+                assert 1 <= manager.get_stages_number() <= units_number, \
+                    "Structure parallelism: wrong number of stages"
+        # each internal node of the tree of a sequence of four events can be evaluated by a separate stage
+        manager = StructureParallelEvaluationManager(self.__create_patterns()[0], None,
+                                                     StructureParallelExecutionParameters(units_number=5))
+        assert manager.get_stages_number() == 3, "Structure parallelism: the tree was not split into all its subtrees"
+
+    def test_structure_parallel_matches(self):
+        for pattern in self.__create_patterns():
+            expected_matches = self.__run(pattern)
+            assert len(expected_matches) > 0, "Structure parallelism: no matches were detected by the test pattern"
+            for units_number in range(2, 5):
+                for batch_size in (1, 64):
+                    matches = self.__run(pattern, StructureParallelExecutionParameters(units_number=units_number,
+                                                                                       batch_size=batch_size))
+                    assert matches == expected_matches, \
+                        "Structure parallelism: the matches differ from the ones detected by sequential evaluation"
+
+    def test_hybrid_matches(self):
+        seq_pattern = self.__create_patterns()[0]
+        data_parallel_params = DataParallelExecutionParametersHirzelAlgorithm(units_number=3, key="key")
+        expected_matches = self.__run(seq_pattern, data_parallel_params)
+        assert len(expected_matches) > 0, "Structure parallelism: no matches were detected by the test pattern"
+        matches = self.__run(seq_pattern, HybridParallelExecutionParameters(
+            data_parallel_params, StructureParallelExecutionParameters(units_number=3)))
+        assert matches == expected_matches, \
+            "Structure parallelism: the matches of hybrid evaluation differ from the ones of data-parallel evaluation"
+
+    def test_unsupported_parameters(self):
+        pattern = self.__create_patterns()[0]
+        for storage_params in (TreeStorageParameters(use_load_shedding=True),
+                               TreeStorageParameters(profile_nodes=True)):
+            try:
+                StructureParallelEvaluationManager(pattern, TreeBasedEvaluationMechanismParameters(
+                    storage_params=storage_params), StructureParallelExecutionParameters())
+            except Exception:
+                continue
+            assert False, "Structure parallelism: unsupported storage parameters were accepted"
+
+    def run_tests(self):
+        self.test_stages_number()
+        self.test_structure_parallel_matches()
+        self.test_hybrid_matches()
+        self.test_unsupported_parameters()
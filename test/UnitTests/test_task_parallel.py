@@ -0,0 +1,120 @@
+import random
+from datetime import timedelta
+
+from OpenCEP.CEP import CEP
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, AndOperator, PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import SmallerThanCondition
+from OpenCEP.condition.Condition import Variable, TrueCondition
+from OpenCEP.misc.ConsumptionPolicy import ConsumptionPolicy
+from OpenCEP.misc.SelectionStrategies import SelectionStrategies
+from OpenCEP.misc.Timestamps import NANOSECONDS_PER_SECOND
+from OpenCEP.parallel.ParallelExecutionParameters import TaskParallelExecutionParameters
+from OpenCEP.parallel.task_parallel.PatternPartitioning import find_sharing_clusters
+from OpenCEP.parallel.task_parallel.TaskParallelEvaluationManager import TaskParallelEvaluationManager
+from OpenCEP.evaluation.EvaluationMechanismFactory import TreeBasedEvaluationMechanismParameters
+from OpenCEP.stream.Stream import Stream, OutputStream
+from test.UnitTests.DictDataFormatter import DictDataFormatter
+
+
+def run_task_parallel_tests():
+    task_parallel_test = TestTaskParallel()
+    task_parallel_test.run_tests()
+    print("Task-parallel evaluation unit tests executed successfully.")
+
+
+class TestTaskParallel:
+    def __init__(self):
+        # events of six types arriving every 10 milliseconds, with random values
+        generator = random.Random(0)
+        self.events = [{"type": "ABCDEF"[generator.randrange(6)], "time": i * NANOSECONDS_PER_SECOND // 100,
+                        "value": generator.randrange(100)} for i in range(1000)]
+
+    @staticmethod
+    def __create_pattern(types: str, window_ms: int = 100, operator=SeqOperator):
+        """
+        Creates a pattern over events of the given types, the value of each event being smaller than the next one.
+        """
+        names = types.lower()
+        value = lambda x: x["value"]
+        condition = SmallerThanCondition(Variable(names[0], value), Variable(names[1], value))
+        return Pattern(operator(*[PrimitiveEventStructure(event_type, name) for event_type, name in zip(types, names)]),
+                       condition, timedelta(milliseconds=window_ms))
+
+    def __create_patterns(self):
+        # the first three patterns share the subtree of A and B, the fourth one is equal to the first, and the last two
+        # share the subtree of E and F. Each event type appears at the same position in all patterns, as leaves are
+        # shared by the patterns in sequential evaluation.
+        return [self.__create_pattern("ABC"), self.__create_pattern("ABD"), self.__create_pattern("ABC", 50),
+                self.__create_pattern("ABC"), self.__create_pattern("EF", operator=AndOperator),
+                self.__create_pattern("EFD"), self.__create_pattern("EFC")]
+
+    @staticmethod
+    def __get_positions(patterns, pattern_list):
+        """
+        Returns the positions of the given patterns in the given list. Patterns differing only in their windows are
+        considered equal, hence the positions are found by identity.
+        """
+        return sorted(next(i for i, other in enumerate(pattern_list) if other is pattern) for pattern in patterns)
+
+    def __run(self, patterns, parallel_execution_params=None):
+        events = Stream()
+        for event in self.events:
+            events.add_item(event)
+        events.close()
+        matches = OutputStream()
+        CEP(patterns, None, parallel_execution_params).run(events, matches, DictDataFormatter())
+        return sorted(str(match) for match in matches)
+
+    def test_sharing_clusters(self):
+        patterns = self.__create_patterns()
+        clusters = find_sharing_clusters(patterns, TreeBasedEvaluationMechanismParameters())
+        clusters_patterns = sorted(self.__get_positions(cluster_patterns, patterns) for cluster_patterns, _ in clusters)
+        # the equal patterns are merged into a single one
+        assert clusters_patterns == [[0, 1, 2], [4], [5, 6]], "Task parallelism: wrong sharing clusters"
+        cluster_sizes = {len(cluster_patterns): cluster_size for cluster_patterns, cluster_size in clusters}
+        # the first cluster consists of the shared subtree of A and B, the roots of ABC (shared by the first and the
+        # third patterns) and ABD, and the leaves of A, B, C and D
+        assert cluster_sizes[3] == 7, "Task parallelism: wrong cluster size"
+
+    def test_partitioning(self):
+        patterns = self.__create_patterns()
+        for units_number in range(1, 6):
+            manager = TaskParallelEvaluationManager(patterns, None,
+                                                    TaskParallelExecutionParameters(units_number=units_number))
+            units_patterns = manager.get_units_patterns()
+            assert len(units_patterns) == min(units_number, 3), "Task parallelism: wrong number of units"
+            assert self.__get_positions(sum(units_patterns, []), patterns) == [0, 1, 2, 4, 5, 6], \
+                "Task parallelism: the patterns were not partitioned"
+            units_positions = [self.__get_positions(unit_patterns, patterns) for unit_patterns in units_patterns]
+            assert all(any(set(cluster).issubset(positions) for positions in units_positions)
+                       for cluster in [[0, 1, 2], [5, 6]]), "Task parallelism: a sharing cluster was split"
+
+    def test_matches(self):
+        patterns = self.__create_patterns()
+        expected_matches = self.__run(patterns)
+        assert len(expected_matches) > 0, "Task parallelism: no matches were detected by the test patterns"
+        for units_number in range(1, 6):
+            matches = self.__run(patterns, TaskParallelExecutionParameters(units_number=units_number))
+            assert matches == expected_matches, \
+                "Task parallelism: the matches differ from the ones detected by sequential evaluation"
+        single_pattern = [self.__create_pattern("ABC")]
+        assert self.__run(single_pattern, TaskParallelExecutionParameters()) == self.__run(single_pattern), \
+            "Task parallelism: the matches of a single pattern differ from the ones of sequential evaluation"
+
+    def test_unsupported_parameters(self):
+        pattern = Pattern(SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b")),
+                          TrueCondition(), timedelta(milliseconds=100),
+                          ConsumptionPolicy(primary_selection_strategy=SelectionStrategies.MATCH_SINGLE))
+        try:
+            TaskParallelEvaluationManager([pattern, self.__create_pattern("CD")], None,
+                                          TaskParallelExecutionParameters())
+        except Exception:
+            return
+        assert False, "Task parallelism: a consumption policy was accepted"
+
+    def run_tests(self):
+        self.test_sharing_clusters()
+        self.test_partitioning()
+        self.test_matches()
+        self.test_unsupported_parameters()
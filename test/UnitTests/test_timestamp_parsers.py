@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+from OpenCEP.misc.Timestamps import datetime_to_ns
+from OpenCEP.misc.TimestampParsers import MetastockTimestampParser, SensorsTimestampParser, \
+    TwitterTimestampParser, StrptimeTimestampParser
+from OpenCEP.plugin.sensors.Sensors import SensorsDataFormatter
+from OpenCEP.plugin.stocks.Stocks import MetastockDataFormatter
+
+
+def run_timestamp_parsers_tests():
+    timestamp_parsers_test = TestTimestampParsers()
+    timestamp_parsers_test.run_tests()
+    print("Timestamp parsers unit tests executed successfully.")
+
+
+class TestTimestampParsers:
+    def __init__(self):
+        # covers leap years, century years and month boundaries
+        self.dates = [datetime(1900, 3, 1), datetime(1969, 12, 31, 23, 59, 59), datetime(1970, 1, 1),
+                      datetime(2000, 2, 29, 12, 30, 1), datetime(2008, 2, 1, 9, 0), datetime(2100, 12, 31, 0, 1)]
+        self.dates += [datetime(2019, 12, 25) + timedelta(days=i, hours=i, minutes=7 * i, seconds=13 * i)
+                       for i in range(0, 800, 7)]
+
+    def test_metastock_parser(self):
+        parser = MetastockTimestampParser()
+        for date in self.dates:
+            value = int(date.strftime("%Y%m%d%H%M"))
+            expected = datetime_to_ns(date.replace(second=0))
+            assert parser.parse(value) == expected, "TimestampParsers: wrong metastock timestamp for %s" % (value,)
+            assert parser.parse(str(value)) == expected, "TimestampParsers: wrong metastock timestamp for %s" % (value,)
+
+    def test_sensors_parser(self):
+        parser = SensorsTimestampParser()
+        for date in self.dates:
+            timestamp = date.strftime("%m/%d/%Y %H:%M:%S")
+            assert parser.parse(timestamp) == datetime_to_ns(date), \
+                "TimestampParsers: wrong sensors timestamp for %s" % (timestamp,)
+        assert parser.parse("1/2/2020 3:04:05") == datetime_to_ns(datetime(2020, 1, 2, 3, 4, 5)), \
+            "TimestampParsers: a timestamp without zero padding was not parsed"
+        try:
+            parser.parse("13/01/2020 00:00:00")
+        except ValueError:
+            return
+        raise Exception("TimestampParsers: an invalid timestamp was parsed")
+
+    def test_twitter_parser(self):
+        parser = TwitterTimestampParser()
+        for date in self.dates:
+            timestamp = date.strftime("%a %b %d %H:%M:%S +0000 %Y")
+            assert parser.parse(timestamp) == datetime_to_ns(date), \
+                "TimestampParsers: wrong twitter timestamp for %s" % (timestamp,)
+
+    def test_invalid_dates(self):
+        parser = MetastockTimestampParser()
+        # the 30th of February, the 29th of February of a common century year and the 31st of April
+        for value in ("200802301000", "190002291000", "201904311000"):
+            try:
+                parser.parse(value)
+            except ValueError:
+                continue
+            raise Exception("TimestampParsers: an invalid date was parsed: %s" % (value,))
+        assert parser.parse("200002291000") == datetime_to_ns(datetime(2000, 2, 29, 10, 0)), \
+            "TimestampParsers: the 29th of February of a leap century year was not parsed"
+
+    def test_column_parsing(self):
+        timestamps = ["01/01/2020 00:00:0%d" % (i // 3,) for i in range(30)]
+        parser = StrptimeTimestampParser("%m/%d/%Y %H:%M:%S")
+        expected = [parser.parse(timestamp) for timestamp in timestamps]
+        assert SensorsTimestampParser().parse_column(timestamps) == expected, \
+            "TimestampParsers: wrong column parsing result"
+        assert SensorsTimestampParser(cache_size=0).parse_column(iter(timestamps)) == expected, \
+            "TimestampParsers: wrong column parsing result without a cache"
+
+    def test_data_formatters(self):
+        stock_formatter = MetastockDataFormatter()
+        payloads = [stock_formatter.parse_event("AAPL,2008020109%02d,135.4,135.48,135.4,135.46,3225" % (i // 2,))
+                    for i in range(10)]
+        expected = [datetime_to_ns(datetime(2008, 2, 1, 9, i // 2)) for i in range(10)]
+        assert stock_formatter.get_event_timestamps(payloads) == expected, \
+            "TimestampParsers: wrong metastock column timestamps"
+        assert [stock_formatter.get_event_timestamp(payload) for payload in payloads] == expected, \
+            "TimestampParsers: wrong metastock timestamps"
+        sensors_formatter = SensorsDataFormatter()
+        payload = sensors_formatter.parse_event("PressTemp,02/01/2008 09:00:01,1.5,1000.2,20.1")
+        assert sensors_formatter.get_event_timestamp(payload) == datetime_to_ns(datetime(2008, 2, 1, 9, 0, 1)), \
+            "TimestampParsers: wrong sensors timestamp"
+
+    def run_tests(self):
+        self.test_metastock_parser()
+        self.test_sensors_parser()
+        self.test_twitter_parser()
+        self.test_invalid_dates()
+        self.test_column_parsing()
+        self.test_data_formatters()
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternStructure import SeqOperator, PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import SmallerThanCondition, GreaterThanCondition
+from OpenCEP.condition.CompositeCondition import AndCondition
+from OpenCEP.condition.Condition import Variable
+from OpenCEP.plan.TreePlan import TreePlan, TreePlanLeafNode, TreePlanBinaryNode, OperatorTypes
+from OpenCEP.plan.multi.ShareLeavesTreePlanMerger import ShareLeavesTreePlanMerger
+from OpenCEP.plan.multi.SubTreeSharingTreePlanMerger import SubTreeSharingTreePlanMerger
+
+
+def run_tree_plan_merger_tests():
+    tree_plan_merger_test = TestTreePlanMerger()
+    tree_plan_merger_test.run_tests()
+    print("Tree plan merger unit tests executed successfully.")
+
+
+class TestTreePlanMerger:
+    @staticmethod
+    def __create_leaf(event_type: str, index: int):
+        return TreePlanLeafNode(index, event_type, event_type.lower())
+
+    def __create_plan(self, types: str, operator: OperatorTypes = OperatorTypes.SEQ):
+        """
+        Creates a left-deep tree plan over events of the given types.
+        """
+        root = self.__create_leaf(types[0], 0)
+        for index, event_type in enumerate(types[1:], 1):
+            root = TreePlanBinaryNode(operator, root, self.__create_leaf(event_type, index))
+        return root
+
+    @staticmethod
+    def __create_pattern(types: str):
+        return Pattern(SeqOperator(*[PrimitiveEventStructure(event_type, event_type.lower()) for event_type in types]),
+                       None, timedelta(seconds=1))
+
+    def __merge(self, merger, plans_types):
+        pattern_to_tree_plan_map = {}
+        for types in plans_types:
+            pattern = self.__create_pattern(types)
+            pattern_to_tree_plan_map[pattern] = TreePlan(self.__create_plan(types), pattern)
+        return [tree_plan.root for tree_plan in merger.merge_tree_plans(pattern_to_tree_plan_map).values()]
+
+    def test_structural_hash(self):
+        value = lambda x: x["value"]
+        first_node = TreePlanBinaryNode(OperatorTypes.AND, self.__create_leaf("A", 0), self.__create_leaf("B", 1),
+                                        AndCondition(SmallerThanCondition(Variable("a", value), Variable("b", value))))
+        # equivalent to the first node, with swapped subtrees and the opposite condition
+        second_node = TreePlanBinaryNode(OperatorTypes.AND, self.__create_leaf("B", 0), self.__create_leaf("A", 1),
+                                         AndCondition(GreaterThanCondition(Variable("b", value),
+                                                                           Variable("a", value))))
+        assert first_node.is_equivalent(second_node), "Tree plan merger: the test nodes are not equivalent"
+        assert first_node.get_structural_hash() == second_node.get_structural_hash(), \
+            "Tree plan merger: equivalent nodes have different structural hashes"
+        # atomic conditions of opposite relations
+        third_node = TreePlanBinaryNode(OperatorTypes.AND, self.__create_leaf("A", 0), self.__create_leaf("B", 1),
+                                        SmallerThanCondition(Variable("a", value), Variable("b", value)))
+        fourth_node = TreePlanBinaryNode(OperatorTypes.AND, self.__create_leaf("B", 0), self.__create_leaf("A", 1),
+                                         GreaterThanCondition(Variable("b", value), Variable("a", value)))
+        assert third_node.is_equivalent(fourth_node), "Tree plan merger: the test nodes are not equivalent"
+        assert third_node.get_structural_hash() == fourth_node.get_structural_hash(), \
+            "Tree plan merger: nodes with opposite atomic conditions have different structural hashes"
+        assert self.__create_plan("ABC").get_structural_hash() != self.__create_plan("ABD").get_structural_hash(), \
+            "Tree plan merger: nodes of different event types have equal structural hashes"
+
+    def test_subtree_sharing(self):
+        abc_root, abd_root, efg_root = self.__merge(SubTreeSharingTreePlanMerger(), ["ABC", "ABD", "EFG"])
+        assert abc_root.left_child is abd_root.left_child, "Tree plan merger: a common subtree was not shared"
+        assert abc_root is not abd_root and abc_root.right_child is not abd_root.right_child, \
+            "Tree plan merger: different subtrees were shared"
+        assert efg_root.left_child is not abc_root.left_child, "Tree plan merger: different subtrees were shared"
+
+    def test_leaves_sharing(self):
+        abc_root, abd_root = self.__merge(ShareLeavesTreePlanMerger(), ["ABC", "ABD"])
+        assert abc_root.left_child is not abd_root.left_child, "Tree plan merger: an internal node was shared"
+        assert abc_root.left_child.left_child is abd_root.left_child.left_child, \
+            "Tree plan merger: a common leaf was not shared"
+
+    def run_tests(self):
+        self.test_structural_hash()
+        self.test_subtree_sharing()
+        self.test_leaves_sharing()
@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+from OpenCEP.adaptive.statistics.StatisticsTypes import StatisticsTypes
+from OpenCEP.base.Pattern import Pattern
+from OpenCEP.base.PatternMatch import PatternMatch
+from OpenCEP.base.PatternStructure import SeqOperator, PrimitiveEventStructure
+from OpenCEP.condition.BaseRelationCondition import SmallerThanCondition
+from OpenCEP.condition.Condition import Variable
+from OpenCEP.evaluation.EvaluationMechanismFactory import TreeBasedEvaluationMechanismParameters, \
+    EvaluationMechanismFactory
+from OpenCEP.misc.Timestamps import NANOSECONDS_PER_SECOND
+from OpenCEP.stream.Stream import Stream, OutputStream
+from OpenCEP.tree.PatternMatchStorage import TreeStorageParameters, UnsortedPatternMatchStorage
+from OpenCEP.tree.TreeProfiler import TreeProfiler
+from test.UnitTests.DictDataFormatter import DictDataFormatter
+
+
+class Event:
+    def __init__(self, time):
+        self.min_timestamp = self.max_timestamp = self.timestamp = time
+
+
+def run_tree_profiling_tests():
+    tree_profiling_test = TestTreeProfiling()
+    tree_profiling_test.run_tests()
+    print("Tree profiling unit tests executed successfully.")
+
+
+class TestTreeProfiling:
+    def __init__(self):
+        # A and B events alternate every second, the value of every other A event exceeding the value of the B events
+        self.events = []
+        for i in range(20):
+            self.events.append({"type": "A", "time": (2 * i) * NANOSECONDS_PER_SECOND, "value": 2 * (i % 2)})
+            self.events.append({"type": "B", "time": (2 * i + 1) * NANOSECONDS_PER_SECOND, "value": 1})
+
+    @staticmethod
+    def __create_pattern(statistics: dict = None):
+        return Pattern(SeqOperator(PrimitiveEventStructure("A", "a"), PrimitiveEventStructure("B", "b")),
+                       SmallerThanCondition(Variable("a", lambda x: x["value"]), Variable("b", lambda x: x["value"])),
+                       timedelta(seconds=10), statistics=statistics)
+
+    def __run(self, pattern: Pattern, profile_nodes: bool):
+        eval_mechanism = EvaluationMechanismFactory.build_eval_mechanism(TreeBasedEvaluationMechanismParameters(
+            storage_params=TreeStorageParameters(clean_up_interval=1, profile_nodes=profile_nodes)), [pattern])
+        events = Stream()
+        for event in self.events:
+            events.add_item(event)
+        events.close()
+        matches = OutputStream()
+        eval_mechanism.eval(events, matches, DictDataFormatter())
+        return eval_mechanism, len(list(matches))
+
+    def test_profiling_disabled(self):
+        eval_mechanism, _ = self.__run(self.__create_pattern(), False)
+        try:
+            eval_mechanism.get_profile_report()
+        except Exception:
+            return
+        assert False, "Tree profiling: a report was returned with profiling disabled"
+
+    def test_node_counters(self):
+        _, expected_matches_count = self.__run(self.__create_pattern(), False)
+        eval_mechanism, matches_count = self.__run(self.__create_pattern(), True)
+        assert matches_count == expected_matches_count, "Tree profiling: profiling changed the detected matches"
+        root_row, a_row, b_row = eval_mechanism._tree.get_profile()
+        assert (root_row["node"], root_row["depth"]) == ("SEQ", 0), "Tree profiling: wrong root row"
+        assert (a_row["node"], a_row["depth"]) == ("a (A)", 1), "Tree profiling: wrong leaf row"
+        assert a_row["added"] == b_row["added"] == 20, "Tree profiling: wrong number of partial matches at a leaf"
+        assert a_row["candidates"] == a_row["evaluations"] == 20, "Tree profiling: wrong number of leaf candidates"
+        assert root_row["added"] == matches_count, "Tree profiling: wrong number of partial matches at the root"
+        assert root_row["probes"] == 40, "Tree profiling: each new leaf partial match must probe the root once"
+        # a pair is only evaluated if its events are ordered and fit within the window
+        assert root_row["candidates"] > root_row["evaluations"] > root_row["added"], \
+            "Tree profiling: wrong number of root candidates"
+        assert root_row["pass_rate"] == root_row["added"] / root_row["evaluations"], \
+            "Tree profiling: wrong pass rate"
+        assert a_row["expired"] > 0 and a_row["added"] - a_row["expired"] <= 5, \
+            "Tree profiling: expired partial matches were not counted"
+        assert root_row["handling_time_ns"] >= root_row["self_handling_time_ns"] > 0, \
+            "Tree profiling: the handling time was not measured"
+        # 20 partial matches were added to each leaf over 39 seconds, that is, about 5 per 10 seconds window
+        assert abs(a_row["actual_size"] - 20 * 10 / 39) < 1e-9, "Tree profiling: wrong actual size"
+        assert a_row["predicted_size"] is None, "Tree profiling: a size was predicted without statistics"
+
+    def test_predicted_sizes(self):
+        statistics = {StatisticsTypes.ARRIVAL_RATES: [0.5, 0.5],
+                      StatisticsTypes.SELECTIVITY_MATRIX: [[1.0, 0.5], [0.5, 1.0]]}
+        eval_mechanism, _ = self.__run(self.__create_pattern(statistics), True)
+        root_row, a_row, b_row = eval_mechanism._tree.get_profile()
+        assert a_row["predicted_size"] == b_row["predicted_size"] == 5.0, "Tree profiling: wrong leaf prediction"
+        assert root_row["predicted_size"] == 12.5, "Tree profiling: wrong root prediction"
+        report = eval_mechanism.get_profile_report()
+        lines = report.split("\n")
+        assert len(lines) == 4 and lines[0].startswith("node") and lines[2].startswith("  a (A)"), \
+            "Tree profiling: wrong report layout"
+
+    def test_storage_counters(self):
+        profile = TreeProfiler().create_node_profile()
+        storage = UnsortedPatternMatchStorage(1)
+        storage.set_profile(profile)
+        partial_matches = [PatternMatch([Event(i)]) for i in range(10)]
+        for pm in partial_matches:
+            storage.add(pm)
+        storage.remove_partial_matches({partial_matches[8].partial_id, partial_matches[9].partial_id})
+        storage.try_clean_expired_partial_matches(3)
+        storage.remove_partial_matches_containing(set(partial_matches[5].events))
+        assert (profile.partial_matches_shed, profile.partial_matches_expired, profile.partial_matches_purged) == \
+               (2, 3, 1), "Tree profiling: wrong storage counters"
+
+    def test_nested_handling_time(self):
+        profiler = TreeProfiler()
+        parent, grandparent = profiler.create_node_profile(), profiler.create_node_profile()
+        parent.start_handling()
+        grandparent.start_handling()
+        grandparent.stop_handling()
+        parent.stop_handling()
+        assert parent.handling_time_ns - parent.self_handling_time_ns == grandparent.handling_time_ns, \
+            "Tree profiling: the time of a nested handler was not excluded"
+
+    def run_tests(self):
+        self.test_profiling_disabled()
+        self.test_node_counters()
+        self.test_predicted_sizes()
+        self.test_storage_counters()
+        self.test_nested_handling_time()
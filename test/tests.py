@@ -10,6 +10,23 @@ from test.StorageTests import *
 import test.EventProbabilityTests
 from test.NestedTests import *
 from test.UnitTests.test_storage import run_storage_tests
+from test.UnitTests.test_statistics import run_statistics_tests
+from test.UnitTests.test_load_shedding import run_load_shedding_tests
+from test.UnitTests.test_match_sinks import run_match_sinks_tests
+from test.UnitTests.test_leaf_predicate_index import run_leaf_predicate_index_tests
+from test.UnitTests.test_group_by_key import run_group_by_key_tests
+from test.UnitTests.test_lazy_nfa import run_lazy_nfa_tests
+from test.UnitTests.test_timestamp_parsers import run_timestamp_parsers_tests
+from test.UnitTests.test_schema_csv_data_formatter import run_schema_csv_data_formatter_tests
+from test.UnitTests.test_columnar_file_stream import run_columnar_file_stream_tests
+from test.UnitTests.test_benchmark import run_benchmark_tests
+from test.UnitTests.test_tree_profiling import run_tree_profiling_tests
+from test.UnitTests.test_structure_parallel import run_structure_parallel_tests
+from test.UnitTests.test_task_parallel import run_task_parallel_tests
+from test.UnitTests.test_multi_pattern_graph import run_multi_pattern_graph_tests
+from test.UnitTests.test_tree_plan_merger import run_tree_plan_merger_tests
+from test.UnitTests.test_freeze_policy import run_freeze_policy_tests
+from test.UnitTests.test_state_migration import run_state_migration_tests
 from test.UnitTests.RuleTransformationTests import ruleTransformationTests
 from test.ParallelTests import *
 
@@ -125,6 +142,8 @@ testWithMultipleNotAtBeginningMiddleEnd2StatDPTree()
 # consumption policies tests
 singleType1PolicyPatternSearchTest()
 singleType2PolicyPatternSearchTest()
+andSingleType1PolicyPatternSearchTest()
+andSingleType2PolicyPatternSearchTest()
 contiguousPolicyPatternSearchTest()
 contiguousPolicy2PatternSearchTest()
 freezePolicyPatternSearchTest()
@@ -132,7 +151,25 @@ freezePolicy2PatternSearchTest()
 
 # storage tests
 sortedStorageTest()
+spilledUnsortedStorageTest()
+spilledSortedStorageTest()
 run_storage_tests()
+run_load_shedding_tests()
+run_match_sinks_tests()
+run_leaf_predicate_index_tests()
+run_group_by_key_tests()
+run_lazy_nfa_tests()
+run_timestamp_parsers_tests()
+run_schema_csv_data_formatter_tests()
+run_columnar_file_stream_tests()
+run_benchmark_tests()
+run_tree_profiling_tests()
+run_structure_parallel_tests()
+run_task_parallel_tests()
+run_multi_pattern_graph_tests()
+run_tree_plan_merger_tests()
+run_freeze_policy_tests()
+run_state_migration_tests()
 
 # multi-pattern tests
 leafIsRoot()
@@ -193,6 +230,9 @@ NestedNegationWithKCTest()
 NestedNegationWithNestedKCStructuralTest()
 
 
+# statistics unit tests
+run_statistics_tests()
+
 # Optimizer tests
 greedyInvariantOptimizerTreeChangeFailTest_1()
 greedyInvariantOptimizerTreeChangeFailTest_2()
@@ -274,6 +314,24 @@ googleIncreasePatternSearchTest_8()
 amazonSpecificPatternSearchTest_8()
 googleAmazonLowPatternSearchTest_8()
 
+# state migration evaluation with deviation aware optimizer
+simple_9()
+googleAscendPatternSearchTest_9()
+amazonInstablePatternSearchTest_9()
+msftDrivRacePatternSearchTest_9()
+googleIncreasePatternSearchTest_9()
+amazonSpecificPatternSearchTest_9()
+googleAmazonLowPatternSearchTest_9()
+
+# state migration evaluation with greedy invariant optimizer
+simple_10()
+googleAscendPatternSearchTest_10()
+amazonInstablePatternSearchTest_10()
+msftDrivRacePatternSearchTest_10()
+googleIncreasePatternSearchTest_10()
+amazonSpecificPatternSearchTest_10()
+googleAmazonLowPatternSearchTest_10()
+
 # parallel testing
 simpleGroupByKeyTest()
 SensorsDataHIRZELTest()